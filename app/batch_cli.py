@@ -0,0 +1,318 @@
+########################
+# Batch CLI             #
+########################
+
+import argparse
+import csv
+from dataclasses import dataclass
+from decimal import Decimal
+import io
+from itertools import islice
+import json
+import sys
+import time
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from app.calculator import Calculator
+
+# Rows evaluated and written together
+DEFAULT_CHUNK_SIZE = 1000
+
+# Size of the output buffer, so results reach the file in large writes
+WRITE_BUFFER_SIZE = 1 << 20
+
+# File extensions read as JSON Lines; anything else is CSV
+JSONL_SUFFIXES = ('.jsonl', '.ndjson', '.json')
+
+# One input row: (line number, operation, a, b, error); the error is set for
+# rows that could not be read, and the other fields may then be empty
+BatchRow = Tuple[int, str, str, str, Optional[str]]
+
+
+@dataclass
+class BatchSummary:
+    """
+    Totals of a batch run.
+    """
+
+    rows: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """
+        Get the throughput of the run.
+
+        Returns:
+            float: Rows per second, 0.0 for an instant run.
+        """
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        """
+        Return the summary printed at the end of a run.
+
+        Returns:
+            str: The row and error counts, the duration and the throughput.
+        """
+        return (
+            f"Processed {self.rows} rows ({self.errors} errors) "
+            f"in {self.seconds:.3f}s: {self.rate:.0f} rows/s"
+        )
+
+
+def read_csv_rows(lines: Iterable[str]) -> Iterator[BatchRow]:
+    """
+    Read operations from CSV lines of operation, a, b.
+
+    A first row starting with 'operation' is a header and is skipped. Rows are
+    read lazily, one at a time.
+
+    Args:
+        lines (Iterable[str]): The CSV lines.
+
+    Yields:
+        BatchRow: The rows, with an error for rows without three fields.
+    """
+    reader = csv.reader(lines)
+    for row in reader:
+        line = reader.line_num
+        if line == 1 and row and row[0].strip().lower() == 'operation':
+            continue
+        if not row:
+            continue
+        if len(row) != 3:
+            yield line, '', '', '', f"Expected 3 fields (operation, a, b), got {len(row)}"
+            continue
+        yield line, row[0].strip(), row[1].strip(), row[2].strip(), None
+
+
+def read_jsonl_rows(lines: Iterable[str]) -> Iterator[BatchRow]:
+    """
+    Read operations from JSON Lines objects with operation, a and b keys.
+
+    Numbers are read as exact Decimals. Blank lines are skipped.
+
+    Args:
+        lines (Iterable[str]): The JSON lines.
+
+    Yields:
+        BatchRow: The rows, with an error for lines that are not valid operations.
+    """
+    for line, text in enumerate(lines, 1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text, parse_float=Decimal)
+            yield line, str(record['operation']), str(record['a']), str(record['b']), None
+        except (ValueError, KeyError, TypeError) as e:
+            yield line, '', '', '', f"Invalid JSON operation: {e}"
+
+
+def chunked(rows: Iterable[BatchRow], size: int) -> Iterator[List[BatchRow]]:
+    """
+    Group rows into lists of at most a given size.
+
+    Args:
+        rows (Iterable[BatchRow]): The rows.
+        size (int): The chunk size.
+
+    Yields:
+        List[BatchRow]: The chunks, in order.
+    """
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def format_jsonl(line: int, operation: str, a: str, b: str, outcome: object) -> str:
+    """
+    Format the outcome of one row as a JSON line.
+
+    Args:
+        line (int): Input line number.
+        operation (str): Operation identifier.
+        a (str): First operand.
+        b (str): Second operand.
+        outcome (object): The result, or the error message as a CalculatorError or str.
+
+    Returns:
+        str: The JSON object with a 'result' or 'error' key, and a newline.
+    """
+    record = {'line': line, 'operation': operation, 'a': a, 'b': b}
+    if isinstance(outcome, Decimal):
+        record['result'] = str(outcome)
+    else:
+        record['error'] = str(outcome)
+    return json.dumps(record) + '\n'
+
+
+class _CsvFormatter:
+    """
+    Formats outcomes as CSV lines of line, operation, a, b, result, error.
+    """
+
+    HEADER = ('line', 'operation', 'a', 'b', 'result', 'error')
+
+    def __init__(self):
+        """
+        Initialize the formatter.
+        """
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator='\n')
+
+    def header(self) -> str:
+        """
+        Format the header line.
+
+        Returns:
+            str: The CSV header, with a newline.
+        """
+        return self._format(self.HEADER)
+
+    def __call__(self, line: int, operation: str, a: str, b: str, outcome: object) -> str:
+        """
+        Format the outcome of one row as a CSV line.
+
+        Args:
+            line (int): Input line number.
+            operation (str): Operation identifier.
+            a (str): First operand.
+            b (str): Second operand.
+            outcome (object): The result, or the error message as a CalculatorError or str.
+
+        Returns:
+            str: The CSV line, with a newline.
+        """
+        ok = isinstance(outcome, Decimal)
+        return self._format((line, operation, a, b, str(outcome) if ok else '', '' if ok else str(outcome)))
+
+    def _format(self, fields: Iterable[object]) -> str:
+        """
+        Format one CSV record.
+
+        Args:
+            fields (Iterable[object]): The fields.
+
+        Returns:
+            str: The CSV line, with a newline.
+        """
+        self._writer.writerow(fields)
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text
+
+
+def run_batch(
+    calc: Calculator,
+    rows: Iterable[BatchRow],
+    out: TextIO,
+    output_format: str = 'jsonl',
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> BatchSummary:
+    """
+    Evaluate a stream of operations and write the outcome of every row.
+
+    Rows are evaluated a chunk at a time with Calculator.perform_many, without
+    recording them in the history, and each chunk's outcomes are written with
+    one write call. Only one chunk is held in memory at any time, so memory use
+    does not grow with the input. Rows that cannot be read or calculated are
+    written with their error, and the run continues.
+
+    Args:
+        calc (Calculator): The calculator evaluating the rows.
+        rows (Iterable[BatchRow]): The input rows.
+        out (TextIO): The output stream.
+        output_format (str, optional): 'jsonl' or 'csv'. Defaults to 'jsonl'.
+        chunk_size (int, optional): Rows evaluated together. Defaults to DEFAULT_CHUNK_SIZE.
+
+    Returns:
+        BatchSummary: The number of rows and errors and the duration of the run.
+    """
+    summary = BatchSummary()
+    started = time.perf_counter()
+    if output_format == 'csv':
+        formatter = _CsvFormatter()
+        out.write(formatter.header())
+    else:
+        formatter = format_jsonl
+
+    for chunk in chunked(rows, chunk_size):
+        readable = [row for row in chunk if row[4] is None]
+        results = iter(calc.perform_many([(op, a, b) for _, op, a, b, _ in readable], record=False))
+        lines = []
+        for line, op, a, b, error in chunk:
+            outcome = error if error is not None else next(results)
+            if not isinstance(outcome, Decimal):
+                summary.errors += 1
+            lines.append(formatter(line, op, a, b, outcome))
+        out.write(''.join(lines))
+        summary.rows += len(chunk)
+
+    summary.seconds = time.perf_counter() - started
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the batch command line: evaluate an operations file and write the results.
+
+    Usage: python main.py batch [--in FILE] [--out FILE] [--format auto|csv|jsonl]
+    [--chunk-size N]. The input defaults to stdin and the output to stdout. The
+    input format follows the file extension ('.jsonl', '.ndjson' and '.json'
+    are JSON Lines, anything else CSV) and stdin is read as CSV unless a format
+    is given. Results are written as CSV to '.csv' files and as JSON Lines
+    otherwise. The throughput summary is printed to stderr.
+
+    Args:
+        argv (Optional[List[str]], optional): The arguments after 'batch'.
+            Defaults to sys.argv[2:].
+
+    Returns:
+        int: The exit status: 0 on success, 2 if a file cannot be opened.
+    """
+    parser = argparse.ArgumentParser(prog="main.py batch", description="Evaluate operations from a file or stdin.")
+    parser.add_argument('--in', dest='input', default='-', help="operations file, CSV or JSON Lines (default: stdin)")
+    parser.add_argument('--out', dest='output', default='-', help="results file, CSV or JSON Lines (default: stdout)")
+    parser.add_argument('--format', choices=('auto', 'csv', 'jsonl'), default='auto', help="input format")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="rows evaluated together")
+    args = parser.parse_args(sys.argv[2:] if argv is None else argv)
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be positive")
+
+    input_format = args.format
+    if input_format == 'auto':
+        input_format = 'jsonl' if args.input.lower().endswith(JSONL_SUFFIXES) else 'csv'
+    output_format = 'csv' if args.output.lower().endswith('.csv') else 'jsonl'
+
+    try:
+        source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8', newline='')
+    except OSError as e:
+        print(f"Error: cannot read {args.input}: {e}", file=sys.stderr)
+        return 2
+    try:
+        try:
+            out = sys.stdout if args.output == '-' else open(
+                args.output, 'w', encoding='utf-8', newline='', buffering=WRITE_BUFFER_SIZE
+            )
+        except OSError as e:
+            print(f"Error: cannot write {args.output}: {e}", file=sys.stderr)
+            return 2
+        calc = Calculator()
+        try:
+            rows = read_jsonl_rows(source) if input_format == 'jsonl' else read_csv_rows(source)
+            summary = run_batch(calc, rows, out, output_format, args.chunk_size)
+        finally:
+            calc.close()
+            if out is not sys.stdout:
+                out.close()
+            else:
+                out.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    print(summary, file=sys.stderr)
+    return 0
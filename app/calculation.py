@@ -5,10 +5,16 @@
 from dataclasses import dataclass, field
 import datetime
 from decimal import Decimal, InvalidOperation
+import json
 import logging
-from typing import Any, Dict
+import random
+from typing import Any, Dict, Optional
 
-from app.exceptions import OperationError
+import numpy as np
+
+from app.decimal_math import quantizer
+from app.exceptions import OperationError, ValidationError
+from app.operations import OperationFactory
 
 
 @dataclass
@@ -40,13 +46,78 @@ class Calculation:
         """
         self.result = self.calculate()
 
+    @classmethod
+    def with_result(
+        cls,
+        operation: str,
+        operand1: Decimal,
+        operand2: Decimal,
+        result: Decimal,
+        timestamp: Optional[datetime.datetime] = None,
+        verify_rate: float = 0.0
+    ) -> 'Calculation':
+        """
+        Create a calculation whose result is already known.
+
+        Skips the recomputation done by __post_init__, for callers that have just
+        executed the operation or are loading a saved result. The result can be
+        checked against a recomputation for every calculation, a random sample of
+        them, or none.
+
+        Args:
+            operation (str): The name of the operation (e.g., "Addition").
+            operand1 (Decimal): The first operand.
+            operand2 (Decimal): The second operand.
+            result (Decimal): The known result of the calculation.
+            timestamp (Optional[datetime.datetime], optional): Time of the calculation.
+                Defaults to now.
+            verify_rate (float, optional): Fraction of calculations to verify, from 0.0
+                (never) to 1.0 (always). Defaults to 0.0.
+
+        Returns:
+            Calculation: The new calculation.
+        """
+        calc = cls.__new__(cls)
+        calc.operation = operation
+        calc.operand1 = operand1
+        calc.operand2 = operand2
+        calc.result = result
+        calc.timestamp = timestamp if timestamp is not None else datetime.datetime.now()
+        if verify_rate >= 1.0 or (verify_rate > 0.0 and random.random() < verify_rate):
+            calc.verify()
+        return calc
+
+    def verify(self) -> bool:
+        """
+        Check the stored result against a recomputation.
+
+        Logs a warning and replaces the stored result with the computed one if they
+        differ (helps catch data corruption).
+
+        Returns:
+            bool: True if the stored result matches the computed result.
+        """
+        try:
+            computed = self.calculate()
+        except OperationError as e:
+            logging.warning(f"Could not verify calculation result {self.result}: {e}")
+            return False
+        if computed != self.result:
+            logging.warning(
+                f"Loaded calculation result {self.result} "
+                f"differs from computed result {computed}"
+            )
+            self.result = computed
+            return False
+        return True
+
     def calculate(self) -> Decimal:
         """
         Execute calculation using the specified operation.
 
-        Utilizes a dictionary to map operation names to their corresponding
-        lambda functions, enabling dynamic execution of operations based on
-        the operation name.
+        Looks the operation name up in the shared operation registry, so every
+        operation registered with OperationFactory, built-in or custom, can be
+        recomputed.
 
         Returns:
             Decimal: The result of the calculation.
@@ -54,71 +125,20 @@ class Calculation:
         Raises:
             OperationError: If the operation is unknown or the calculation fails.
         """
-        # Mapping of operation names to their corresponding functions
-        operations = {
-            "Addition": lambda x, y: x + y,
-            "Subtraction": lambda x, y: x - y,
-            "Multiplication": lambda x, y: x * y,
-            "Division": lambda x, y: x / y if y != 0 else self._raise_div_zero(),
-            "Power": lambda x, y: Decimal(pow(float(x), float(y))) if y >= 0 else self._raise_neg_power(),
-            "Root": lambda x, y: (
-                Decimal(pow(float(x), 1 / float(y))) 
-                if x >= 0 and y != 0 
-                else self._raise_invalid_root(x, y)
-            ),
-            "Modulus": lambda x, y: x % y if y != 0 else self._raise_div_zero(),
-            "IntDivision": lambda x, y: x // y if y != 0 else self._raise_div_zero(),
-            "Percentage": lambda x, y: (x / y) * 100 if y != 0 else self._raise_div_zero(),
-            "AbsDifference": lambda x, y: abs(x - y)
-        }
-
-        # Retrieve the operation function based on the operation name
-        op = operations.get(self.operation)
-        if not op:
+        # Retrieve the operation kernel based on the operation name
+        kernel = OperationFactory.get_kernel(self.operation)
+        if not kernel:
             raise OperationError(f"Unknown operation: {self.operation}")
 
         try:
             # Execute the operation with the provided operands
-            return op(self.operand1, self.operand2)
+            return kernel(self.operand1, self.operand2)
+        except ValidationError as e:
+            # Operand rules of the operation, such as division by zero
+            raise OperationError(str(e))
         except (InvalidOperation, ValueError, ArithmeticError) as e: 
             # Handle any errors that occur during calculation
-            raise OperationError(f"Calculation failed: {str(e)}") # pragma: no cover
-
-    @staticmethod
-    def _raise_div_zero():  # pragma: no cover
-        """
-        Helper method to raise division by zero error.
-
-        This method is called when a division by zero is attempted.
-        """
-        raise OperationError("Division by zero is not allowed")
-
-    @staticmethod
-    def _raise_neg_power():  # pragma: no cover
-        """
-        Helper method to raise negative power error.
-
-        This method is called when a negative exponent is used in a power operation.
-        """
-        raise OperationError("Negative exponents are not supported")
-
-    @staticmethod
-    def _raise_invalid_root(x: Decimal, y: Decimal):  # pragma: no cover
-        """
-        Helper method to raise invalid root error.
-
-        This method is called when an invalid root operation is attempted, such as
-        taking the root of a negative number or using zero as the root degree.
-
-        Args:
-            x (Decimal): The number from which the root is taken.
-            y (Decimal): The degree of the root.
-        """
-        if y == 0:
-            raise OperationError("Zero root is undefined")
-        if x < 0:
-            raise OperationError("Cannot calculate root of negative number")
-        raise OperationError("Invalid root operation")
+            raise OperationError(f"Calculation failed: {str(e)}")
 
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -139,15 +159,18 @@ class Calculation:
         }
 
     @staticmethod
-    def from_dict(data: Dict[str, Any]) -> 'Calculation':
+    def from_dict(data: Dict[str, Any], verify_rate: float = 1.0) -> 'Calculation':
         """
         Create calculation from dictionary.
 
         This method reconstructs a Calculation instance from a dictionary, ensuring
-        that all required fields are present and correctly formatted.
+        that all required fields are present and correctly formatted. The saved
+        result is used as is, and checked against a recomputation at the given rate.
 
         Args:
             data (Dict[str, Any]): Dictionary containing calculation data.
+            verify_rate (float, optional): Fraction of loaded results to verify, from
+                0.0 (never) to 1.0 (always). Defaults to 1.0.
 
         Returns:
             Calculation: A new instance of Calculation with data populated from the dictionary.
@@ -155,27 +178,20 @@ class Calculation:
         Raises:
             OperationError: If data is invalid or missing required fields.
         """
+        # Batch entries store their operands as JSON arrays
+        if str(data.get('operand1', '')).lstrip().startswith('['):
+            return BatchCalculation.from_dict(data)
+
         try:
-            # Create the calculation object with the original operands
-            calc = Calculation(
+            return Calculation.with_result(
                 operation=data['operation'],
                 operand1=Decimal(data['operand1']),
-                operand2=Decimal(data['operand2'])
+                operand2=Decimal(data['operand2']),
+                result=Decimal(data['result']),
+                timestamp=datetime.datetime.fromisoformat(data['timestamp']),
+                verify_rate=verify_rate
             )
 
-            # Set the timestamp from the saved data
-            calc.timestamp = datetime.datetime.fromisoformat(data['timestamp'])
-
-            # Verify the result matches (helps catch data corruption)
-            saved_result = Decimal(data['result'])
-            if calc.result != saved_result:
-                logging.warning(
-                    f"Loaded calculation result {saved_result} "
-                    f"differs from computed result {calc.result}"
-                )  # pragma: no cover
-
-            return calc
-
         except (KeyError, InvalidOperation, ValueError) as e:
             raise OperationError(f"Invalid calculation data: {str(e)}")
 
@@ -246,8 +262,108 @@ class Calculation:
         """
         try:
             # Remove trailing zeros and format to specified precision
-            return str(self.result.normalize().quantize(
-                Decimal('0.' + '0' * precision)
-            ).normalize())
+            return str(self.result.normalize().quantize(quantizer(precision)).normalize())
         except InvalidOperation:  # pragma: no cover
             return str(self.result)
+
+
+
+@dataclass(eq=False)
+class BatchCalculation:
+    """
+    Value Object representing a vectorized batch of calculations.
+
+    A batch is recorded in the history as a single compact entry holding the
+    float64 operand and result arrays of one operation, instead of one Calculation
+    per row. Rows that could not be calculated are flagged in the error mask and
+    hold NaN as their result.
+    """
+
+    operation: str              # The name of the operation (e.g., "Addition")
+    operand1: np.ndarray        # The first operands of every row
+    operand2: np.ndarray        # The second operands of every row
+    result: np.ndarray          # The results of every row (NaN where the row failed)
+    errors: np.ndarray          # Boolean mask of the rows that failed
+    timestamp: datetime.datetime = field(default_factory=datetime.datetime.now)  # Time when the batch was performed
+
+    def __len__(self) -> int:
+        """
+        Return the number of rows in the batch.
+
+        Returns:
+            int: Number of rows.
+        """
+        return len(self.result)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the batch to dictionary for serialization.
+
+        The arrays are stored as JSON lists so the batch fits the same columns as a
+        single Calculation.
+
+        Returns:
+            Dict[str, Any]: A dictionary containing the batch data in a serializable format.
+        """
+        return {
+            'operation': self.operation,
+            'operand1': json.dumps(self.operand1.tolist()),
+            'operand2': json.dumps(self.operand2.tolist()),
+            'result': json.dumps(self.result.tolist()),
+            'timestamp': self.timestamp.isoformat()
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> 'BatchCalculation':
+        """
+        Create a batch from dictionary.
+
+        Args:
+            data (Dict[str, Any]): Dictionary containing batch data.
+
+        Returns:
+            BatchCalculation: A new instance of BatchCalculation with data populated from the dictionary.
+
+        Raises:
+            OperationError: If data is invalid or missing required fields.
+        """
+        try:
+            result = np.array(json.loads(data['result']), dtype=np.float64)
+            return BatchCalculation(
+                operation=data['operation'],
+                operand1=np.array(json.loads(data['operand1']), dtype=np.float64),
+                operand2=np.array(json.loads(data['operand2']), dtype=np.float64),
+                result=result,
+                errors=np.isnan(result),
+                timestamp=datetime.datetime.fromisoformat(data['timestamp'])
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise OperationError(f"Invalid calculation data: {str(e)}")
+
+    def __str__(self) -> str:
+        """
+        Return string representation of the batch.
+
+        Returns:
+            str: Formatted string showing the operation, row count and error count.
+        """
+        return f"{self.operation}[{len(self)} rows, {int(self.errors.sum())} errors]"
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Check if two batches are equal.
+
+        Args:
+            other (object): Another batch to compare with.
+
+        Returns:
+            bool: True if both batches hold the same operation and arrays, False otherwise.
+        """
+        if not isinstance(other, BatchCalculation):
+            return NotImplemented
+        return (
+            self.operation == other.operation and
+            np.array_equal(self.operand1, other.operand1, equal_nan=True) and
+            np.array_equal(self.operand2, other.operand2, equal_nan=True) and
+            np.array_equal(self.result, other.result, equal_nan=True)
+        )
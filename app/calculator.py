@@ -2,25 +2,48 @@
 # Calculator Class      #
 ########################
 
-from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+from decimal import Decimal, InvalidOperation, localcontext
+from itertools import repeat
 import logging
+import multiprocessing
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
-from app.calculation import Calculation
+from app.calculation import BatchCalculation, Calculation
 from app.calculator_config import CalculatorConfig
-from app.calculator_memento import CalculatorMemento
-from app.exceptions import OperationError, ValidationError
+from app.calculator_memento import CalculatorMemento, HistoryDelta
+from app.exceptions import CalculatorError, OperationError, ValidationError
+from app.expression import compile_expression
+from app.formulas import Formula, define_formula, formula_definitions, load_formulas
 from app.history import HistoryObserver
+from app.history_buffer import HistoryBuffer
+from app.history_format import is_binary_path
+from app.history_index import HistoryIndex
+from app.history_journal import HistoryJournal
+from app.history_reader import HistoryReader
+from app.history_storage import (
+    FileHistoryStorage, HistoryStorage, SQLiteHistoryStorage, read_history_file, write_history_file
+)
+from app.history_writer import BackgroundHistoryWriter
 from app.input_validators import InputValidator
-from app.operations import Operation
+from app.operation_cache import OperationCache
+from app.operations import Operation, OperationFactory
+from app.parallel import (
+    decode_outcomes, decode_rows, encode_rows, evaluate_chunk, init_worker, is_encodable,
+    resolve_operation
+)
 
 # Type aliases for better readability
 Number = Union[int, float, Decimal]
 CalculationResult = Union[Number, str]
+OperationRow = Tuple[Union[str, Operation], Union[str, Number], Union[str, Number]]
 
 
 class Calculator:
@@ -33,13 +56,27 @@ class Calculator:
     scalability.
     """
 
-    def __init__(self, config: Optional[CalculatorConfig] = None):
+    def __init__(
+        self,
+        config: Optional[CalculatorConfig] = None,
+        load_saved_history: bool = True,
+        operation_cache: Optional[OperationCache] = None,
+        configure_logging: bool = True
+    ):
         """
         Initialize calculator with configuration.
 
         Args:
             config (Optional[CalculatorConfig], optional): Configuration settings for the calculator.
                 If not provided, default settings are loaded based on environment variables.
+            load_saved_history (bool, optional): Whether to define the formulas of the formulas
+                file and load the saved history. Calculators whose state is managed elsewhere,
+                such as sessions, start empty instead. Defaults to True.
+            operation_cache (Optional[OperationCache], optional): Result cache shared with
+                other calculators. Defaults to a cache of the calculator's own, if the
+                configuration enables one.
+            configure_logging (bool, optional): Whether to configure logging to the log
+                file, which calculators created together need only do once. Defaults to True.
         """
         if config is None:
             # Determine the project root directory if no configuration is provided
@@ -51,46 +88,107 @@ class Calculator:
         self.config = config
         self.config.validate()
 
+        # Decimal context every calculation is evaluated in; it is entered with
+        # localcontext, which is local to the running thread and task
+        self.decimal_context = self.config.decimal_context
+
         # Ensure that the log directory exists
         os.makedirs(self.config.log_dir, exist_ok=True)
 
         # Set up the logging system
-        self._setup_logging()
+        if configure_logging:
+            self.setup_logging(self.config)
+
+        # Guards the history and the undo/redo stacks, so background saves copy a
+        # consistent snapshot
+        self._lock = threading.RLock()
+        # Serializes writes of the history file
+        self._save_lock = threading.Lock()
 
         # Initialize calculation history and operation strategy
-        self.history: List[Calculation] = []
-        self.operation_strategy: Optional[Operation] = None
+        self.history = HistoryBuffer(
+            self.config.max_history_size,
+            self.config.max_history_age or None
+        )
+        # Secondary indexes over the history, kept in step with every change
+        self.index = HistoryIndex()
+        # Immutable copy of the history handed to readers, rebuilt after each change
+        self._snapshot: Optional[Tuple[Any, ...]] = None
+
+        # Current operation set by set_operation: shared by all threads, or kept
+        # per thread in concurrent mode
+        self._operation_strategy: Optional[Operation] = None
+        self._thread_state = threading.local()
+
+        # Least-recently-used cache of operation results, optionally persisted across runs
+        self.operation_cache: Optional[OperationCache] = operation_cache
+        if self.operation_cache is None and self.config.operation_cache_size:
+            self.operation_cache = OperationCache(
+                self.config.operation_cache_size,
+                self.config.operation_cache_file if self.config.operation_cache_persist else None
+            )
 
         # Initialize observer list for the Observer pattern
         self.observers: List[HistoryObserver] = []
 
-        # Initialize stacks for undo and redo functionality using the Memento pattern
-        self.undo_stack: List[CalculatorMemento] = []
-        self.redo_stack: List[CalculatorMemento] = []
+        # Initialize stacks of history changes for undo and redo functionality
+        self.undo_stack: List[HistoryDelta] = []
+        self.redo_stack: List[HistoryDelta] = []
 
         # Create required directories for history management
         self._setup_directories()
 
-        try:
-            # Attempt to load existing calculation history from file
-            self.load_history()
-        except Exception as e:
-            # Log a warning if history could not be loaded
-            logging.warning(f"Could not load existing history: {e}")
+        # Storage backend persisting the history, and whether its stored history
+        # matches the history, as it does once an incremental backend is loaded
+        self.storage: HistoryStorage = self._create_storage()
+        self._storage_in_step = False
+
+        # Append-only journal of history changes, used by the 'journal' auto-save mode
+        # of the history file (incremental backends persist each change themselves)
+        self.journal: Optional[HistoryJournal] = None
+        if self.config.auto_save and self.config.auto_save_mode == 'journal' and not self.storage.incremental:
+            self.journal = HistoryJournal(self.config.journal_file, self.config.journal_durability)
+        self._compaction_thread: Optional[threading.Thread] = None
+
+        # Background thread coalescing saves, used by the 'background' auto-save mode
+        self.writer: Optional[BackgroundHistoryWriter] = None
+
+        # Formulas defined in the formulas file, registered before the history is
+        # loaded so calculations using them can be recomputed
+        if load_saved_history:
+            load_formulas(self.config.formulas_file)
+
+            try:
+                # Attempt to load existing calculation history from file
+                self.load_history()
+            except Exception as e:
+                # Log a warning if history could not be loaded
+                logging.warning(f"Could not load existing history: {e}")
+
+        if self.config.auto_save and self.config.auto_save_mode == 'background' and not self.storage.incremental:
+            self.writer = BackgroundHistoryWriter(
+                self._save_snapshot,
+                flush_every=self.config.save_flush_every,
+                flush_interval=self.config.save_flush_interval_ms / 1000
+            )
 
         # Log the successful initialization of the calculator
         logging.info("Calculator initialized with configuration")
 
-    def _setup_logging(self) -> None:
+    @staticmethod
+    def setup_logging(config: CalculatorConfig) -> None:
         """
         Configure the logging system.
 
         Sets up logging to a file with a specified format and log level.
+
+        Args:
+            config (CalculatorConfig): The configuration naming the log file.
         """
         try:
             # Ensure the log directory exists
-            os.makedirs(self.config.log_dir, exist_ok=True)
-            log_file = self.config.log_file.resolve()
+            os.makedirs(config.log_dir, exist_ok=True)
+            log_file = config.log_file.resolve()
 
             # Configure the basic logging settings
             logging.basicConfig(
@@ -105,6 +203,18 @@ class Calculator:
             print(f"Error setting up logging: {e}")
             raise
 
+    def _create_storage(self) -> HistoryStorage:
+        """
+        Create the configured history storage backend.
+
+        Returns:
+            HistoryStorage: The SQLite backend for the 'sqlite' history backend,
+                otherwise the history file.
+        """
+        if self.config.history_backend == 'sqlite':
+            return SQLiteHistoryStorage(self.config.history_db_file, verify_rate=self.config.verify_rate)
+        return FileHistoryStorage(self.config)
+
     def _setup_directories(self) -> None:
         """
         Create required directories.
@@ -151,6 +261,55 @@ class Calculator:
         for observer in self.observers:
             observer.update(calculation)
 
+    def notify_observers_batch(self, calculations: List[Calculation]) -> None:
+        """
+        Notify all observers of a batch of new calculations.
+
+        Each observer is notified once for the whole batch.
+
+        Args:
+            calculations (List[Calculation]): The calculations performed in the batch.
+        """
+        for observer in self.observers:
+            observer.update_batch(calculations)
+
+    def _history_changed(self, kind: str, entries: List[Any] = ()) -> None:
+        """
+        Record a change to the history.
+
+        Every mutation of the history is reported here, so the history index and
+        observers can follow it, the journal can log it and incremental storage
+        backends can apply it.
+
+        Args:
+            kind (str): The kind of change: 'append', 'prepend', 'evict',
+                'truncate', 'clear' or 'reset'.
+            entries (List[Any], optional): The entries the change added or removed,
+                oldest first. Defaults to none.
+        """
+        if not entries and kind not in ('clear', 'reset'):
+            return
+        self._follow_history(kind, entries)
+        if self.journal is not None:
+            self.journal.record(kind, entries)
+        if self.storage.incremental:
+            self.storage.record(kind, entries)
+
+    def _follow_history(self, kind: str, entries: List[Any] = ()) -> None:
+        """
+        Update the history index and observers for a change to the history.
+
+        Args:
+            kind (str): The kind of change.
+            entries (List[Any], optional): The entries the change added or removed,
+                oldest first. Defaults to none.
+        """
+        # Readers get a new snapshot on their next read
+        self._snapshot = None
+        self.index.apply(kind, entries)
+        for observer in self.observers:
+            observer.history_changed(kind, entries)
+
     def set_operation(self, operation: Operation) -> None:
         """
         Set the current operation strategy.
@@ -165,20 +324,54 @@ class Calculator:
         self.operation_strategy = operation
         logging.info(f"Set operation: {operation}")
 
+    @property
+    def operation_strategy(self) -> Optional[Operation]:
+        """
+        Get the current operation strategy.
+
+        In concurrent mode every thread has its own current operation, so threads
+        sharing the calculator never perform each other's operations.
+
+        Returns:
+            Optional[Operation]: The operation set by set_operation, or None.
+        """
+        if self.config.concurrent:
+            return getattr(self._thread_state, 'operation', None)
+        return self._operation_strategy
+
+    @operation_strategy.setter
+    def operation_strategy(self, operation: Optional[Operation]) -> None:
+        """
+        Set the current operation strategy, for the calling thread in concurrent mode.
+
+        Args:
+            operation (Optional[Operation]): The operation strategy.
+        """
+        if self.config.concurrent:
+            self._thread_state.operation = operation
+        else:
+            self._operation_strategy = operation
+
     def perform_operation(
         self,
         a: Union[str, Number],
-        b: Union[str, Number]
+        b: Union[str, Number],
+        operation: Optional[Operation] = None
     ) -> CalculationResult:
         """
-        Perform calculation with the current operation.
+        Perform calculation with the given or the current operation.
 
         Validates and sanitizes user inputs, executes the calculation using the
-        current operation strategy, updates the history, and notifies observers.
+        operation, updates the history, and notifies observers. Passing the
+        operation, rather than calling set_operation first, keeps no state
+        between calls, so threads sharing a calculator can calculate at once; only
+        the update of the history is serialized.
 
         Args:
             a (Union[str, Number]): The first operand, can be a string or a numeric type.
             b (Union[str, Number]): The second operand, can be a string or a numeric type.
+            operation (Optional[Operation], optional): The operation to perform.
+                Defaults to the current operation strategy.
 
         Returns:
             CalculationResult: The result of the calculation.
@@ -187,87 +380,577 @@ class Calculator:
             OperationError: If no operation is set or if the operation fails.
             ValidationError: If input validation fails.
         """
-        if not self.operation_strategy:
+        if operation is None:
+            operation = self.operation_strategy
+        if not operation:
             raise OperationError("No operation set")
 
         try:
-            # Validate and convert inputs to Decimal
+            with localcontext(self.decimal_context):
+                # Validate and convert inputs to Decimal
+                validated_a = InputValidator.validate_number(a, self.config)
+                validated_b = InputValidator.validate_number(b, self.config)
+
+                # Execute the operation strategy
+                result = self._execute(operation, validated_a, validated_b)
+
+                # Create a new Calculation instance with the operation details
+                calculation = Calculation.with_result(
+                    operation=str(operation),
+                    operand1=validated_a,
+                    operand2=validated_b,
+                    result=result,
+                    verify_rate=self.config.verify_rate
+                )
+
+            # Record the calculation in the history and notify observers
+            self._add_to_history(calculation)
+
+            return result
+
+        except ValidationError as e:
+            # Log and re-raise validation errors
+            logging.error(f"Validation error: {str(e)}")
+            raise
+        except Exception as e: # pragma: no cover
+            # Log and raise operation errors for any other exceptions
+            logging.error(f"Operation failed: {str(e)}")
+            raise OperationError(f"Operation failed: {str(e)}")
+
+    def _execute(self, operation: Operation, a: Decimal, b: Decimal) -> Decimal:
+        """
+        Execute an operation through the operation cache, if enabled.
+
+        Args:
+            operation (Operation): The operation to execute.
+            a (Decimal): Validated first operand.
+            b (Decimal): Validated second operand.
+
+        Returns:
+            Decimal: The result of the operation.
+        """
+        if self.operation_cache is None:
+            return operation.execute(a, b)
+        return self.operation_cache.execute(operation, a, b)
+
+    def perform_many(
+        self,
+        rows: Iterable[OperationRow],
+        record: bool = True
+    ) -> List[Union[Decimal, CalculatorError]]:
+        """
+        Perform many exact Decimal calculations as one history commit.
+
+        Each row is validated and calculated exactly as perform_operation would,
+        all under the calculator's Decimal context, so the results match the scalar
+        path bit for bit. Failed rows are reported in place instead of raising. The successful
+        calculations are appended to the history at once, with a single undo step
+        and a single notification to each observer, unless recording is turned off
+        for callers that only want the results.
+
+        Args:
+            rows (Iterable[OperationRow]): Tuples of (operation, a, b), where the
+                operation is an identifier such as 'add' or an Operation instance.
+            record (bool, optional): Whether to record the calculations in the
+                history. Defaults to True.
+
+        Returns:
+            List[Union[Decimal, CalculatorError]]: For every row, in input order,
+                either its result or the error that prevented the calculation.
+        """
+        outcomes: List[Union[Decimal, CalculatorError]] = []
+        calculations: List[Calculation] = []
+        operations: Dict[str, Operation] = {}
+
+        with localcontext(self.decimal_context):
+            for op, a, b in rows:
+                outcome, calculation = self._calculate_row(operations, op, a, b, record)
+                outcomes.append(outcome)
+                if calculation is not None:
+                    calculations.append(calculation)
+
+        if calculations:
+            self._add_many_to_history(calculations)
+        logging.info(
+            f"Performed {len(outcomes)} calculations with "
+            f"{sum(isinstance(outcome, CalculatorError) for outcome in outcomes)} errors"
+        )
+        return outcomes
+
+    def stream(
+        self,
+        records: Iterable[OperationRow],
+        chunk_size: int = 1000
+    ) -> Iterator[Union[Decimal, CalculatorError]]:
+        """
+        Lazily calculate a stream of operations, yielding each outcome in turn.
+
+        Rows are read from the iterable only as outcomes are consumed, and each is
+        calculated exactly as perform_many would, so the stream composes with
+        lazy readers and writers, e.g.
+        out.writelines(f"{r}\n" for r in calc.stream(row[:3] for row in csv.reader(file))).
+        Successful calculations are buffered and committed to the history every
+        chunk_size calculations, with one notification to each observer per
+        chunk; the rest is committed when the stream ends or is closed.
+
+        The whole stream is a single undo step. Entries that the stream appends
+        and then evicts again cancel out of that step, so memory use is bounded by
+        the history size and the chunk size, however long the stream.
+
+        Args:
+            records (Iterable[OperationRow]): Tuples of (operation, a, b), where the
+                operation is an identifier such as 'add' or an Operation instance.
+            chunk_size (int, optional): Calculations committed to the history
+                together. Defaults to 1000.
+
+        Yields:
+            Union[Decimal, CalculatorError]: For every row, in input order, either
+                its result or the error that prevented the calculation.
+        """
+        operations: Dict[str, Operation] = {}
+        pending: List[Calculation] = []
+        delta: Optional[HistoryDelta] = None
+        count = errors = 0
+        try:
+            for op, a, b in records:
+                # The context is not held across the yield, so it never leaks to the consumer
+                with localcontext(self.decimal_context):
+                    outcome, calculation = self._calculate_row(operations, op, a, b)
+                count += 1
+                if calculation is None:
+                    errors += 1
+                else:
+                    pending.append(calculation)
+                    if len(pending) >= chunk_size:
+                        delta = self._add_many_to_history(pending, delta)
+                        pending = []
+                yield outcome
+        finally:
+            if pending:
+                self._add_many_to_history(pending, delta)
+            logging.info(f"Streamed {count} calculations with {errors} errors")
+
+    def perform_parallel(
+        self,
+        rows: Iterable[OperationRow],
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> List[Union[Decimal, CalculatorError]]:
+        """
+        Perform many exact Decimal calculations on several CPU cores.
+
+        The rows are split into chunks that worker processes validate and
+        calculate as perform_many would, in the calculator's Decimal context, so
+        the results are the same. Chunks travel to and from the workers in a
+        compact text encoding rather than as pickled Decimal or Calculation
+        objects. Outcomes are returned in input order, and the successful
+        calculations are appended to the history as one commit, with a single undo
+        step. Formulas defined in this process are defined in every worker. The
+        rare rows holding a separator character of the encoding are calculated
+        in this process instead.
+
+        Starting the worker processes takes a moment, so this pays off only for
+        large inputs; with a single worker the chunks are evaluated in this process.
+
+        Args:
+            rows (Iterable[OperationRow]): Tuples of (operation, a, b), where the
+                operation is an identifier such as 'add' or a registered Operation instance.
+            workers (Optional[int], optional): Worker processes, 0 for one per CPU core.
+                Defaults to the configured parallel_workers.
+            chunk_size (Optional[int], optional): Rows sent to a worker at a time.
+                Defaults to the configured parallel_chunk_size.
+
+        Returns:
+            List[Union[Decimal, CalculatorError]]: For every row, in input order,
+                either its result or the error that prevented the calculation.
+        """
+        workers = self.config.parallel_workers if workers is None else workers
+        workers = workers or os.cpu_count() or 1
+        chunk_size = chunk_size or self.config.parallel_chunk_size
+        chunks = []
+        pending: List[Tuple[str, Any, Any]] = []
+        # Rows the encoding cannot carry are calculated here, keyed by their position
+        local: Dict[int, Tuple[Union[Decimal, CalculatorError], Optional[Calculation]]] = {}
+        operations: Dict[str, Operation] = {}
+        with localcontext(self.decimal_context):
+            for position, (op, a, b) in enumerate(rows):
+                if not is_encodable((str(op), a, b)):
+                    local[position] = self._calculate_row(operations, op, a, b)
+                    continue
+                pending.append((str(op), a, b))
+                if len(pending) == chunk_size:
+                    chunks.append(encode_rows(pending))
+                    pending = []
+        if pending:
+            chunks.append(encode_rows(pending))
+
+        if workers == 1 or len(chunks) <= 1:
+            encoded = [evaluate_chunk(chunk, self.config, self.decimal_context) for chunk in chunks]
+        else:
+            # Spawned workers import a clean interpreter, never a copy of this one's locks and threads
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(chunks)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(formula_definitions(),)
+            ) as pool:
+                encoded = list(pool.map(evaluate_chunk, chunks, repeat(self.config), repeat(self.decimal_context)))
+
+        outcomes: List[Union[Decimal, CalculatorError]] = []
+        calculations: List[Calculation] = []
+        display_names: Dict[str, str] = {}
+
+        def take_local() -> None:
+            while len(outcomes) in local:
+                outcome, calculation = local.pop(len(outcomes))
+                outcomes.append(outcome)
+                if calculation is not None:
+                    calculations.append(calculation)
+
+        for chunk, text in zip(chunks, encoded):
+            for (name, _, _), outcome in zip(decode_rows(chunk), decode_outcomes(text)):
+                take_local()
+                if isinstance(outcome, CalculatorError):
+                    outcomes.append(outcome)
+                    continue
+                if name not in display_names:
+                    display_names[name] = str(resolve_operation(name))
+                a, b, result = outcome
+                outcomes.append(result)
+                calculations.append(Calculation.with_result(
+                    operation=display_names[name],
+                    operand1=a,
+                    operand2=b,
+                    result=result,
+                    verify_rate=self.config.verify_rate
+                ))
+        take_local()
+
+        if calculations:
+            self._add_many_to_history(calculations)
+        logging.info(
+            f"Performed {len(outcomes)} calculations in {len(chunks)} chunks with "
+            f"{len(outcomes) - len(calculations)} errors"
+        )
+        return outcomes
+
+    def _calculate_row(
+        self,
+        operations: Dict[str, Operation],
+        op: Union[str, Operation],
+        a: Union[str, Number],
+        b: Union[str, Number],
+        record: bool = True
+    ) -> Tuple[Union[Decimal, CalculatorError], Optional[Calculation]]:
+        """
+        Validate and calculate one row of perform_many or stream.
+
+        Must be called inside the calculator's Decimal context.
+
+        Args:
+            operations (Dict[str, Operation]): Operations already looked up by identifier.
+            op (Union[str, Operation]): Operation identifier or instance.
+            a (Union[str, Number]): First operand.
+            b (Union[str, Number]): Second operand.
+            record (bool, optional): Whether to build the Calculation for the history.
+                Defaults to True.
+
+        Returns:
+            Tuple[Union[Decimal, CalculatorError], Optional[Calculation]]: The result or
+                error, and the calculation to record, None on error or when not recording.
+        """
+        try:
+            if isinstance(op, Operation):
+                operation = op
+            else:
+                operation = operations.get(op)
+                if operation is None:
+                    try:
+                        operation = operations[op] = OperationFactory.create_operation(op)
+                    except (AttributeError, ValueError):
+                        raise OperationError(f"Unknown operation: {op}")
+
             validated_a = InputValidator.validate_number(a, self.config)
             validated_b = InputValidator.validate_number(b, self.config)
+            result = self._execute(operation, validated_a, validated_b)
+        except CalculatorError as e:
+            return e, None
+        except (ArithmeticError, ValueError) as e:
+            return OperationError(f"Operation failed: {str(e)}"), None
+        if not record:
+            return result, None
+        return result, Calculation.with_result(
+            operation=str(operation),
+            operand1=validated_a,
+            operand2=validated_b,
+            result=result,
+            verify_rate=self.config.verify_rate
+        )
+
+    def evaluate(
+        self,
+        expression: str,
+        variables: Optional[Dict[str, Union[str, Number]]] = None
+    ) -> Decimal:
+        """
+        Evaluate an infix expression, such as "(2.5 ^ 3 + root(56.25, 2)) % 7".
+
+        Expressions combine numbers and variables with the operators + - * / // % ^
+        and calls of any registered operation by identifier, like root(x, 2). The
+        compiled form of each expression is cached by its text, so evaluating it
+        again with new variable values does not parse it again. Variable values are
+        validated like operands, and the expression is evaluated in the
+        calculator's Decimal context.
 
-            # Execute the operation strategy
-            result = self.operation_strategy.execute(validated_a, validated_b)
+        The outermost operation is recorded in the history, with the values of its
+        two operands, so it can be undone and recomputed like any calculation. An
+        expression without an operation, such as a single number, is not recorded.
+
+        Args:
+            expression (str): The expression.
+            variables (Optional[Dict[str, Union[str, Number]]], optional): Values of
+                the variables in the expression. Defaults to none.
+
+        Returns:
+            Decimal: The value of the expression.
 
-            # Create a new Calculation instance with the operation details
-            calculation = Calculation(
-                operation=str(self.operation_strategy),
-                operand1=validated_a,
-                operand2=validated_b
+        Raises:
+            ValidationError: If the expression is not well formed, a variable has no
+                valid value, or an operand is invalid for its operation.
+            OperationError: If an operation fails.
+        """
+        try:
+            compiled = compile_expression(expression)
+            with localcontext(self.decimal_context):
+                values = {
+                    name: InputValidator.validate_number(value, self.config)
+                    for name, value in (variables or {}).items()
+                }
+                if compiled.operation is None:
+                    return compiled.evaluate(values)
+                a, b, result = compiled.evaluate_operands(values)
+                calculation = Calculation.with_result(
+                    operation=str(compiled.operation),
+                    operand1=a,
+                    operand2=b,
+                    result=result,
+                    verify_rate=self.config.verify_rate
+                )
+        except CalculatorError as e:
+            logging.error(f"Expression error: {str(e)}")
+            raise
+
+        self._add_to_history(calculation)
+        logging.info(f"Evaluated expression {expression} = {result}")
+        return result
+
+    def define_formula(self, definition: str) -> Formula:
+        """
+        Define a formula operation, such as "margin(x, y) = (x - y) / x * 100".
+
+        The formula is registered as an operation under its name, usable in
+        perform_operation, perform_many, perform_batch and expressions, and
+        recomputable from the history. The definition is appended to the formulas
+        file, so the formula is defined again when a calculator starts, before the
+        history using it is loaded; a later definition of the same name replaces
+        an earlier one.
+
+        Args:
+            definition (str): The definition: a name, two parameter names and an
+                expression over the parameters.
+
+        Returns:
+            Formula: The new operation.
+
+        Raises:
+            ValidationError: If the definition is invalid.
+        """
+        try:
+            formula = define_formula(definition)
+        except ValidationError as e:
+            logging.error(f"Formula error: {str(e)}")
+            raise
+        try:
+            path = self.config.formulas_file
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Start a new line if the file's last line is unterminated
+            text = path.read_text(encoding='utf-8') if path.exists() else ''
+            separator = '\n' if text and not text.endswith('\n') else ''
+            with open(path, 'a', encoding='utf-8') as file:
+                file.write(separator + formula.definition + '\n')
+        except OSError as e:
+            # The formula stays usable until the calculator stops
+            logging.warning(f"Could not save formula to {self.config.formulas_file}: {e}")
+        return formula
+
+    def perform_batch(
+        self,
+        op_name: str,
+        a_array: Any,
+        b_array: Any
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Perform one operation over whole arrays of operands.
+
+        Runs the operation's float64 NumPy kernel over every row at once instead of
+        one perform_operation call per pair. Rows that fail (division by zero,
+        negative roots, inputs beyond the maximum allowed value, overflow) are
+        flagged in the returned error mask instead of raising. The batch is recorded
+        in the history as one compact BatchCalculation entry.
+
+        Args:
+            op_name (str): Operation identifier (e.g., 'add').
+            a_array (Any): First operands, anything convertible to a float64 array.
+            b_array (Any): Second operands, broadcastable against the first operands.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results (NaN for failed rows) and a
+                boolean mask that is True for every failed row.
+
+        Raises:
+            OperationError: If the operation is unknown.
+            ValidationError: If the operands cannot be converted to numeric arrays.
+        """
+        try:
+            operation = OperationFactory.create_operation(op_name)
+        except ValueError as e:
+            raise OperationError(str(e))
+
+        try:
+            a, b = np.broadcast_arrays(
+                np.atleast_1d(np.asarray(a_array, dtype=np.float64)),
+                np.atleast_1d(np.asarray(b_array, dtype=np.float64))
             )
+        except (TypeError, ValueError) as e:
+            logging.error(f"Validation error: {str(e)}")
+            raise ValidationError(f"Invalid operand arrays: {str(e)}") from e
+        a = np.ascontiguousarray(a)
+        b = np.ascontiguousarray(b)
+
+        # Rows with non-numeric or out of range operands are errors, not exceptions
+        limit = float(self.config.max_input_value)
+        invalid = np.isnan(a) | np.isnan(b) | (np.abs(a) > limit) | (np.abs(b) > limit)
+
+        result, errors = operation.execute_array(np.where(invalid, 0.0, a), np.where(invalid, 0.0, b))
+        errors = errors | invalid | ~np.isfinite(result)
+        result[errors] = np.nan
+
+        # Record the whole batch as one history entry
+        self._add_to_history(BatchCalculation(
+            operation=str(operation),
+            operand1=a,
+            operand2=b,
+            result=result,
+            errors=errors
+        ))
+        logging.info(f"Batch of {len(result)} {operation} calculations performed with {int(errors.sum())} errors")
+
+        return result, errors
+
+    def _add_to_history(self, calculation: Any) -> None:
+        """
+        Record a new history entry.
+
+        Records the change for undo, clears the redo stack, appends the entry,
+        enforces the maximum history size and age, and notifies all observers.
 
-            # Save the current state to the undo stack before making changes
-            self.undo_stack.append(CalculatorMemento(self.history.copy()))
+        Args:
+            calculation (Any): The Calculation or BatchCalculation to record.
+        """
+        # Append the new calculation to the history, evicting the oldest entries
+        # beyond the maximum size or age, and record the change for undo
+        with self._lock:
+            delta = HistoryDelta()
+            evicted = self._sync_history_limits()
+            evicted += self.history.append(calculation)
+            delta.record(appended=[calculation], evicted=evicted)
+            self.undo_stack.append(delta)
+            self._history_changed('append', [calculation])
+            self._history_changed('evict', evicted)
 
             # Clear the redo stack since new operation invalidates the redo history
             self.redo_stack.clear()
 
-            # Append the new calculation to the history
-            self.history.append(calculation)
+        # Notify all observers about the new calculation
+        self.notify_observers(calculation)
 
-            # Ensure the history does not exceed the maximum size
-            if len(self.history) > self.config.max_history_size:
-                self.history.pop(0)
+    def _add_many_to_history(
+        self,
+        calculations: List[Calculation],
+        delta: Optional[HistoryDelta] = None
+    ) -> HistoryDelta:
+        """
+        Record several new history entries as one change.
 
-            # Notify all observers about the new calculation
-            self.notify_observers(calculation)
+        Records a single undo step, appends every entry and notifies each observer
+        once. The entries can extend the undo step of an earlier call instead, as
+        long as that step is still the latest one.
 
-            return result
+        Args:
+            calculations (List[Calculation]): The calculations to record.
+            delta (Optional[HistoryDelta], optional): The undo step to extend.
+                Defaults to a new undo step.
 
-        except ValidationError as e:
-            # Log and re-raise validation errors
-            logging.error(f"Validation error: {str(e)}")
-            raise
-        except Exception as e: # pragma: no cover
-            # Log and raise operation errors for any other exceptions
-            logging.error(f"Operation failed: {str(e)}")
-            raise OperationError(f"Operation failed: {str(e)}")
+        Returns:
+            HistoryDelta: The undo step the entries were recorded in.
+        """
+        with self._lock:
+            if delta is None or not self.undo_stack or self.undo_stack[-1] is not delta:
+                delta = HistoryDelta()
+                self.undo_stack.append(delta)
+            evicted = self._sync_history_limits()
+            for calculation in calculations:
+                evicted += self.history.append(calculation)
+            delta.record(appended=calculations, evicted=evicted)
+            self.redo_stack.clear()
+            self._history_changed('append', calculations)
+            self._history_changed('evict', evicted)
+
+        self.notify_observers_batch(calculations)
+        return delta
 
+    def _sync_history_limits(self) -> List[Calculation]:
+        """
+        Apply the configured maximum history size and age to the history buffer.
+
+        Returns:
+            List[Calculation]: Entries evicted because the maximum size shrank.
+        """
+        evicted = []
+        if self.history.capacity != self.config.max_history_size:
+            evicted = self.history.resize(self.config.max_history_size)
+        self.history.max_age = self.config.max_history_age or None
+        return evicted
 
     def save_history(self) -> None:
         """
-        Save calculation history to a CSV file using pandas.
+        Save calculation history to the storage backend.
 
-        Serializes the history of calculations and writes them to a CSV file for
-        persistent storage. Utilizes pandas DataFrames for efficient data handling.
+        Serializes the history of calculations and writes them to the history file
+        for persistent storage, as CSV through pandas DataFrames or in the binary
+        columnar format, or to the history database.
+        The file is replaced atomically, and the journal, if any, is truncated since
+        the new file holds the full history. The save happens on the calling thread
+        even in 'background' auto-save mode, and covers every change the background
+        writer still had pending.
 
         Raises:
             OperationError: If saving the history fails.
         """
         try:
-            # Ensure the history directory exists
-            self.config.history_dir.mkdir(parents=True, exist_ok=True)
-
-            history_data = []
-            for calc in self.history:
-                # Serialize each Calculation instance to a dictionary
-                history_data.append({
-                    'operation': str(calc.operation),
-                    'operand1': str(calc.operand1),
-                    'operand2': str(calc.operand2),
-                    'result': str(calc.result),
-                    'timestamp': calc.timestamp.isoformat()
-                })
-
-            if history_data:
-                # Create a pandas DataFrame from the history data
-                df = pd.DataFrame(history_data)
-                # Write the DataFrame to a CSV file without the index
-                df.to_csv(self.config.history_file, index=False)
-                logging.info(f"History saved successfully to {self.config.history_file}")
+            # Let an in-flight compaction finish so it cannot overwrite this save
+            self._wait_for_compaction()
+
+            generation = self.writer.generation if self.writer is not None else 0
+            entries = self._save_snapshot()
+            if self.writer is not None:
+                self.writer.mark_saved(generation)
+            if self.journal is not None:
+                self.journal.truncate()
+
+            if entries:
+                logging.info(f"History saved successfully to {self.storage.location}")
             else:
-                # If history is empty, create an empty CSV with headers
-                pd.DataFrame(columns=['operation', 'operand1', 'operand2', 'result', 'timestamp']
-                           ).to_csv(self.config.history_file, index=False)
                 logging.info("Empty history saved")
 
         except Exception as e:
@@ -275,55 +958,260 @@ class Calculator:
             logging.error(f"Failed to save history: {e}")
             raise OperationError(f"Failed to save history: {e}")
 
+    def _save_snapshot(self) -> List[Calculation]:
+        """
+        Write a consistent copy of the history to the storage backend.
+
+        Saves are serialized and each copies the history only once it may write,
+        so a later save never loses to an earlier one.
+
+        Returns:
+            List[Calculation]: The entries written.
+        """
+        with self._save_lock:
+            with self._lock:
+                entries = self.history.copy()
+            self.storage.save(entries)
+        return entries
+
+    @property
+    def unsaved_changes(self) -> int:
+        """
+        Get the number of calculations waiting for a background save.
+
+        Returns:
+            int: The background writer's queue depth, 0 without a background writer.
+        """
+        return self.writer.pending if self.writer is not None else 0
+
+    @property
+    def save_staleness(self) -> float:
+        """
+        Get how long the oldest unsaved calculation has waited for a background save.
+
+        Returns:
+            float: Seconds since the oldest unsaved calculation, 0.0 if the saved
+                history is current or there is no background writer.
+        """
+        return self.writer.staleness if self.writer is not None else 0.0
+
+    def close(self) -> None:
+        """
+        Flush pending background saves, stop the background writer, close the
+        storage backend and persist the operation cache.
+        """
+        if self.writer is not None:
+            self.writer.close()
+        self._wait_for_compaction()
+        if self.journal is not None:
+            self.journal.close()
+        self.storage.close()
+        if self.operation_cache is not None:
+            try:
+                self.operation_cache.save()
+            except OSError as e:
+                logging.warning(f"Could not save operation cache: {e}")
+
+    def export_history(self, path: Union[str, Path]) -> None:
+        """
+        Export the calculation history to a file.
+
+        The format follows the file extension: '.bin' files are written in the
+        binary format, anything else as CSV.
+
+        Args:
+            path (Union[str, Path]): The file to write.
+
+        Raises:
+            OperationError: If exporting the history fails.
+        """
+        try:
+            with self._lock:
+                entries = self.history.copy()
+            write_history_file(Path(path), entries, 'binary' if is_binary_path(path) else 'csv')
+            logging.info(f"Exported {len(entries)} calculations to {path}")
+        except Exception as e:
+            logging.error(f"Failed to export history: {e}")
+            raise OperationError(f"Failed to export history: {e}")
+
+    def import_history(self, path: Union[str, Path]) -> None:
+        """
+        Replace the calculation history with the entries of a file.
+
+        The format follows the file extension: '.bin' files are read in the binary
+        format, anything else as CSV. Recorded changes no longer apply to the
+        imported history, so the undo and redo stacks are cleared.
+
+        Args:
+            path (Union[str, Path]): The file to read.
+
+        Raises:
+            OperationError: If importing the history fails.
+        """
+        try:
+            with localcontext(self.decimal_context):
+                entries = read_history_file(
+                    Path(path), 'binary' if is_binary_path(path) else 'csv',
+                    self.config.max_history_size, self.config.verify_rate
+                )
+        except Exception as e:
+            logging.error(f"Failed to import history: {e}")
+            raise OperationError(f"Failed to import history: {e}")
+        with self._lock:
+            self.history.reset(entries)
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self._history_changed('reset', self.history.copy())
+        logging.info(f"Imported {len(entries)} calculations from {path}")
+
+    def compact_history(self) -> bool:
+        """
+        Compact the history journal into the history file in the background.
+
+        The journal is rotated on the calling thread together with a copy of the
+        history; a background thread then writes the copy to the history file and
+        discards the rotated journal.
+
+        Returns:
+            bool: True if a compaction was started, False if there is no journal or
+                a compaction is still running.
+        """
+        if self.journal is None:
+            return False
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return False
+
+        with self._lock:
+            snapshot = self.history.copy()
+            self.journal.rotate(snapshot)
+        self._compaction_thread = threading.Thread(
+            target=self._finish_compaction,
+            args=(snapshot,),
+            name="history-compaction"
+        )
+        self._compaction_thread.start()
+        return True
+
+    def _finish_compaction(self, snapshot: List[Calculation]) -> None:
+        """
+        Write a compacted snapshot and discard the rotated journal.
+
+        Args:
+            snapshot (List[Calculation]): The history at the time of the rotation.
+        """
+        try:
+            self.storage.save(snapshot)
+            self.journal.discard_rotated()
+            logging.info(f"History journal compacted into {self.config.history_file}")
+        except Exception as e:
+            logging.error(f"Failed to compact history journal: {e}")
+
+    def _wait_for_compaction(self) -> None:
+        """
+        Block until an in-flight journal compaction has finished.
+        """
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+            self._compaction_thread = None
+
     def load_history(self) -> None:
         """
-        Load calculation history from a CSV file using pandas.
+        Load calculation history from the storage backend.
 
-        Reads the calculation history from a CSV file and reconstructs the
-        Calculation instances, restoring the calculator's history.
+        Reads the calculation history from the CSV or binary history file, or the
+        history database, and reconstructs the Calculation instances, restoring the
+        calculator's history. In 'journal' auto-save mode the journaled changes are
+        replayed on top of the file.
 
         Raises:
             OperationError: If loading the history fails.
         """
         try:
-            if self.config.history_file.exists():
-                # Read the CSV file into a pandas DataFrame
-                df = pd.read_csv(self.config.history_file)
-                if not df.empty:
-                    # Deserialize each row into a Calculation instance
-                    self.history = [
-                        Calculation.from_dict({
-                            'operation': row['operation'],
-                            'operand1': row['operand1'],
-                            'operand2': row['operand2'],
-                            'result': row['result'],
-                            'timestamp': row['timestamp']
-                        })
-                        for _, row in df.iterrows()
-                    ]
-                    logging.info(f"Loaded {len(self.history)} calculations from history")
+            entries: List[Calculation] = []
+            if self.storage.incremental:
+                # Changes made since the last save are not part of the saved history
+                self.storage.discard()
+                self._storage_in_step = False
+            if self.storage.exists():
+                # Journal records apply to the whole snapshot, so only read the rows
+                # that fit in the history when there is no journal to replay
+                limit = self.config.max_history_size if self.journal is None else None
+                with localcontext(self.decimal_context):
+                    # Verified results are recomputed as they were calculated
+                    entries = self.storage.load(limit)
+                if entries:
+                    logging.info(f"Loaded {len(entries)} calculations from history")
                 else:
                     logging.info("Loaded empty history file")
             else:
                 # If no history file exists, start with an empty history
                 logging.info("No history file found - starting with empty history")
+
+            if self.journal is not None:
+                # Replay the changes journaled since the last snapshot
+                self._wait_for_compaction()
+                with localcontext(self.decimal_context):
+                    entries = self.journal.replay(entries)
+
+            if entries or self.journal is not None or self.storage.incremental:
+                with self._lock:
+                    self.history.reset(entries)
+                    # Recorded changes no longer apply to the loaded history
+                    self.undo_stack.clear()
+                    self.redo_stack.clear()
+                    self._follow_history('reset', self.history.copy())
+                    if self.storage.incremental:
+                        # Keep the stored rows in step with the history
+                        self.storage.trim(len(self.history))
+                        self._storage_in_step = True
         except Exception as e:
             # Log and raise an OperationError if loading fails
             logging.error(f"Failed to load history: {e}")
             raise OperationError(f"Failed to load history: {e}")
 
-    def get_history_dataframe(self) -> pd.DataFrame:
+    def open_history_reader(self, path: Optional[Union[str, Path]] = None) -> HistoryReader:
+        """
+        Open a binary history file for random access without loading it.
+
+        Args:
+            path (Optional[Union[str, Path]], optional): The binary history file.
+                Defaults to the configured history file.
+
+        Returns:
+            HistoryReader: A memory-mapped reader over the file; close it when done.
+
+        Raises:
+            OperationError: If the file is not a binary history file.
+        """
+        if path is None:
+            path = self.config.history_file
+            binary = self.config.history_file_format == 'binary'
+        else:
+            binary = is_binary_path(path)
+        if not binary:
+            raise OperationError(f"Random access requires a binary history file: {path}")
+        return HistoryReader(path, verify_rate=self.config.verify_rate)
+
+    def get_history_dataframe(self, entries: Optional[Iterable[Any]] = None) -> pd.DataFrame:
         """
         Get calculation history as a pandas DataFrame.
 
         Converts the list of Calculation instances into a pandas DataFrame for
-        advanced data manipulation or analysis.
+        advanced data manipulation or analysis. A window of a history file opened
+        with open_history_reader can be given instead of the in-memory history; it
+        is converted straight from the file columns.
+
+        Args:
+            entries (Optional[Iterable[Any]], optional): The entries to convert, such
+                as a HistoryReader window. Defaults to a snapshot of the in-memory history.
 
         Returns:
             pd.DataFrame: DataFrame containing the calculation history.
         """
+        if isinstance(entries, HistoryReader):
+            return entries.to_dataframe()
         history_data = []
-        for calc in self.history:
+        for calc in (self.history_snapshot() if entries is None else entries):
             history_data.append({
                 'operation': str(calc.operation),
                 'operand1': str(calc.operand1),
@@ -333,19 +1221,92 @@ class Calculator:
             })
         return pd.DataFrame(history_data)
 
-    def show_history(self) -> List[str]:
+    def show_history(self, entries: Optional[Iterable[Any]] = None) -> List[str]:
         """
         Get formatted history of calculations.
 
         Returns a list of human-readable strings representing each calculation.
 
+        Args:
+            entries (Optional[Iterable[Any]], optional): The entries to format, such
+                as a HistoryReader window. Defaults to a snapshot of the in-memory history.
+
         Returns:
             List[str]: List of formatted calculation history entries.
         """
-        return [
-            f"{calc.operation}({calc.operand1}, {calc.operand2}) = {calc.result}"
-            for calc in self.history
-        ]
+        return [str(calc) for calc in (self.history_snapshot() if entries is None else entries)]
+
+    def history_snapshot(self) -> Tuple[Any, ...]:
+        """
+        Get a consistent, immutable copy of the history.
+
+        The copy is made at most once per change of the history and shared by all
+        readers until the next change, so readers never see a change half done
+        and only hold the lock while copying, never while they use the entries.
+
+        Returns:
+            Tuple[Any, ...]: The history entries, oldest first.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    snapshot = self._snapshot = tuple(self.history)
+        return snapshot
+
+    def query(
+        self,
+        operation: Optional[str] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        result_range: Optional[Tuple[Optional[Number], Optional[Number]]] = None,
+        limit: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Find the calculations in the history matching all the given conditions.
+
+        The query is answered without scanning the history: by the database when
+        the storage backend can filter the stored history and no result bounds are
+        given, and from the history index otherwise.
+
+        Args:
+            operation (Optional[str], optional): Operation identifier (e.g., 'add') or
+                display name (e.g., "Addition"). Defaults to any operation.
+            since (Optional[datetime.datetime], optional): Earliest timestamp included.
+                Defaults to no lower bound.
+            until (Optional[datetime.datetime], optional): Timestamp before which
+                calculations are included. Defaults to no upper bound.
+            result_range (Optional[Tuple[Optional[Number], Optional[Number]]], optional):
+                Inclusive lower and upper result bounds, either of which may be None.
+                Batch calculations never match. Defaults to any result.
+            limit (Optional[int], optional): Number of newest matching calculations
+                to return. Defaults to all of them.
+
+        Returns:
+            List[Any]: The matching calculations, oldest first.
+
+        Raises:
+            ValidationError: If the operation is unknown or a result bound is not a number.
+        """
+        if operation is not None:
+            if operation.lower() in OperationFactory.operation_names():
+                operation = str(OperationFactory.create_operation(operation))
+            elif OperationFactory.get_operation(operation) is None:
+                raise ValidationError(f"Unknown operation: {operation}")
+        bounds = None
+        if result_range is not None:
+            try:
+                bounds = tuple(None if bound is None else Decimal(str(bound)) for bound in result_range)
+            except InvalidOperation as e:
+                raise ValidationError(f"Invalid result bound: {result_range}") from e
+            if any(bound is not None and bound.is_nan() for bound in bounds):
+                raise ValidationError(f"Invalid result bound: {result_range}")
+        with self._lock:
+            if bounds is None and self.storage.queryable and self._storage_in_step:
+                with localcontext(self.decimal_context):
+                    return self.storage.query(operation, since, until, limit)
+            return self.index.query(operation, since, until, bounds, limit)
 
     def clear_history(self) -> None:
         """
@@ -353,47 +1314,119 @@ class Calculator:
 
         Empties the calculation history and clears the undo and redo stacks.
         """
-        self.history.clear()
-        self.undo_stack.clear()
-        self.redo_stack.clear()
+        with self._lock:
+            self.history.clear()
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self._history_changed('clear')
         logging.info("History cleared")
 
 
-    def undo(self) -> bool:
+    @property
+    def version(self) -> int:
         """
-        Undo the last operation.
+        Get the current history version.
 
-        Restores the calculator's history to the state before the last calculation
-        was performed.
+        The version counts the changes that can be undone; undo lowers it and redo
+        raises it.
 
         Returns:
-            bool: True if an operation was undone, False if there was nothing to undo.
+            int: The current version.
         """
-        if not self.undo_stack:
-            return False
-        # Pop the last state from the undo stack
-        memento = self.undo_stack.pop()
-        # Push the current state onto the redo stack
-        self.redo_stack.append(CalculatorMemento(self.history.copy()))
-        # Restore the history from the memento
-        self.history = memento.history.copy()
-        return True
+        return len(self.undo_stack)
+
+    def undo(self, steps: int = 1) -> bool:
+        """
+        Undo the last operations.
+
+        Reverts the recorded changes of the last calculations, touching only the
+        entries they appended and evicted. Evicted entries that no longer fit in
+        the history, because its maximum size shrank, stay evicted.
 
-    def redo(self) -> bool:
+        Args:
+            steps (int, optional): Number of operations to undo. Defaults to 1.
+
+        Returns:
+            bool: True if an operation was undone, False if there was nothing to undo.
+        """
+        with self._lock:
+            if not self.undo_stack:
+                return False
+            for _ in range(min(steps, len(self.undo_stack))):
+                # Revert the last change and move it onto the redo stack
+                delta = self.undo_stack.pop()
+                restored = delta.undo(self.history)
+                self.redo_stack.append(delta)
+                self._history_changed('truncate', list(delta.appended))
+                self._history_changed('prepend', restored)
+            return True
+
+    def redo(self, steps: int = 1) -> bool:
         """
-        Redo the previously undone operation.
+        Redo the previously undone operations.
 
-        Restores the calculator's history to the state before the last undo.
+        Reapplies the most recently undone changes.
+
+        Args:
+            steps (int, optional): Number of operations to redo. Defaults to 1.
 
         Returns:
             bool: True if an operation was redone, False if there was nothing to redo.
         """
-        if not self.redo_stack:
+        with self._lock:
+            if not self.redo_stack:
+                return False
+            for _ in range(min(steps, len(self.redo_stack))):
+                # Reapply the last undone change and move it back onto the undo stack
+                delta = self.redo_stack.pop()
+                delta.redo(self.history)
+                self.undo_stack.append(delta)
+                self._history_changed('evict', delta.evicted)
+                self._history_changed('append', list(delta.appended))
+            return True
+
+    def goto_version(self, version: int) -> bool:
+        """
+        Undo or redo operations until the history reaches a version.
+
+        Args:
+            version (int): The target version, between 0 and the number of changes
+                that can be undone plus those that can be redone.
+
+        Returns:
+            bool: True if the history moved to the version, False if the version is
+                out of range or already current.
+        """
+        if not 0 <= version <= len(self.undo_stack) + len(self.redo_stack):
             return False
-        # Pop the last state from the redo stack
-        memento = self.redo_stack.pop()
-        # Push the current state onto the undo stack
-        self.undo_stack.append(CalculatorMemento(self.history.copy()))
-        # Restore the history from the memento
-        self.history = memento.history.copy()
-        return True
+        if version < self.version:
+            return self.undo(self.version - version)
+        if version > self.version:
+            return self.redo(version - self.version)
+        return False
+
+    def create_memento(self) -> CalculatorMemento:
+        """
+        Create a full snapshot of the current history.
+
+        Returns:
+            CalculatorMemento: A memento holding a copy of the history.
+        """
+        with self._lock:
+            return CalculatorMemento(self.history.copy())
+
+    def restore_memento(self, memento: CalculatorMemento) -> None:
+        """
+        Restore the history from a full snapshot.
+
+        Recorded changes no longer apply to the restored history, so the undo and
+        redo stacks are cleared.
+
+        Args:
+            memento (CalculatorMemento): The memento to restore.
+        """
+        with self._lock:
+            self.history.reset(memento.history)
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self._history_changed('reset', self.history.copy())
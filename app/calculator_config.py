@@ -3,7 +3,8 @@
 ########################
 
 from dataclasses import dataclass
-from decimal import Decimal
+import decimal
+from decimal import Context, Decimal
 from numbers import Number
 from pathlib import Path
 import os
@@ -17,6 +18,12 @@ from app.exceptions import ConfigurationError
 #load_dotenv(override=True)
 load_dotenv()
 
+# Rounding modes of the decimal module, by name
+ROUNDING_MODES = (
+    decimal.ROUND_HALF_EVEN, decimal.ROUND_HALF_UP, decimal.ROUND_HALF_DOWN, decimal.ROUND_UP,
+    decimal.ROUND_DOWN, decimal.ROUND_CEILING, decimal.ROUND_FLOOR, decimal.ROUND_05UP
+)
+
 def get_project_root() -> Path:
     """
     Get the project root directory.
@@ -53,7 +60,25 @@ class CalculatorConfig:
         auto_save: Optional[bool] = None,
         precision: Optional[int] = None,
         max_input_value: Optional[Number] = None,
-        default_encoding: Optional[str] = None
+        default_encoding: Optional[str] = None,
+        verify_rate: Optional[float] = None,
+        max_history_age: Optional[float] = None,
+        auto_save_mode: Optional[str] = None,
+        journal_durability: Optional[str] = None,
+        journal_compact_every: Optional[int] = None,
+        save_flush_every: Optional[int] = None,
+        save_flush_interval_ms: Optional[int] = None,
+        history_format: Optional[str] = None,
+        history_backend: Optional[str] = None,
+        operation_cache_size: Optional[int] = None,
+        operation_cache_persist: Optional[bool] = None,
+        rounding: Optional[str] = None,
+        guard_digits: Optional[int] = None,
+        parallel_workers: Optional[int] = None,
+        parallel_chunk_size: Optional[int] = None,
+        session_max_resident: Optional[int] = None,
+        session_max_memory_mb: Optional[float] = None,
+        concurrent: Optional[bool] = None
     ):
         """
         Initialize configuration with environment variables and defaults.
@@ -65,6 +90,24 @@ class CalculatorConfig:
             precision (Optional[int], optional): Number of decimal places for calculations. Defaults to None.
             max_input_value (Optional[Number], optional): Maximum allowed input value. Defaults to None.
             default_encoding (Optional[str], optional): Default encoding for file operations. Defaults to None.
+            verify_rate (Optional[float], optional): Fraction of known results to verify by recomputation. Defaults to None.
+            max_history_age (Optional[float], optional): Maximum age of history entries in seconds, 0 for no limit. Defaults to None.
+            auto_save_mode (Optional[str], optional): How auto-save persists history, 'snapshot', 'journal' or 'background'. Defaults to None.
+            journal_durability (Optional[str], optional): When journal writes are fsynced, 'none', 'batch' or 'op'. Defaults to None.
+            journal_compact_every (Optional[int], optional): Journal records written before compacting into the history file. Defaults to None.
+            save_flush_every (Optional[int], optional): Calculations coalesced into one background save. Defaults to None.
+            save_flush_interval_ms (Optional[int], optional): Milliseconds a calculation may wait for a background save. Defaults to None.
+            history_format (Optional[str], optional): History file format, 'csv', 'binary' or 'auto' (by file extension). Defaults to None.
+            history_backend (Optional[str], optional): History storage backend, 'file' or 'sqlite'. Defaults to None.
+            operation_cache_size (Optional[int], optional): Operation results cached, 0 to disable the cache. Defaults to None.
+            operation_cache_persist (Optional[bool], optional): Whether to persist the operation cache across runs. Defaults to None.
+            rounding (Optional[str], optional): Decimal rounding mode of calculations (e.g., 'ROUND_HALF_EVEN'). Defaults to None.
+            guard_digits (Optional[int], optional): Significant digits calculated beyond the precision. Defaults to None.
+            parallel_workers (Optional[int], optional): Worker processes of parallel evaluation, 0 for one per CPU core. Defaults to None.
+            parallel_chunk_size (Optional[int], optional): Rows sent to a worker process at a time. Defaults to None.
+            session_max_resident (Optional[int], optional): Calculator sessions kept in memory by the session manager. Defaults to None.
+            session_max_memory_mb (Optional[float], optional): Estimated megabytes of resident sessions before the least recently used are offloaded. Defaults to None.
+            concurrent (Optional[bool], optional): Whether the calculator is shared by several threads, each with its own current operation. Defaults to None.
         """
         # Set base directory to project root by default
         project_root = get_project_root()
@@ -77,17 +120,93 @@ class CalculatorConfig:
             os.getenv('CALCULATOR_MAX_HISTORY_SIZE', '1000')
         )
 
+        # Maximum history age in seconds (0 keeps entries regardless of age)
+        self.max_history_age = max_history_age if max_history_age is not None else float(
+            os.getenv('CALCULATOR_MAX_HISTORY_AGE', '0')
+        )
+
         # Auto-save preference
         auto_save_env = os.getenv('CALCULATOR_AUTO_SAVE', 'true').lower()
         self.auto_save = auto_save if auto_save is not None else (
             auto_save_env == 'true' or auto_save_env == '1'
         )
 
+        # Auto-save mode: rewrite the whole history file ('snapshot'), append to a journal ('journal')
+        # or rewrite the history file from a background thread ('background')
+        self.auto_save_mode = (auto_save_mode or os.getenv(
+            'CALCULATOR_AUTO_SAVE_MODE', 'snapshot'
+        )).lower()
+
+        # Journal durability level and compaction interval
+        self.journal_durability = (journal_durability or os.getenv(
+            'CALCULATOR_JOURNAL_DURABILITY', 'batch'
+        )).lower()
+        self.journal_compact_every = journal_compact_every or int(
+            os.getenv('CALCULATOR_JOURNAL_COMPACT_EVERY', '1000')
+        )
+
+        # Background save policy: save after this many calculations or this many milliseconds
+        self.save_flush_every = save_flush_every or int(
+            os.getenv('CALCULATOR_SAVE_FLUSH_EVERY', '100')
+        )
+        self.save_flush_interval_ms = save_flush_interval_ms or int(
+            os.getenv('CALCULATOR_SAVE_FLUSH_INTERVAL_MS', '500')
+        )
+
+        # History file format: 'csv', 'binary', or 'auto' to choose by the history file extension
+        self.history_format = (history_format or os.getenv(
+            'CALCULATOR_HISTORY_FORMAT', 'auto'
+        )).lower()
+
+        # History storage backend: the history file ('file') or a SQLite database ('sqlite')
+        self.history_backend = (history_backend or os.getenv(
+            'CALCULATOR_HISTORY_BACKEND', 'file'
+        )).lower()
+
+        # Least-recently-used cache of operation results (0 disables it), optionally persisted
+        self.operation_cache_size = operation_cache_size if operation_cache_size is not None else int(
+            os.getenv('CALCULATOR_OPERATION_CACHE_SIZE', '1024')
+        )
+        operation_cache_persist_env = os.getenv('CALCULATOR_OPERATION_CACHE_PERSIST', 'false').lower()
+        self.operation_cache_persist = operation_cache_persist if operation_cache_persist is not None else (
+            operation_cache_persist_env == 'true' or operation_cache_persist_env == '1'
+        )
+
+        # Parallel evaluation: worker processes (0 for one per CPU core) and rows per chunk
+        self.parallel_workers = parallel_workers if parallel_workers is not None else int(
+            os.getenv('CALCULATOR_PARALLEL_WORKERS', '0')
+        )
+        self.parallel_chunk_size = parallel_chunk_size or int(
+            os.getenv('CALCULATOR_PARALLEL_CHUNK_SIZE', '5000')
+        )
+
+        # Session manager: sessions kept in memory, by count and estimated size, before offloading to disk
+        self.session_max_resident = session_max_resident or int(
+            os.getenv('CALCULATOR_SESSION_MAX_RESIDENT', '100')
+        )
+        self.session_max_memory_mb = session_max_memory_mb or float(
+            os.getenv('CALCULATOR_SESSION_MAX_MEMORY_MB', '256')
+        )
+
+        # Concurrent mode: one calculator shared by several threads, each with its own current operation
+        concurrent_env = os.getenv('CALCULATOR_CONCURRENT', 'false').lower()
+        self.concurrent = concurrent if concurrent is not None else (
+            concurrent_env == 'true' or concurrent_env == '1'
+        )
+
         # Calculation precision
         self.precision = precision or int(
             os.getenv('CALCULATOR_PRECISION', '10')
         )
 
+        # Decimal arithmetic: significant digits beyond the precision, and the rounding mode
+        self.guard_digits = guard_digits if guard_digits is not None else int(
+            os.getenv('CALCULATOR_GUARD_DIGITS', '18')
+        )
+        self.rounding = (rounding or os.getenv(
+            'CALCULATOR_ROUNDING', decimal.ROUND_HALF_EVEN
+        )).upper()
+
         # Maximum input value allowed
         self.max_input_value = max_input_value or Decimal(
             os.getenv('CALCULATOR_MAX_INPUT_VALUE', '1e999')
@@ -98,6 +217,11 @@ class CalculatorConfig:
             'CALCULATOR_DEFAULT_ENCODING', 'utf-8'
         )
 
+        # Fraction of already known results (e.g., loaded history) verified by recomputation
+        self.verify_rate = verify_rate if verify_rate is not None else float(
+            os.getenv('CALCULATOR_VERIFY_RATE', '0')
+        )
+
     @property
     def log_dir(self) -> Path:
         """
@@ -133,14 +257,121 @@ class CalculatorConfig:
         """
         Get history file path.
 
-        Determines the file path for storing calculation history in CSV format.
+        Determines the file path for storing calculation history, with the binary
+        file extension when the binary history format is configured.
 
         Returns:
             Path: The history file path.
         """
+        default_name = "calculator_history.bin" if self.history_format == 'binary' else "calculator_history.csv"
         return Path(os.getenv(
             'CALCULATOR_HISTORY_FILE',
-            str(self.history_dir / "calculator_history.csv")
+            str(self.history_dir / default_name)
+        )).resolve()
+
+    @property
+    def history_file_format(self) -> str:
+        """
+        Get the format of the history file.
+
+        In 'auto' mode the format follows the history file extension: '.bin' files
+        are binary, anything else is CSV.
+
+        Returns:
+            str: 'csv' or 'binary'.
+        """
+        if self.history_format == 'auto':
+            return 'binary' if self.history_file.suffix.lower() == '.bin' else 'csv'
+        return self.history_format
+
+    @property
+    def journal_file(self) -> Path:
+        """
+        Get history journal file path.
+
+        Determines the file path of the append-only journal used by the 'journal'
+        auto-save mode, next to the history file.
+
+        Returns:
+            Path: The history journal file path.
+        """
+        return self.history_file.with_suffix('.journal')
+
+    @property
+    def history_db_file(self) -> Path:
+        """
+        Get history database path.
+
+        Determines the file path of the SQLite database used by the 'sqlite'
+        history backend.
+
+        Returns:
+            Path: The history database path.
+        """
+        return Path(os.getenv(
+            'CALCULATOR_HISTORY_DB_FILE',
+            str(self.history_dir / "calculator_history.db")
+        )).resolve()
+
+    @property
+    def operation_cache_file(self) -> Path:
+        """
+        Get operation cache file path.
+
+        Determines the path of the dbm file persisting the operation cache.
+
+        Returns:
+            Path: The operation cache file path.
+        """
+        return Path(os.getenv(
+            'CALCULATOR_OPERATION_CACHE_FILE',
+            str(self.history_dir / "operation_cache")
+        )).resolve()
+
+    @property
+    def decimal_context(self) -> Context:
+        """
+        Get the Decimal context calculations are evaluated in.
+
+        The context keeps precision plus guard digits significant digits, so
+        results keep the configured number of decimal places for integer parts of
+        up to guard digits digits, and rounds with the configured rounding mode.
+
+        Returns:
+            Context: A new Decimal context.
+        """
+        return Context(prec=self.precision + self.guard_digits, rounding=self.rounding)
+
+    @property
+    def formulas_file(self) -> Path:
+        """
+        Get formulas file path.
+
+        Determines the path of the file of formula definitions, one per line,
+        registered as operations when the calculator starts.
+
+        Returns:
+            Path: The formulas file path.
+        """
+        return Path(os.getenv(
+            'CALCULATOR_FORMULAS_FILE',
+            str(self.base_dir / "formulas.txt")
+        )).resolve()
+
+    @property
+    def sessions_dir(self) -> Path:
+        """
+        Get session directory path.
+
+        Determines the directory where the session manager offloads idle
+        calculator sessions, one file per session.
+
+        Returns:
+            Path: The session directory path.
+        """
+        return Path(os.getenv(
+            'CALCULATOR_SESSIONS_DIR',
+            str(self.base_dir / "sessions")
         )).resolve()
 
     @property
@@ -170,7 +401,39 @@ class CalculatorConfig:
         """
         if self.max_history_size <= 0:
             raise ConfigurationError("max_history_size must be positive")
+        if self.max_history_age < 0:
+            raise ConfigurationError("max_history_age must not be negative")
+        if self.auto_save_mode not in ('snapshot', 'journal', 'background'):
+            raise ConfigurationError("auto_save_mode must be 'snapshot', 'journal' or 'background'")
+        if self.journal_durability not in ('none', 'batch', 'op'):
+            raise ConfigurationError("journal_durability must be 'none', 'batch' or 'op'")
+        if self.journal_compact_every <= 0:
+            raise ConfigurationError("journal_compact_every must be positive")
+        if self.history_format not in ('auto', 'csv', 'binary'):
+            raise ConfigurationError("history_format must be 'auto', 'csv' or 'binary'")
+        if self.history_backend not in ('file', 'sqlite'):
+            raise ConfigurationError("history_backend must be 'file' or 'sqlite'")
+        if self.save_flush_every <= 0:
+            raise ConfigurationError("save_flush_every must be positive")
+        if self.save_flush_interval_ms <= 0:
+            raise ConfigurationError("save_flush_interval_ms must be positive")
+        if self.operation_cache_size < 0:
+            raise ConfigurationError("operation_cache_size must not be negative")
+        if self.parallel_workers < 0:
+            raise ConfigurationError("parallel_workers must not be negative")
+        if self.parallel_chunk_size <= 0:
+            raise ConfigurationError("parallel_chunk_size must be positive")
+        if self.session_max_resident <= 0:
+            raise ConfigurationError("session_max_resident must be positive")
+        if self.session_max_memory_mb <= 0:
+            raise ConfigurationError("session_max_memory_mb must be positive")
         if self.precision <= 0:
             raise ConfigurationError("precision must be positive")
+        if self.guard_digits < 0:
+            raise ConfigurationError("guard_digits must not be negative")
+        if self.rounding not in ROUNDING_MODES:
+            raise ConfigurationError(f"rounding must be one of {', '.join(ROUNDING_MODES)}")
         if self.max_input_value <= 0:
             raise ConfigurationError("max_input_value must be positive")
+        if not 0 <= self.verify_rate <= 1:
+            raise ConfigurationError("verify_rate must be between 0 and 1")
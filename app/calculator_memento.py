@@ -2,11 +2,13 @@
 # Calculator Memento    #
 ########################
 
+from collections import deque
 from dataclasses import dataclass, field
 import datetime
-from typing import Any, Dict, List
+from typing import Any, Deque, Dict, Iterable, List
 
 from app.calculation import Calculation
+from app.history_buffer import HistoryBuffer
 
 
 @dataclass
@@ -15,7 +17,8 @@ class CalculatorMemento:
     Stores calculator state for undo/redo functionality.
 
     The Memento pattern allows the Calculator to save its current state (history)
-    so that it can be restored later. This enables features like undo and redo.
+    so that it can be restored later. Undo and redo are recorded as HistoryDelta
+    changes; a full memento is produced on demand by Calculator.create_memento.
     """
 
     history: List[Calculation]  # List of Calculation instances representing the calculator's history
@@ -54,3 +57,104 @@ class CalculatorMemento:
             history=[Calculation.from_dict(calc) for calc in data['history']],
             timestamp=datetime.datetime.fromisoformat(data['timestamp'])
         )
+
+
+@dataclass
+class HistoryDelta:
+    """
+    Records one change to the calculator's history for undo/redo functionality.
+
+    Instead of a full copy of the history, each undo step stores only the entries
+    the change appended and the pre-existing entries it evicted, so recording a
+    calculation costs O(1) memory and undoing or redoing it touches only those
+    entries. Entries appended and evicted again within the same change cancel
+    out, so even a change that appends a very large batch holds at most the
+    entries that fit in the history.
+    """
+
+    appended: Deque[Calculation] = field(default_factory=deque)  # Entries added by the change that are still in the history
+    evicted: List[Calculation] = field(default_factory=list)  # Pre-existing entries the change evicted, oldest first
+    timestamp: datetime.datetime = field(default_factory=datetime.datetime.now)  # Time when the change was made
+
+    def record(self, appended: Iterable[Calculation] = (), evicted: Iterable[Calculation] = ()) -> None:
+        """
+        Record entries appended to and evicted from the front of the history.
+
+        Args:
+            appended (Iterable[Calculation], optional): Entries appended, oldest first.
+            evicted (Iterable[Calculation], optional): Entries evicted, oldest first.
+        """
+        self.appended.extend(appended)
+        for entry in evicted:
+            if self.appended and entry is self.appended[0]:
+                # An entry appended by this change was evicted again
+                self.appended.popleft()
+            else:
+                self.evicted.append(entry)
+
+    def undo(self, history: HistoryBuffer) -> List[Calculation]:
+        """
+        Revert the change on a history buffer.
+
+        Evicted entries are restored newest first while they fit. When the
+        history has shrunk since the change, the older entries that no longer
+        fit stay evicted and are dropped from the change, so redo evicts only
+        the entries actually restored.
+
+        Args:
+            history (HistoryBuffer): The history after the change.
+
+        Returns:
+            List[Calculation]: The evicted entries restored, oldest first.
+        """
+        for _ in range(len(self.appended)):
+            history.pop()
+        restored = []
+        for entry in reversed(self.evicted):
+            if not history.appendleft(entry):
+                break
+            restored.append(entry)
+        restored.reverse()
+        self.evicted = restored
+        return restored
+
+    def redo(self, history: HistoryBuffer) -> None:
+        """
+        Reapply the change on a history buffer.
+
+        Args:
+            history (HistoryBuffer): The history before the change.
+        """
+        for _ in range(len(self.evicted)):
+            history.popleft()
+        history.extend(self.appended, expire=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the change to dictionary.
+
+        Returns:
+            Dict[str, Any]: A dictionary containing the serialized change.
+        """
+        return {
+            'appended': [calc.to_dict() for calc in self.appended],
+            'evicted': [calc.to_dict() for calc in self.evicted],
+            'timestamp': self.timestamp.isoformat()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HistoryDelta':
+        """
+        Create a change from dictionary.
+
+        Args:
+            data (Dict[str, Any]): Dictionary containing the serialized change.
+
+        Returns:
+            HistoryDelta: A new instance of HistoryDelta with restored state.
+        """
+        return cls(
+            appended=deque(Calculation.from_dict(calc, verify_rate=0.0) for calc in data['appended']),
+            evicted=[Calculation.from_dict(calc, verify_rate=0.0) for calc in data['evicted']],
+            timestamp=datetime.datetime.fromisoformat(data['timestamp'])
+        )
@@ -2,14 +2,18 @@
 # Calculator REPL       #
 ########################
 
+import datetime
 from decimal import Decimal
 import logging
+from typing import Optional
 
 from colorama import Fore, init, Style, Back
 from app.calculator import Calculator
+from app.decimal_math import quantizer
 from app.exceptions import OperationError, ValidationError
+from app.expression import compile_expression
 from app.operations import OperationFactory
-from app.history import AutoSaveObserver, LoggingObserver
+from app.history import AutoSaveObserver, LoggingObserver, StatsObserver
 
 NORMAL_TEXT = Style.NORMAL + Fore.WHITE + Back.RESET
 COMMAND_TEXT = Style.BRIGHT + Fore.YELLOW + Back.RESET
@@ -38,6 +42,8 @@ def calculator_repl():
         # Register observers for logging and auto-saving history
         calc.add_observer(LoggingObserver())
         calc.add_observer(AutoSaveObserver(calc))
+        stats = StatsObserver()
+        calc.add_observer(stats)
 
         print(NORMAL_TEXT+ "Calculator started.  Type '" + COMMAND_TEXT + "help" + NORMAL_TEXT + "' for commands.")
 
@@ -62,12 +68,18 @@ def calculator_repl():
                     print("    "+COMMAND_TEXT+"percent   " + NORMAL_TEXT + " - Percentage of first number of second number            PERC("+NUMBER1_TEXT+"45"+NORMAL_TEXT+" , "+NUMBER2_TEXT+"900"+NORMAL_TEXT+") = "+NUMBER3_TEXT+"5"+NORMAL_TEXT)
                     print("    "+COMMAND_TEXT+"abs_diff  " + NORMAL_TEXT + " - Subtracts smaller number from larger number            ABS("+NUMBER1_TEXT+"3.2"+NORMAL_TEXT+" - "+NUMBER2_TEXT+"5.7"+NORMAL_TEXT+") = "+NUMBER3_TEXT+"2.5"+NORMAL_TEXT)
                     print("\n  Additional commands:")
+                    print("    "+COMMAND_TEXT+"define    " + NORMAL_TEXT + " - Define a formula operation such as margin(x, y) = (x - y) / x * 100")
+                    print("    "+COMMAND_TEXT+"eval      " + NORMAL_TEXT + " - Evaluate an expression such as (2.5 ^ 3 + root(56.25, 2)) % x")
                     print("    "+COMMAND_TEXT+"history   " + NORMAL_TEXT + " - Show calculation history")
+                    print("    "+COMMAND_TEXT+"search    " + NORMAL_TEXT + " - Find calculations by operation, time range and result range")
+                    print("    "+COMMAND_TEXT+"stats     " + NORMAL_TEXT + " - Show result statistics for each operation used this session")
                     print("    "+COMMAND_TEXT+"clear     " + NORMAL_TEXT + " - Clear calculation history")
-                    print("    "+COMMAND_TEXT+"undo      " + NORMAL_TEXT + " - Undo the last calculation")
-                    print("    "+COMMAND_TEXT+"redo      " + NORMAL_TEXT + " - Redo the last undone calculation")
+                    print("    "+COMMAND_TEXT+"undo [n]  " + NORMAL_TEXT + " - Undo the last calculation, or the last n calculations")
+                    print("    "+COMMAND_TEXT+"redo [n]  " + NORMAL_TEXT + " - Redo the last undone calculation, or the last n")
                     print("    "+COMMAND_TEXT+"save      " + NORMAL_TEXT + " - Save calculation history to file")
                     print("    "+COMMAND_TEXT+"load      " + NORMAL_TEXT + " - Load calculation history from file")
+                    print("    "+COMMAND_TEXT+"export    " + NORMAL_TEXT + " - Export calculation history to a CSV or .bin file")
+                    print("    "+COMMAND_TEXT+"import    " + NORMAL_TEXT + " - Replace calculation history with a CSV or .bin file")
                     print("    "+COMMAND_TEXT+"help      " + NORMAL_TEXT + " - Displays this help information")
                     print("    "+COMMAND_TEXT+"exit      " + NORMAL_TEXT + " - Exit the calculator")
                     continue
@@ -79,6 +91,8 @@ def calculator_repl():
                         print("History saved successfully.")
                     except Exception as e:
                         print(WARNING_TEXT+ f"Warning: Could not save history: {e}")
+                    # Stop the background writer, if any
+                    calc.close()
                     print(NORMAL_TEXT+"Goodbye!")
                     break
 
@@ -93,23 +107,64 @@ def calculator_repl():
                             print(f"{i}. {entry}")
                     continue
 
+                if command == 'search':
+                    # Find calculations matching the conditions given by the user
+                    print(NORMAL_TEXT+"Leave a condition blank to skip it.")
+                    try:
+                        operation = input(NORMAL_TEXT+"Operation: ").strip() or None
+                        since = parse_time(input(NORMAL_TEXT+"From time (YYYY-MM-DD[THH:MM:SS]): "))
+                        until = parse_time(input(NORMAL_TEXT+"Until time (YYYY-MM-DD[THH:MM:SS]): "))
+                        low = input(NORMAL_TEXT+"Minimum result: ").strip() or None
+                        high = input(NORMAL_TEXT+"Maximum result: ").strip() or None
+                        result_range = (low, high) if low is not None or high is not None else None
+                        matches = calc.query(operation, since, until, result_range)
+                    except (ValidationError, ValueError) as e:
+                        print(ERROR_TEXT+ f"Error: {e}")
+                        continue
+                    if not matches:
+                        print("No matching calculations")
+                    else:
+                        print(f"Found {len(matches)} calculations:")
+                        for i, entry in enumerate(calc.show_history(matches), 1):
+                            print(f"{i}. {entry}")
+                    continue
+
+                if command == 'stats':
+                    # Display the running result statistics of each operation
+                    statistics = stats.statistics()
+                    if not statistics:
+                        print("No statistics yet")
+                    else:
+                        print("Result Statistics:")
+                        for operation, summary in statistics.items():
+                            print(f"{operation}: " + ", ".join(
+                                f"{name}={format_statistic(value)}" for name, value in summary.items()
+                            ))
+                    continue
+
                 if command == 'clear':
                     # Clear calculation history
                     calc.clear_history()
                     print("History cleared")
                     continue
 
-                if command == 'undo':
-                    # Undo the last calculation
-                    if calc.undo():
+                if command.split()[0:1] == ['undo']:
+                    # Undo the last calculation, or the last n calculations
+                    steps = parse_steps(command)
+                    if steps is None:
+                        print(ERROR_TEXT+"Usage: undo [n]")
+                    elif calc.undo(steps):
                         print("Operation undone")
                     else:
                         print("Nothing to undo")
                     continue
 
-                if command == 'redo':
-                    # Redo the last undone calculation
-                    if calc.redo():
+                if command.split()[0:1] == ['redo']:
+                    # Redo the last undone calculation, or the last n undone calculations
+                    steps = parse_steps(command)
+                    if steps is None:
+                        print(ERROR_TEXT+"Usage: redo [n]")
+                    elif calc.redo(steps):
                         print("Operation redone")
                     else:
                         print("Nothing to redo")
@@ -133,8 +188,54 @@ def calculator_repl():
                         print(ERROR_TEXT+ f"Error loading history: {e}")
                     continue
 
-                if command in ['add', 'subtract', 'multiply', 'divide', 'power', 'root', 'modulus', 'int_divide', 'percent', 'abs_diff']:
-                    # Perform the specified arithmetic operation
+                if command in ('export', 'import'):
+                    # Export the history to, or import it from, a file named by the user
+                    path = input(NORMAL_TEXT+"File path: ").strip()
+                    if not path:
+                        print(NORMAL_TEXT+"Operation cancelled")
+                        continue
+                    try:
+                        if command == 'export':
+                            calc.export_history(path)
+                            print(f"History exported to {path}")
+                        else:
+                            calc.import_history(path)
+                            print(f"History imported from {path}")
+                    except Exception as e:
+                        print(ERROR_TEXT+ f"Error: {e}")
+                    continue
+
+                if command == 'eval':
+                    # Evaluate an expression, prompting for the value of each of its variables
+                    try:
+                        expression = input(NORMAL_TEXT+"Expression: "+NUMBER1_TEXT).strip()
+                        if not expression or expression.lower() == 'cancel':
+                            print(NORMAL_TEXT+"Operation cancelled")
+                            continue
+                        variables = {}
+                        for name in compile_expression(expression).variables:
+                            variables[name] = input(NORMAL_TEXT+f"Value of {name}: "+NUMBER2_TEXT)
+                        result = calc.evaluate(expression, variables).normalize()
+                        print(NORMAL_TEXT+"Result: "+NUMBER3_TEXT+format_value(result, calc.config.precision)+NORMAL_TEXT)
+                    except (ValidationError, OperationError) as e:
+                        print(ERROR_TEXT+ f"Error: {e}")
+                    continue
+
+                if command == 'define':
+                    # Define a formula, usable as an operation command from now on
+                    definition = input(NORMAL_TEXT+"Formula (name(x, y) = expression): ").strip()
+                    if not definition or definition.lower() == 'cancel':
+                        print(NORMAL_TEXT+"Operation cancelled")
+                        continue
+                    try:
+                        formula = calc.define_formula(definition)
+                        print(f"Defined {formula.definition}")
+                    except ValidationError as e:
+                        print(ERROR_TEXT+ f"Error: {e}")
+                    continue
+
+                if command in OperationFactory.operation_names():
+                    # Perform the specified arithmetic operation or formula
                     try:
                         print(NORMAL_TEXT+"Enter numbers (or '"+COMMAND_TEXT+"cancel"+NORMAL_TEXT+"' to abort):")
                         a = input(NORMAL_TEXT+"First number: "+NUMBER1_TEXT)
@@ -190,6 +291,57 @@ def calculator_repl():
         raise
 
 
+def parse_steps(command: str) -> Optional[int]:
+    """
+    Parse the optional step count of an undo or redo command.
+
+    Args:
+        command (str): The command, e.g. 'undo' or 'undo 3'.
+
+    Returns:
+        Optional[int]: The number of steps, 1 if omitted, or None if it is not a
+            positive integer.
+    """
+    words = command.split()
+    if len(words) == 1:
+        return 1
+    if len(words) == 2 and words[1].isdigit() and int(words[1]) > 0:
+        return int(words[1])
+    return None
+
+
+def parse_time(text: str) -> Optional[datetime.datetime]:
+    """
+    Parse an optional ISO 8601 date or date and time entered by the user.
+
+    Args:
+        text (str): The entered text.
+
+    Returns:
+        Optional[datetime.datetime]: The parsed time, or None if the text is blank.
+
+    Raises:
+        ValueError: If the text is not an ISO 8601 date or date and time.
+    """
+    text = text.strip()
+    if not text:
+        return None
+    return datetime.datetime.fromisoformat(text)
+
+
+def format_statistic(value: Optional[float]) -> str:
+    """
+    Format an aggregate for display.
+
+    Args:
+        value (Optional[float]): The aggregate, None if it is undefined.
+
+    Returns:
+        str: The value with up to 10 significant digits, or '-' if undefined.
+    """
+    return '-' if value is None else f"{value:.10g}"
+
+
 def format_value(value: Decimal, precision: int = 10) -> str:
     """
     Format the calculation result with specified precision.
@@ -205,7 +357,7 @@ def format_value(value: Decimal, precision: int = 10) -> str:
     """
     try:
         # Remove trailing zeros and format to specified precision
-        str_res = str(value.quantize(Decimal('0.'+ '0' * precision)))
+        str_res = str(value.quantize(quantizer(precision)))
         return str_res.rstrip('0').rstrip('.')
     except Exception:  # pragma: no cover
         return str(value)
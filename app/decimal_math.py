@@ -0,0 +1,176 @@
+########################
+# Decimal Math          #
+########################
+
+from decimal import Decimal, getcontext, localcontext
+from fractions import Fraction
+from functools import lru_cache
+from typing import Optional
+
+# Largest number of digits an exact power or root result may have; larger
+# results are rounded to the context precision instead
+EXACT_DIGITS = 1000
+
+# Extra digits of working precision for results computed through ln and exp
+GUARD_DIGITS = 10
+
+
+@lru_cache(maxsize=None)
+def quantizer(places: int) -> Decimal:
+    """
+    Get the Decimal that rounds a value to a number of decimal places.
+
+    Quantizers are built once per number of places and reused by every
+    formatting call.
+
+    Args:
+        places (int): The number of decimal places.
+
+    Returns:
+        Decimal: The value 1E-places, to pass to Decimal.quantize.
+    """
+    return Decimal((0, (1,), -places))
+
+
+def integer_nthroot(value: int, n: int) -> int:
+    """
+    Compute the integer part of the nth root of a non-negative integer.
+
+    Uses Newton's method in exact integer arithmetic, starting from a power of
+    two above the root, so the iteration decreases monotonically to the floor.
+
+    Args:
+        value (int): The non-negative integer.
+        n (int): The degree of the root, at least 1.
+
+    Returns:
+        int: The largest integer r with r ** n <= value.
+    """
+    if value < 2:
+        return value
+    x = 1 << -(-value.bit_length() // n)
+    while True:
+        y = ((n - 1) * x + value // x ** (n - 1)) // n
+        if y >= x:
+            return x
+        x = y
+
+
+def _from_parts(negative: bool, coefficient: int, exponent: int) -> Optional[Decimal]:
+    """
+    Build an exact Decimal from a coefficient and a power of ten.
+
+    Args:
+        negative (bool): Whether the value is negative.
+        coefficient (int): The non-negative integer coefficient.
+        exponent (int): The power of ten.
+
+    Returns:
+        Optional[Decimal]: The value, or None if it has more than EXACT_DIGITS
+            digits or lies outside the exponent range of the current context.
+    """
+    digits = len(str(coefficient))
+    context = getcontext()
+    if digits > EXACT_DIGITS or not context.Etiny() <= exponent <= context.Emax - digits + 1:
+        return None
+    sign = '-' if negative else ''
+    if 0 <= exponent and digits + exponent <= context.prec:
+        # Small integers are written out in full, as the float implementation did
+        return Decimal(f"{sign}{coefficient * 10 ** exponent}")
+    return Decimal(f"{sign}{coefficient}E{exponent}")
+
+
+def exact_power(a: Decimal, n: int) -> Optional[Decimal]:
+    """
+    Raise a Decimal to a non-negative integer power exactly.
+
+    The coefficient is raised by binary exponentiation in integer arithmetic,
+    which is exact, after checking that the result stays within EXACT_DIGITS.
+
+    Args:
+        a (Decimal): The finite base.
+        n (int): The non-negative exponent.
+
+    Returns:
+        Optional[Decimal]: The exact power, or None if it is too large to give exactly.
+    """
+    if n == 0:
+        return Decimal(1)
+    sign, digits, exponent = a.as_tuple()
+    if n > EXACT_DIGITS or (len(digits) - 1) * n >= EXACT_DIGITS:
+        return None
+    coefficient = int(''.join(map(str, digits)))
+    if coefficient == 0:
+        return Decimal(0)
+    return _from_parts(bool(sign) and n % 2 == 1, coefficient ** n, exponent * n)
+
+
+def exact_root(a: Decimal, n: int) -> Optional[Decimal]:
+    """
+    Take the nth root of a Decimal when it is exact.
+
+    The value is written as an integer coefficient times a power of ten whose
+    exponent is a multiple of n, and the integer nth root of the coefficient is
+    checked by raising it back to the nth power.
+
+    Args:
+        a (Decimal): The finite number.
+        n (int): The degree of the root, at least 1.
+
+    Returns:
+        Optional[Decimal]: The exact root, or None if the root is not a finite
+            decimal, or is negative under an even degree.
+    """
+    sign, digits, exponent = a.as_tuple()
+    if (sign and n % 2 == 0) or n > EXACT_DIGITS:
+        return None
+    shift = exponent % n
+    coefficient = int(''.join(map(str, digits))) * 10 ** shift
+    root = integer_nthroot(coefficient, n)
+    if root ** n != coefficient:
+        return None
+    return _from_parts(bool(sign), root, (exponent - shift) // n)
+
+
+def rational_power(a: Decimal, exponent: Fraction) -> Decimal:
+    """
+    Raise a Decimal to a rational power, exactly where the math allows it.
+
+    An exponent p/q is applied as the exact qth root raised to the exact pth
+    power whenever the result is a decimal with at most EXACT_DIGITS digits,
+    and that result is rounded once to the context precision.
+    Otherwise the result is computed in the Decimal context with extra guard
+    digits, through ln and exp for non-integer exponents, and rounded once to
+    the context precision. Odd roots of negative numbers are real.
+
+    Args:
+        a (Decimal): The finite base.
+        exponent (Fraction): The exponent.
+
+    Returns:
+        Decimal: The power.
+
+    Raises:
+        ArithmeticError: If the power overflows or is not a real number.
+    """
+    p, q = exponent.numerator, exponent.denominator
+    if p == 0:
+        return Decimal(1)
+    root = exact_root(a, q)
+    if root is not None:
+        power = exact_power(root, abs(p))
+        if power is not None:
+            # An exact result is still rounded to the context, like every other result
+            return +power if p > 0 else Decimal(1) / power
+
+    negative = a < 0 and q % 2 == 1
+    with localcontext() as context:
+        context.prec += GUARD_DIGITS
+        base = -a if negative else a
+        if q == 1:
+            result = base ** p
+        else:
+            result = base ** (Decimal(p) / Decimal(q))
+        if negative and p % 2 == 1:
+            result = -result
+    return +result
@@ -0,0 +1,499 @@
+########################
+# Expression Engine     #
+########################
+
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+import re
+from typing import Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from app.exceptions import OperationError, ValidationError
+from app.operations import Operation, OperationFactory
+
+# Number of compiled expressions kept in the cache
+EXPRESSION_CACHE_SIZE = 256
+
+# Operation identifiers of the infix operators
+BINARY_OPERATORS = {
+    '+': 'add',
+    '-': 'subtract',
+    '*': 'multiply',
+    '/': 'divide',
+    '%': 'modulus',
+    '//': 'int_divide',
+    '^': 'power',
+}
+
+# One token, after optional whitespace: a number, a name, or an operator or punctuation
+TOKEN_PATTERN = re.compile(
+    r"\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<name>[A-Za-z_]\w*)"
+    r"|(?P<symbol>//|[-+*/%^(),]))"
+)
+
+Token = Tuple[str, str, int]  # (kind, text, position)
+Variables = Mapping[str, Decimal]
+Evaluator = Callable[[Variables], Decimal]
+ArrayVariables = Mapping[str, np.ndarray]
+ArrayEvaluator = Callable[[ArrayVariables, Tuple[int, ...]], Tuple[np.ndarray, np.ndarray]]
+
+
+@dataclass(frozen=True)
+class Number:
+    """AST node for a numeric literal."""
+
+    value: Decimal
+
+
+@dataclass(frozen=True)
+class Variable:
+    """AST node for a variable bound at evaluation time."""
+
+    name: str
+
+
+@dataclass(frozen=True)
+class Apply:
+    """AST node applying a registered operation to two sub-expressions."""
+
+    operation: Operation
+    left: 'Node'
+    right: 'Node'
+
+
+Node = Union[Number, Variable, Apply]
+
+
+def tokenize(source: str) -> List[Token]:
+    """
+    Split an expression into tokens.
+
+    Args:
+        source (str): The expression.
+
+    Returns:
+        List[Token]: The (kind, text, position) tokens, where kind is 'number',
+            'name' or 'symbol', followed by an ('end', '', position) token.
+
+    Raises:
+        ValidationError: If the expression contains a character that starts no token.
+    """
+    tokens: List[Token] = []
+    position = 0
+    while True:
+        match = TOKEN_PATTERN.match(source, position)
+        if match is None:
+            rest = source[position:]
+            if rest.strip():
+                offset = position + len(rest) - len(rest.lstrip())
+                raise ValidationError(f"Invalid expression: unexpected '{source[offset]}' at position {offset}")
+            tokens.append(('end', '', len(source)))
+            return tokens
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind), match.start(kind)))
+        position = match.end()
+
+
+class _Parser:
+    """
+    Recursive descent parser building the AST of an expression.
+
+    Grammar, from the lowest precedence to the highest:
+        expression := term (('+' | '-') term)*
+        term       := unary (('*' | '/' | '//' | '%') unary)*
+        unary      := ('-' | '+') unary | power
+        power      := atom ('^' unary)?
+        atom       := number | name | name '(' expression ',' expression ')' | '(' expression ')'
+
+    so '^' is right associative and binds tighter than a leading minus, as in
+    -2 ^ 2 = -4 and 2 ^ 3 ^ 2 = 2 ^ 9.
+    """
+
+    def __init__(self, source: str):
+        """
+        Initialize the parser.
+
+        Args:
+            source (str): The expression to parse.
+        """
+        self.tokens = tokenize(source)
+        self.position = 0
+
+    def parse(self) -> Node:
+        """
+        Parse the whole expression.
+
+        Returns:
+            Node: The root of the AST.
+
+        Raises:
+            ValidationError: If the expression is not well formed.
+        """
+        node = self._expression()
+        self._expect('end')
+        return node
+
+    def _peek(self) -> Token:
+        """
+        Get the next token without consuming it.
+
+        Returns:
+            Token: The next token.
+        """
+        return self.tokens[self.position]
+
+    def _accept(self, *symbols: str) -> Optional[str]:
+        """
+        Consume the next token if it is one of the given symbols.
+
+        Args:
+            *symbols (str): The symbols to accept.
+
+        Returns:
+            Optional[str]: The symbol consumed, or None.
+        """
+        kind, text, _ = self._peek()
+        if kind == 'symbol' and text in symbols:
+            self.position += 1
+            return text
+        return None
+
+    def _expect(self, expected: str) -> None:
+        """
+        Consume the next token, which must be the given symbol, or the end for 'end'.
+
+        Args:
+            expected (str): The expected symbol, or 'end'.
+
+        Raises:
+            ValidationError: If the next token is something else.
+        """
+        kind, text, position = self._peek()
+        if (kind == 'end') if expected == 'end' else (kind == 'symbol' and text == expected):
+            self.position += 1
+            return
+        found = f"'{text}' at position {position}" if kind != 'end' else "end of expression"
+        wanted = "end of expression" if expected == 'end' else f"'{expected}'"
+        raise ValidationError(f"Invalid expression: expected {wanted}, found {found}")
+
+    def _binary(self, symbol: str, left: Node, right: Node) -> Node:
+        """
+        Build the node of an infix operator.
+
+        Args:
+            symbol (str): The operator.
+            left (Node): The left operand.
+            right (Node): The right operand.
+
+        Returns:
+            Node: The node applying the operator's operation.
+        """
+        return Apply(OperationFactory.create_operation(BINARY_OPERATORS[symbol]), left, right)
+
+    def _expression(self) -> Node:
+        """Parse an expression of the grammar."""
+        node = self._term()
+        while (symbol := self._accept('+', '-')) is not None:
+            node = self._binary(symbol, node, self._term())
+        return node
+
+    def _term(self) -> Node:
+        """Parse a term of the grammar."""
+        node = self._unary()
+        while (symbol := self._accept('*', '/', '//', '%')) is not None:
+            node = self._binary(symbol, node, self._unary())
+        return node
+
+    def _unary(self) -> Node:
+        """Parse a unary expression of the grammar."""
+        symbol = self._accept('-', '+')
+        if symbol == '-':
+            # Negation is a subtraction from zero
+            return self._binary('-', Number(Decimal(0)), self._unary())
+        if symbol == '+':
+            return self._unary()
+        return self._power()
+
+    def _power(self) -> Node:
+        """Parse a power of the grammar."""
+        node = self._atom()
+        if self._accept('^') is not None:
+            node = self._binary('^', node, self._unary())
+        return node
+
+    def _atom(self) -> Node:
+        """Parse an atom of the grammar."""
+        kind, text, position = self._peek()
+        if kind == 'number':
+            self.position += 1
+            return Number(Decimal(text))
+        if kind == 'name':
+            self.position += 1
+            if self._accept('(') is None:
+                return Variable(text)
+            try:
+                operation = OperationFactory.create_operation(text)
+            except ValueError:
+                raise ValidationError(f"Invalid expression: unknown operation '{text}' at position {position}")
+            left = self._expression()
+            self._expect(',')
+            right = self._expression()
+            self._expect(')')
+            return Apply(operation, left, right)
+        if self._accept('(') is not None:
+            node = self._expression()
+            self._expect(')')
+            return node
+        found = f"'{text}' at position {position}" if kind != 'end' else "end of expression"
+        raise ValidationError(f"Invalid expression: expected a number, name or '(', found {found}")
+
+
+def parse(source: str) -> Node:
+    """
+    Parse an expression into an AST whose nodes apply registered operations.
+
+    Args:
+        source (str): The expression (e.g., "(2.5 ^ 3 + root(56.25, 2)) % 7").
+
+    Returns:
+        Node: The root of the AST.
+
+    Raises:
+        ValidationError: If the expression is not well formed or uses an unknown operation.
+    """
+    return _Parser(source).parse()
+
+
+def _compile(node: Node) -> Evaluator:
+    """
+    Compile an AST into a tree of closures.
+
+    Each closure evaluates its node from the closures of its children, so
+    evaluation never walks or inspects the AST again.
+
+    Args:
+        node (Node): The root of the AST.
+
+    Returns:
+        Evaluator: A function evaluating the expression for the given variable values.
+    """
+    if isinstance(node, Number):
+        value = node.value
+        return lambda variables: value
+    if isinstance(node, Variable):
+        name = node.name
+
+        def load(variables: Variables) -> Decimal:
+            try:
+                return variables[name]
+            except KeyError:
+                raise ValidationError(f"No value given for variable: {name}")
+        return load
+    execute = node.operation.execute
+    left = _compile(node.left)
+    right = _compile(node.right)
+    return lambda variables: execute(left(variables), right(variables))
+
+
+def _compile_array(node: Node) -> ArrayEvaluator:
+    """
+    Compile an AST into a tree of closures over float64 arrays.
+
+    Each closure runs the NumPy kernel of its operation over whole arrays and
+    passes on the mask of rows that failed in it or in its operands.
+
+    Args:
+        node (Node): The root of the AST.
+
+    Returns:
+        ArrayEvaluator: A function evaluating the expression for arrays of variable
+            values of the given shape, returning the results and the error mask.
+    """
+    if isinstance(node, Number):
+        value = float(node.value)
+        return lambda arrays, shape: (np.full(shape, value), np.zeros(shape, dtype=bool))
+    if isinstance(node, Variable):
+        name = node.name
+
+        def load(arrays: ArrayVariables, shape: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+            try:
+                return np.broadcast_to(arrays[name], shape), np.zeros(shape, dtype=bool)
+            except KeyError:
+                raise ValidationError(f"No value given for variable: {name}")
+        return load
+    execute_array = node.operation.execute_array
+    left = _compile_array(node.left)
+    right = _compile_array(node.right)
+
+    def apply(arrays: ArrayVariables, shape: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        a, a_errors = left(arrays, shape)
+        b, b_errors = right(arrays, shape)
+        result, errors = execute_array(a, b)
+        return result, errors | a_errors | b_errors
+    return apply
+
+
+def _variable_names(node: Node, names: Dict[str, None]) -> None:
+    """
+    Collect the variable names of an AST, in order of first appearance.
+
+    Args:
+        node (Node): The root of the AST.
+        names (Dict[str, None]): Ordered set the names are added to.
+    """
+    if isinstance(node, Variable):
+        names[node.name] = None
+    elif isinstance(node, Apply):
+        _variable_names(node.left, names)
+        _variable_names(node.right, names)
+
+
+def _operations(node: Node, operations: Dict[int, Operation]) -> None:
+    """
+    Collect the operations an AST applies, in order of first appearance.
+
+    Args:
+        node (Node): The root of the AST.
+        operations (Dict[int, Operation]): Ordered set the operations are added to,
+            keyed by identity.
+    """
+    if isinstance(node, Apply):
+        operations.setdefault(id(node.operation), node.operation)
+        _operations(node.left, operations)
+        _operations(node.right, operations)
+
+
+class CompiledExpression:
+    """
+    An expression parsed and compiled once, to be evaluated any number of times.
+
+    Evaluation runs in the current Decimal context, so callers choose the
+    precision and rounding by entering a context first.
+    """
+
+    def __init__(self, source: str, tree: Node):
+        """
+        Compile a parsed expression.
+
+        Args:
+            source (str): The expression text.
+            tree (Node): The AST of the expression.
+        """
+        self.source = source
+        self.tree = tree
+        names: Dict[str, None] = {}
+        _variable_names(tree, names)
+        self.variables: Tuple[str, ...] = tuple(names)
+        applied: Dict[int, Operation] = {}
+        _operations(tree, applied)
+        # The operations the expression applies, bound when it was compiled
+        self.operations: Tuple[Operation, ...] = tuple(applied.values())
+        # The outermost operation, whose operands and result are recorded in history
+        self.operation: Optional[Operation] = tree.operation if isinstance(tree, Apply) else None
+        self._evaluate = _compile(tree)
+        self._evaluate_array = _compile_array(tree)
+        if isinstance(tree, Apply):
+            self._left = _compile(tree.left)
+            self._right = _compile(tree.right)
+
+    def evaluate(self, variables: Optional[Variables] = None) -> Decimal:
+        """
+        Evaluate the expression.
+
+        Args:
+            variables (Optional[Variables], optional): Values of the variables.
+                Defaults to none.
+
+        Returns:
+            Decimal: The value of the expression.
+
+        Raises:
+            ValidationError: If a variable has no value or an operand is invalid.
+            OperationError: If an operation fails.
+        """
+        try:
+            return self._evaluate(variables or {})
+        except (ArithmeticError, ValueError) as e:
+            raise OperationError(f"Evaluation failed: {str(e)}")
+
+    def evaluate_array(self, variables: ArrayVariables) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate the expression over whole float64 arrays of variable values.
+
+        Rows that fail in any operation are flagged in the error mask instead of
+        raising, as in Operation.execute_array.
+
+        Args:
+            variables (ArrayVariables): Broadcastable arrays of the variable values.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and a boolean mask that is
+                True for every row that could not be calculated.
+
+        Raises:
+            ValidationError: If a variable has no values.
+        """
+        shape = np.broadcast(*variables.values()).shape if variables else (1,)
+        with np.errstate(all='ignore'):
+            result, errors = self._evaluate_array(variables, shape)
+        return np.array(result, dtype=np.float64), errors
+
+    def evaluate_operands(self, variables: Optional[Variables] = None) -> Tuple[Decimal, Decimal, Decimal]:
+        """
+        Evaluate the operands of the outermost operation, then the operation.
+
+        Args:
+            variables (Optional[Variables], optional): Values of the variables.
+                Defaults to none.
+
+        Returns:
+            Tuple[Decimal, Decimal, Decimal]: The two operands and the result.
+
+        Raises:
+            ValidationError: If the expression has no operation, a variable has no
+                value or an operand is invalid.
+            OperationError: If an operation fails.
+        """
+        if self.operation is None:
+            raise ValidationError(f"Expression has no operation: {self.source}")
+        variables = variables or {}
+        try:
+            a = self._left(variables)
+            b = self._right(variables)
+            return a, b, self.operation.execute(a, b)
+        except (ArithmeticError, ValueError) as e:
+            raise OperationError(f"Evaluation failed: {str(e)}")
+
+    def __repr__(self) -> str:
+        """
+        Return the representation of the compiled expression.
+
+        Returns:
+            str: The class name and source text.
+        """
+        return f"CompiledExpression({self.source!r})"
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(source: str) -> CompiledExpression:
+    """
+    Parse and compile an expression, reusing the compiled form of the same text.
+
+    Compiled expressions are kept in a least-recently-used cache keyed on the
+    source text, so evaluating a repeated expression, with the same or new
+    variable values, skips tokenizing, parsing and compiling. Expressions that
+    fail to parse are not cached.
+
+    Args:
+        source (str): The expression.
+
+    Returns:
+        CompiledExpression: The compiled expression.
+
+    Raises:
+        ValidationError: If the expression is not well formed or uses an unknown operation.
+    """
+    return CompiledExpression(source, parse(source))
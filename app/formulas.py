@@ -0,0 +1,250 @@
+########################
+# Formula Operations    #
+########################
+
+from decimal import Decimal
+import logging
+from pathlib import Path
+import re
+from typing import List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from app.exceptions import ValidationError
+from app.expression import compile_expression
+from app.operations import Operation, OperationFactory
+
+# A formula definition: name(x, y) = expression
+DEFINITION_PATTERN = re.compile(
+    r"\s*(?P<name>[A-Za-z_]\w*)\s*\(\s*(?P<x>[A-Za-z_]\w*)\s*,\s*(?P<y>[A-Za-z_]\w*)\s*\)\s*=(?P<body>.*)",
+    re.DOTALL
+)
+
+# Command words of the calculator REPL, which would shadow formulas of the same name
+RESERVED_NAMES = frozenset({
+    'clear', 'define', 'eval', 'exit', 'export', 'help', 'history', 'import',
+    'load', 'redo', 'save', 'search', 'stats', 'undo',
+})
+
+
+class Formula(Operation):
+    """
+    Operation defined at runtime by a formula over its two operands.
+
+    The formula body is an expression compiled once into both a scalar Decimal
+    kernel and a NumPy kernel, so the operation runs in exact calculations,
+    vectorized batches and history recomputation like the built-in operations.
+    Its display name is the formula name.
+    """
+
+    def __init__(self, name: str, parameters: Tuple[str, str], body: str):
+        """
+        Compile a formula.
+
+        Args:
+            name (str): The formula name, also its display name.
+            parameters (Tuple[str, str]): The names of the first and second operand.
+            body (str): The expression computing the result from the operands.
+
+        Raises:
+            ValidationError: If the body is not a valid expression, or uses a
+                variable that is not a parameter.
+        """
+        if parameters[0] == parameters[1]:
+            raise ValidationError(f"Formula parameters must differ: {parameters[0]}")
+        self.name = name
+        self.parameters = parameters
+        self.body = body.strip()
+        self.expression = compile_expression(self.body)
+        unknown = [variable for variable in self.expression.variables if variable not in parameters]
+        if unknown:
+            raise ValidationError(f"Unknown variable in formula {name}: {', '.join(unknown)}")
+        # Formulas the body calls; their definitions were bound when it was compiled
+        self.calls: Tuple['Formula', ...] = tuple(
+            operation for operation in self.expression.operations if isinstance(operation, Formula)
+        )
+
+    @property
+    def definition(self) -> str:
+        """
+        Get the definition of the formula.
+
+        Returns:
+            str: The definition, as in "margin(x, y) = (x - y) / x * 100".
+        """
+        return f"{self.name}({self.parameters[0]}, {self.parameters[1]}) = {self.body}"
+
+    @property
+    def cache_key(self) -> str:
+        """
+        Get the key identifying the formula's results in result caches.
+
+        Returns:
+            str: The definition, followed by those of the formulas it calls, so a
+                redefined formula never answers with results of an earlier definition.
+        """
+        return '; '.join([self.definition] + [call.cache_key for call in self.calls])
+
+    def execute(self, a: Decimal, b: Decimal) -> Decimal:
+        """
+        Evaluate the formula with the compiled Decimal kernel.
+
+        Args:
+            a (Decimal): First operand.
+            b (Decimal): Second operand.
+
+        Returns:
+            Decimal: The value of the formula.
+
+        Raises:
+            ValidationError: If an operand is invalid for an operation of the formula.
+            OperationError: If an operation of the formula fails.
+        """
+        x, y = self.parameters
+        return self.expression.evaluate({x: a, y: b})
+
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate the formula over whole arrays with the compiled NumPy kernel.
+
+        Args:
+            a (np.ndarray): First operands.
+            b (np.ndarray): Second operands.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and a mask of rows that failed
+                in any operation of the formula.
+        """
+        x, y = self.parameters
+        return self.expression.evaluate_array({x: a, y: b})
+
+    def __str__(self) -> str:
+        """
+        Return the formula name for display.
+
+        Returns:
+            str: Name of the formula.
+        """
+        return self.name
+
+
+def define_formula(definition: str) -> Formula:
+    """
+    Compile a formula and register it as an operation.
+
+    The formula is registered with OperationFactory under its name, so it can be
+    used as an operation identifier, called in expressions and recomputed from
+    the history. Formulas cannot be named after REPL commands, and can be redefined, but built-in operations cannot;
+    formulas calling a redefined formula are compiled again to call the new
+    definition.
+
+    Args:
+        definition (str): The definition, as in "margin(x, y) = (x - y) / x * 100".
+
+    Returns:
+        Formula: The registered formula.
+
+    Raises:
+        ValidationError: If the definition is invalid, names an operation that
+            is not a formula or uses a reserved command word as its name.
+    """
+    match = DEFINITION_PATTERN.fullmatch(definition)
+    if match is None:
+        raise ValidationError(f"Invalid formula definition: {definition}")
+    name = match.group('name')
+    if name.lower() in RESERVED_NAMES:
+        raise ValidationError(f"Formula name is a reserved command: {name}")
+    for existing in (OperationFactory.get_operation(name), _registered(name)):
+        if existing is not None and not isinstance(existing, Formula):
+            raise ValidationError(f"Cannot redefine operation: {name}")
+
+    formula = Formula(name, (match.group('x'), match.group('y')), match.group('body'))
+    OperationFactory.register_operation(name, formula)
+    # Compiled expressions calling an earlier definition must be compiled again
+    compile_expression.cache_clear()
+    _recompile_callers(name, {name.lower()})
+    logging.info(f"Defined formula: {formula.definition}")
+    return formula
+
+
+def _recompile_callers(name: str, recompiled: Set[str]) -> None:
+    """
+    Compile again, and register again, the formulas calling a redefined formula.
+
+    Callers of those formulas are recompiled in turn, each formula at most once.
+
+    Args:
+        name (str): The name of the redefined formula.
+        recompiled (Set[str]): Identifiers of the formulas already redefined or recompiled.
+    """
+    for identifier in OperationFactory.operation_names():
+        caller = _registered(identifier)
+        if (
+            identifier in recompiled
+            or not isinstance(caller, Formula)
+            or not any(call.name.lower() == name.lower() for call in caller.calls)
+        ):
+            continue
+        recompiled.add(identifier)
+        OperationFactory.register_operation(identifier, Formula(caller.name, caller.parameters, caller.body))
+        _recompile_callers(caller.name, recompiled)
+
+
+def load_formulas(path: Union[str, Path]) -> List[Formula]:
+    """
+    Define the formulas listed in a file, one definition per line.
+
+    Blank lines and lines starting with '#' are ignored. Invalid definitions are
+    skipped with a warning, so one bad line does not lose the others.
+
+    Args:
+        path (Union[str, Path]): The formulas file.
+
+    Returns:
+        List[Formula]: The formulas defined, in file order; none if the file does
+            not exist.
+    """
+    path = Path(path)
+    if not path.exists():
+        return []
+    formulas = []
+    for number, line in enumerate(path.read_text(encoding='utf-8').splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            formulas.append(define_formula(line))
+        except ValidationError as e:
+            logging.warning(f"Skipped formula on line {number} of {path}: {e}")
+    return formulas
+
+
+def formula_definitions() -> List[str]:
+    """
+    Get the definitions of all registered formulas.
+
+    Returns:
+        List[str]: The definitions, in registration order.
+    """
+    definitions = []
+    for name in OperationFactory.operation_names():
+        operation = OperationFactory.create_operation(name)
+        if isinstance(operation, Formula):
+            definitions.append(operation.definition)
+    return definitions
+
+
+def _registered(name: str) -> Optional[Operation]:
+    """
+    Get the operation registered under an identifier.
+
+    Args:
+        name (str): The operation identifier.
+
+    Returns:
+        Optional[Operation]: The operation, or None if the identifier is unknown.
+    """
+    try:
+        return OperationFactory.create_operation(name)
+    except ValueError:
+        return None
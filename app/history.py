@@ -4,8 +4,12 @@
 
 from abc import ABC, abstractmethod
 import logging
-from typing import Any
-from app.calculation import Calculation
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.calculation import BatchCalculation, Calculation
+from app.history_stats import OperationStats
 
 
 class HistoryObserver(ABC):
@@ -27,6 +31,34 @@ class HistoryObserver(ABC):
         """
         pass  # pragma: no cover
 
+    def update_batch(self, calculations: List[Calculation]) -> None:
+        """
+        Handle a batch of new calculations committed at once.
+
+        The default implementation forwards each calculation to update. Observers
+        with expensive side effects can override it to react once per batch.
+
+        Args:
+            calculations (List[Calculation]): The calculations that were performed.
+        """
+        for calculation in calculations:
+            self.update(calculation)
+
+    def history_changed(self, kind: str, entries: List[Any] = ()) -> None:
+        """
+        Handle a change to the history, including undo, redo and clear.
+
+        Every mutation of the history is reported here, including the ones made by
+        undo, redo, clear and loading a history. The default implementation
+        ignores it.
+
+        Args:
+            kind (str): The kind of change: 'append', 'prepend', 'evict',
+                'truncate', 'clear' or 'reset'.
+            entries (List[Any], optional): The entries the change added or removed,
+                oldest first. Defaults to none.
+        """
+
 
 class LoggingObserver(HistoryObserver):
     """
@@ -61,7 +93,11 @@ class AutoSaveObserver(HistoryObserver):
 
     Implements the Observer pattern by listening for new calculations and
     triggering an automatic save of the calculation history if the auto-save
-    feature is enabled in the configuration.
+    feature is enabled in the configuration. When the calculator keeps a history
+    journal, the save commits the journaled changes instead of rewriting the whole
+    history file, and compacts the journal into the file once it grows past the
+    configured number of records. When the calculator has a background writer, the
+    save is only queued, and the writer coalesces queued saves into one write.
     """
 
     def __init__(self, calculator: Any):
@@ -93,6 +129,144 @@ class AutoSaveObserver(HistoryObserver):
             raise AttributeError("Calculation cannot be None")
         
         if self.calculator.config.auto_save:
-            self.calculator.save_history()
-            print ("History auto-saved")
-            logging.info("History auto-saved")
+            self._save()
+
+    def update_batch(self, calculations: List[Calculation]) -> None:
+        """
+        Trigger a single auto-save for a batch of calculations.
+
+        Args:
+            calculations (List[Calculation]): The calculations that were performed.
+        """
+        if calculations and self.calculator.config.auto_save:
+            self._save(len(calculations))
+
+    def _save(self, count: int = 1) -> None:
+        """
+        Save the history, through the storage backend, journal or background writer if
+        the calculator persists changes incrementally.
+
+        Args:
+            count (int, optional): Number of new calculations. Defaults to 1.
+        """
+        storage = getattr(self.calculator, 'storage', None)
+        if storage is not None and storage.incremental:
+            # The changes are already recorded; committing makes them durable
+            storage.commit()
+            logging.info("History changes committed")
+            return
+        writer = getattr(self.calculator, 'writer', None)
+        if writer is not None:
+            writer.notify(count)
+            return
+        journal = getattr(self.calculator, 'journal', None)
+        if journal is not None:
+            journal.commit()
+            if journal.records >= self.calculator.config.journal_compact_every:
+                self.calculator.compact_history()
+            logging.info("History journal committed")
+            return
+        self.calculator.save_history()
+        print ("History auto-saved")
+        logging.info("History auto-saved")
+
+
+class StatsObserver(HistoryObserver):
+    """
+    Observer that keeps running aggregates of the results of each operation.
+
+    The aggregates cover the calculations performed, so calculations evicted
+    from the bounded history still count, while undone calculations are removed
+    again, redone ones added back and clearing the history starts over. Loading
+    or importing a history replaces the aggregates with those of the loaded
+    calculations. Every change costs O(1) arithmetic per operation involved,
+    independent of the size of the history, and percentiles come from a
+    quantile sketch. Memory is bounded by the history, however many
+    calculations stream through it. Batch calculations count each successful row.
+    """
+
+    def __init__(self):
+        """
+        Initialize the observer with no results.
+        """
+        self._stats: Dict[str, OperationStats] = {}
+
+    def update(self, calculation: Calculation) -> None:
+        """
+        Ignore the calculation; it is counted when the history changes.
+
+        Args:
+            calculation (Calculation): The calculation that was performed.
+        """
+        if calculation is None:
+            raise AttributeError("Calculation cannot be None")
+
+    def history_changed(self, kind: str, entries: List[Any] = ()) -> None:
+        """
+        Update the aggregates for a change to the history.
+
+        Args:
+            kind (str): The kind of change.
+            entries (List[Any], optional): The entries the change added or removed.
+                Defaults to none.
+        """
+        if kind in ('clear', 'reset'):
+            self._stats.clear()
+        if kind in ('append', 'reset'):
+            for operation, values in self._results(entries).items():
+                self._stats.setdefault(operation, OperationStats()).add(values)
+        elif kind == 'truncate':
+            # Undo removes the newest calculations
+            for operation, values in self._results(entries).items():
+                stats = self._stats.get(operation)
+                if stats is not None:
+                    stats.remove(values)
+                    if not stats.count:
+                        del self._stats[operation]
+        elif kind in ('evict', 'prepend'):
+            # Evicted calculations still count, but only those in the history are tracked for undo
+            for operation, values in self._results(entries).items():
+                stats = self._stats.get(operation)
+                if stats is not None:
+                    if kind == 'evict':
+                        stats.evict(len(values))
+                    else:
+                        stats.restore(len(values))
+
+    def statistics(self, operation: Optional[str] = None) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Get the aggregates of each operation.
+
+        Args:
+            operation (Optional[str], optional): Display name of the only operation
+                to include (e.g., "Addition"). Defaults to every operation.
+
+        Returns:
+            Dict[str, Dict[str, Optional[float]]]: For each operation name, the count,
+                sum, min, max, mean, variance and p50, p90 and p99 of its results.
+        """
+        return {
+            name: stats.summary()
+            for name, stats in sorted(self._stats.items())
+            if operation is None or name == operation
+        }
+
+    @staticmethod
+    def _results(entries: List[Any]) -> Dict[str, np.ndarray]:
+        """
+        Collect the finite results of entries, grouped by operation.
+
+        Args:
+            entries (List[Any]): Calculation and BatchCalculation entries.
+
+        Returns:
+            Dict[str, np.ndarray]: The float results of each operation, in order.
+        """
+        grouped: Dict[str, List[np.ndarray]] = {}
+        for entry in entries:
+            if isinstance(entry, BatchCalculation):
+                values = entry.result[~entry.errors]
+            else:
+                values = np.array([float(entry.result)])
+            grouped.setdefault(entry.operation, []).append(values[np.isfinite(values)])
+        return {operation: np.concatenate(parts) for operation, parts in grouped.items()}
@@ -0,0 +1,281 @@
+########################
+# History Buffer        #
+########################
+
+import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Union
+
+
+class HistoryBuffer:
+    """
+    Bounded ring buffer holding the calculation history.
+
+    Entries live in a fixed block of slots addressed from a moving head index, so
+    appending to a full buffer evicts the oldest entry in O(1) instead of shifting
+    every remaining entry. Entries can optionally also be retained by age: when
+    max_age is set, entries older than that many seconds are evicted from the
+    front whenever new entries arrive.
+
+    The buffer supports len, indexing, slicing and iteration, and compares equal
+    to any sequence holding the same entries, so it can be used wherever the
+    history used to be a list.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        max_age: Optional[float] = None,
+        entries: Iterable[Any] = ()
+    ):
+        """
+        Initialize the buffer.
+
+        Args:
+            capacity (int): Maximum number of entries kept.
+            max_age (Optional[float], optional): Maximum age of entries in seconds.
+                Defaults to None (no age limit).
+            entries (Iterable[Any], optional): Initial entries, oldest first. Only the
+                newest capacity entries are kept. Defaults to no entries.
+
+        Raises:
+            ValueError: If the capacity is not positive.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.max_age = max_age
+        self._slots: List[Any] = [None] * capacity
+        self._head = 0
+        self._size = 0
+        self.reset(entries)
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries in the buffer.
+
+        Returns:
+            int: Number of entries.
+        """
+        return self._size
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        """
+        Get an entry by position, oldest first, or a list of entries by slice.
+
+        Args:
+            index (Union[int, slice]): Position or slice of positions.
+
+        Returns:
+            Any: The entry, or a list of entries for a slice.
+
+        Raises:
+            IndexError: If the position is out of range.
+        """
+        if isinstance(index, slice):
+            return [self._slots[(self._head + i) % self.capacity]
+                    for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        return self._slots[(self._head + index) % self.capacity]
+
+    def __iter__(self) -> Iterator[Any]:
+        """
+        Iterate over the entries, oldest first.
+
+        Returns:
+            Iterator[Any]: Iterator over the entries.
+        """
+        slots, head, capacity = self._slots, self._head, self.capacity
+        for i in range(self._size):
+            yield slots[(head + i) % capacity]
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Check if the buffer holds the same entries as another sequence.
+
+        Args:
+            other (object): A HistoryBuffer, list or tuple to compare with.
+
+        Returns:
+            bool: True if both hold equal entries in the same order.
+        """
+        if not isinstance(other, (HistoryBuffer, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        """
+        Return detailed string representation of the buffer.
+
+        Returns:
+            str: The entries and limits of the buffer.
+        """
+        return f"HistoryBuffer({self.copy()!r}, capacity={self.capacity}, max_age={self.max_age})"
+
+    def append(self, entry: Any, expire: bool = True) -> List[Any]:
+        """
+        Append an entry, evicting the oldest entries if needed.
+
+        Args:
+            entry (Any): The entry to append.
+            expire (bool, optional): Whether to also evict entries beyond the maximum
+                age. Defaults to True.
+
+        Returns:
+            List[Any]: The evicted entries, oldest first.
+        """
+        evicted = []
+        if self._size == self.capacity:
+            evicted.append(self.popleft())
+        self._slots[(self._head + self._size) % self.capacity] = entry
+        self._size += 1
+        if expire and self.max_age:
+            evicted.extend(self.expire())
+        return evicted
+
+    def extend(self, entries: Iterable[Any], expire: bool = True) -> List[Any]:
+        """
+        Append several entries, evicting the oldest entries if needed.
+
+        Args:
+            entries (Iterable[Any]): The entries to append, oldest first.
+            expire (bool, optional): Whether to also evict entries beyond the maximum
+                age. Defaults to True.
+
+        Returns:
+            List[Any]: The evicted entries, oldest first.
+        """
+        evicted = []
+        for entry in entries:
+            evicted.extend(self.append(entry, expire))
+        return evicted
+
+    def appendleft(self, entry: Any) -> bool:
+        """
+        Insert an entry before the oldest entry.
+
+        Used to restore evicted entries, so a full buffer rejects the entry instead
+        of evicting the newest one.
+
+        Args:
+            entry (Any): The entry to insert.
+
+        Returns:
+            bool: True if the entry was inserted, False if the buffer is full.
+        """
+        if self._size == self.capacity:
+            return False
+        self._head = (self._head - 1) % self.capacity
+        self._slots[self._head] = entry
+        self._size += 1
+        return True
+
+    def pop(self) -> Any:
+        """
+        Remove and return the newest entry.
+
+        Returns:
+            Any: The newest entry.
+
+        Raises:
+            IndexError: If the buffer is empty.
+        """
+        if not self._size:
+            raise IndexError("pop from empty history")
+        self._size -= 1
+        index = (self._head + self._size) % self.capacity
+        entry = self._slots[index]
+        self._slots[index] = None
+        return entry
+
+    def popleft(self) -> Any:
+        """
+        Remove and return the oldest entry.
+
+        Returns:
+            Any: The oldest entry.
+
+        Raises:
+            IndexError: If the buffer is empty.
+        """
+        if not self._size:
+            raise IndexError("pop from empty history")
+        entry = self._slots[self._head]
+        self._slots[self._head] = None
+        self._head = (self._head + 1) % self.capacity
+        self._size -= 1
+        return entry
+
+    def expire(self, now: Optional[datetime.datetime] = None) -> List[Any]:
+        """
+        Evict entries older than the maximum age.
+
+        Args:
+            now (Optional[datetime.datetime], optional): Reference time. Defaults to now.
+
+        Returns:
+            List[Any]: The evicted entries, oldest first.
+        """
+        evicted = []
+        if not self.max_age:
+            return evicted
+        cutoff = (now or datetime.datetime.now()) - datetime.timedelta(seconds=self.max_age)
+        while self._size and self._slots[self._head].timestamp < cutoff:
+            evicted.append(self.popleft())
+        return evicted
+
+    def resize(self, capacity: int) -> List[Any]:
+        """
+        Change the capacity, evicting the oldest entries if they no longer fit.
+
+        Args:
+            capacity (int): New maximum number of entries.
+
+        Returns:
+            List[Any]: The evicted entries, oldest first.
+
+        Raises:
+            ValueError: If the capacity is not positive.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        entries = self.copy()
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._head = 0
+        self._size = 0
+        evicted = entries[:max(len(entries) - capacity, 0)]
+        self.reset(entries[len(evicted):])
+        return evicted
+
+    def reset(self, entries: Iterable[Any]) -> None:
+        """
+        Replace the contents of the buffer.
+
+        Args:
+            entries (Iterable[Any]): The new entries, oldest first. Only the newest
+                capacity entries are kept.
+        """
+        self.clear()
+        entries = list(entries)[-self.capacity:]
+        self._slots[:len(entries)] = entries
+        self._size = len(entries)
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        self._slots = [None] * self.capacity
+        self._head = 0
+        self._size = 0
+
+    def copy(self) -> List[Any]:
+        """
+        Return the entries as a new list, oldest first.
+
+        Returns:
+            List[Any]: The entries.
+        """
+        return list(self)
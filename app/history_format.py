@@ -0,0 +1,463 @@
+########################
+# History File Format   #
+########################
+
+import csv
+import datetime
+from decimal import Decimal, InvalidOperation
+import gc
+import json
+import os
+from pathlib import Path
+import struct
+import warnings
+from typing import Any, BinaryIO, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.calculation import BatchCalculation, Calculation
+from app.exceptions import OperationError
+
+# File extension of binary history files
+BINARY_SUFFIX = '.bin'
+
+MAGIC = b'CALCHIST'
+VERSION = 1
+HEADER = struct.Struct('<8sHHIQ')  # magic, version, reserved, names length, entry count
+ALIGNMENT = 8
+STRING_COLUMNS = ('operand1', 'operand2', 'result')
+
+EPOCH = np.datetime64(0, 'us')
+
+# Columns of CSV history files, and the size of the chunks read backward from their end
+CSV_COLUMNS = ('operation', 'operand1', 'operand2', 'result', 'timestamp')
+TAIL_CHUNK_SIZE = 64 * 1024
+
+
+def is_binary_path(path: Path) -> bool:
+    """
+    Check whether a history file path names a binary history file.
+
+    Args:
+        path (Path): The history file path.
+
+    Returns:
+        bool: True if the path has the binary history file extension.
+    """
+    return Path(path).suffix.lower() == BINARY_SUFFIX
+
+
+def _padding(size: int) -> bytes:
+    """
+    Get the zero bytes that align a section of the given size.
+
+    Args:
+        size (int): Size of the section in bytes.
+
+    Returns:
+        bytes: The padding.
+    """
+    return b'\0' * (-size % ALIGNMENT)
+
+
+def _aligned(size: int) -> int:
+    """
+    Round a section size up to the section alignment.
+
+    Args:
+        size (int): Size of the section in bytes.
+
+    Returns:
+        int: The aligned size.
+    """
+    return size + (-size % ALIGNMENT)
+
+
+def write_binary_history(file: BinaryIO, entries: List[Any]) -> None:
+    """
+    Write history entries in the binary columnar format.
+
+    The file holds a header, the JSON list of operation names, then one
+    contiguous column per field, each aligned to 8 bytes:
+
+    - operation codes: uint16 indexes into the operation names;
+    - timestamps: int64 microseconds since 1970-01-01 (naive local time);
+    - operand1, operand2 and result: uint64 end offsets of each entry followed by
+      the exact ASCII strings of all entries (Decimal strings, or JSON arrays for
+      batch entries);
+    - operand1, operand2 and result again as float64 approximations, for numeric
+      analysis without parsing (NaN for batch entries).
+
+    Args:
+        file (BinaryIO): The file to write to.
+        entries (List[Any]): The Calculation or BatchCalculation entries, oldest first.
+    """
+    names: List[str] = []
+    codes_by_name = {}
+    codes = np.empty(len(entries), dtype='<u2')
+    for i, entry in enumerate(entries):
+        code = codes_by_name.get(entry.operation)
+        if code is None:
+            code = codes_by_name[entry.operation] = len(names)
+            names.append(entry.operation)
+        codes[i] = code
+    names_json = json.dumps(names).encode('utf-8')
+
+    file.write(HEADER.pack(MAGIC, VERSION, 0, len(names_json), len(entries)))
+    file.write(_padding(HEADER.size))
+    file.write(names_json + _padding(len(names_json)))
+    file.write(codes.tobytes() + _padding(codes.nbytes))
+
+    timestamps = np.array([entry.timestamp for entry in entries], dtype='datetime64[us]')
+    file.write((timestamps - EPOCH).astype('<i8').tobytes())
+
+    for column in STRING_COLUMNS:
+        data = [_column_string(entry, column).encode('ascii') for entry in entries]
+        offsets = np.zeros(len(data) + 1, dtype='<u8')
+        np.cumsum([len(value) for value in data], out=offsets[1:])
+        blob = b''.join(data)
+        file.write(offsets.tobytes())
+        file.write(blob + _padding(len(blob)))
+
+    for column in STRING_COLUMNS:
+        numbers = np.array([_column_float(entry, column) for entry in entries], dtype='<f8')
+        file.write(numbers.tobytes())
+
+
+def _column_string(entry: Any, column: str) -> str:
+    """
+    Get the exact string stored for one field of an entry.
+
+    Args:
+        entry (Any): A Calculation or BatchCalculation.
+        column (str): 'operand1', 'operand2' or 'result'.
+
+    Returns:
+        str: The Decimal string, or the JSON array of a batch entry.
+    """
+    value = getattr(entry, column)
+    if isinstance(value, np.ndarray):
+        return json.dumps(value.tolist())
+    return str(value)
+
+
+def _column_float(entry: Any, column: str) -> float:
+    """
+    Get the float64 approximation stored for one field of an entry.
+
+    Args:
+        entry (Any): A Calculation or BatchCalculation.
+        column (str): 'operand1', 'operand2' or 'result'.
+
+    Returns:
+        float: The value, or NaN for a batch entry.
+    """
+    value = getattr(entry, column)
+    if isinstance(value, np.ndarray):
+        return np.nan
+    return float(value)
+
+
+class BinaryLayout(NamedTuple):
+    """
+    Location of the columns of a binary history file.
+
+    The arrays are views of the file contents, not copies.
+    """
+
+    names: List[str]                                # Operation names, indexed by code
+    codes: np.ndarray                               # uint16 operation code of every entry
+    timestamps: np.ndarray                          # int64 microseconds of every entry
+    strings: List[Tuple[np.ndarray, memoryview]]    # (offsets, data) of operand1, operand2, result
+    numbers: List[np.ndarray]                       # float64 operand1, operand2, result
+
+
+def read_binary_layout(buffer: Any) -> BinaryLayout:
+    """
+    Locate the columns of a binary history file without copying them.
+
+    Args:
+        buffer (Any): The file contents, as bytes or a memory map.
+
+    Returns:
+        BinaryLayout: The columns, as views of the buffer.
+
+    Raises:
+        OperationError: If the buffer is not a binary history file.
+    """
+    if len(buffer) < HEADER.size:
+        raise OperationError("Invalid binary history file: truncated header")
+    magic, version, _, names_length, count = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise OperationError("Invalid binary history file: unknown header")
+    view = memoryview(buffer)
+
+    try:
+        position = _aligned(HEADER.size)
+        names = json.loads(bytes(view[position:position + names_length]).decode('utf-8'))
+        position += _aligned(names_length)
+
+        codes = np.frombuffer(view, dtype='<u2', count=count, offset=position)
+        position += _aligned(codes.nbytes)
+        timestamps = np.frombuffer(view, dtype='<i8', count=count, offset=position)
+        position += timestamps.nbytes
+
+        columns = []
+        for _ in STRING_COLUMNS:
+            offsets = np.frombuffer(view, dtype='<u8', count=count + 1, offset=position)
+            position += offsets.nbytes
+            size = int(offsets[-1])
+            if position + size > len(view):
+                raise ValueError("string column past end of file")
+            columns.append((offsets, view[position:position + size]))
+            position += _aligned(size)
+
+        numbers = []
+        for _ in STRING_COLUMNS:
+            numbers.append(np.frombuffer(view, dtype='<f8', count=count, offset=position))
+            position += count * 8
+    except ValueError as e:
+        raise OperationError(f"Invalid binary history file: {e}")
+    return BinaryLayout(names, codes, timestamps, columns, numbers)
+
+
+def read_binary_history(buffer: Any, limit: Optional[int] = None, verify_rate: float = 0.0) -> List[Any]:
+    """
+    Read history entries from the binary columnar format.
+
+    Args:
+        buffer (Any): The file contents, as bytes or a memory map.
+        limit (Optional[int], optional): Number of newest entries to read. Defaults
+            to all entries.
+        verify_rate (float, optional): Fraction of loaded results to verify by
+            recomputation. Defaults to 0.0.
+
+    Returns:
+        List[Any]: The Calculation and BatchCalculation entries, oldest first.
+
+    Raises:
+        OperationError: If the buffer is not a valid binary history file.
+    """
+    layout = read_binary_layout(buffer)
+    count = len(layout.codes)
+    start = count - limit if limit is not None and limit < count else 0
+    return decode_entries(layout, start, count, verify_rate)
+
+
+def decode_entries(layout: BinaryLayout, start: int, stop: int, verify_rate: float = 0.0) -> List[Any]:
+    """
+    Decode a range of entries of a binary history file.
+
+    Only the bytes of the requested entries are decoded.
+
+    Args:
+        layout (BinaryLayout): The columns of the file.
+        start (int): Position of the first entry.
+        stop (int): Position after the last entry.
+        verify_rate (float, optional): Fraction of loaded results to verify by
+            recomputation. Defaults to 0.0.
+
+    Returns:
+        List[Any]: The Calculation and BatchCalculation entries, oldest first.
+    """
+    names = layout.names
+    operations = [names[code] for code in layout.codes[start:stop].tolist()]
+    times = layout.timestamps[start:stop].astype('datetime64[us]').astype(object).tolist()
+    strings = [split_strings(offsets[start:stop + 1], data) for offsets, data in layout.strings]
+    return build_entries(operations, times, *strings, verify_rate=verify_rate)
+
+
+def build_entries(
+    operations: List[str],
+    timestamps: List[datetime.datetime],
+    operand1: List[str],
+    operand2: List[str],
+    result: List[str],
+    verify_rate: float = 0.0
+) -> List[Any]:
+    """
+    Build history entries from already split columns.
+
+    The garbage collector is paused while the entries are created, since the
+    many small objects built at once would otherwise trigger repeated collections
+    that find nothing to free.
+
+    Args:
+        operations (List[str]): The operation name of every entry.
+        timestamps (List[datetime.datetime]): The timestamp of every entry.
+        operand1 (List[str]): The first operand strings.
+        operand2 (List[str]): The second operand strings.
+        result (List[str]): The result strings.
+        verify_rate (float, optional): Fraction of loaded results to verify by
+            recomputation. Defaults to 0.0.
+
+    Returns:
+        List[Any]: The Calculation and BatchCalculation entries, oldest first.
+
+    Raises:
+        OperationError: If a value is not a valid number.
+    """
+    entries: List[Any] = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for operation, timestamp, a, b, r in zip(operations, timestamps, operand1, operand2, result):
+            if a.startswith('['):
+                entries.append(BatchCalculation.from_dict({
+                    'operation': operation,
+                    'operand1': a,
+                    'operand2': b,
+                    'result': r,
+                    'timestamp': timestamp.isoformat()
+                }))
+            else:
+                entries.append(Calculation.with_result(
+                    operation=operation,
+                    operand1=Decimal(a),
+                    operand2=Decimal(b),
+                    result=Decimal(r),
+                    timestamp=timestamp,
+                    verify_rate=verify_rate
+                ))
+    except InvalidOperation as e:
+        raise OperationError(f"Invalid calculation data: {str(e)}")
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return entries
+
+
+def parse_timestamps(values: List[str]) -> List[datetime.datetime]:
+    """
+    Parse ISO 8601 timestamps in bulk.
+
+    NumPy parses the whole column at once; values it does not parse exactly (such
+    as timestamps with a UTC offset, which it would convert to UTC) fall back to
+    datetime.fromisoformat.
+
+    Args:
+        values (List[str]): The timestamp strings.
+
+    Returns:
+        List[datetime.datetime]: The timestamps.
+
+    Raises:
+        OperationError: If a value is not a valid timestamp.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            return np.array(values, dtype='datetime64[us]').astype(object).tolist()
+    except (ValueError, Warning):
+        pass
+    try:
+        return [datetime.datetime.fromisoformat(value) for value in values]
+    except (TypeError, ValueError) as e:
+        raise OperationError(f"Invalid calculation data: {str(e)}")
+
+
+def read_csv_history(
+    path: Path,
+    limit: Optional[int] = None,
+    verify_rate: float = 0.0,
+    encoding: str = 'utf-8'
+) -> List[Any]:
+    """
+    Read history entries from a CSV history file without pandas.
+
+    With a limit, the file is read backward from its end in chunks until enough
+    lines are found, so only the rows that will be kept are read and parsed. This
+    relies on rows never spanning lines, which holds for every value the history
+    stores (numbers, JSON arrays and ISO timestamps).
+
+    Args:
+        path (Path): The CSV file.
+        limit (Optional[int], optional): Number of newest rows to read. Defaults to
+            all rows.
+        verify_rate (float, optional): Fraction of loaded results to verify by
+            recomputation. Defaults to 0.0.
+        encoding (str, optional): Text encoding of the file. Defaults to 'utf-8'.
+
+    Returns:
+        List[Any]: The Calculation and BatchCalculation entries, oldest first.
+
+    Raises:
+        OperationError: If the file is missing a column or holds invalid data.
+    """
+    with open(path, 'rb') as file:
+        header_line = file.readline()
+        if not header_line.strip():
+            return []
+        header = next(csv.reader([header_line.decode(encoding)]))
+        if limit is None:
+            lines = file.read().splitlines()
+        else:
+            lines = _tail_lines(file, file.tell(), limit)
+
+    try:
+        columns = [header.index(name) for name in CSV_COLUMNS]
+    except ValueError as e:
+        raise OperationError(f"Invalid calculation data: {str(e)}")
+
+    rows = [row for row in csv.reader(line.decode(encoding) for line in lines) if row]
+    try:
+        operations, operand1, operand2, result, timestamps = (
+            [row[column] for row in rows] for column in columns
+        )
+    except IndexError:
+        raise OperationError("Invalid calculation data: row has missing fields")
+    return build_entries(
+        operations, parse_timestamps(timestamps), operand1, operand2, result,
+        verify_rate=verify_rate
+    )
+
+
+def _tail_lines(file: BinaryIO, start: int, limit: int) -> List[bytes]:
+    """
+    Read the last lines of a file by seeking backward from its end.
+
+    Args:
+        file (BinaryIO): The file, opened in binary mode.
+        start (int): Offset where the data lines start, after the header.
+        limit (int): Number of lines to return.
+
+    Returns:
+        List[bytes]: Up to limit non-empty lines, oldest first.
+    """
+    position = file.seek(0, os.SEEK_END)
+    chunks: List[bytes] = []
+    newlines = 0
+    # One more line than needed, since the first one read is usually cut off
+    while position > start and newlines <= limit:
+        size = min(TAIL_CHUNK_SIZE, position - start)
+        position -= size
+        file.seek(position)
+        chunk = file.read(size)
+        chunks.append(chunk)
+        newlines += chunk.count(b'\n')
+    lines = b''.join(reversed(chunks)).splitlines()
+    if position > start:
+        # The first line is cut off unless the data read starts right after a newline
+        file.seek(position - 1)
+        if file.read(1) != b'\n':
+            lines = lines[1:]
+    lines = [line for line in lines if line.strip()]
+    return lines[-limit:] if limit else []
+
+
+def split_strings(offsets: np.ndarray, data: memoryview) -> List[str]:
+    """
+    Split a string column into its values.
+
+    Args:
+        offsets (np.ndarray): The start offset of the first value, then the end
+            offset of every value.
+        data (memoryview): The concatenated ASCII values.
+
+    Returns:
+        List[str]: The values.
+    """
+    bounds = offsets.tolist()
+    base = bounds[0]
+    text = bytes(data[base:bounds[-1]]).decode('ascii')
+    return [text[start - base:end - base] for start, end in zip(bounds, bounds[1:])]
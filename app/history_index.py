@@ -0,0 +1,233 @@
+########################
+# History Index         #
+########################
+
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+import datetime
+from decimal import Decimal
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Sorts after every position, so (value, AFTER) bounds all index keys holding value
+AFTER = float('inf')
+
+
+class HistoryIndex:
+    """
+    Secondary indexes over the calculation history for fast queries.
+
+    Every entry in the history is given a position key that increases from the
+    oldest entry to the newest, so the keys of the history always form one
+    contiguous run: appends take the key after the newest entry, and prepends
+    the key before the oldest. The index keeps
+    - a hash index from operation name to the keys of its entries, in order,
+    - the entries sorted by timestamp, as (timestamp, key) pairs,
+    - the entries with a single result sorted by result, as (result, key) pairs.
+
+    The index is updated incrementally from the same change notifications as the
+    journal and storage backends, so it never has to scan the history. A query
+    starts from whichever index narrows the candidates most, using binary search
+    for the sorted indexes, and checks the remaining conditions only on those
+    candidates.
+    """
+
+    def __init__(self, entries: Iterable[Any] = ()):
+        """
+        Initialize the index.
+
+        Args:
+            entries (Iterable[Any], optional): Initial entries, oldest first.
+                Defaults to no entries.
+        """
+        self._entries: Dict[int, Any] = {}
+        self._operations: Dict[str, Deque[int]] = {}
+        self._timestamps: List[Tuple[datetime.datetime, int]] = []
+        self._results: List[Tuple[Decimal, int]] = []
+        self._first = 0  # Key of the oldest entry
+        self._next = 0   # Key after the newest entry
+        self.apply('reset', list(entries))
+
+    def __len__(self) -> int:
+        """
+        Return the number of indexed entries.
+
+        Returns:
+            int: Number of entries.
+        """
+        return len(self._entries)
+
+    def apply(self, kind: str, entries: List[Any] = ()) -> None:
+        """
+        Apply one change to the history.
+
+        Args:
+            kind (str): The kind of change: 'append', 'prepend', 'evict',
+                'truncate', 'clear' or 'reset'.
+            entries (List[Any], optional): The entries the change added or removed,
+                oldest first. Defaults to none.
+        """
+        if kind == 'append':
+            for entry in entries:
+                self._add(self._next, entry)
+                self._next += 1
+        elif kind == 'prepend':
+            for entry in reversed(entries):
+                self._first -= 1
+                self._add(self._first, entry)
+        elif kind == 'evict':
+            for _ in entries:
+                self._remove(self._first)
+                self._first += 1
+        elif kind == 'truncate':
+            for _ in entries:
+                self._next -= 1
+                self._remove(self._next)
+        elif kind in ('clear', 'reset'):
+            self._entries.clear()
+            self._operations.clear()
+            self._timestamps.clear()
+            self._results.clear()
+            self._first = self._next = 0
+            if kind == 'reset':
+                self.apply('append', entries)
+
+    def query(
+        self,
+        operation: Optional[str] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        result_range: Optional[Tuple[Optional[Decimal], Optional[Decimal]]] = None,
+        limit: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Find the entries matching all the given conditions.
+
+        Args:
+            operation (Optional[str], optional): Operation display name to match
+                (e.g., "Addition"). Defaults to any operation.
+            since (Optional[datetime.datetime], optional): Earliest timestamp included.
+                Defaults to no lower bound.
+            until (Optional[datetime.datetime], optional): Timestamp before which entries
+                are included. Defaults to no upper bound.
+            result_range (Optional[Tuple[Optional[Decimal], Optional[Decimal]]], optional):
+                Inclusive lower and upper result bounds, either of which may be None.
+                Only entries with a single result match. Defaults to any result.
+            limit (Optional[int], optional): Number of newest matching entries to
+                return. Defaults to all matching entries.
+
+        Returns:
+            List[Any]: The matching entries, oldest first.
+        """
+        low, high = result_range if result_range is not None else (None, None)
+
+        # Each usable index proposes its candidate keys; the smallest set wins
+        candidates: List[Tuple[int, Callable[[], Iterable[int]]]] = [
+            (len(self._entries), lambda: range(self._first, self._next))
+        ]
+        if operation is not None:
+            keys = self._operations.get(operation, deque())
+            candidates.append((len(keys), lambda: keys))
+        if since is not None or until is not None:
+            start = bisect_left(self._timestamps, (since,)) if since is not None else 0
+            stop = bisect_left(self._timestamps, (until,)) if until is not None else len(self._timestamps)
+            candidates.append(self._range_candidate(self._timestamps, start, stop))
+        if result_range is not None:
+            start = bisect_left(self._results, (low,)) if low is not None else 0
+            stop = bisect_right(self._results, (high, AFTER)) if high is not None else len(self._results)
+            candidates.append(self._range_candidate(self._results, start, stop))
+        _, candidate_keys = min(candidates, key=lambda candidate: candidate[0])
+
+        matches = []
+        for key in reversed(candidate_keys()):
+            entry = self._entries[key]
+            if operation is not None and entry.operation != operation:
+                continue
+            if since is not None and entry.timestamp < since:
+                continue
+            if until is not None and entry.timestamp >= until:
+                continue
+            if result_range is not None:
+                result = self._result(entry)
+                if result is None or (low is not None and result < low) or (high is not None and result > high):
+                    continue
+            matches.append(entry)
+            if limit is not None and len(matches) >= limit:
+                break
+        matches.reverse()
+        return matches
+
+    @staticmethod
+    def _range_candidate(
+        pairs: List[Tuple[Any, int]],
+        start: int,
+        stop: int
+    ) -> Tuple[int, Callable[[], Iterable[int]]]:
+        """
+        Describe the keys in a range of a sorted index as query candidates.
+
+        Args:
+            pairs (List[Tuple[Any, int]]): The sorted (value, key) pairs.
+            start (int): Position of the first pair in the range.
+            stop (int): Position after the last pair in the range.
+
+        Returns:
+            Tuple[int, Callable[[], Iterable[int]]]: The number of keys, and a function
+                returning them in ascending order.
+        """
+        stop = max(start, stop)
+        return stop - start, lambda: sorted(key for _, key in pairs[start:stop])
+
+    def _add(self, key: int, entry: Any) -> None:
+        """
+        Add an entry to every index.
+
+        Args:
+            key (int): Position key of the entry.
+            entry (Any): The Calculation or BatchCalculation.
+        """
+        self._entries[key] = entry
+        keys = self._operations.setdefault(entry.operation, deque())
+        if keys and key < keys[0]:
+            keys.appendleft(key)
+        else:
+            keys.append(key)
+        insort(self._timestamps, (entry.timestamp, key))
+        result = self._result(entry)
+        if result is not None:
+            insort(self._results, (result, key))
+
+    def _remove(self, key: int) -> None:
+        """
+        Remove an entry from every index.
+
+        Args:
+            key (int): Position key of the oldest or newest entry.
+        """
+        entry = self._entries.pop(key)
+        keys = self._operations[entry.operation]
+        if keys[0] == key:
+            keys.popleft()
+        else:
+            keys.pop()
+        if not keys:
+            del self._operations[entry.operation]
+        del self._timestamps[bisect_left(self._timestamps, (entry.timestamp, key))]
+        result = self._result(entry)
+        if result is not None:
+            del self._results[bisect_left(self._results, (result, key))]
+
+    @staticmethod
+    def _result(entry: Any) -> Optional[Decimal]:
+        """
+        Get the result of an entry as an orderable value.
+
+        Args:
+            entry (Any): The Calculation or BatchCalculation.
+
+        Returns:
+            Optional[Decimal]: The result, or None for batch entries and NaN results.
+        """
+        result = entry.result
+        if not isinstance(result, Decimal) or result.is_nan():
+            return None
+        return result
@@ -0,0 +1,228 @@
+########################
+# History Journal       #
+########################
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+from app.calculation import Calculation
+from app.exceptions import ConfigurationError
+
+
+class HistoryJournal:
+    """
+    Append-only write-ahead journal of history changes.
+
+    Instead of rewriting the whole history file after every calculation, each
+    change to the history (entries appended, evicted, undone, restored, cleared
+    or replaced) is appended to the journal as one JSON line. The history file
+    then only holds a snapshot, and the current history is the snapshot with the
+    journal replayed on top.
+
+    Writes are grouped into commits, and the durability level decides when they
+    reach the disk:
+
+    - 'none': records are flushed to the operating system on commit, never fsynced.
+    - 'batch': records are flushed and fsynced once per commit.
+    - 'op': every record is flushed and fsynced as soon as it is written.
+
+    To compact, the journal is rotated: the current file is sealed with the size
+    of the snapshot that is about to be written and renamed aside, so new records
+    go to a fresh file while the snapshot is written. Once the snapshot is in
+    place the rotated file is discarded. If the process stops in between, replay
+    uses the seal to tell whether the snapshot already contains the rotated
+    records.
+    """
+
+    DURABILITY_LEVELS = ('none', 'batch', 'op')
+
+    def __init__(self, path: Path, durability: str = 'batch'):
+        """
+        Initialize the journal.
+
+        Args:
+            path (Path): Path of the journal file.
+            durability (str, optional): One of 'none', 'batch' or 'op'. Defaults to 'batch'.
+
+        Raises:
+            ConfigurationError: If the durability level is unknown.
+        """
+        if durability not in self.DURABILITY_LEVELS:
+            raise ConfigurationError(f"Unknown journal durability: {durability}")
+        self.path = Path(path)
+        self.rotated_path = self.path.with_name(self.path.name + '.compacting')
+        self.durability = durability
+        self.records = 0
+        self._file: Optional[TextIO] = None
+
+    def record(self, kind: str, entries: List[Any] = ()) -> None:
+        """
+        Append one history change to the journal.
+
+        Args:
+            kind (str): The kind of change: 'append', 'prepend', 'evict',
+                'truncate', 'clear' or 'reset'.
+            entries (List[Any], optional): The entries the change added or removed,
+                oldest first. Defaults to none.
+        """
+        if kind in ('evict', 'truncate'):
+            data: Dict[str, Any] = {'op': kind, 'count': len(entries)}
+        else:
+            data = {'op': kind, 'entries': [entry.to_dict() for entry in entries]}
+        self._write(data)
+        if self.durability == 'op':
+            self._sync()
+
+    def commit(self) -> None:
+        """
+        Commit the records written since the last commit.
+        """
+        if self._file is None:
+            return
+        if self.durability == 'batch':
+            self._sync()
+        else:
+            self._file.flush()
+
+    def rotate(self, snapshot: List[Any]) -> Path:
+        """
+        Seal the journal and move it aside for compaction.
+
+        Args:
+            snapshot (List[Any]): The history the compacted snapshot will hold.
+
+        Returns:
+            Path: The path of the rotated journal, to be discarded once the snapshot
+                is written.
+        """
+        self._write({
+            'op': 'seal',
+            'size': len(snapshot),
+            'last': snapshot[-1].timestamp.isoformat() if snapshot else None
+        })
+        self._sync()
+        self.close()
+        os.replace(self.path, self.rotated_path)
+        self.records = 0
+        return self.rotated_path
+
+    def discard_rotated(self) -> None:
+        """
+        Remove the rotated journal once its snapshot is written.
+        """
+        self.rotated_path.unlink(missing_ok=True)
+
+    def truncate(self) -> None:
+        """
+        Remove all journal files, after a full snapshot was written.
+        """
+        self.close()
+        self.path.unlink(missing_ok=True)
+        self.rotated_path.unlink(missing_ok=True)
+        self.records = 0
+
+    def close(self) -> None:
+        """
+        Flush and close the journal file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def replay(self, snapshot: Iterable[Any]) -> List[Any]:
+        """
+        Rebuild the history from a snapshot and the journal files.
+
+        Args:
+            snapshot (Iterable[Any]): The entries loaded from the history file.
+
+        Returns:
+            List[Any]: The history with every journaled change applied.
+        """
+        entries = list(snapshot)
+        if self.rotated_path.exists():
+            records = self._read(self.rotated_path)
+            seal = records[-1] if records and records[-1]['op'] == 'seal' else None
+            last = entries[-1].timestamp.isoformat() if entries else None
+            if not (seal and seal['size'] == len(entries) and seal['last'] == last):
+                entries = self._apply(entries, records)
+        if self.path.exists():
+            entries = self._apply(entries, self._read(self.path))
+        return entries
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        """
+        Write one record to the journal file.
+
+        Args:
+            data (Dict[str, Any]): The record.
+        """
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(data) + '\n')
+        self.records += 1
+
+    def _sync(self) -> None:
+        """
+        Flush the journal file and force it to disk.
+        """
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    @staticmethod
+    def _read(path: Path) -> List[Dict[str, Any]]:
+        """
+        Read the records of a journal file.
+
+        A torn last line left by an interrupted write ends the journal.
+
+        Args:
+            path (Path): Path of the journal file.
+
+        Returns:
+            List[Dict[str, Any]]: The records, oldest first.
+        """
+        records = []
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logging.warning(f"Ignoring incomplete journal record in {path}")
+                    break
+        return records
+
+    @staticmethod
+    def _apply(entries: List[Any], records: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Apply journal records to a list of entries.
+
+        Args:
+            entries (List[Any]): The entries before the records.
+            records (List[Dict[str, Any]]): The records to apply, oldest first.
+
+        Returns:
+            List[Any]: The entries after the records.
+        """
+        for data in records:
+            kind = data['op']
+            if kind in ('append', 'prepend', 'reset'):
+                loaded = [Calculation.from_dict(entry, verify_rate=0.0) for entry in data['entries']]
+                if kind == 'append':
+                    entries.extend(loaded)
+                elif kind == 'prepend':
+                    entries[:0] = loaded
+                else:
+                    entries = loaded
+            elif kind == 'evict':
+                del entries[:data['count']]
+            elif kind == 'truncate':
+                del entries[len(entries) - data['count']:]
+            elif kind == 'clear':
+                entries = []
+        return entries
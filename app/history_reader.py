@@ -0,0 +1,276 @@
+########################
+# History Reader        #
+########################
+
+import datetime
+import mmap
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from app.exceptions import OperationError
+from app.history_format import STRING_COLUMNS, BinaryLayout, decode_entries, read_binary_layout, split_strings
+
+
+class HistoryReader:
+    """
+    Random access to a binary history file through a memory map.
+
+    The file is mapped rather than read, so opening a history far larger than
+    the in-memory history costs nothing until entries are accessed, and only the
+    pages holding the accessed entries are ever read. Entries are decoded on
+    demand: indexing returns one entry, and slicing returns a window, another
+    reader over a range of the same mapping. The reader and its windows can be
+    closed in any order; the mapping is released when the last of them is closed.
+
+    The timestamp, operation code and float64 operand and result columns are
+    exposed as read-only NumPy views of the mapping, without copying. Time
+    ranges are located by binary search on the timestamps, which are in
+    ascending order in any history the calculator writes.
+    """
+
+    CHUNK_SIZE = 1024  # Entries decoded at a time while iterating
+
+    def __init__(self, path: Union[str, Path], verify_rate: float = 0.0):
+        """
+        Open a binary history file.
+
+        Args:
+            path (Union[str, Path]): The binary history file.
+            verify_rate (float, optional): Fraction of decoded results to verify by
+                recomputation. Defaults to 0.0.
+
+        Raises:
+            OperationError: If the file cannot be mapped or is not a binary history file.
+        """
+        self.path = Path(path)
+        self.verify_rate = verify_rate
+        # Open readers sharing the mapping: a one-item counter shared by all of them
+        self._references = [1]
+        try:
+            with open(self.path, 'rb') as file:
+                self._mmap: Optional[mmap.mmap] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise OperationError(f"Cannot open history file: {e}")
+        try:
+            self._layout: BinaryLayout = read_binary_layout(self._mmap)
+        except OperationError:
+            self.close()
+            raise
+        self._start = 0
+        self._stop = len(self._layout.codes)
+
+    def _window(self, start: int, stop: int) -> 'HistoryReader':
+        """
+        Create a reader over a range of this reader's entries.
+
+        Args:
+            start (int): Position of the first entry, relative to this reader.
+            stop (int): Position after the last entry, relative to this reader.
+
+        Returns:
+            HistoryReader: A reader sharing this reader's mapping, to be closed
+                separately.
+        """
+        window = HistoryReader.__new__(HistoryReader)
+        window.path = self.path
+        window.verify_rate = self.verify_rate
+        window._references = self._references
+        if self._mmap is not None:
+            self._references[0] += 1
+        window._mmap = self._mmap
+        window._layout = self._layout
+        window._start = self._start + start
+        window._stop = self._start + max(stop, start)
+        return window
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries in the reader.
+
+        Returns:
+            int: Number of entries.
+        """
+        return self._stop - self._start
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        """
+        Get an entry by position, oldest first, or a window of entries by slice.
+
+        Args:
+            index (Union[int, slice]): Position or slice of positions.
+
+        Returns:
+            Any: The decoded entry, or a HistoryReader over the slice.
+
+        Raises:
+            IndexError: If the position is out of range.
+            ValueError: If the slice has a step other than 1.
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("history windows do not support steps")
+            return self._window(start, stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        position = self._start + index
+        return decode_entries(self._layout, position, position + 1, self.verify_rate)[0]
+
+    def __iter__(self) -> Iterator[Any]:
+        """
+        Iterate over the entries, oldest first, decoding them in chunks.
+
+        Returns:
+            Iterator[Any]: Iterator over the decoded entries.
+        """
+        for start in range(self._start, self._stop, self.CHUNK_SIZE):
+            stop = min(start + self.CHUNK_SIZE, self._stop)
+            yield from decode_entries(self._layout, start, stop, self.verify_rate)
+
+    def __enter__(self) -> 'HistoryReader':
+        """
+        Enter a context that closes the reader on exit.
+
+        Returns:
+            HistoryReader: This reader.
+        """
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """
+        Close the reader.
+        """
+        self.close()
+
+    def entries(self) -> List[Any]:
+        """
+        Decode every entry of the reader.
+
+        Returns:
+            List[Any]: The Calculation and BatchCalculation entries, oldest first.
+        """
+        return decode_entries(self._layout, self._start, self._stop, self.verify_rate)
+
+    @property
+    def operation_names(self) -> List[str]:
+        """
+        Get the operation names, indexed by operation code.
+
+        Returns:
+            List[str]: The operation names.
+        """
+        return list(self._layout.names)
+
+    @property
+    def operation_codes(self) -> np.ndarray:
+        """
+        Get the operation code of every entry, without copying.
+
+        Returns:
+            np.ndarray: uint16 indexes into operation_names.
+        """
+        return self._layout.codes[self._start:self._stop]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """
+        Get the timestamp of every entry, without copying.
+
+        Returns:
+            np.ndarray: The timestamps as datetime64[us].
+        """
+        return self._layout.timestamps[self._start:self._stop].view('datetime64[us]')
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get a numeric column as float64 values, without copying.
+
+        The values approximate the exact Decimal values; batch entries hold NaN.
+
+        Args:
+            name (str): 'operand1', 'operand2' or 'result'.
+
+        Returns:
+            np.ndarray: The float64 values of every entry.
+
+        Raises:
+            OperationError: If the column is unknown.
+        """
+        if name not in STRING_COLUMNS:
+            raise OperationError(f"Unknown history column: {name}")
+        return self._layout.numbers[STRING_COLUMNS.index(name)][self._start:self._stop]
+
+    def search(self, timestamp: datetime.datetime, side: str = 'left') -> int:
+        """
+        Find where a timestamp falls among the entries by binary search.
+
+        Args:
+            timestamp (datetime.datetime): The timestamp to look for.
+            side (str, optional): 'left' for the first entry at or after the
+                timestamp, 'right' for the first entry after it. Defaults to 'left'.
+
+        Returns:
+            int: Position of that entry, or the number of entries if there is none.
+        """
+        return int(np.searchsorted(self.timestamps, np.datetime64(timestamp, 'us'), side=side))
+
+    def between(
+        self,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None
+    ) -> 'HistoryReader':
+        """
+        Get the window of entries in a time range.
+
+        Args:
+            start (Optional[datetime.datetime], optional): Earliest timestamp included.
+                Defaults to the first entry.
+            end (Optional[datetime.datetime], optional): Timestamp before which entries
+                are included. Defaults to the last entry.
+
+        Returns:
+            HistoryReader: A reader over the entries in the range.
+        """
+        low = self.search(start) if start is not None else 0
+        high = self.search(end) if end is not None else len(self)
+        return self._window(low, high)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Get the entries as a pandas DataFrame, without building Calculation objects.
+
+        Returns:
+            pd.DataFrame: The operation, operand1, operand2, result and timestamp of
+                every entry, with values as exact strings.
+        """
+        columns = {'operation': np.array(self._layout.names, dtype=object)[self.operation_codes]}
+        for name, (offsets, data) in zip(STRING_COLUMNS, self._layout.strings):
+            columns[name] = split_strings(offsets[self._start:self._stop + 1], data)
+        columns['timestamp'] = self.timestamps.astype('datetime64[ns]')
+        return pd.DataFrame(columns)
+
+    def close(self) -> None:
+        """
+        Close the reader, releasing the memory map once no other reader shares it.
+
+        Column views returned earlier keep the mapping alive until they are
+        released themselves.
+        """
+        if self._mmap is None:
+            return
+        mapping, self._mmap = self._mmap, None
+        self._layout = None
+        self._references[0] -= 1
+        if self._references[0]:
+            # Other windows of the same file still read the mapping
+            return
+        try:
+            mapping.close()
+        except BufferError:
+            # Views of the mapping are still in use; it is unmapped once they are gone
+            pass
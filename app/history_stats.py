@@ -0,0 +1,298 @@
+########################
+# History Statistics    #
+########################
+
+from collections import deque
+from dataclasses import dataclass, field
+import math
+from typing import Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with bounded relative error.
+
+    Values are counted in logarithmically sized buckets, one set for positive
+    values and one for negative values, plus a count of zeros: a value x > 0
+    falls in bucket ceil(log(x) / log(gamma)), where gamma = (1 + a) / (1 - a)
+    for the relative accuracy a. Every quantile is then returned within a
+    relative error of a of the exact quantile, using memory that grows only with
+    the logarithm of the range of values, not with their number.
+
+    Because a sketch is just bucket counts, two sketches merge by adding their
+    counts, and a value is removed again by decrementing its bucket, which is
+    how undone calculations leave the distribution.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            relative_accuracy (float, optional): Relative error bound of the
+                quantiles, between 0 and 1. Defaults to 0.01.
+
+        Raises:
+            ValueError: If the relative accuracy is not between 0 and 1.
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._positive: Dict[int, int] = {}
+        self._negative: Dict[int, int] = {}
+        self._zeros = 0
+        self.count = 0
+
+    def add(self, values: np.ndarray, weight: int = 1) -> None:
+        """
+        Count values in the sketch, or remove them with a negative weight.
+
+        Args:
+            values (np.ndarray): Finite float values.
+            weight (int, optional): 1 to add the values, -1 to remove values added
+                earlier. Defaults to 1.
+        """
+        values = np.asarray(values, dtype=float)
+        zeros = int(np.count_nonzero(values == 0))
+        self._zeros += weight * zeros
+        for store, part in ((self._positive, values[values > 0]), (self._negative, -values[values < 0])):
+            if not part.size:
+                continue
+            buckets, counts = np.unique(np.ceil(np.log(part) / self._log_gamma), return_counts=True)
+            for bucket, count in zip(buckets.astype(int).tolist(), counts.tolist()):
+                remaining = store.get(bucket, 0) + weight * count
+                if remaining > 0:
+                    store[bucket] = remaining
+                else:
+                    store.pop(bucket, None)
+        self.count += weight * len(values)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """
+        Add the counts of another sketch with the same relative accuracy.
+
+        Args:
+            other (QuantileSketch): The sketch to merge into this one.
+
+        Raises:
+            ValueError: If the sketches have different relative accuracies.
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracies")
+        for store, other_store in ((self._positive, other._positive), (self._negative, other._negative)):
+            for bucket, count in other_store.items():
+                store[bucket] = store.get(bucket, 0) + count
+        self._zeros += other._zeros
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile of the counted values.
+
+        Args:
+            q (float): The quantile, between 0 and 1 (e.g., 0.5 for the median).
+
+        Returns:
+            Optional[float]: The estimate, or None if the sketch is empty.
+
+        Raises:
+            ValueError: If q is not between 0 and 1.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # Walk the buckets from the most negative value to the most positive
+        for bucket in sorted(self._negative, reverse=True):
+            seen += self._negative[bucket]
+            if seen > rank:
+                return -self._value(bucket)
+        seen += self._zeros
+        if seen > rank:
+            return 0.0
+        for bucket in sorted(self._positive):
+            seen += self._positive[bucket]
+            if seen > rank:
+                return self._value(bucket)
+        return self._value(max(self._positive))  # pragma: no cover
+
+    def _value(self, bucket: int) -> float:
+        """
+        Get the value representing a bucket.
+
+        Args:
+            bucket (int): The bucket index.
+
+        Returns:
+            float: The value with the same relative error to both bucket bounds.
+        """
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+
+@dataclass
+class OperationStats:
+    """
+    Running aggregates of the results of one operation.
+
+    Count, mean and the sum of squared deviations are maintained with Welford's
+    method, generalized to batches by Chan's pairwise update, so adding or
+    removing any number of values costs O(1) arithmetic. Min and max are exact:
+    removals only ever undo the newest additions, so the extremes replaced by
+    each value that set a new min or max are kept on a stack and restored when
+    that value is removed. A quantile sketch estimates percentiles.
+
+    The stack only covers values still in the history: when the oldest values
+    are evicted, their entries are dropped, so it never holds more entries than
+    the history holds values. Undoing so far back that restored calculations are
+    removed again leaves min and max as estimates from the sketch.
+    """
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0  # Sum of squared deviations from the mean
+    min: Optional[float] = None
+    max: Optional[float] = None
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+    # (count before a value, extremes before it), for each value that changed the extremes
+    _extremes: Deque[Tuple[int, Optional[float], Optional[float]]] = field(default_factory=deque, repr=False)
+    # Number of oldest values evicted from the history, whose stack entries are dropped
+    _evicted: int = field(default=0, repr=False)
+    # Count below which stack entries may have been dropped
+    _floor: int = field(default=0, repr=False)
+
+    @property
+    def sum(self) -> float:
+        """
+        Get the sum of the results.
+
+        Returns:
+            float: The sum.
+        """
+        return self.mean * self.count
+
+    @property
+    def variance(self) -> float:
+        """
+        Get the population variance of the results.
+
+        Returns:
+            float: The variance, 0.0 with fewer than two results.
+        """
+        return self.m2 / self.count if self.count > 1 else 0.0
+
+    def add(self, values: np.ndarray) -> None:
+        """
+        Add results.
+
+        Args:
+            values (np.ndarray): Finite float results.
+        """
+        values = np.asarray(values, dtype=float)
+        if not values.size:
+            return
+        # Running extremes before each value; record the values that change them
+        lows = np.minimum.accumulate(np.concatenate(([math.inf if self.min is None else self.min], values)))
+        highs = np.maximum.accumulate(np.concatenate(([-math.inf if self.max is None else self.max], values)))
+        for i in np.flatnonzero((lows[1:] != lows[:-1]) | (highs[1:] != highs[:-1])).tolist():
+            self._extremes.append((
+                self.count + i,
+                None if math.isinf(lows[i]) else float(lows[i]),
+                None if math.isinf(highs[i]) else float(highs[i])
+            ))
+        self.min, self.max = float(lows[-1]), float(highs[-1])
+        self._combine(len(values), float(values.mean()), float(values.var() * len(values)), 1)
+        self.sketch.add(values)
+
+    def remove(self, values: np.ndarray) -> None:
+        """
+        Remove the newest results added, after their calculations were undone.
+
+        Args:
+            values (np.ndarray): The finite float results to remove.
+        """
+        values = np.asarray(values, dtype=float)
+        if not values.size:
+            return
+        self._combine(len(values), float(values.mean()), float(values.var() * len(values)), -1)
+        self.sketch.add(values, weight=-1)
+        self._evicted = min(self._evicted, self.count)
+        while self._extremes and self._extremes[-1][0] >= self.count:
+            _, self.min, self.max = self._extremes.pop()
+        if self.count < self._floor:
+            # The extremes before the removed values were dropped with evicted values
+            self.min, self.max = self.sketch.quantile(0), self.sketch.quantile(1)
+            self._floor = self.count
+
+    def evict(self, count: int) -> None:
+        """
+        Record that the oldest results left the history, dropping their stack entries.
+
+        Args:
+            count (int): Number of results evicted.
+        """
+        self._evicted = min(self._evicted + count, self.count)
+        while self._extremes and self._extremes[0][0] < self._evicted:
+            self._extremes.popleft()
+        self._floor = max(self._floor, self._evicted)
+
+    def restore(self, count: int) -> None:
+        """
+        Record that evicted results were restored to the history by undo.
+
+        Args:
+            count (int): Number of results restored.
+        """
+        self._evicted = max(self._evicted - count, 0)
+
+    def _combine(self, count: int, mean: float, m2: float, sign: int) -> None:
+        """
+        Add or subtract the moments of a group of values.
+
+        Args:
+            count (int): Number of values in the group.
+            mean (float): Mean of the group.
+            m2 (float): Sum of squared deviations from the group mean.
+            sign (int): 1 to add the group, -1 to remove it.
+        """
+        if sign > 0:
+            total = self.count + count
+            delta = mean - self.mean
+            self.mean += delta * count / total
+            self.m2 += m2 + delta * delta * self.count * count / total
+            self.count = total
+            return
+        remaining = self.count - count
+        if remaining <= 0:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        rest_mean = (self.mean * self.count - mean * count) / remaining
+        delta = mean - rest_mean
+        self.m2 = max(self.m2 - m2 - delta * delta * remaining * count / self.count, 0.0)
+        self.mean = rest_mean
+        self.count = remaining
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """
+        Get the aggregates as a dictionary.
+
+        Returns:
+            Dict[str, Optional[float]]: count, sum, min, max, mean, variance and
+                the p50, p90 and p99 percentile estimates.
+        """
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean if self.count else None,
+            'variance': self.variance,
+            'p50': self.sketch.quantile(0.5),
+            'p90': self.sketch.quantile(0.9),
+            'p99': self.sketch.quantile(0.99),
+        }
@@ -0,0 +1,510 @@
+########################
+# History Storage       #
+########################
+
+from abc import ABC, abstractmethod
+import datetime
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.exceptions import OperationError
+from app.history_format import (
+    EPOCH, build_entries, read_binary_history, read_csv_history, write_binary_history
+)
+
+
+def write_history_file(path: Path, entries: List[Any], file_format: str) -> None:
+    """
+    Write history entries to a CSV or binary history file.
+
+    The entries are written to a temporary file that then atomically replaces
+    the history file, so an interrupted write never truncates it.
+
+    Args:
+        path (Path): The file to write.
+        entries (List[Any]): The entries to write, oldest first.
+        file_format (str): 'csv' or 'binary'.
+    """
+    # Ensure the history directory exists
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = path.with_name(path.name + '.tmp')
+
+    if file_format == 'binary':
+        # Write the entries as contiguous columns
+        with open(temp_file, 'wb') as file:
+            write_binary_history(file, entries)
+        os.replace(temp_file, path)
+        return
+
+    # Serialize each Calculation instance to a dictionary
+    history_data = [calc.to_dict() for calc in entries]
+
+    if history_data:
+        # Create a pandas DataFrame from the history data
+        df = pd.DataFrame(history_data)
+    else:
+        # If history is empty, create an empty CSV with headers
+        df = pd.DataFrame(columns=['operation', 'operand1', 'operand2', 'result', 'timestamp'])
+
+    # Write the DataFrame to a temporary CSV file without the index, then swap it in
+    with open(temp_file, 'w', newline='') as file:
+        df.to_csv(file, index=False)
+    os.replace(temp_file, path)
+
+
+def read_history_file(
+    path: Path,
+    file_format: str,
+    limit: Optional[int] = None,
+    verify_rate: float = 0.0
+) -> List[Any]:
+    """
+    Read history entries from a CSV or binary history file.
+
+    Args:
+        path (Path): The file to read.
+        file_format (str): 'csv' or 'binary'.
+        limit (Optional[int], optional): Number of newest entries to read. Defaults
+            to all entries.
+        verify_rate (float, optional): Fraction of loaded results to verify by
+            recomputation. Defaults to 0.0.
+
+    Returns:
+        List[Any]: The entries, oldest first.
+    """
+    if file_format == 'binary':
+        return read_binary_history(Path(path).read_bytes(), limit=limit, verify_rate=verify_rate)
+    # Stream the newest rows of the CSV file, keeping values as exact strings
+    return read_csv_history(path, limit=limit, verify_rate=verify_rate)
+
+
+class HistoryStorage(ABC):
+    """
+    Abstract base class for history storage backends.
+
+    A backend persists the calculation history. Every backend can save a full
+    snapshot and load it back; incremental backends also apply each change to
+    the history as it happens (through record), so saving after a calculation
+    only needs to commit the recorded changes.
+    """
+
+    # Whether record persists changes, so a commit is enough to save them
+    incremental = False
+
+    # Whether query can filter the stored history by operation and timestamp
+    queryable = False
+
+    @abstractmethod
+    def exists(self) -> bool:
+        """
+        Check whether a saved history exists.
+
+        Returns:
+            bool: True if there is a history to load.
+        """
+        pass  # pragma: no cover
+
+    @abstractmethod
+    def load(self, limit: Optional[int] = None) -> List[Any]:
+        """
+        Load the saved history.
+
+        Args:
+            limit (Optional[int], optional): Number of newest entries to load.
+                Defaults to all entries.
+
+        Returns:
+            List[Any]: The entries, oldest first.
+        """
+        pass  # pragma: no cover
+
+    @abstractmethod
+    def save(self, entries: List[Any]) -> None:
+        """
+        Replace the saved history with a full snapshot.
+
+        Args:
+            entries (List[Any]): The entries to save, oldest first.
+        """
+        pass  # pragma: no cover
+
+    def record(self, kind: str, entries: List[Any] = ()) -> None:
+        """
+        Apply one change to the history, for incremental backends.
+
+        Args:
+            kind (str): The kind of change: 'append', 'prepend', 'evict',
+                'truncate', 'clear' or 'reset'.
+            entries (List[Any], optional): The entries the change added or removed,
+                oldest first. Defaults to none.
+        """
+
+    def commit(self) -> None:
+        """
+        Make the recorded changes durable, for incremental backends.
+        """
+
+    def discard(self) -> None:
+        """
+        Drop the recorded changes that were not committed, for incremental backends.
+        """
+
+    def trim(self, count: int) -> None:
+        """
+        Drop all but the newest entries, for incremental backends.
+
+        Args:
+            count (int): Number of newest entries to keep.
+        """
+
+    def close(self) -> None:
+        """
+        Release the resources held by the backend.
+        """
+
+    @property
+    @abstractmethod
+    def location(self) -> Path:
+        """
+        Get where the history is stored, for messages.
+
+        Returns:
+            Path: The history file or database path.
+        """
+        pass  # pragma: no cover
+
+
+class FileHistoryStorage(HistoryStorage):
+    """
+    History storage in the configured CSV or binary history file.
+
+    Every save rewrites the whole file. The file path and format are read from
+    the configuration on every access, so they follow configuration changes.
+    """
+
+    def __init__(self, config: Any):
+        """
+        Initialize the storage.
+
+        Args:
+            config (Any): The calculator configuration, providing history_file,
+                history_file_format and verify_rate.
+        """
+        self.config = config
+
+    @property
+    def location(self) -> Path:
+        """
+        Get the history file path.
+
+        Returns:
+            Path: The history file path.
+        """
+        return self.config.history_file
+
+    def exists(self) -> bool:
+        """
+        Check whether the history file exists.
+
+        Returns:
+            bool: True if the history file exists.
+        """
+        return self.config.history_file.exists()
+
+    def load(self, limit: Optional[int] = None) -> List[Any]:
+        """
+        Load the history file.
+
+        Args:
+            limit (Optional[int], optional): Number of newest entries to load.
+                Defaults to all entries.
+
+        Returns:
+            List[Any]: The entries, oldest first.
+        """
+        return read_history_file(
+            self.config.history_file, self.config.history_file_format, limit, self.config.verify_rate
+        )
+
+    def save(self, entries: List[Any]) -> None:
+        """
+        Rewrite the history file.
+
+        Args:
+            entries (List[Any]): The entries to save, oldest first.
+        """
+        write_history_file(self.config.history_file, entries, self.config.history_file_format)
+
+
+class SQLiteHistoryStorage(HistoryStorage):
+    """
+    History storage in a local SQLite database.
+
+    The database mirrors the history one row per entry, in insertion order. Each
+    change to the history is applied as row inserts and deletes inside the open
+    transaction, so auto-saving a calculation costs one row insert and a commit
+    instead of a full file rewrite. The database uses write-ahead logging, and
+    keeps indexes on the operation and timestamp columns so history queries can
+    be answered by the database.
+
+    Timestamps are stored as integer microseconds since 1970-01-01 (naive local
+    time), and values as exact strings.
+    """
+
+    incremental = True
+    queryable = True
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS history ("
+        "id INTEGER PRIMARY KEY, "
+        "operation TEXT NOT NULL, "
+        "operand1 TEXT NOT NULL, "
+        "operand2 TEXT NOT NULL, "
+        "result TEXT NOT NULL, "
+        "timestamp INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS history_operation ON history (operation)",
+        "CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp)",
+    )
+
+    def __init__(self, path: Path, verify_rate: float = 0.0):
+        """
+        Open or create the database.
+
+        Args:
+            path (Path): Path of the database file.
+            verify_rate (float, optional): Fraction of loaded results to verify by
+                recomputation. Defaults to 0.0.
+
+        Raises:
+            OperationError: If the database cannot be opened.
+        """
+        self.path = Path(path)
+        self.verify_rate = verify_rate
+        self._lock = threading.RLock()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.SCHEMA:
+                self._connection.execute(statement)
+            self._connection.commit()
+        except sqlite3.Error as e:
+            raise OperationError(f"Cannot open history database: {e}")
+
+    @property
+    def location(self) -> Path:
+        """
+        Get the database file path.
+
+        Returns:
+            Path: The database file path.
+        """
+        return self.path
+
+    def exists(self) -> bool:
+        """
+        Check whether the database holds any history.
+
+        Returns:
+            bool: True if the history table has rows.
+        """
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM history LIMIT 1").fetchone() is not None
+
+    def load(self, limit: Optional[int] = None) -> List[Any]:
+        """
+        Load the history from the database.
+
+        Args:
+            limit (Optional[int], optional): Number of newest entries to load.
+                Defaults to all entries.
+
+        Returns:
+            List[Any]: The entries, oldest first.
+        """
+        return self.query(limit=limit)
+
+    def query(
+        self,
+        operation: Optional[str] = None,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Load the entries matching a filter, using the database indexes.
+
+        Args:
+            operation (Optional[str], optional): Operation name to match (e.g.,
+                "Addition"). Defaults to any operation.
+            start (Optional[datetime.datetime], optional): Earliest timestamp included.
+                Defaults to no lower bound.
+            end (Optional[datetime.datetime], optional): Timestamp before which entries
+                are included. Defaults to no upper bound.
+            limit (Optional[int], optional): Number of newest matching entries to
+                load. Defaults to all matching entries.
+
+        Returns:
+            List[Any]: The matching entries, oldest first.
+        """
+        conditions, parameters = [], []
+        if operation is not None:
+            conditions.append("operation = ?")
+            parameters.append(operation)
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            parameters.append(self._micros(start))
+        if end is not None:
+            conditions.append("timestamp < ?")
+            parameters.append(self._micros(end))
+        sql = "SELECT operation, operand1, operand2, result, timestamp FROM history"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+        rows.reverse()
+        if not rows:
+            return []
+        operations, operand1, operand2, result, timestamps = (list(column) for column in zip(*rows))
+        times = (np.array(timestamps, dtype='i8').astype('datetime64[us]')).astype(object).tolist()
+        return build_entries(operations, times, operand1, operand2, result, verify_rate=self.verify_rate)
+
+    def save(self, entries: List[Any]) -> None:
+        """
+        Replace the history in the database and commit.
+
+        Args:
+            entries (List[Any]): The entries to save, oldest first.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM history")
+            self._insert(entries)
+            self._connection.commit()
+
+    def record(self, kind: str, entries: List[Any] = ()) -> None:
+        """
+        Apply one change to the history rows, inside the open transaction.
+
+        Args:
+            kind (str): The kind of change: 'append', 'prepend', 'evict',
+                'truncate', 'clear' or 'reset'.
+            entries (List[Any], optional): The entries the change added or removed,
+                oldest first. Defaults to none.
+        """
+        with self._lock:
+            connection = self._connection
+            if kind == 'append':
+                self._insert(entries)
+            elif kind == 'prepend':
+                first = connection.execute("SELECT MIN(id) FROM history").fetchone()[0]
+                self._insert(entries, first_id=(first if first is not None else 1) - len(entries))
+            elif kind == 'evict':
+                connection.execute(
+                    "DELETE FROM history WHERE id IN (SELECT id FROM history ORDER BY id LIMIT ?)",
+                    (len(entries),)
+                )
+            elif kind == 'truncate':
+                connection.execute(
+                    "DELETE FROM history WHERE id IN (SELECT id FROM history ORDER BY id DESC LIMIT ?)",
+                    (len(entries),)
+                )
+            elif kind in ('clear', 'reset'):
+                connection.execute("DELETE FROM history")
+                if kind == 'reset':
+                    self._insert(entries)
+
+    def commit(self) -> None:
+        """
+        Commit the recorded changes.
+        """
+        with self._lock:
+            self._connection.commit()
+
+    def discard(self) -> None:
+        """
+        Roll back the recorded changes that were not committed.
+        """
+        with self._lock:
+            self._connection.rollback()
+
+    def trim(self, count: int) -> None:
+        """
+        Delete all but the newest rows and commit.
+
+        Args:
+            count (int): Number of newest rows to keep.
+        """
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM history WHERE id NOT IN (SELECT id FROM history ORDER BY id DESC LIMIT ?)",
+                (count,)
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        """
+        Commit the recorded changes and close the database.
+        """
+        with self._lock:
+            try:
+                self._connection.commit()
+                self._connection.close()
+            except sqlite3.Error as e:  # pragma: no cover
+                logging.warning(f"Could not close history database: {e}")
+
+    def _insert(self, entries: List[Any], first_id: Optional[int] = None) -> None:
+        """
+        Insert entries as rows.
+
+        Args:
+            entries (List[Any]): The entries to insert, oldest first.
+            first_id (Optional[int], optional): Row id of the first entry. Defaults
+                to after the last row.
+        """
+        if not entries:
+            return
+        rows = [
+            (data['operation'], data['operand1'], data['operand2'], data['result'])
+            for data in (entry.to_dict() for entry in entries)
+        ]
+        timestamps = np.array([entry.timestamp for entry in entries], dtype='datetime64[us]')
+        micros = (timestamps - EPOCH).astype('i8').tolist()
+        if first_id is None:
+            self._connection.executemany(
+                "INSERT INTO history (operation, operand1, operand2, result, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [row + (micro,) for row, micro in zip(rows, micros)]
+            )
+        else:
+            self._connection.executemany(
+                "INSERT INTO history (id, operation, operand1, operand2, result, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(first_id + i,) + row + (micro,) for i, (row, micro) in enumerate(zip(rows, micros))]
+            )
+
+    @staticmethod
+    def _micros(timestamp: datetime.datetime) -> int:
+        """
+        Convert a timestamp to stored microseconds.
+
+        Args:
+            timestamp (datetime.datetime): The timestamp.
+
+        Returns:
+            int: Microseconds since 1970-01-01.
+        """
+        return int((np.datetime64(timestamp, 'us') - EPOCH).astype('i8'))
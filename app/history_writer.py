@@ -0,0 +1,322 @@
+########################
+# History Writer        #
+########################
+
+import atexit
+from collections import deque
+import logging
+import threading
+import time
+from typing import Callable, Deque, Optional, Tuple
+import weakref
+
+
+class BackgroundHistoryWriter:
+    """
+    Background thread that saves the history on behalf of auto-save.
+
+    Change notifications only bump a counter, so the calculating thread never
+    waits for disk I/O. The writer thread coalesces bursts of notifications into
+    one save, made once flush_every changes are pending or the oldest pending
+    change is flush_interval seconds old, whichever comes first.
+
+    The policy adapts to the measured cost of a save: after each save the writer
+    waits at least cost_factor times as long as the save took before saving again,
+    so slow saves of large histories are batched more aggressively and never take
+    more than a fixed share of the time.
+
+    Pending changes are flushed when the writer is closed, which also happens at
+    interpreter shutdown for writers still alive. Neither the shutdown hook nor the
+    writer thread keeps a writer alive, so an unclosed writer and the calculator
+    behind its save callable can still be garbage collected; their thread then stops
+    without saving.
+    """
+
+    def __init__(
+        self,
+        save: Callable[[], None],
+        flush_every: int = 100,
+        flush_interval: float = 0.5,
+        cost_factor: float = 4.0
+    ):
+        """
+        Initialize and start the writer.
+
+        Args:
+            save (Callable[[], None]): Saves the current history.
+            flush_every (int, optional): Pending changes that trigger a save. Defaults to 100.
+            flush_interval (float, optional): Seconds a change may stay pending. Defaults to 0.5.
+            cost_factor (float, optional): Minimum pause between saves, as a multiple of
+                the last save's duration. Defaults to 4.0.
+        """
+        self._save = save
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.cost_factor = cost_factor
+        self.last_save_cost = 0.0
+        self.saves = 0
+
+        self._condition = threading.Condition()
+        self._generation = 0          # Changes notified so far
+        self._saved_generation = 0    # Changes covered by the last completed save
+        self._oldest_pending: Optional[float] = None
+        # (generation, time) of each notification not yet covered by a save, oldest first
+        self._notified: Deque[Tuple[int, float]] = deque()
+        self._next_save_allowed = 0.0
+        self._flush_target = 0        # Generation a caller of flush is waiting for
+        self._error: Optional[Exception] = None
+        self._closed = False
+
+        # The thread holds the writer only through a weak reference, and is woken
+        # to stop when the writer is collected
+        weakref.finalize(self, _wake, self._condition)
+        self._thread = threading.Thread(
+            target=self._run, args=(weakref.ref(self),), name="history-writer", daemon=True
+        )
+        self._thread.start()
+        _live_writers.add(self)
+
+    @property
+    def generation(self) -> int:
+        """
+        Get the number of changes notified so far.
+
+        Returns:
+            int: The current generation.
+        """
+        with self._condition:
+            return self._generation
+
+    @property
+    def pending(self) -> int:
+        """
+        Get the number of changes not yet saved (the queue depth).
+
+        Returns:
+            int: Number of pending changes.
+        """
+        with self._condition:
+            return self._generation - self._saved_generation
+
+    @property
+    def staleness(self) -> float:
+        """
+        Get how long the oldest unsaved change has been waiting.
+
+        Returns:
+            float: Seconds since the oldest pending change, 0.0 if nothing is pending.
+        """
+        with self._condition:
+            if self._oldest_pending is None:
+                return 0.0
+            return time.monotonic() - self._oldest_pending
+
+    def notify(self, count: int = 1) -> None:
+        """
+        Record changes to the history that need saving.
+
+        Args:
+            count (int, optional): Number of changes. Defaults to 1.
+        """
+        with self._condition:
+            self._generation += count
+            now = time.monotonic()
+            self._notified.append((self._generation, now))
+            if self._oldest_pending is None:
+                # Wake the writer so it starts timing the flush interval
+                self._oldest_pending = now
+                self._condition.notify()
+            elif self._generation - self._saved_generation >= self.flush_every:
+                self._condition.notify()
+
+    def mark_saved(self, generation: int) -> None:
+        """
+        Record that a save made elsewhere covered the changes up to a generation.
+
+        Args:
+            generation (int): The generation read before the save took its snapshot.
+        """
+        with self._condition:
+            self._advance_saved(generation)
+            self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every change notified so far has been saved.
+
+        Args:
+            timeout (Optional[float], optional): Maximum seconds to wait. Defaults to no limit.
+
+        Returns:
+            bool: True if all changes were saved.
+
+        Raises:
+            Exception: The error of the last failed save, if saving failed.
+        """
+        with self._condition:
+            target = self._generation
+            self._flush_target = max(self._flush_target, target)
+            self._condition.notify_all()
+            saved = self._condition.wait_for(
+                lambda: self._saved_generation >= target or self._error is not None
+                or not self._thread.is_alive(),
+                timeout
+            )
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+            return saved and self._saved_generation >= target
+
+    def close(self) -> None:
+        """
+        Flush pending changes and stop the writer thread.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        _live_writers.discard(self)
+
+    def _advance_saved(self, generation: int) -> None:
+        """
+        Record that the changes up to a generation are saved.
+
+        The oldest pending change becomes the first one notified after the
+        saved generation, so a save that missed later changes does not leave
+        them timed from the changes it covered. Called with the condition held.
+
+        Args:
+            generation (int): The generation the save covered.
+        """
+        if generation > self._saved_generation:
+            self._saved_generation = generation
+        while self._notified and self._notified[0][0] <= self._saved_generation:
+            self._notified.popleft()
+        self._oldest_pending = self._notified[0][1] if self._notified else None
+
+    def _due(self, now: float) -> bool:
+        """
+        Decide whether the pending changes should be saved now.
+
+        Args:
+            now (float): The current monotonic time.
+
+        Returns:
+            bool: True if a save is due.
+        """
+        pending = self._generation - self._saved_generation
+        if not pending:
+            return False
+        if self._closed or self._flush_target > self._saved_generation:
+            return True
+        if now < self._next_save_allowed:
+            return False
+        return pending >= self.flush_every or now - self._oldest_pending >= self.flush_interval
+
+    def _timeout(self, now: float) -> Optional[float]:
+        """
+        Compute how long the writer thread can sleep.
+
+        Args:
+            now (float): The current monotonic time.
+
+        Returns:
+            Optional[float]: Seconds until a save may become due, None to sleep until notified.
+        """
+        if self._oldest_pending is None or self._generation == self._saved_generation:
+            return None
+        due = max(self._oldest_pending + self.flush_interval, self._next_save_allowed)
+        return max(due - now, 0.0)
+
+    @staticmethod
+    def _run(reference: 'weakref.ref[BackgroundHistoryWriter]') -> None:
+        """
+        Save coalesced changes until the writer is closed or garbage collected.
+
+        The writer is dropped before every wait, so the sleeping thread does not
+        keep it alive.
+
+        Args:
+            reference (weakref.ref[BackgroundHistoryWriter]): The writer.
+        """
+        while True:
+            writer = reference()
+            if writer is None:
+                return
+            condition = writer._condition
+            with condition:
+                if not writer._due(time.monotonic()):
+                    if writer._closed:
+                        return
+                    timeout = writer._timeout(time.monotonic())
+                    writer = None
+                    # A writer collected on this thread could not wake it
+                    if reference() is None:
+                        return
+                    condition.wait(timeout)
+                    continue
+                generation = writer._generation
+            if not writer._save_pending(generation):
+                return
+            writer = None
+
+    def _save_pending(self, generation: int) -> bool:
+        """
+        Save the history and record the outcome.
+
+        Args:
+            generation (int): The generation read before the save.
+
+        Returns:
+            bool: False if the save failed after the writer was closed.
+        """
+        started = time.monotonic()
+        try:
+            self._save()
+            error = None
+        except Exception as e:
+            logging.error(f"Background history save failed: {e}")
+            error = e
+        finished = time.monotonic()
+
+        with self._condition:
+            self.last_save_cost = finished - started
+            self._next_save_allowed = finished + self.last_save_cost * self.cost_factor
+            if error is None:
+                self.saves += 1
+                self._advance_saved(generation)
+            else:
+                # Report the error to waiting callers and retry after the flush interval
+                self._error = error
+                self._flush_target = self._saved_generation
+                self._next_save_allowed = finished + self.flush_interval
+                if self._closed:
+                    return False
+            self._condition.notify_all()
+        return True
+
+
+# Writers not yet closed, flushed at interpreter shutdown
+_live_writers: 'weakref.WeakSet[BackgroundHistoryWriter]' = weakref.WeakSet()
+
+
+def _wake(condition: threading.Condition) -> None:
+    """
+    Wake the thread of a collected writer so it stops.
+
+    Args:
+        condition (threading.Condition): The writer's condition.
+    """
+    with condition:
+        condition.notify_all()
+
+
+@atexit.register
+def _close_live_writers() -> None:
+    """
+    Flush and stop every writer still open at interpreter shutdown.
+    """
+    for writer in list(_live_writers):
+        writer.close()
@@ -0,0 +1,179 @@
+########################
+# Operation Cache       #
+########################
+
+import dbm
+from collections import OrderedDict
+from decimal import Decimal, getcontext
+import logging
+from pathlib import Path
+import threading
+from typing import Dict, Optional, Tuple, Union
+
+from app.operations import Operation
+
+# Separates the fields of a key stored in the persistence file
+KEY_SEPARATOR = '\x1f'
+
+CacheKey = Tuple[str, str, str, int, str]
+
+
+class OperationCache:
+    """
+    Bounded least-recently-used cache of operation results.
+
+    Results are keyed on the operation's cache key, the exact string form of both
+    operands (the calculator normalizes operands before executing) and the
+    precision and rounding mode of the current Decimal context, so a cached
+    result is always the one execute would return. Failed executions are not
+    cached. When the cache is full, the least recently used result is evicted.
+
+    The cache can be persisted to a dbm file, so a restarted process starts with
+    the results of the previous one. Keys and results are stored as plain
+    strings.
+    """
+
+    def __init__(self, capacity: int = 1024, path: Optional[Union[str, Path]] = None):
+        """
+        Initialize the cache, loading persisted results if a file is given.
+
+        Args:
+            capacity (int, optional): Maximum number of cached results. Defaults to 1024.
+            path (Optional[Union[str, Path]], optional): The dbm file persisting the
+                cache. Defaults to no persistence.
+        """
+        self.capacity = capacity
+        self.path = Path(path) if path is not None else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[CacheKey, Decimal]' = OrderedDict()
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.load()
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        """
+        Return the number of cached results.
+
+        Returns:
+            int: Number of results.
+        """
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Get the fraction of lookups answered from the cache.
+
+        Returns:
+            float: Hits divided by lookups, 0.0 before the first lookup.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def execute(self, operation: Operation, a: Decimal, b: Decimal) -> Decimal:
+        """
+        Execute an operation, answering from the cache when possible.
+
+        Args:
+            operation (Operation): The operation to execute.
+            a (Decimal): First operand.
+            b (Decimal): Second operand.
+
+        Returns:
+            Decimal: The result of the operation.
+
+        Raises:
+            ValidationError: If the operands are invalid for the operation.
+            OperationError: If the operation fails.
+        """
+        context = getcontext()
+        key = (operation.cache_key, str(a), str(b), context.prec, context.rounding)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = operation.execute(a, b)
+        self._store(key, result)
+        return result
+
+    def clear(self) -> None:
+        """
+        Remove every cached result and reset the statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def statistics(self) -> Dict[str, float]:
+        """
+        Get the cache statistics.
+
+        Returns:
+            Dict[str, float]: The size, capacity, hits, misses, evictions and hit rate.
+        """
+        return {
+            'size': len(self._entries),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+    def load(self) -> None:
+        """
+        Load the results persisted in the cache file, if it exists.
+
+        Unreadable files and entries are skipped with a warning; the cache only
+        ever speeds calculations up.
+        """
+        try:
+            with dbm.open(str(self.path), 'r') as db:
+                for raw_key in db.keys():
+                    fields = raw_key.decode().split(KEY_SEPARATOR)
+                    key = (fields[0], fields[1], fields[2], int(fields[3]), fields[4])
+                    self._store(key, Decimal(db[raw_key].decode()))
+        except dbm.error[0]:
+            # No cache has been persisted yet
+            return
+        except Exception as e:
+            logging.warning(f"Could not load operation cache: {e}")
+
+    def save(self) -> None:
+        """
+        Persist the cached results to the cache file, replacing its contents.
+
+        Raises:
+            OSError: If the cache file cannot be written.
+        """
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            entries = list(self._entries.items())
+        with dbm.open(str(self.path), 'n') as db:
+            for key, result in entries:
+                db[KEY_SEPARATOR.join(str(field) for field in key)] = str(result)
+        logging.info(f"Operation cache saved to {self.path}")
+
+    def _store(self, key: CacheKey, result: Decimal) -> None:
+        """
+        Store a result as the most recently used, evicting the least recently used.
+
+        Args:
+            key (CacheKey): The cache key.
+            result (Decimal): The result.
+        """
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
@@ -4,8 +4,13 @@
 
 from abc import ABC, abstractmethod
 from decimal import Decimal
-from typing import Dict
-from app.exceptions import ValidationError
+from fractions import Fraction
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.decimal_math import rational_power
+from app.exceptions import CalculatorError, ValidationError
 
 
 class Operation(ABC):
@@ -51,6 +56,42 @@ class Operation(ABC):
         """
         pass
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Execute the operation over whole float64 arrays.
+
+        The base implementation falls back to the scalar execute method row by row,
+        so operations registered without a vectorized kernel still work in batches.
+        Subclasses override it with a NumPy kernel.
+
+        Args:
+            a (np.ndarray): First operands.
+            b (np.ndarray): Second operands.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and a boolean mask that is
+                True for every row that could not be calculated.
+        """
+        result = np.full(a.shape, np.nan)
+        errors = np.zeros(a.shape, dtype=bool)
+        for i, (x, y) in enumerate(zip(a.tolist(), b.tolist())):
+            try:
+                result[i] = float(self.execute(Decimal(repr(x)), Decimal(repr(y))))
+            except (CalculatorError, ArithmeticError, ValueError):
+                errors[i] = True
+        return result, errors
+
+    @property
+    def cache_key(self) -> str:
+        """
+        Get the key identifying the operation's results in result caches.
+
+        Returns:
+            str: The display name; operations whose behaviour can change at runtime
+                extend it with what determines that behaviour.
+        """
+        return str(self)
+
     def __str__(self) -> str:
         """
         Return operation name for display.
@@ -84,6 +125,19 @@ class Addition(Operation):
         self.validate_operands(a, b)
         return a + b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Add two arrays of numbers element-wise.
+
+        Args:
+            a (np.ndarray): First operands.
+            b (np.ndarray): Second operands.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and an all-False error mask.
+        """
+        return a + b, np.zeros(a.shape, dtype=bool)
+
 
 class Subtraction(Operation):
     """
@@ -106,6 +160,19 @@ class Subtraction(Operation):
         self.validate_operands(a, b)
         return a - b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Subtract two arrays of numbers element-wise.
+
+        Args:
+            a (np.ndarray): First operands.
+            b (np.ndarray): Second operands.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and an all-False error mask.
+        """
+        return a - b, np.zeros(a.shape, dtype=bool)
+
 
 class Multiplication(Operation):
     """
@@ -128,6 +195,19 @@ class Multiplication(Operation):
         self.validate_operands(a, b)
         return a * b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Multiply two arrays of numbers element-wise.
+
+        Args:
+            a (np.ndarray): First operands.
+            b (np.ndarray): Second operands.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and an all-False error mask.
+        """
+        return a * b, np.zeros(a.shape, dtype=bool)
+
 
 class Division(Operation):
     """
@@ -167,6 +247,23 @@ class Division(Operation):
         self.validate_operands(a, b)
         return a / b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Divide two arrays of numbers element-wise.
+
+        Args:
+            a (np.ndarray): Dividends.
+            b (np.ndarray): Divisors.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and a mask of rows that divide by zero.
+        """
+        errors = b == 0
+        with np.errstate(all='ignore'):
+            result = a / b
+        result[errors] = np.nan
+        return result, errors
+
 
 class Power(Operation):
     """
@@ -190,12 +287,15 @@ class Power(Operation):
         """
         super().validate_operands(a, b)
         if b < 0:
-            raise ValidationError("Negative exponents not supported")
+            raise ValidationError("Negative exponents are not supported")
 
     def execute(self, a: Decimal, b: Decimal) -> Decimal:
         """
         Calculate one number raised to the power of another.
 
+        The power is computed in Decimal arithmetic: exactly for integer exponents
+        and exact roots, otherwise rounded to the context precision.
+
         Args:
             a (Decimal): Base number.
             b (Decimal): Exponent.
@@ -204,7 +304,24 @@ class Power(Operation):
             Decimal: Result of the exponentiation.
         """
         self.validate_operands(a, b)
-        return Decimal(pow(float(a), float(b)))
+        return rational_power(a, Fraction(b))
+
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Raise an array of numbers to the powers in another, element-wise.
+
+        Args:
+            a (np.ndarray): Base numbers.
+            b (np.ndarray): Exponents.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and a mask of rows with a negative exponent.
+        """
+        errors = b < 0
+        with np.errstate(all='ignore'):
+            result = np.power(a, b)
+        result[errors] = np.nan
+        return result, errors
 
 
 class Root(Operation):
@@ -238,6 +355,9 @@ class Root(Operation):
         """
         Calculate the nth root of a number.
 
+        The root is computed in Decimal arithmetic: exactly for perfect powers,
+        otherwise rounded to the context precision.
+
         Args:
             a (Decimal): Number from which the root is taken.
             b (Decimal): Degree of the root.
@@ -246,7 +366,24 @@ class Root(Operation):
             Decimal: Result of the root calculation.
         """
         self.validate_operands(a, b)
-        return Decimal(pow(float(a), 1 / float(b)))
+        return rational_power(a, 1 / Fraction(b))
+
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calculate the nth roots of an array of numbers, element-wise.
+
+        Args:
+            a (np.ndarray): Numbers from which the roots are taken.
+            b (np.ndarray): Degrees of the roots.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and a mask of rows with a negative number or a zero root degree.
+        """
+        errors = (a < 0) | (b == 0)
+        with np.errstate(all='ignore'):
+            result = np.power(a, 1 / b)
+        result[errors] = np.nan
+        return result, errors
 
 
 class Modulus(Operation):
@@ -287,6 +424,25 @@ class Modulus(Operation):
         self.validate_operands(a, b)
         return a % b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the remainders of dividing two arrays of numbers element-wise.
+
+        Uses np.fmod so the remainder takes the sign of the dividend, matching Decimal.
+
+        Args:
+            a (np.ndarray): Dividends.
+            b (np.ndarray): Divisors.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and a mask of rows that divide by zero.
+        """
+        errors = b == 0
+        with np.errstate(all='ignore'):
+            result = np.fmod(a, b)
+        result[errors] = np.nan
+        return result, errors
+
 
 class IntDivision(Operation):
     """
@@ -326,6 +482,25 @@ class IntDivision(Operation):
         self.validate_operands(a, b)
         return a // b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the integer quotients of two arrays of numbers element-wise.
+
+        Truncates toward zero, matching Decimal integer division.
+
+        Args:
+            a (np.ndarray): Dividends.
+            b (np.ndarray): Divisors.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and a mask of rows that divide by zero.
+        """
+        errors = b == 0
+        with np.errstate(all='ignore'):
+            result = np.trunc(a / b)
+        result[errors] = np.nan
+        return result, errors
+
 
 class Percentage(Operation):
     """
@@ -365,6 +540,23 @@ class Percentage(Operation):
         self.validate_operands(a, b)
         return (a / b) * 100
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the percentages of one array of numbers of another, element-wise.
+
+        Args:
+            a (np.ndarray): Dividends.
+            b (np.ndarray): Divisors.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and a mask of rows that divide by zero.
+        """
+        errors = b == 0
+        with np.errstate(all='ignore'):
+            result = (a / b) * 100
+        result[errors] = np.nan
+        return result, errors
+
 
 class AbsDifference(Operation):
     """
@@ -387,6 +579,19 @@ class AbsDifference(Operation):
         self.validate_operands(a, b)
         return abs(a - b)
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the absolute differences of two arrays of numbers element-wise.
+
+        Args:
+            a (np.ndarray): First operands.
+            b (np.ndarray): Second operands.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The results and an all-False error mask.
+        """
+        return np.abs(a - b), np.zeros(a.shape, dtype=bool)
+
 
 class OperationFactory:
     """
@@ -395,47 +600,63 @@ class OperationFactory:
     Implements the Factory pattern by providing a method to instantiate
     different operation classes based on a given operation type. This promotes
     scalability and decouples the creation logic from the Calculator class.
+
+    The factory is also the single registry of operation semantics. Operations
+    are stateless, so each registered class is instantiated once at registration
+    and the shared instance is handed out by identifier (e.g., 'add') or by its
+    display name (e.g., "Addition"), together with its execute kernel.
     """
 
     # Dictionary mapping operation identifiers to their corresponding classes
-    _operations: Dict[str, type] = {
-        'add': Addition,
-        'subtract': Subtraction,
-        'multiply': Multiplication,
-        'divide': Division,
-        'power': Power,
-        'root': Root,
-        'modulus': Modulus,
-        'int_divide': IntDivision,
-        'percent': Percentage,
-        'abs_diff': AbsDifference,
-    }
+    _operations: Dict[str, type] = {}
+
+    # Shared stateless instances keyed by operation identifier
+    _instances: Dict[str, Operation] = {}
+
+    # Shared stateless instances keyed by display name, as stored in Calculation.operation
+    _by_display_name: Dict[str, Operation] = {}
+
+    # Execute kernels keyed by display name
+    _kernels: Dict[str, Callable[[Decimal, Decimal], Decimal]] = {}
 
     @classmethod
-    def register_operation(cls, name: str, operation_class: type) -> None:
+    def register_operation(cls, name: str, operation_class: Union[type, Operation]) -> None:
         """
         Register a new operation type.
 
-        Allows dynamic addition of new operations to the factory.
+        Allows dynamic addition of new operations to the factory. The operation is
+        instantiated once and also registered under its display name, so stored
+        calculations using it can be recomputed on load and replay. Operations
+        built at runtime, such as user-defined formulas, are registered as
+        instances.
 
         Args:
             name (str): Operation identifier (e.g., 'modulus').
-            operation_class (type): The class implementing the new operation.
+            operation_class (Union[type, Operation]): The class implementing the new
+                operation, or an instance of it.
 
         Raises:
             TypeError: If the operation_class does not inherit from Operation.
         """
-        if not issubclass(operation_class, Operation):
+        if isinstance(operation_class, Operation):
+            operation = operation_class
+            operation_class = type(operation)
+        elif isinstance(operation_class, type) and issubclass(operation_class, Operation):
+            operation = operation_class()
+        else:
             raise TypeError("Operation class must inherit from Operation")
         cls._operations[name.lower()] = operation_class
+        cls._instances[name.lower()] = operation
+        cls._by_display_name[str(operation)] = operation
+        cls._kernels[str(operation)] = operation.execute
 
     @classmethod
     def create_operation(cls, operation_type: str) -> Operation:
         """
         Create an operation instance based on the operation type.
 
-        This method retrieves the appropriate operation class from the
-        _operations dictionary and instantiates it.
+        This method retrieves the shared instance of the appropriate operation
+        class from the registry.
 
         Args:
             operation_type (str): The type of operation to create (e.g., 'add').
@@ -446,7 +667,59 @@ class OperationFactory:
         Raises:
             ValueError: If the operation type is unknown.
         """
-        operation_class = cls._operations.get(operation_type.lower())
-        if not operation_class:
+        operation = cls._instances.get(operation_type.lower())
+        if not operation:
             raise ValueError(f"Unknown operation: {operation_type}")
-        return operation_class()
+        return operation
+
+    @classmethod
+    def get_operation(cls, display_name: str) -> Optional[Operation]:
+        """
+        Get the registered operation with the given display name.
+
+        Args:
+            display_name (str): The display name of the operation (e.g., "Addition").
+
+        Returns:
+            Optional[Operation]: The shared operation instance, or None if unknown.
+        """
+        return cls._by_display_name.get(display_name)
+
+    @classmethod
+    def get_kernel(cls, display_name: str) -> Optional[Callable[[Decimal, Decimal], Decimal]]:
+        """
+        Get the execute kernel of the operation with the given display name.
+
+        Args:
+            display_name (str): The display name of the operation (e.g., "Addition").
+
+        Returns:
+            Optional[Callable[[Decimal, Decimal], Decimal]]: The kernel, or None if unknown.
+        """
+        return cls._kernels.get(display_name)
+
+    @classmethod
+    def operation_names(cls) -> List[str]:
+        """
+        Get the identifiers of all registered operations.
+
+        Returns:
+            List[str]: Operation identifiers in registration order.
+        """
+        return list(cls._operations)
+
+
+# Build the registry of built-in operations once at import
+for _name, _operation_class in (
+    ('add', Addition),
+    ('subtract', Subtraction),
+    ('multiply', Multiplication),
+    ('divide', Division),
+    ('power', Power),
+    ('root', Root),
+    ('modulus', Modulus),
+    ('int_divide', IntDivision),
+    ('percent', Percentage),
+    ('abs_diff', AbsDifference),
+):
+    OperationFactory.register_operation(_name, _operation_class)
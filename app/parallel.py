@@ -0,0 +1,189 @@
+########################
+# Parallel Evaluation   #
+########################
+
+from array import array
+from decimal import Context, Decimal, localcontext
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from app.calculator_config import CalculatorConfig
+from app.exceptions import CalculatorError, OperationError, ValidationError
+from app.formulas import define_formula
+from app.input_validators import InputValidator
+from app.operations import Operation, OperationFactory
+
+# Separates the fields of an encoded row or outcome
+FIELD_SEPARATOR = '\x1f'
+
+# Separates the encoded outcomes of a chunk
+ROW_SEPARATOR = '\x1e'
+
+# Starts the encoded outcome of a failed row, followed by the error kind
+ERROR_MARK = '\x00'
+
+# Error kinds of failed rows, by their code in the encoding
+ERROR_KINDS = {'V': ValidationError, 'O': OperationError}
+
+# A chunk of rows as shipped to a worker: the operation identifiers used in the
+# chunk, the uint16 index of every row's operation in them, and all operands
+# as one string
+EncodedChunk = Tuple[Tuple[str, ...], bytes, str]
+
+# The outcome of one row: the validated operands and result, or the error
+DecodedOutcome = Union[Tuple[Decimal, Decimal, Decimal], CalculatorError]
+
+
+def encode_rows(rows: Sequence[Tuple[str, object, object]]) -> EncodedChunk:
+    """
+    Encode a chunk of rows compactly for shipping to a worker process.
+
+    Pickling one string of operands and a byte array of operation codes is far
+    cheaper, in size and time, than pickling a tuple of objects per row.
+
+    Args:
+        rows (Sequence[Tuple[str, object, object]]): Tuples of (operation identifier, a, b),
+            each of them encodable.
+
+    Returns:
+        EncodedChunk: The encoded chunk.
+
+    Raises:
+        ValueError: If a row holds a separator of the encoding.
+    """
+    codes_by_name: Dict[str, int] = {}
+    codes = array('H')
+    operands: List[str] = []
+    for name, a, b in rows:
+        code = codes_by_name.get(name)
+        if code is None:
+            code = codes_by_name[name] = len(codes_by_name)
+        codes.append(code)
+        if not is_encodable((name, a, b)):
+            raise ValueError(f"Row cannot be encoded: {(name, a, b)!r}")
+        operands.append(str(a))
+        operands.append(str(b))
+    return tuple(codes_by_name), codes.tobytes(), FIELD_SEPARATOR.join(operands)
+
+
+def is_encodable(row: Tuple[str, object, object]) -> bool:
+    """
+    Check whether a row can be encoded, with no separator of the encoding in it.
+
+    Such rows are rare but not always invalid, since separators count as
+    whitespace around a number, so they are calculated without the encoding.
+
+    Args:
+        row (Tuple[str, object, object]): The (operation identifier, a, b) row.
+
+    Returns:
+        bool: True if no field holds a separator.
+    """
+    return not any(FIELD_SEPARATOR in text or ROW_SEPARATOR in text for text in map(str, row))
+
+
+def decode_rows(chunk: EncodedChunk) -> Iterator[Tuple[str, str, str]]:
+    """
+    Decode a chunk of rows encoded by encode_rows.
+
+    Args:
+        chunk (EncodedChunk): The encoded chunk.
+
+    Yields:
+        Tuple[str, str, str]: The (operation identifier, a, b) rows, in order.
+    """
+    names, raw_codes, operand_text = chunk
+    codes = array('H')
+    codes.frombytes(raw_codes)
+    operands = operand_text.split(FIELD_SEPARATOR)
+    for i, code in enumerate(codes):
+        yield names[code], operands[2 * i], operands[2 * i + 1]
+
+
+def resolve_operation(name: str) -> Optional[Operation]:
+    """
+    Look up a registered operation by identifier or display name.
+
+    Args:
+        name (str): The identifier, such as 'add', or display name, such as 'Addition'.
+
+    Returns:
+        Optional[Operation]: The shared operation instance, or None if unknown.
+    """
+    try:
+        return OperationFactory.create_operation(name)
+    except ValueError:
+        return OperationFactory.get_operation(name)
+
+
+def evaluate_chunk(chunk: EncodedChunk, config: CalculatorConfig, context: Context) -> str:
+    """
+    Validate and calculate an encoded chunk of rows.
+
+    Runs in a worker process, or in the calling process for a single worker.
+    Each row is validated and calculated as Calculator.perform_many would, in
+    the given Decimal context.
+
+    Args:
+        chunk (EncodedChunk): The encoded rows.
+        config (CalculatorConfig): The configuration operands are validated against.
+        context (Context): The Decimal context of the calculations.
+
+    Returns:
+        str: The encoded outcomes, in row order: the normalized operands and the
+            result of each successful row, or the kind and message of its error.
+    """
+    operations: Dict[str, Optional[Operation]] = {}
+    outcomes: List[str] = []
+    with localcontext(context):
+        for name, a, b in decode_rows(chunk):
+            try:
+                if name not in operations:
+                    operations[name] = resolve_operation(name)
+                operation = operations[name]
+                if operation is None:
+                    raise OperationError(f"Unknown operation: {name}")
+                validated_a = InputValidator.validate_number(a, config)
+                validated_b = InputValidator.validate_number(b, config)
+                result = operation.execute(validated_a, validated_b)
+                outcomes.append(FIELD_SEPARATOR.join((str(validated_a), str(validated_b), str(result))))
+            except CalculatorError as e:
+                kind = 'V' if isinstance(e, ValidationError) else 'O'
+                outcomes.append(f"{ERROR_MARK}{kind}{FIELD_SEPARATOR}{e}")
+            except (ArithmeticError, ValueError) as e:
+                outcomes.append(f"{ERROR_MARK}O{FIELD_SEPARATOR}Operation failed: {e}")
+    return ROW_SEPARATOR.join(outcomes)
+
+
+def decode_outcomes(text: str) -> Iterator[DecodedOutcome]:
+    """
+    Decode the outcomes of a chunk encoded by evaluate_chunk.
+
+    Args:
+        text (str): The encoded outcomes.
+
+    Yields:
+        DecodedOutcome: For every row, in order, its validated operands and result,
+            or its error.
+    """
+    if not text:
+        return
+    for entry in text.split(ROW_SEPARATOR):
+        fields = entry.split(FIELD_SEPARATOR, 2)
+        if entry.startswith(ERROR_MARK):
+            yield ERROR_KINDS[fields[0][1]](fields[1])
+        else:
+            yield Decimal(fields[0]), Decimal(fields[1]), Decimal(fields[2])
+
+
+def init_worker(formulas: Sequence[str]) -> None:
+    """
+    Prepare a worker process: define the formulas of the parent process.
+
+    Built-in operations are registered when the worker imports the operations
+    module; formulas are defined at runtime and have to be passed on.
+
+    Args:
+        formulas (Sequence[str]): The formula definitions, in definition order.
+    """
+    for definition in formulas:
+        define_formula(definition)
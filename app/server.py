@@ -0,0 +1,349 @@
+########################
+# Calculator Server     #
+########################
+
+import argparse
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from decimal import Decimal
+import json
+import logging
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.calculator import Calculator
+from app.exceptions import CalculatorError, ValidationError
+from app.operations import OperationFactory
+
+# Longest request line accepted, in bytes
+MAX_LINE_SIZE = 1 << 20
+
+# Requests read ahead of the one being answered, per connection
+PIPELINE_DEPTH = 64
+
+# Address served when none is given
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# A JSON response object
+Response = Dict[str, Any]
+
+
+class CalculatorServer:
+    """
+    Serves a calculator over a JSON Lines protocol on TCP or Unix domain sockets.
+
+    Every request is one line holding a JSON object, answered by one line
+    holding a JSON object with the request's "id" and either a "result" or an
+    "error":
+
+        {"id": 1, "operation": "power", "a": 2, "b": 10}  ->  {"id": 1, "result": "1024"}
+        {"id": 2, "command": "undo"}                       ->  {"id": 2, "result": true}
+
+    The commands are history, undo, redo, clear, save, version and operations.
+    A line holding a JSON array is a batch of operation requests, evaluated as
+    one history commit and answered by an array of responses in the same order.
+
+    Clients may pipeline requests, sending more before reading the responses,
+    which are always written in request order. Each connection reads at most
+    pipeline_depth requests ahead, and stops reading while the client does not
+    take its responses, so a fast client cannot make the server buffer without
+    bound. Calculations run in an executor, so slow Power and Root calls never
+    stall the event loop. The default executor has a single thread, which
+    answers all connections in arrival order; a calculator in concurrent mode
+    can also be served by a larger thread pool.
+    """
+
+    def __init__(
+        self,
+        calculator: Calculator,
+        executor: Optional[Executor] = None,
+        pipeline_depth: int = PIPELINE_DEPTH
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            calculator (Calculator): The calculator serving the requests.
+            executor (Optional[Executor], optional): The executor running the
+                calculator calls. Defaults to a single-thread executor owned by the server.
+            pipeline_depth (int, optional): Requests read ahead per connection.
+                Defaults to PIPELINE_DEPTH.
+        """
+        self.calculator = calculator
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='calculator')
+        self.pipeline_depth = pipeline_depth
+        self.connections = 0
+        self.commands: Dict[str, Callable[[], Any]] = {
+            'history': lambda: [entry.to_dict() for entry in calculator.history_snapshot()],
+            'undo': calculator.undo,
+            'redo': calculator.redo,
+            'clear': calculator.clear_history,
+            'save': calculator.save_history,
+            'version': lambda: calculator.version,
+            'operations': OperationFactory.operation_names,
+        }
+
+    async def start(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        path: Optional[str] = None
+    ) -> asyncio.AbstractServer:
+        """
+        Start listening for connections.
+
+        Args:
+            host (str, optional): The TCP host. Defaults to DEFAULT_HOST.
+            port (int, optional): The TCP port, 0 for any free port. Defaults to DEFAULT_PORT.
+            path (Optional[str], optional): A Unix domain socket path to listen on
+                instead of TCP. Defaults to None.
+
+        Returns:
+            asyncio.AbstractServer: The listening server.
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path, limit=MAX_LINE_SIZE)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE_SIZE)
+        logging.info(f"Calculator server listening on {path or server.sockets[0].getsockname()}")
+        return server
+
+    async def serve(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        path: Optional[str] = None
+    ) -> None:
+        """
+        Serve connections until cancelled.
+
+        Args:
+            host (str, optional): The TCP host. Defaults to DEFAULT_HOST.
+            port (int, optional): The TCP port. Defaults to DEFAULT_PORT.
+            path (Optional[str], optional): A Unix domain socket path to listen on
+                instead of TCP. Defaults to None.
+        """
+        server = await self.start(host, port, path)
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        """
+        Shut down the executor, if the server created it.
+        """
+        if self._owns_executor:
+            self.executor.shutdown(wait=True)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serve one client connection until it closes.
+
+        Request lines are read into a bounded queue that a second task answers
+        in order, so reading ahead pauses, and TCP flow control pushes back on
+        the client, once pipeline_depth requests are waiting.
+
+        Args:
+            reader (asyncio.StreamReader): The connection's input.
+            writer (asyncio.StreamWriter): The connection's output.
+        """
+        self.connections += 1
+        logging.info("Client connected")
+        queue: asyncio.Queue = asyncio.Queue(self.pipeline_depth)
+        responder = asyncio.create_task(self._respond(queue, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The rest of an over-long line cannot be told apart from the next request
+                    await queue.put(json.dumps({'id': None, 'error': "Request line too long"}))
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    await queue.put(line)
+        except ConnectionError:
+            pass
+        finally:
+            await queue.put(None)
+            await responder
+            writer.close()
+            self.connections -= 1
+            logging.info("Client disconnected")
+
+    async def _respond(self, queue: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        """
+        Answer the queued request lines of a connection in order.
+
+        Args:
+            queue (asyncio.Queue): The request lines, or ready responses as str, ended by None.
+            writer (asyncio.StreamWriter): The connection's output.
+        """
+        connected = True
+        while (line := await queue.get()) is not None:
+            if not connected:
+                # Keep taking requests, so the reading task never blocks on a full queue
+                continue
+            try:
+                response = line if isinstance(line, str) else await self.handle_line(line)
+            except Exception as e:
+                # One failed request must not stop the answers to the ones after it
+                logging.error(f"Request failed: {e}")
+                response = json.dumps({'id': None, 'error': f"Request failed: {e}"})
+            try:
+                writer.write(response.encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+
+    async def handle_line(self, line: bytes) -> str:
+        """
+        Answer one request line.
+
+        Args:
+            line (bytes): The request line.
+
+        Returns:
+            str: The JSON response, without a newline.
+        """
+        try:
+            request = json.loads(line, parse_float=Decimal)
+        except ValueError as e:
+            return json.dumps({'id': None, 'error': f"Invalid JSON: {e}"})
+        handler = self.handle_batch if isinstance(request, list) else self.handle_request
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(self.executor, handler, request)
+        except Exception as e:
+            # A request the handlers did not anticipate is answered, never left hanging
+            logging.error(f"Request failed: {e}")
+            response = {'id': request.get('id') if isinstance(request, dict) else None, 'error': f"Request failed: {e}"}
+        return json.dumps(response, default=str)
+
+    def handle_request(self, request: Any) -> Response:
+        """
+        Answer one operation or command request.
+
+        Runs in the executor.
+
+        Args:
+            request (Any): The decoded request.
+
+        Returns:
+            Response: The response object.
+        """
+        if not isinstance(request, dict):
+            return {'id': None, 'error': "Request must be a JSON object or array"}
+        response: Response = {'id': request.get('id')}
+        try:
+            if 'command' in request:
+                name = request['command']
+                if not isinstance(name, str) or name not in self.commands:
+                    raise ValidationError(f"Unknown command: {name}")
+                response['result'] = self.commands[name]()
+            else:
+                self._set_outcome(response, self.calculator.perform_many([_operation_row(request)])[0])
+        except CalculatorError as e:
+            response['error'] = str(e)
+        return response
+
+    def handle_batch(self, requests: List[Any]) -> List[Response]:
+        """
+        Answer a batch of operation requests.
+
+        The valid operations are calculated together with Calculator.perform_many,
+        so they are recorded as one history commit and one undo step.
+
+        Runs in the executor.
+
+        Args:
+            requests (List[Any]): The decoded requests.
+
+        Returns:
+            List[Response]: The responses, in request order.
+        """
+        responses: List[Response] = []
+        rows: List[Tuple[Any, Any, Any]] = []
+        pending: List[Response] = []
+        for request in requests:
+            if not isinstance(request, dict):
+                responses.append({'id': None, 'error': "Batch entries must be JSON objects"})
+                continue
+            response: Response = {'id': request.get('id')}
+            responses.append(response)
+            try:
+                if 'command' in request:
+                    raise ValidationError("Commands cannot be batched")
+                rows.append(_operation_row(request))
+                pending.append(response)
+            except CalculatorError as e:
+                response['error'] = str(e)
+        for response, outcome in zip(pending, self.calculator.perform_many(rows)):
+            self._set_outcome(response, outcome)
+        return responses
+
+    @staticmethod
+    def _set_outcome(response: Response, outcome: Any) -> None:
+        """
+        Store the outcome of a calculation in its response.
+
+        Args:
+            response (Response): The response object.
+            outcome (Any): The result, or the error that prevented the calculation.
+        """
+        if isinstance(outcome, CalculatorError):
+            response['error'] = str(outcome)
+        else:
+            response['result'] = str(outcome)
+
+
+def _operation_row(request: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+    """
+    Get the (operation, a, b) row of an operation request.
+
+    Args:
+        request (Dict[str, Any]): The decoded request.
+
+    Returns:
+        Tuple[Any, Any, Any]: The operation identifier and the operands.
+
+    Raises:
+        ValidationError: If a field is missing.
+    """
+    missing = [field for field in ('operation', 'a', 'b') if field not in request]
+    if missing:
+        raise ValidationError(f"Missing field: {', '.join(missing)}")
+    return str(request['operation']), request['a'], request['b']
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the calculator server until interrupted.
+
+    Usage: python main.py serve [--host HOST] [--port PORT] [--unix PATH].
+
+    Args:
+        argv (Optional[List[str]], optional): The arguments after 'serve'.
+            Defaults to sys.argv[2:].
+
+    Returns:
+        int: The exit status.
+    """
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Serve the calculator over JSON Lines.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"TCP host (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument('--unix', dest='path', help="Unix domain socket path to listen on instead of TCP")
+    args = parser.parse_args(sys.argv[2:] if argv is None else argv)
+
+    calc = Calculator()
+    server = CalculatorServer(calc)
+    print(f"Serving on {args.path or f'{args.host}:{args.port}'}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        calc.close()
+    return 0
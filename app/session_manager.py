@@ -0,0 +1,458 @@
+########################
+# Session Manager       #
+########################
+
+from collections import OrderedDict, deque
+import copy
+from dataclasses import dataclass
+import datetime
+import json
+import logging
+import os
+from pathlib import Path
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Set
+
+from app.calculation import BatchCalculation, Calculation
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.calculator_memento import CalculatorMemento, HistoryDelta
+from app.exceptions import ValidationError
+from app.formulas import load_formulas
+from app.history import HistoryObserver
+from app.operation_cache import OperationCache
+
+# Session identifiers, which double as file names
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Estimated memory held per entry besides its arrays, per undo or redo step
+# besides its entries, and per reference from a step to an entry, in bytes
+ENTRY_BYTES = 500
+DELTA_BYTES = 200
+REFERENCE_BYTES = 8
+
+
+@dataclass
+class SessionStats:
+    """
+    Counters of a session manager.
+    """
+
+    hits: int = 0                       # Requests for a resident session
+    created: int = 0                    # Requests that started a new session
+    rehydrated: int = 0                 # Requests that loaded an offloaded session
+    evictions: int = 0                  # Sessions offloaded to disk
+    rehydration_seconds: float = 0.0    # Total time spent loading offloaded sessions
+
+    @property
+    def misses(self) -> int:
+        """
+        Get the number of requests for a session that was not resident.
+
+        Returns:
+            int: Sessions created plus sessions rehydrated.
+        """
+        return self.created + self.rehydrated
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Get the fraction of requests served by a resident session.
+
+        Returns:
+            float: Hits over all requests, 0.0 before the first request.
+        """
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    @property
+    def mean_rehydration_ms(self) -> float:
+        """
+        Get the average time taken to rehydrate a session.
+
+        Returns:
+            float: Milliseconds per rehydration, 0.0 before the first one.
+        """
+        return self.rehydration_seconds * 1000 / self.rehydrated if self.rehydrated else 0.0
+
+    def __str__(self) -> str:
+        """
+        Return a one-line summary of the counters.
+
+        Returns:
+            str: Hits, misses, evictions and the mean rehydration latency.
+        """
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.1%} hit rate), "
+            f"{self.evictions} evictions, {self.mean_rehydration_ms:.2f} ms mean rehydration"
+        )
+
+
+class SessionManager:
+    """
+    Keeps one Calculator per user session, with a bounded number in memory.
+
+    Sessions are created on demand from a shared configuration template. When
+    more sessions are resident than the configured count, or their estimated
+    memory exceeds the configured size, the least recently used ones are
+    offloaded: their history and undo and redo steps are written to a file per
+    session and the calculator is released. Asking for an offloaded session
+    rehydrates it from its file, with the same history and undo and redo steps.
+
+    Session calculators keep their history only in the manager: they do not
+    load the history file nor save to it. Callers should fetch the calculator
+    with get for every use, since an evicted calculator's later changes are lost.
+
+    The sessions share one operation cache and the logging set up by the
+    manager. The estimated memory of each session, from the content of its
+    history and undo and redo steps, is kept with the session and re-estimated
+    only after its history changed, so enforcing the limits never rescans the
+    resident sessions.
+    """
+
+    def __init__(self, template: CalculatorConfig):
+        """
+        Initialize the session manager.
+
+        Args:
+            template (CalculatorConfig): The configuration every session starts from.
+                Its session settings limit the resident sessions, and its sessions
+                directory holds the offloaded ones.
+        """
+        template.validate()
+        self.template = template
+        self.max_resident = template.session_max_resident
+        self.max_memory = int(template.session_max_memory_mb * 1024 * 1024)
+        self.sessions_dir = template.sessions_dir
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self.sessions: 'OrderedDict[str, Calculator]' = OrderedDict()
+        self.stats = SessionStats()
+        self._lock = threading.RLock()
+        # Estimated bytes held by each resident session, their total, and the
+        # sessions whose history changed since they were estimated
+        self._sizes: Dict[str, int] = {}
+        self._memory = 0
+        self._changed: Set[str] = set()
+        # Logging, formulas and cached results are shared by every session, so
+        # they are set up once here
+        Calculator.setup_logging(template)
+        load_formulas(template.formulas_file)
+        self.operation_cache = (
+            OperationCache(template.operation_cache_size) if template.operation_cache_size else None
+        )
+
+    def get(self, session_id: str) -> Calculator:
+        """
+        Get the calculator of a session, creating or rehydrating it as needed.
+
+        Args:
+            session_id (str): The session identifier: letters, digits, '_' and '-'.
+
+        Returns:
+            Calculator: The session's calculator.
+
+        Raises:
+            ValidationError: If the session identifier is invalid.
+        """
+        path = self.session_file(session_id)
+        with self._lock:
+            calc = self.sessions.get(session_id)
+            if calc is not None:
+                self.sessions.move_to_end(session_id)
+                self.stats.hits += 1
+                return calc
+
+            calc = Calculator(
+                self._session_config(),
+                load_saved_history=False,
+                operation_cache=self.operation_cache,
+                configure_logging=False
+            )
+            if path.exists():
+                started = time.perf_counter()
+                restore_session(calc, json.loads(path.read_text(encoding=self.template.default_encoding)))
+                path.unlink()
+                self.stats.rehydration_seconds += time.perf_counter() - started
+                self.stats.rehydrated += 1
+                logging.info(f"Rehydrated session {session_id}")
+            else:
+                self.stats.created += 1
+                logging.info(f"Created session {session_id}")
+            self.sessions[session_id] = calc
+            self._changed.add(session_id)
+            calc.add_observer(SessionUsageObserver(self._changed, session_id))
+            self._enforce_limits()
+            return calc
+
+    def evict(self, session_id: str) -> bool:
+        """
+        Offload a resident session to its file and release its calculator.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Returns:
+            bool: True if the session was resident and has been offloaded.
+        """
+        with self._lock:
+            calc = self.sessions.pop(session_id, None)
+            if calc is None:
+                return False
+            self._memory -= self._sizes.pop(session_id)
+            path = self.session_file(session_id)
+            temp_file = path.with_name(path.name + '.tmp')
+            temp_file.write_text(json.dumps(dump_session(calc)), encoding=self.template.default_encoding)
+            os.replace(temp_file, path)
+            calc.close()
+            self.stats.evictions += 1
+            logging.info(f"Offloaded session {session_id}")
+            return True
+
+    def discard(self, session_id: str) -> None:
+        """
+        End a session, dropping its calculator and its offloaded file.
+
+        Args:
+            session_id (str): The session identifier.
+        """
+        path = self.session_file(session_id)
+        with self._lock:
+            calc = self.sessions.pop(session_id, None)
+            if calc is not None:
+                self._memory -= self._sizes.pop(session_id)
+                calc.close()
+            path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """
+        Offload every resident session, so all of them survive a restart.
+        """
+        with self._lock:
+            for session_id in list(self.sessions):
+                self.evict(session_id)
+
+    def session_file(self, session_id: str) -> Path:
+        """
+        Get the file an offloaded session is kept in.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Returns:
+            Path: The session file.
+
+        Raises:
+            ValidationError: If the session identifier is invalid.
+        """
+        if not SESSION_ID_PATTERN.fullmatch(session_id):
+            raise ValidationError(f"Invalid session id: {session_id!r}")
+        return self.sessions_dir / f"{session_id}.json"
+
+    def memory_usage(self) -> int:
+        """
+        Estimate the memory held by the resident sessions.
+
+        Returns:
+            int: Estimated bytes, from the history entries and undo and redo steps.
+        """
+        with self._lock:
+            self._update_sizes()
+            return self._memory
+
+    def __len__(self) -> int:
+        """
+        Return the number of resident sessions.
+
+        Returns:
+            int: The number of sessions in memory.
+        """
+        return len(self.sessions)
+
+    def __contains__(self, session_id: object) -> bool:
+        """
+        Check whether a session is resident.
+
+        Args:
+            session_id (object): The session identifier.
+
+        Returns:
+            bool: True if the session is in memory.
+        """
+        return session_id in self.sessions
+
+    def _session_config(self) -> CalculatorConfig:
+        """
+        Build the configuration of a new session calculator.
+
+        Returns:
+            CalculatorConfig: A copy of the template that never writes the shared
+                history file, history database or operation cache file.
+        """
+        config = copy.copy(self.template)
+        config.auto_save = False
+        config.history_backend = 'file'
+        config.operation_cache_persist = False
+        return config
+
+    def _update_sizes(self) -> None:
+        """
+        Re-estimate the memory of the resident sessions whose history changed.
+        """
+        while self._changed:
+            session_id = self._changed.pop()
+            calc = self.sessions.get(session_id)
+            if calc is not None:
+                size = estimate_size(calc)
+                self._memory += size - self._sizes.get(session_id, 0)
+                self._sizes[session_id] = size
+
+    def _enforce_limits(self) -> None:
+        """
+        Offload least recently used sessions until the limits are met.
+
+        The most recently used session always stays resident.
+        """
+        self._update_sizes()
+        while len(self.sessions) > 1 and (
+            len(self.sessions) > self.max_resident or self._memory > self.max_memory
+        ):
+            self.evict(next(iter(self.sessions)))
+
+
+class SessionUsageObserver(HistoryObserver):
+    """
+    Marks a session for re-estimating its memory when its history changes.
+
+    Marking only adds to a set, so the calculator's thread never waits for the
+    session manager's lock.
+    """
+
+    def __init__(self, changed: Set[str], session_id: str):
+        """
+        Initialize the observer.
+
+        Args:
+            changed (Set[str]): The manager's set of sessions to re-estimate.
+            session_id (str): The session identifier.
+        """
+        self.changed = changed
+        self.session_id = session_id
+
+    def update(self, calculation: Calculation) -> None:
+        """
+        Ignore a new calculation, which history_changed already reported.
+
+        Args:
+            calculation (Calculation): The new calculation.
+        """
+
+    def history_changed(self, kind: str, entries: List[Any] = ()) -> None:
+        """
+        Mark the session for re-estimating after its history changed.
+
+        Args:
+            kind (str): The kind of change.
+            entries (List[Any], optional): The entries the change added or removed.
+                Defaults to none.
+        """
+        self.changed.add(self.session_id)
+
+
+def estimate_size(calc: Calculator) -> int:
+    """
+    Estimate the memory held by a calculator's history and undo and redo steps.
+
+    Every distinct entry is counted once, with the arrays of batch entries, and
+    every step by the number of entries it refers to, so large batches and
+    steps recording many calculations count in full.
+
+    Args:
+        calc (Calculator): The calculator.
+
+    Returns:
+        int: Estimated bytes.
+    """
+    seen = set()
+    size = 0
+
+    def count(entries: Iterable[Any]) -> None:
+        nonlocal size
+        for entry in entries:
+            if id(entry) in seen:
+                continue
+            seen.add(id(entry))
+            size += ENTRY_BYTES
+            if isinstance(entry, BatchCalculation):
+                size += sum(array.nbytes for array in (entry.operand1, entry.operand2, entry.result, entry.errors))
+
+    count(calc.history)
+    for delta in (*calc.undo_stack, *calc.redo_stack):
+        size += DELTA_BYTES + (len(delta.appended) + len(delta.evicted)) * REFERENCE_BYTES
+        count(delta.appended)
+        count(delta.evicted)
+    return size
+
+
+def dump_session(calc: Calculator) -> Dict[str, Any]:
+    """
+    Serialize a calculator's history and undo and redo steps.
+
+    An entry held by both the history and undo steps is written once and
+    referred to by its position, so it is shared again when restored.
+
+    Args:
+        calc (Calculator): The calculator.
+
+    Returns:
+        Dict[str, Any]: The JSON-serializable session state.
+    """
+    entries: List[Dict[str, Any]] = []
+    positions: Dict[int, int] = {}
+
+    def refer(items: Iterable[Any]) -> List[int]:
+        references = []
+        for item in items:
+            if id(item) not in positions:
+                positions[id(item)] = len(entries)
+                entries.append(item.to_dict())
+            references.append(positions[id(item)])
+        return references
+
+    def dump_delta(delta: HistoryDelta) -> Dict[str, Any]:
+        return {
+            'appended': refer(delta.appended),
+            'evicted': refer(delta.evicted),
+            'timestamp': delta.timestamp.isoformat()
+        }
+
+    history = refer(calc.history)
+    undo = [dump_delta(delta) for delta in calc.undo_stack]
+    redo = [dump_delta(delta) for delta in calc.redo_stack]
+    return {'entries': entries, 'history': history, 'undo': undo, 'redo': redo}
+
+
+def restore_session(calc: Calculator, data: Dict[str, Any]) -> None:
+    """
+    Restore a calculator's history and undo and redo steps serialized by dump_session.
+
+    Args:
+        calc (Calculator): The calculator, which must not be in use yet.
+        data (Dict[str, Any]): The session state.
+    """
+    loaded = [Calculation.from_dict(entry, verify_rate=0.0) for entry in data['entries']]
+
+    def entries(references: List[int]) -> List[Any]:
+        return [loaded[i] for i in references]
+
+    def load_delta(item: Dict[str, Any]) -> HistoryDelta:
+        return HistoryDelta(
+            appended=deque(entries(item['appended'])),
+            evicted=entries(item['evicted']),
+            timestamp=datetime.datetime.fromisoformat(item['timestamp'])
+        )
+
+    calc.restore_memento(CalculatorMemento(entries(data['history'])))
+    calc.undo_stack.extend(load_delta(item) for item in data['undo'])
+    calc.redo_stack.extend(load_delta(item) for item in data['redo'])
@@ -23,8 +23,18 @@ Version: 1.0
 
 
 
+import sys
+
 from app.calculator_repl import calculator_repl
 
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ['batch']:
+        # Non-interactive batch evaluation: python main.py batch --in ops.csv --out results.jsonl
+        from app.batch_cli import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ['serve']:
+        # JSON Lines server for other services: python main.py serve --port 8765
+        from app.server import main
+        sys.exit(main(sys.argv[2:]))
     calculator_repl()
\ No newline at end of file
@@ -0,0 +1,116 @@
+import io
+import json
+import pytest
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from app.batch_cli import BatchSummary, chunked, main, read_csv_rows, read_jsonl_rows, run_batch
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+
+
+@pytest.fixture
+def calculator():
+    with TemporaryDirectory() as temp_dir:
+        calc = Calculator(CalculatorConfig(base_dir=Path(temp_dir), auto_save=False))
+        yield calc
+
+
+# Test Readers
+
+def test_read_csv_rows():
+    lines = ["operation,a,b\n", "add, 2, 3\n", "\n", "divide,1\n", "power,2,10\n"]
+    assert list(read_csv_rows(lines)) == [
+        (2, 'add', '2', '3', None),
+        (4, '', '', '', "Expected 3 fields (operation, a, b), got 2"),
+        (5, 'power', '2', '10', None),
+    ]
+
+def test_read_csv_rows_without_header():
+    assert list(read_csv_rows(["add,1,2\n"])) == [(1, 'add', '1', '2', None)]
+
+def test_read_jsonl_rows():
+    lines = ['{"operation": "add", "a": 0.1, "b": 2}\n', '\n', 'not json\n', '{"operation": "add"}\n']
+    rows = list(read_jsonl_rows(lines))
+    assert rows[0] == (1, 'add', '0.1', '2', None)
+    assert rows[1][0] == 3 and rows[1][4].startswith("Invalid JSON operation")
+    assert rows[2][0] == 4 and rows[2][4] == "Invalid JSON operation: 'a'"
+
+def test_chunked():
+    assert [len(chunk) for chunk in chunked(iter(range(7)), 3)] == [3, 3, 1]
+
+
+# Test Batch Runs
+
+def test_run_batch_jsonl(calculator):
+    rows = [(1, 'add', '2', '3', None), (2, 'divide', '1', '0', None), (3, '', '', '', "Bad row")]
+    out = io.StringIO()
+    history_size = len(calculator.history)
+    summary = run_batch(calculator, rows, out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert records[0] == {'line': 1, 'operation': 'add', 'a': '2', 'b': '3', 'result': '5'}
+    assert records[1]['error'] == "Division by zero is not allowed"
+    assert records[2]['error'] == "Bad row"
+    assert (summary.rows, summary.errors) == (3, 2)
+    assert len(calculator.history) == history_size
+
+def test_run_batch_csv(calculator):
+    out = io.StringIO()
+    run_batch(calculator, [(2, 'multiply', '1.5', '4', None), (3, 'nope', '1', '2', None)], out, 'csv')
+    assert out.getvalue().splitlines() == [
+        "line,operation,a,b,result,error",
+        "2,multiply,1.5,4,6.0,",
+        "3,nope,1,2,,Unknown operation: nope",
+    ]
+
+def test_run_batch_holds_one_chunk(calculator):
+    rows = ((n, 'add', str(n), '1', None) for n in range(1, 1001))
+    sizes = []
+    perform_many = calculator.perform_many
+
+    def spy(chunk, record=True):
+        sizes.append(len(chunk))
+        return perform_many(chunk, record)
+
+    with patch.object(calculator, 'perform_many', side_effect=spy):
+        summary = run_batch(calculator, rows, io.StringIO(), chunk_size=64)
+    assert summary.rows == 1000
+    assert max(sizes) == 64
+
+def test_summary():
+    summary = BatchSummary(rows=500, errors=2, seconds=0.25)
+    assert summary.rate == 2000
+    assert str(summary) == "Processed 500 rows (2 errors) in 0.250s: 2000 rows/s"
+    assert BatchSummary().rate == 0.0
+
+
+# Test Command Line
+
+def test_main_files(capsys):
+    with TemporaryDirectory() as temp_dir:
+        source = Path(temp_dir) / "ops.jsonl"
+        source.write_text('{"operation": "root", "a": 27, "b": 3}\n', encoding='utf-8')
+        target = Path(temp_dir) / "results.csv"
+        assert main(['--in', str(source), '--out', str(target), '--chunk-size', '10']) == 0
+        assert target.read_text(encoding='utf-8').splitlines()[1] == "1,root,27,3,3,"
+    assert "Processed 1 rows (0 errors)" in capsys.readouterr().err
+
+def test_main_stdin(capsys):
+    with patch('sys.stdin', io.StringIO("operation,a,b\nsubtract,5,7\n")):
+        assert main([]) == 0
+    captured = capsys.readouterr()
+    assert json.loads(captured.out)['result'] == "-2"
+
+def test_main_file_errors(capsys):
+    with TemporaryDirectory() as temp_dir:
+        assert main(['--in', str(Path(temp_dir) / "missing.csv")]) == 2
+        assert "cannot read" in capsys.readouterr().err
+        source = Path(temp_dir) / "ops.csv"
+        source.write_text("add,1,2\n", encoding='utf-8')
+        assert main(['--in', str(source), '--out', str(Path(temp_dir) / "no/such/dir.jsonl")]) == 2
+        assert "cannot write" in capsys.readouterr().err
+
+def test_main_invalid_chunk_size():
+    with pytest.raises(SystemExit):
+        main(['--chunk-size', '0'])
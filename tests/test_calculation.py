@@ -1,9 +1,12 @@
 import pytest
 from decimal import Decimal
 from datetime import datetime
-from app.calculation import Calculation
+from app.calculation import BatchCalculation, Calculation
 from app.exceptions import OperationError
+from app.operations import Operation, OperationFactory
 import logging
+from unittest.mock import patch
+import numpy as np
 
 
 def test_addition():
@@ -186,3 +189,88 @@ def test_repr():
 
 
 
+
+
+def test_batch_to_from_dict():
+    batch = BatchCalculation(
+        operation="Division",
+        operand1=np.array([1.0, 2.0]),
+        operand2=np.array([0.0, 4.0]),
+        result=np.array([np.nan, 0.5]),
+        errors=np.array([True, False])
+    )
+    back = Calculation.from_dict(batch.to_dict())
+    assert isinstance(back, BatchCalculation)
+    assert back == batch
+    assert back.errors.tolist() == [True, False]
+    assert batch != 3
+    assert str(batch) == "Division[2 rows, 1 errors]"
+
+
+def test_batch_invalid_from_dict():
+    with pytest.raises(OperationError, match="Invalid calculation data"):
+        BatchCalculation.from_dict({"operation": "Addition", "operand1": "[1]"})
+
+
+def test_with_result_skips_recompute():
+    with patch.object(Calculation, 'calculate') as mock_calculate:
+        calc = Calculation.with_result("Power", Decimal("2"), Decimal("3"), Decimal("8"))
+        mock_calculate.assert_not_called()
+    assert calc.result == Decimal("8")
+    assert isinstance(calc.timestamp, datetime)
+
+
+def test_with_result_verify_mismatch(caplog):
+    with caplog.at_level(logging.WARNING):
+        calc = Calculation.with_result(
+            "Addition", Decimal("2"), Decimal("3"), Decimal("6"), verify_rate=1.0
+        )
+    assert calc.result == Decimal("5")
+    assert "differs from computed result 5" in caplog.text
+
+
+def test_with_result_sampled_verify():
+    with patch('app.calculation.random.random', return_value=0.9), \
+         patch.object(Calculation, 'verify') as mock_verify:
+        Calculation.with_result("Addition", Decimal("2"), Decimal("3"), Decimal("5"), verify_rate=0.5)
+        mock_verify.assert_not_called()
+    with patch('app.calculation.random.random', return_value=0.1), \
+         patch.object(Calculation, 'verify') as mock_verify:
+        Calculation.with_result("Addition", Decimal("2"), Decimal("3"), Decimal("5"), verify_rate=0.5)
+        mock_verify.assert_called_once()
+
+
+def test_verify_unknown_operation(caplog):
+    calc = Calculation.with_result("Custom", Decimal("2"), Decimal("3"), Decimal("5"))
+    with caplog.at_level(logging.WARNING):
+        assert calc.verify() is False
+    assert "Could not verify" in caplog.text
+    assert Calculation.with_result("Addition", Decimal("2"), Decimal("3"), Decimal("5")).verify()
+
+
+def test_from_dict_without_verify():
+    data = {
+        "operation": "Addition",
+        "operand1": "2",
+        "operand2": "3",
+        "result": "10",
+        "timestamp": datetime.now().isoformat()
+    }
+    assert Calculation.from_dict(data, verify_rate=0.0).result == Decimal("10")
+
+
+def test_calculation_failed():
+    with pytest.raises(OperationError, match="Calculation failed"):
+        Calculation(operation="Power", operand1=Decimal("10"), operand2=Decimal("1000000"))
+
+
+def test_custom_operation_recompute():
+    class Average(Operation):
+        def execute(self, a: Decimal, b: Decimal) -> Decimal:
+            return (a + b) / 2
+
+    OperationFactory.register_operation("average", Average)
+    calc = Calculation(operation="Average", operand1=Decimal("2"), operand2=Decimal("4"))
+    assert calc.result == Decimal("3")
+    loaded = Calculation.from_dict(calc.to_dict())
+    assert loaded.result == Decimal("3")
@@ -1,15 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+import itertools
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import pytest
-from unittest.mock import Mock, mock_open, patch, PropertyMock
-from decimal import Decimal
+from unittest.mock import call, Mock, mock_open, patch, PropertyMock
+from decimal import Decimal, ROUND_HALF_EVEN, getcontext
 from tempfile import TemporaryDirectory
+from app.calculation import BatchCalculation
 from app.calculator import Calculator
 from app.calculator_config import CalculatorConfig
 from app.calculator_memento import CalculatorMemento
 from app.exceptions import OperationError, ValidationError
-from app.history import LoggingObserver
+from app.history import AutoSaveObserver, LoggingObserver, StatsObserver
+from app.history_storage import FileHistoryStorage, SQLiteHistoryStorage
 from app.operations import OperationFactory
 
 # Fixture to initialize Calculator with a temporary directory for file paths
@@ -153,18 +158,14 @@ def test_history_max():
  #    assert result == Decimal('5')
 
 
-@patch('app.calculator.pd.read_csv')
-@patch('app.calculator.Path.exists', return_value=True)
-def test_load_history(mock_exists, mock_read_csv, calculator):
-    # Mock CSV data to match the expected format in from_dict
-    mock_read_csv.return_value = pd.DataFrame({
-        'operation': ['Addition'],
-        'operand1': ['2'],
-        'operand2': ['3'],
-        'result': ['5'],
-        'timestamp': [datetime.datetime.now().isoformat()]
-    })
-    
+def test_load_history(calculator):
+    # Write CSV data in the format save_history produces
+    calculator.config.history_file.parent.mkdir(parents=True, exist_ok=True)
+    calculator.config.history_file.write_text(
+        "operation,operand1,operand2,result,timestamp\n"
+        f"Addition,2,3,5,{datetime.datetime.now().isoformat()}\n"
+    )
+
     # Test the load_history functionality
     try:
         calculator.load_history()
@@ -181,24 +182,27 @@ def test_load_history(mock_exists, mock_read_csv, calculator):
 
 # Test load history failure
 
-@patch('app.calculator.pd.read_csv')
+@patch('app.history_storage.read_csv_history')
 @patch('app.calculator.Path.exists', return_value=True)
-def test_load_history(mock_exists, mock_read_csv, calculator):
-    # Mock CSV data to match the expected format in from_dict
-    mock_read_csv.return_value = pd.DataFrame({
-        'operation': ['Addition'],
-        'operand1': ['2'],
-        'operand2': ['3'],
-        'result': ['5'],
-        'timestamp': [datetime.datetime.now().isoformat()]
-    })
-    
+def test_load_history_failure(mock_exists, mock_read_csv_history, calculator):
     # Test the load_history functionality
     simulated_error_message = "Simulated disk full error during save."
-    mock_read_csv.side_effect = IOError(simulated_error_message)
+    mock_read_csv_history.side_effect = IOError(simulated_error_message)
     with pytest.raises(OperationError):
         calculator.load_history()
-        
+
+
+def test_load_history_reads_only_kept_rows(calculator):
+    calculator.config.max_history_size = 3
+    calculator.history.resize(3)
+    calculator.config.history_file.parent.mkdir(parents=True, exist_ok=True)
+    calculator.config.history_file.write_text(
+        "operation,operand1,operand2,result,timestamp\n" +
+        "".join(f"Addition,{i},1,{i + 1},2024-01-01T00:00:{i:02d}\n" for i in range(10))
+    )
+    with patch('app.history_format.TAIL_CHUNK_SIZE', 16):
+        calculator.load_history()
+    assert [calc.operand1 for calc in calculator.history] == [Decimal(7), Decimal(8), Decimal(9)]
 
 
 # Test Clearing History
@@ -241,3 +245,814 @@ def test_redo(calculator):
     calculator.undo()
     calculator.redo()
     assert len(calculator.history) == 1
+
+# Test Batch Operations
+
+def test_perform_batch(calculator):
+    result, errors = calculator.perform_batch('divide', [10, 5, 1], [2, 0, 4])
+    assert errors.tolist() == [False, True, False]
+    assert result[0] == 5.0 and result[2] == 0.25
+    assert np.isnan(result[1])
+    assert len(calculator.history) == 1
+    assert isinstance(calculator.history[0], BatchCalculation)
+    assert calculator.show_history() == ["Division[3 rows, 1 errors]"]
+
+def test_perform_batch_invalid_rows(calculator):
+    calculator.config.max_input_value = Decimal('100')
+    result, errors = calculator.perform_batch('add', [1, 1000, float('nan')], 1)
+    assert errors.tolist() == [False, True, True]
+    assert result[0] == 2.0
+
+def test_perform_batch_unknown_operation(calculator):
+    with pytest.raises(OperationError, match="Unknown operation"):
+        calculator.perform_batch('nope', [1], [2])
+
+def test_perform_batch_invalid_arrays(calculator):
+    with pytest.raises(ValidationError):
+        calculator.perform_batch('add', ['x'], [2])
+
+def test_perform_batch_undo(calculator):
+    calculator.perform_batch('multiply', [1, 2], [3, 4])
+    calculator.undo()
+    assert calculator.history == []
+
+def test_save_load_batch_history(calculator):
+    calculator.perform_batch('root', [9, -1], [2, 2])
+    calculator.save_history()
+    calculator.clear_history()
+    calculator.load_history()
+    assert len(calculator.history) == 1
+    batch = calculator.history[0]
+    assert batch.operation == "Root"
+    assert batch.result[0] == 3.0
+    assert batch.errors.tolist() == [False, True]
+
+# Test Bulk Decimal Operations
+
+def test_perform_many(calculator):
+    observer = Mock(spec=LoggingObserver)
+    calculator.add_observer(observer)
+    outcomes = calculator.perform_many([
+        ('add', 2, 3),
+        ('divide', 1, 0),
+        (OperationFactory.create_operation('power'), '2', '10'),
+        ('unknown', 1, 2),
+        ('subtract', 'abc', 1),
+        ('power', -8, '0.5'),
+    ])
+    assert outcomes[0] == Decimal('5')
+    assert isinstance(outcomes[1], ValidationError)
+    assert outcomes[2] == Decimal('1024')
+    assert isinstance(outcomes[3], OperationError)
+    assert isinstance(outcomes[4], ValidationError)
+    assert isinstance(outcomes[5], OperationError)
+    assert len(calculator.history) == 2
+    assert len(calculator.undo_stack) == 1
+    observer.update_batch.assert_called_once()
+
+def test_perform_many_matches_scalar(calculator):
+    rows = [('divide', 1, 3), ('root', 2, 3), ('percent', '7.1', '3')]
+    outcomes = calculator.perform_many(rows)
+    for (op, a, b), outcome in zip(rows, outcomes):
+        calculator.set_operation(OperationFactory.create_operation(op))
+        scalar = calculator.perform_operation(a, b)
+        assert str(outcome) == str(scalar)
+
+def test_perform_many_undo_and_max(calculator):
+    calculator.config.max_history_size = 2
+    calculator.perform_many([('add', i, 1) for i in range(5)])
+    assert [calc.operand1 for calc in calculator.history] == [Decimal('3'), Decimal('4')]
+    calculator.undo()
+    assert calculator.history == []
+
+def test_perform_many_empty(calculator):
+    assert calculator.perform_many([]) == []
+    assert calculator.undo_stack == []
+
+def test_history_max_age(calculator):
+    calculator.config.max_history_age = 60
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    calculator.perform_operation(1, 1)
+    calculator.history[0].timestamp -= datetime.timedelta(seconds=120)
+    calculator.perform_operation(2, 2)
+    assert len(calculator.history) == 1
+    assert calculator.history[0].operand1 == Decimal('2')
+
+def test_undo_redo_steps(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    for i in range(4):
+        calculator.perform_operation(i, 1)
+    assert calculator.version == 4
+    assert calculator.undo(3)
+    assert [calc.operand1 for calc in calculator.history] == [Decimal('0')]
+    assert calculator.redo(2)
+    assert len(calculator.history) == 3
+    assert calculator.version == 3
+
+def test_undo_restores_evicted():
+    config = CalculatorConfig(max_history_size=2)
+    calc = Calculator(config)
+    calc.clear_history()
+    calc.set_operation(OperationFactory.create_operation('add'))
+    for i in range(3):
+        calc.perform_operation(i, 1)
+    assert [c.operand1 for c in calc.history] == [Decimal('1'), Decimal('2')]
+    calc.undo()
+    assert [c.operand1 for c in calc.history] == [Decimal('0'), Decimal('1')]
+    calc.redo()
+    assert [c.operand1 for c in calc.history] == [Decimal('1'), Decimal('2')]
+
+def test_undo_after_history_shrinks_restores_what_fits(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    for i in range(4):
+        calculator.perform_operation(i, 1)
+    calculator.config.max_history_size = 2
+    calculator.perform_operation(10, 1)
+    observer = Mock()
+    calculator.add_observer(observer)
+    with patch.object(calculator.index, 'apply', wraps=calculator.index.apply) as apply:
+        calculator.undo()
+    assert [c.operand1 for c in calculator.history] == [Decimal('2'), Decimal('3')]
+    # Only the entry that fit back in the history is reported as restored
+    assert apply.call_args_list[-1] == call('prepend', [calculator.history[0]])
+    observer.history_changed.assert_called_with('prepend', [calculator.history[0]])
+    assert calculator.query() == list(calculator.history)
+    calculator.redo()
+    assert [c.operand1 for c in calculator.history] == [Decimal('3'), Decimal('10')]
+    assert calculator.query() == list(calculator.history)
+
+def test_undo_large_batch_is_bounded(calculator):
+    calculator.config.max_history_size = 3
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    calculator.perform_operation(100, 1)
+    calculator.perform_many([('add', i, 1) for i in range(50)])
+    delta = calculator.undo_stack[-1]
+    assert len(delta.appended) == 3
+    assert len(delta.evicted) == 1
+    calculator.undo()
+    assert [c.operand1 for c in calculator.history] == [Decimal('100')]
+
+def test_goto_version(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    for i in range(3):
+        calculator.perform_operation(i, 1)
+    assert calculator.goto_version(1)
+    assert len(calculator.history) == 1
+    assert calculator.goto_version(3)
+    assert len(calculator.history) == 3
+    assert not calculator.goto_version(3)
+    assert not calculator.goto_version(7)
+
+def test_create_restore_memento(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    calculator.perform_operation(1, 1)
+    memento = calculator.create_memento()
+    calculator.perform_operation(2, 2)
+    calculator.restore_memento(memento)
+    assert calculator.history == memento.history
+    assert calculator.undo_stack == []
+
+# Test Journal Auto-Save Mode
+
+def make_journal_calculator(temp_path, **kwargs):
+    config = CalculatorConfig(base_dir=temp_path, auto_save=True, auto_save_mode='journal', **kwargs)
+    with patch.object(CalculatorConfig, 'history_dir', new_callable=PropertyMock) as mock_history_dir, \
+         patch.object(CalculatorConfig, 'history_file', new_callable=PropertyMock) as mock_history_file:
+        mock_history_dir.return_value = temp_path / "history"
+        mock_history_file.return_value = temp_path / "history/calculator_history.csv"
+        calc = Calculator(config)
+        calc.add_observer(AutoSaveObserver(calc))
+        yield calc
+
+def test_journal_replay_on_startup():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for calc in make_journal_calculator(temp_path):
+            calc.set_operation(OperationFactory.create_operation('add'))
+            calc.perform_operation(1, 2)
+            calc.perform_operation(3, 4)
+            calc.perform_many([('multiply', 2, 5)])
+            calc.undo()
+            calc.undo()
+            calc.redo()
+            assert not (temp_path / "history/calculator_history.csv").exists()
+            expected = calc.history.copy()
+            calc.close()
+        for calc in make_journal_calculator(temp_path):
+            assert calc.history == expected
+
+def test_journal_clear_and_save():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for calc in make_journal_calculator(temp_path):
+            calc.set_operation(OperationFactory.create_operation('add'))
+            calc.perform_operation(1, 2)
+            calc.clear_history()
+            calc.perform_operation(5, 5)
+            calc.save_history()
+            assert not calc.config.journal_file.exists()
+        for calc in make_journal_calculator(temp_path):
+            assert [c.result for c in calc.history] == [Decimal('10')]
+
+def test_journal_compaction():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for calc in make_journal_calculator(temp_path, journal_compact_every=2):
+            calc.set_operation(OperationFactory.create_operation('add'))
+            calc.perform_operation(1, 2)
+            calc.perform_operation(3, 4)
+            calc._wait_for_compaction()
+            assert (temp_path / "history/calculator_history.csv").exists()
+            assert not calc.journal.rotated_path.exists()
+            calc.perform_operation(5, 6)
+            calc.journal.close()
+        for calc in make_journal_calculator(temp_path):
+            assert [c.result for c in calc.history] == [Decimal('3'), Decimal('7'), Decimal('11')]
+            restored = calc.create_memento()
+            calc.clear_history()
+            calc.restore_memento(restored)
+            assert len(calc.history) == 3
+
+def test_compact_history_without_journal(calculator):
+    assert not calculator.compact_history()
+
+@patch('app.calculator.logging.error')
+def test_compact_history_in_flight_and_failure(logging_error_mock):
+    with TemporaryDirectory() as temp_dir:
+        for calc in make_journal_calculator(Path(temp_dir)):
+            calc._compaction_thread = Mock(is_alive=Mock(return_value=True))
+            assert not calc.compact_history()
+            calc._compaction_thread = None
+            with patch.object(FileHistoryStorage, 'save', side_effect=IOError("disk full")):
+                assert calc.compact_history()
+                calc._wait_for_compaction()
+            logging_error_mock.assert_any_call("Failed to compact history journal: disk full")
+
+# Test Background Auto-Save
+
+def make_background_calculator(temp_path, **kwargs):
+    config = CalculatorConfig(base_dir=temp_path, auto_save=True, auto_save_mode='background', **kwargs)
+    with patch.object(CalculatorConfig, 'history_dir', new_callable=PropertyMock) as mock_history_dir, \
+         patch.object(CalculatorConfig, 'history_file', new_callable=PropertyMock) as mock_history_file:
+        mock_history_dir.return_value = temp_path / "history"
+        mock_history_file.return_value = temp_path / "history/calculator_history.csv"
+        calc = Calculator(config)
+        calc.add_observer(AutoSaveObserver(calc))
+        yield calc
+        calc.close()
+
+def test_background_save_is_coalesced():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for calc in make_background_calculator(temp_path, save_flush_every=1000, save_flush_interval_ms=60000):
+            calc.set_operation(OperationFactory.create_operation('add'))
+            with patch.object(calc.storage, 'save', wraps=calc.storage.save) as mock_write:
+                for i in range(20):
+                    calc.perform_operation(i, 1)
+                calc.perform_many([('multiply', 2, 5), ('subtract', 9, 4)])
+                assert calc.unsaved_changes == 22
+                assert calc.save_staleness > 0
+                mock_write.assert_not_called()
+                assert calc.writer.flush(timeout=5)
+                mock_write.assert_called_once()
+            assert calc.unsaved_changes == 0
+            assert calc.save_staleness == 0.0
+            df = pd.read_csv(temp_path / "history/calculator_history.csv", dtype=str)
+            assert len(df) == 22
+
+def test_background_save_flushed_on_close():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for calc in make_background_calculator(temp_path, save_flush_every=1000, save_flush_interval_ms=60000):
+            calc.set_operation(OperationFactory.create_operation('add'))
+            calc.perform_operation(2, 3)
+            expected = calc.history.copy()
+        for calc in make_background_calculator(temp_path):
+            assert calc.history == expected
+
+def test_explicit_save_covers_pending_changes():
+    with TemporaryDirectory() as temp_dir:
+        for calc in make_background_calculator(Path(temp_dir), save_flush_every=1000, save_flush_interval_ms=60000):
+            calc.set_operation(OperationFactory.create_operation('add'))
+            calc.perform_operation(2, 3)
+            calc.save_history()
+            assert calc.unsaved_changes == 0
+
+def test_no_background_writer_by_default(calculator):
+    assert calculator.writer is None
+    assert calculator.unsaved_changes == 0
+    assert calculator.save_staleness == 0.0
+    calculator.close()
+
+# Test Binary History Format
+
+def test_binary_history_file_round_trip():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        config = CalculatorConfig(base_dir=temp_path, history_format='auto')
+        with patch.object(CalculatorConfig, 'history_dir', new_callable=PropertyMock) as mock_history_dir, \
+             patch.object(CalculatorConfig, 'history_file', new_callable=PropertyMock) as mock_history_file:
+            mock_history_dir.return_value = temp_path / "history"
+            mock_history_file.return_value = temp_path / "history/calculator_history.bin"
+            calc = Calculator(config)
+            assert config.history_file_format == 'binary'
+            calc.set_operation(OperationFactory.create_operation('divide'))
+            calc.perform_operation(1, 3)
+            calc.perform_batch('add', [1, 2], [3, np.nan])
+            calc.save_history()
+            assert config.history_file.read_bytes().startswith(b'CALCHIST')
+            expected = calc.history.copy()
+            assert Calculator(config).history == expected
+
+def test_export_import_history(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    calculator.perform_operation(2, 3)
+    calculator.perform_operation(4, 5)
+    expected = calculator.history.copy()
+    with TemporaryDirectory() as temp_dir:
+        for name in ('export.csv', 'export.bin'):
+            path = Path(temp_dir) / name
+            calculator.export_history(path)
+            calculator.clear_history()
+            calculator.import_history(path)
+            assert calculator.history == expected
+            assert not calculator.undo_stack
+        df = pd.read_csv(Path(temp_dir) / 'export.csv', dtype=str)
+        assert df['result'].tolist() == ['5', '9']
+
+@patch('app.calculator.logging.error')
+def test_export_import_history_failure(logging_error_mock, calculator):
+    with TemporaryDirectory() as temp_dir:
+        with pytest.raises(OperationError, match="Failed to import history"):
+            calculator.import_history(Path(temp_dir) / 'missing.bin')
+        with patch('app.history_storage.write_binary_history', side_effect=IOError("disk full")):
+            with pytest.raises(OperationError, match="Failed to export history: disk full"):
+                calculator.export_history(Path(temp_dir) / 'export.bin')
+
+# Test Memory-Mapped History Access
+
+def test_history_window_from_file(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    for i in range(5):
+        calculator.perform_operation(i, 1)
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / 'archive.bin'
+        calculator.export_history(path)
+        calculator.clear_history()
+        with calculator.open_history_reader(path) as reader:
+            window = reader[1:3]
+            assert calculator.show_history(window) == ["Addition(1, 1) = 2", "Addition(2, 1) = 3"]
+            df = calculator.get_history_dataframe(window)
+            assert df['result'].tolist() == ['2', '3']
+            assert len(calculator.get_history_dataframe(list(window))) == 2
+        assert calculator.show_history() == []
+
+def test_open_history_reader_requires_binary(calculator):
+    with pytest.raises(OperationError, match="requires a binary history file"):
+        calculator.open_history_reader()
+    with pytest.raises(OperationError, match="requires a binary history file"):
+        calculator.open_history_reader('archive.csv')
+
+# Test SQLite History Backend
+
+def make_sqlite_calculator(temp_path, **kwargs):
+    config = CalculatorConfig(base_dir=temp_path, history_backend='sqlite', **kwargs)
+    with patch.object(CalculatorConfig, 'history_dir', new_callable=PropertyMock) as mock_history_dir, \
+         patch.object(CalculatorConfig, 'history_db_file', new_callable=PropertyMock) as mock_db_file:
+        mock_history_dir.return_value = temp_path / "history"
+        mock_db_file.return_value = temp_path / "history/calculator_history.db"
+        calc = Calculator(config)
+        calc.add_observer(AutoSaveObserver(calc))
+        yield calc
+        calc.close()
+
+def test_sqlite_backend_commits_each_calculation():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for calc in make_sqlite_calculator(temp_path, auto_save=True, auto_save_mode='background'):
+            assert isinstance(calc.storage, SQLiteHistoryStorage)
+            # The database persists each change itself
+            assert calc.journal is None and calc.writer is None
+            calc.set_operation(OperationFactory.create_operation('add'))
+            calc.perform_operation(2, 3)
+            calc.perform_many([('multiply', 2, 5), ('subtract', 9, 4)])
+            reader = SQLiteHistoryStorage(temp_path / "history/calculator_history.db")
+            try:
+                assert len(reader.load()) == 3
+                # Undo is committed along with the next calculation
+                calc.undo()
+                calc.perform_operation(1, 1)
+                assert [entry.result for entry in reader.load()] == [Decimal('5'), Decimal('2')]
+                calc.clear_history()
+                calc.save_history()
+                assert reader.load() == []
+            finally:
+                reader.close()
+
+def test_sqlite_backend_load_discards_unsaved_changes():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for calc in make_sqlite_calculator(temp_path, auto_save=False):
+            calc.set_operation(OperationFactory.create_operation('add'))
+            calc.perform_operation(2, 3)
+            calc.save_history()
+            calc.perform_operation(4, 5)
+            calc.load_history()
+            assert [entry.result for entry in calc.history] == [Decimal('5')]
+            assert not calc.undo()
+
+def test_sqlite_backend_trims_to_history_size():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for calc in make_sqlite_calculator(temp_path, auto_save=True, max_history_size=10):
+            calc.set_operation(OperationFactory.create_operation('add'))
+            for i in range(5):
+                calc.perform_operation(i, 1)
+        for calc in make_sqlite_calculator(temp_path, auto_save=True, max_history_size=2):
+            assert [entry.result for entry in calc.history] == [Decimal('4'), Decimal('5')]
+            assert len(calc.storage.load()) == 2
+
+def test_sqlite_backend_answers_queries():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for calc in make_sqlite_calculator(temp_path, auto_save=False):
+            calc.set_operation(OperationFactory.create_operation('add'))
+            for i in range(3):
+                calc.perform_operation(i, 1)
+            calc.perform_many([('multiply', 2, 5)])
+            with patch.object(calc.storage, 'query', wraps=calc.storage.query) as query, \
+                 patch.object(calc.index, 'query', wraps=calc.index.query) as index_query:
+                # Unsaved rows are visible to the database's own queries
+                assert calc.query('add', limit=2) == list(calc.history)[1:3]
+                query.assert_called_once_with("Addition", None, None, 2)
+                index_query.assert_not_called()
+                # The database does not compare results, so the index answers
+                assert calc.query(result_range=(10, None)) == [calc.history[-1]]
+                index_query.assert_called_once()
+                query.assert_called_once()
+
+def test_sqlite_backend_commits_on_close():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for calc in make_sqlite_calculator(temp_path, auto_save=False):
+            calc.set_operation(OperationFactory.create_operation('add'))
+            calc.perform_operation(2, 3)
+        for calc in make_sqlite_calculator(temp_path, auto_save=False):
+            assert [entry.result for entry in calc.history] == [Decimal('5')]
+
+# Test History Queries
+
+def test_query_history(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    for i in range(5):
+        calculator.perform_operation(i, 1)
+    calculator.set_operation(OperationFactory.create_operation('multiply'))
+    calculator.perform_operation(3, 3)
+    assert calculator.show_history(calculator.query('add', result_range=(2, '4'))) == [
+        "Addition(1, 1) = 2", "Addition(2, 1) = 3", "Addition(3, 1) = 4"
+    ]
+    assert calculator.query("Multiplication") == calculator.query(result_range=(9, None))
+    assert len(calculator.query(since=datetime.datetime(2000, 1, 1), limit=2)) == 2
+    assert calculator.query(until=datetime.datetime(2000, 1, 1)) == []
+
+def test_query_follows_history_changes(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    calculator.perform_operation(2, 3)
+    calculator.perform_many([('multiply', 2, 5), ('subtract', 9, 4)])
+    assert len(calculator.query(result_range=(5, 5))) == 2
+    calculator.undo()
+    assert len(calculator.query(result_range=(5, 5))) == 1
+    calculator.redo()
+    assert calculator.query('multiply')[0].result == Decimal('10')
+    calculator.save_history()
+    calculator.clear_history()
+    assert calculator.query() == []
+    calculator.load_history()
+    assert len(calculator.query()) == 3
+
+def test_query_validation(calculator):
+    with pytest.raises(ValidationError, match="Unknown operation: nope"):
+        calculator.query('nope')
+    with pytest.raises(ValidationError, match="Invalid result bound"):
+        calculator.query(result_range=('x', None))
+    with pytest.raises(ValidationError, match="Invalid result bound"):
+        calculator.query(result_range=(None, 'NaN'))
+
+# Test Result Statistics
+
+def test_stats_observer_follows_undo_redo_and_clear(calculator):
+    stats = StatsObserver()
+    calculator.add_observer(stats)
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    calculator.perform_operation(2, 3)
+    calculator.perform_many([('add', 1, 1), ('multiply', 2, 5)])
+    assert stats.statistics()["Addition"]['count'] == 2
+    calculator.undo()
+    assert stats.statistics() == {"Addition": stats.statistics()["Addition"]}
+    assert stats.statistics()["Addition"]['max'] == 5.0
+    calculator.redo()
+    assert stats.statistics()["Multiplication"]['mean'] == 10.0
+    calculator.save_history()
+    calculator.clear_history()
+    assert stats.statistics() == {}
+    calculator.load_history()
+    assert stats.statistics()["Addition"]['sum'] == 7.0
+
+# Test Operation Cache
+
+def test_operation_cache_answers_repeated_calculations(calculator):
+    calculator.set_operation(OperationFactory.create_operation('power'))
+    calculator.perform_operation(2, 10)
+    calculator.perform_many([('power', 2, 10), ('power', 3, 2)])
+    assert calculator.operation_cache.statistics()['hits'] == 1
+    assert [entry.result for entry in calculator.history] == [Decimal('1024')] * 2 + [Decimal('9')]
+
+def test_operation_cache_persists_across_runs():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        config = CalculatorConfig(base_dir=temp_path, auto_save=False, operation_cache_persist=True)
+        with patch.object(CalculatorConfig, 'history_dir', new_callable=PropertyMock) as mock_history_dir, \
+             patch.object(CalculatorConfig, 'history_file', new_callable=PropertyMock) as mock_history_file:
+            mock_history_dir.return_value = temp_path / "history"
+            mock_history_file.return_value = temp_path / "history/calculator_history.csv"
+            calc = Calculator(config)
+            calc.set_operation(OperationFactory.create_operation('root'))
+            calc.perform_operation(27, 3)
+            calc.close()
+            restarted = Calculator(config)
+            restarted.set_operation(OperationFactory.create_operation('root'))
+            restarted.perform_operation(27, 3)
+            assert restarted.operation_cache.hits == 1
+            with patch('app.operation_cache.dbm.open', side_effect=OSError("read-only")), \
+                 patch('app.calculator.logging.warning') as logging_warning_mock:
+                restarted.close()
+            logging_warning_mock.assert_called_once_with("Could not save operation cache: read-only")
+
+def test_operation_cache_can_be_disabled():
+    with TemporaryDirectory() as temp_dir:
+        calc = Calculator(CalculatorConfig(base_dir=Path(temp_dir), operation_cache_size=0, auto_save=False))
+        calc.set_operation(OperationFactory.create_operation('add'))
+        assert calc.perform_operation(2, 3) == Decimal('5')
+        assert calc.operation_cache is None
+
+# Test Decimal Context
+
+def test_decimal_context_follows_config():
+    with TemporaryDirectory() as temp_dir:
+        config = CalculatorConfig(
+            base_dir=Path(temp_dir), auto_save=False, precision=4, guard_digits=2, rounding='round_down'
+        )
+        calc = Calculator(config)
+        calc.set_operation(OperationFactory.create_operation('divide'))
+        assert calc.perform_operation(2, 3) == Decimal('0.666666')
+        assert calc.perform_many([('divide', 2, 3)]) == [Decimal('0.666666')]
+        # Exact powers are rounded to the context like every other result
+        assert str(calc.perform_many([('power', 10, 999)])[0]) == '1.00000E+999'
+        # The global context is left alone
+        assert getcontext().prec == 28
+        assert getcontext().rounding == ROUND_HALF_EVEN
+
+def test_decimal_context_is_per_calculator():
+    with TemporaryDirectory() as temp_dir:
+        calcs = [
+            Calculator(CalculatorConfig(base_dir=Path(temp_dir), auto_save=False, precision=p, guard_digits=0))
+            for p in (5, 40)
+        ]
+        for calc in calcs:
+            calc.set_operation(OperationFactory.create_operation('root'))
+
+        def run(calc):
+            return {calc.perform_operation(2, n) for n in (2, 2, 2, 2)}
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(run, calcs * 4))
+        assert all(len(r) == 1 for r in results)
+        assert {len(next(iter(r)).as_tuple().digits) for r in results} == {5, 40}
+
+def test_loaded_results_verified_in_calculator_context():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        config = CalculatorConfig(base_dir=temp_path, auto_save=False, precision=4, guard_digits=2, verify_rate=1.0)
+        with patch.object(CalculatorConfig, 'history_dir', new_callable=PropertyMock) as mock_history_dir, \
+             patch.object(CalculatorConfig, 'history_file', new_callable=PropertyMock) as mock_history_file:
+            mock_history_dir.return_value = temp_path / "history"
+            mock_history_file.return_value = temp_path / "history/calculator_history.csv"
+            calc = Calculator(config)
+            calc.set_operation(OperationFactory.create_operation('divide'))
+            calc.perform_operation(1, 7)
+            calc.save_history()
+            with patch('app.calculation.logging.warning') as logging_warning_mock:
+                restarted = Calculator(config)
+            logging_warning_mock.assert_not_called()
+            assert restarted.history[0].result == Decimal('0.142857')
+
+# Test Expressions
+
+def test_evaluate_records_outermost_operation(calculator):
+    result = calculator.evaluate("(2.5 ^ 3 + root(56.25, 2)) % x", {'x': 7})
+    assert result == Decimal('2.125')
+    entry = calculator.history[-1]
+    assert entry.operation == "Modulus"
+    assert (entry.operand1, entry.operand2, entry.result) == (Decimal('23.125'), Decimal('7'), Decimal('2.125'))
+    assert entry.verify()
+    calculator.undo()
+    assert calculator.history == []
+
+def test_evaluate_plain_value_is_not_recorded(calculator):
+    assert calculator.evaluate("x", {'x': '2.50'}) == Decimal('2.5')
+    assert calculator.history == []
+
+def test_evaluate_errors(calculator):
+    with patch('app.calculator.logging.error') as logging_error_mock:
+        with pytest.raises(ValidationError, match="Invalid number format"):
+            calculator.evaluate("x + 1", {'x': 'abc'})
+        with pytest.raises(ValidationError, match="Invalid expression"):
+            calculator.evaluate("x +")
+    assert logging_error_mock.call_count == 2
+    assert calculator.history == []
+
+# Test Formulas
+
+def test_define_formula_is_usable_everywhere(calculator):
+    calculator.define_formula("spread(x, y) = abs_diff(x, y) / y * 100")
+    calculator.set_operation(OperationFactory.create_operation('spread'))
+    assert calculator.perform_operation(12, 10) == Decimal('20')
+    assert calculator.perform_many([('spread', 15, 10), ('spread', 1, 0)])[0] == Decimal('50')
+    result, errors = calculator.perform_batch('spread', [12, 5], [10, 0])
+    assert result[0] == pytest.approx(20.0)
+    assert errors.tolist() == [False, True]
+    assert calculator.evaluate("spread(9, 10) + 1") == Decimal('11')
+    assert [entry.operation for entry in calculator.history][:3] == ['spread'] * 3
+
+def test_define_formula_error(calculator):
+    with patch('app.calculator.logging.error') as logging_error_mock:
+        with pytest.raises(ValidationError, match="Cannot redefine operation: divide"):
+            calculator.define_formula("divide(x, y) = x * y")
+    logging_error_mock.assert_called_once()
+
+def test_formulas_file_loaded_before_history():
+    with TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        (temp_path / "formulas.txt").write_text("cube_sum(x, y) = x ^ 3 + y ^ 3\n", encoding='utf-8')
+        (temp_path / "history").mkdir()
+        (temp_path / "history/calculator_history.csv").write_text(
+            "operation,operand1,operand2,result,timestamp\ncube_sum,1,2,9,2024-01-01T12:00:00\n", encoding='utf-8'
+        )
+        config = CalculatorConfig(base_dir=temp_path, auto_save=False, verify_rate=1.0)
+        with patch.object(CalculatorConfig, 'history_dir', new_callable=PropertyMock) as mock_history_dir, \
+             patch.object(CalculatorConfig, 'history_file', new_callable=PropertyMock) as mock_history_file, \
+             patch.object(CalculatorConfig, 'formulas_file', new_callable=PropertyMock) as mock_formulas_file:
+            mock_history_dir.return_value = temp_path / "history"
+            mock_history_file.return_value = temp_path / "history/calculator_history.csv"
+            mock_formulas_file.return_value = temp_path / "formulas.txt"
+            with patch('app.calculation.logging.warning') as logging_warning_mock:
+                calc = Calculator(config)
+            logging_warning_mock.assert_not_called()
+            assert calc.history[0].result == Decimal('9')
+
+def test_perform_many_without_recording(calculator):
+    assert calculator.perform_many([('add', 2, 3), ('divide', 1, 0)], record=False)[0] == Decimal('5')
+    assert calculator.history == []
+    assert calculator.undo_stack == []
+
+# Test Streaming
+
+def test_stream_is_lazy(calculator):
+    rows = (('add', n, 1) for n in itertools.count())
+    outcomes = calculator.stream(rows, chunk_size=10)
+    assert list(itertools.islice(outcomes, 25)) == [Decimal(n + 1) for n in range(25)]
+    # Two full chunks were committed; the rest is committed when the stream is closed
+    assert len(calculator.history) == 20
+    outcomes.close()
+    assert len(calculator.history) == 25
+    assert len(calculator.undo_stack) == 1
+
+def test_stream_reports_errors_in_place(calculator):
+    outcomes = list(calculator.stream([('divide', 1, 0), ('power', 2, 3), ('bogus', 1, 1)]))
+    assert isinstance(outcomes[0], ValidationError)
+    assert outcomes[1] == Decimal('8')
+    assert isinstance(outcomes[2], OperationError)
+    assert [entry.result for entry in calculator.history] == [Decimal('8')]
+
+def test_stream_notifies_observers_per_chunk(calculator):
+    observer = Mock(spec=LoggingObserver)
+    calculator.add_observer(observer)
+    for _ in calculator.stream((('multiply', n, 2) for n in range(25)), chunk_size=10):
+        pass
+    assert [len(call.args[0]) for call in observer.update_batch.call_args_list] == [10, 10, 5]
+    observer.update.assert_not_called()
+
+def test_stream_memory_bounded_by_history_size(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    calculator.perform_operation(1, 1)
+    before = list(calculator.history)
+    calculator.config.max_history_size = 50
+    for _ in calculator.stream((('add', n, 0) for n in range(5000)), chunk_size=100):
+        pass
+    delta = calculator.undo_stack[-1]
+    assert len(delta.appended) == 50
+    assert len(calculator.history) == 50
+    calculator.undo()
+    assert list(calculator.history) == before
+
+def test_stream_starts_new_undo_step_after_other_changes(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    outcomes = calculator.stream((('add', n, 0) for n in range(4)), chunk_size=2)
+    next(outcomes), next(outcomes)
+    calculator.perform_operation(5, 5)
+    list(outcomes)
+    assert len(calculator.undo_stack) == 3
+
+
+# Test Parallel Evaluation
+
+def test_perform_parallel_inline_matches_perform_many(calculator):
+    rows = [('divide', n, 7) for n in range(1, 30)] + [('root', 2, 3), ('divide', 1, 0), ('bogus', 1, 1)]
+    observer = Mock(spec=LoggingObserver)
+    calculator.add_observer(observer)
+    outcomes = calculator.perform_parallel(rows, workers=1, chunk_size=8)
+    expected = calculator.perform_many(rows, record=False)
+    assert [str(outcome) for outcome in outcomes] == [str(outcome) for outcome in expected]
+    assert isinstance(outcomes[-2], ValidationError)
+    assert isinstance(outcomes[-1], OperationError)
+    assert len(calculator.history) == 30
+    assert calculator.history[0].operation == 'Division'
+    assert len(calculator.undo_stack) == 1
+    observer.update_batch.assert_called_once()
+
+def test_perform_parallel_accepts_operation_instances(calculator):
+    operation = OperationFactory.create_operation('multiply')
+    assert calculator.perform_parallel([(operation, 6, 7)]) == [Decimal('42')]
+    assert calculator.history[-1].operation == 'Multiplication'
+
+def test_perform_parallel_rows_with_separators_match_perform_many(calculator):
+    rows = [('add', 1, 1), ('add', '1\x1f2', '3'), ('add', 2, 2), ('add', '\x1e5', 1), ('b\x1fgus', 1, 1)]
+    outcomes = calculator.perform_parallel(rows, workers=1, chunk_size=2)
+    expected = calculator.perform_many(rows, record=False)
+    assert [repr(outcome) for outcome in outcomes] == [repr(outcome) for outcome in expected]
+    assert outcomes[:4] == [Decimal('2'), outcomes[1], Decimal('4'), Decimal('6')]
+    assert str(outcomes[1]) == "Invalid number format: 1\x1f2"
+    assert [calc.result for calc in calculator.history] == [Decimal('2'), Decimal('4'), Decimal('6')]
+
+def test_perform_parallel_empty(calculator):
+    assert calculator.perform_parallel([]) == []
+    assert calculator.undo_stack == []
+
+def test_perform_parallel_worker_processes(calculator):
+    calculator.define_formula("weighted(x, y) = x * 3 + y")
+    rows = [('weighted' if n % 2 else 'add', n, '0.5') for n in range(40)]
+    outcomes = calculator.perform_parallel(rows, workers=2, chunk_size=10)
+    assert outcomes == [Decimal(n) * 3 + Decimal('0.5') if n % 2 else Decimal(n) + Decimal('0.5') for n in range(40)]
+    assert [calc.operand1 for calc in calculator.history] == [Decimal(n) for n in range(40)]
+    assert calculator.undo()
+    assert len(calculator.history) == 0
+
+
+# Test Concurrent Use
+
+def test_perform_operation_with_operation_argument(calculator):
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    assert calculator.perform_operation(2, 3, OperationFactory.create_operation('multiply')) == Decimal('6')
+    assert calculator.history[-1].operation == 'Multiplication'
+    assert calculator.operation_strategy == OperationFactory.create_operation('add')
+
+def test_concurrent_mode_keeps_operation_per_thread(calculator):
+    calculator.config.concurrent = True
+    calculator.set_operation(OperationFactory.create_operation('add'))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(lambda: calculator.operation_strategy).result() is None
+        executor.submit(calculator.set_operation, OperationFactory.create_operation('subtract')).result()
+        assert executor.submit(calculator.perform_operation, 5, 2).result() == Decimal('3')
+    assert calculator.perform_operation(5, 2) == Decimal('7')
+
+def test_history_snapshot_is_shared_until_changed(calculator):
+    operation = OperationFactory.create_operation('add')
+    calculator.perform_operation(1, 1, operation)
+    snapshot = calculator.history_snapshot()
+    assert snapshot == (calculator.history[0],)
+    assert calculator.history_snapshot() is snapshot
+    calculator.perform_operation(2, 2, operation)
+    assert snapshot == (calculator.history[0],)
+    assert len(calculator.history_snapshot()) == 2
+    calculator.undo()
+    assert calculator.show_history() == [str(calculator.history[0])]
+
+def test_shared_calculator_across_threads(calculator):
+    calculator.config.concurrent = True
+    calculator.config.max_history_size = 10000
+    operations = [OperationFactory.create_operation(name) for name in ('add', 'subtract', 'multiply', 'power')]
+
+    def work(worker):
+        operation = operations[worker % len(operations)]
+        for n in range(200):
+            if n % 50 == 0:
+                calculator.set_operation(operation)
+                snapshot = calculator.history_snapshot()
+                assert len(calculator.get_history_dataframe()) >= len(snapshot)
+            assert calculator.perform_operation(worker, n % 7) == operation.execute(Decimal(worker), Decimal(n % 7))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(8)))
+    assert len(calculator.history) == 1600
+    assert len(calculator.undo_stack) == 1600
+    assert calculator.history_snapshot() == tuple(calculator.history)
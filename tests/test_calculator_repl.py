@@ -1,6 +1,10 @@
 # Test REPL Commands (using patches for input/output handling)
 
-from unittest.mock import patch
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch, PropertyMock
+from app.calculator_config import CalculatorConfig
+from app.exceptions import OperationError
 
 from app.calculator_repl import COMMAND_TEXT, ERROR_TEXT, WARNING_TEXT, calculator_repl, NORMAL_TEXT, NUMBER1_TEXT, NUMBER2_TEXT, NUMBER3_TEXT
 
@@ -221,3 +225,92 @@ def test_calculator_repl_interrupt(mock_print, mock_input):
         #mock_perform_oper.assert_called_once()
         mock_print.assert_any_call("\nOperation cancelled")
 
+
+@patch('builtins.input', side_effect=['add', '1', '2', 'add', '3', '4', 'undo 2', 'redo 2', 'exit'])
+@patch('builtins.print')
+def test_calculator_repl_undo_redo_steps(mock_print, mock_input):
+    calculator_repl()
+    mock_print.assert_any_call("Operation undone")
+    mock_print.assert_any_call("Operation redone")
+
+@patch('builtins.input', side_effect=['undo x', 'redo 0', 'exit'])
+@patch('builtins.print')
+def test_calculator_repl_undo_redo_invalid_steps(mock_print, mock_input):
+    calculator_repl()
+    mock_print.assert_any_call(ERROR_TEXT+"Usage: undo [n]")
+    mock_print.assert_any_call(ERROR_TEXT+"Usage: redo [n]")
+
+
+@patch('builtins.input', side_effect=['export', 'history.bin', 'import', 'history.bin', 'export', '', 'exit'])
+@patch('builtins.print')
+def test_calculator_repl_export_import(mock_print, mock_input):
+    with patch('app.calculator.Calculator.export_history') as mock_export, \
+         patch('app.calculator.Calculator.import_history') as mock_import:
+        calculator_repl()
+        mock_export.assert_called_once_with('history.bin')
+        mock_import.assert_called_once_with('history.bin')
+    mock_print.assert_any_call("History exported to history.bin")
+    mock_print.assert_any_call("History imported from history.bin")
+    mock_print.assert_any_call(NORMAL_TEXT+"Operation cancelled")
+
+
+@patch('builtins.input', side_effect=['import', 'missing.csv', 'exit'])
+@patch('builtins.print')
+def test_calculator_repl_import_failure(mock_print, mock_input):
+    with patch('app.calculator.Calculator.import_history', side_effect=OperationError("no such file")):
+        calculator_repl()
+    mock_print.assert_any_call(ERROR_TEXT+ "Error: no such file")
+
+
+@patch('builtins.input', side_effect=['add', '2', '3', 'search', 'add', '2020-01-01', '', '5', '5', 'exit'])
+@patch('builtins.print')
+def test_calculator_repl_search(mock_print, mock_input):
+    calculator_repl()
+    printed = [str(call.args[0]) for call in mock_print.call_args_list if call.args]
+    assert any(line.startswith("Found ") for line in printed)
+    assert any(line.endswith("Addition(2, 3) = 5") for line in printed)
+
+
+@patch('builtins.input', side_effect=['search', '', '', '', '', '', 'search', '', 'yesterday', 'exit'])
+@patch('builtins.print')
+def test_calculator_repl_search_no_match_and_errors(mock_print, mock_input):
+    with patch('app.calculator.Calculator.query', return_value=[]) as mock_query:
+        calculator_repl()
+        mock_query.assert_any_call(None, None, None, None)
+    mock_print.assert_any_call("No matching calculations")
+    mock_print.assert_any_call(ERROR_TEXT+ "Error: Invalid isoformat string: 'yesterday'")
+
+
+@patch('builtins.input', side_effect=['stats', 'clear', 'add', '2', '3', 'multiply', '2', '5', 'stats', 'exit'])
+@patch('builtins.print')
+def test_calculator_repl_stats(mock_print, mock_input):
+    calculator_repl()
+    mock_print.assert_any_call("No statistics yet")
+    printed = [str(call.args[0]) for call in mock_print.call_args_list if call.args]
+    assert any(line.startswith("Addition: count=1, sum=5, min=5, max=5, mean=5, variance=0") for line in printed)
+    assert any(line.startswith("Multiplication: count=1") for line in printed)
+
+
+@patch('builtins.input', side_effect=['eval', '(2.5 ^ 3 + root(56.25, 2)) % x', '7', 'eval', '', 'eval', '1 / y', '0', 'exit'])
+@patch('builtins.print')
+def test_calculator_repl_eval(mock_print, mock_input):
+    calculator_repl()
+    mock_print.assert_any_call(NORMAL_TEXT+"Result: "+NUMBER3_TEXT+"2.125"+NORMAL_TEXT)
+    mock_print.assert_any_call(NORMAL_TEXT+"Operation cancelled")
+    mock_print.assert_any_call(ERROR_TEXT+ "Error: Division by zero is not allowed")
+
+
+@patch('builtins.input', side_effect=['define', 'repl_gain(x, y) = (x - y) / y * 100', 'repl_gain', '15', '10',
+                                      'define', 'add(x, y) = x', 'define', 'stats(x, y) = x', 'define', '', 'exit'])
+@patch('builtins.print')
+def test_calculator_repl_define(mock_print, mock_input):
+    with TemporaryDirectory() as temp_dir, \
+         patch.object(CalculatorConfig, 'formulas_file', new_callable=PropertyMock) as mock_formulas_file:
+        mock_formulas_file.return_value = Path(temp_dir) / "formulas.txt"
+        calculator_repl()
+        assert mock_formulas_file.return_value.read_text(encoding='utf-8') == "repl_gain(x, y) = (x - y) / y * 100\n"
+    mock_print.assert_any_call("Defined repl_gain(x, y) = (x - y) / y * 100")
+    mock_print.assert_any_call(NORMAL_TEXT+"Result: "+NUMBER3_TEXT+"50"+NORMAL_TEXT)
+    mock_print.assert_any_call(ERROR_TEXT+ "Error: Cannot redefine operation: add")
+    mock_print.assert_any_call(ERROR_TEXT+ "Error: Formula name is a reserved command: stats")
+    mock_print.assert_any_call(NORMAL_TEXT+"Operation cancelled")
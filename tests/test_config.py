@@ -144,3 +144,130 @@ def test_history_file_property():
     config = CalculatorConfig(base_dir=Path('/new_base_dir'))
     assert config.history_file == Path('/new_base_dir/history/calculator_history.csv').resolve()
 
+
+def test_invalid_verify_rate():
+    with pytest.raises(ConfigurationError, match="verify_rate must be between 0 and 1"):
+        config = CalculatorConfig(verify_rate=2)
+        config.validate()
+
+def test_invalid_max_history_age():
+    with pytest.raises(ConfigurationError, match="max_history_age must not be negative"):
+        config = CalculatorConfig(max_history_age=-1)
+        config.validate()
+
+def test_invalid_auto_save_mode():
+    with pytest.raises(ConfigurationError, match="auto_save_mode must be"):
+        CalculatorConfig(auto_save_mode='sometimes').validate()
+
+def test_invalid_journal_durability():
+    with pytest.raises(ConfigurationError, match="journal_durability must be"):
+        CalculatorConfig(journal_durability='always').validate()
+
+def test_invalid_journal_compact_every():
+    with pytest.raises(ConfigurationError, match="journal_compact_every must be positive"):
+        CalculatorConfig(journal_compact_every=-1).validate()
+
+def test_journal_file_property():
+    clear_env_vars('CALCULATOR_HISTORY_FILE')
+    config = CalculatorConfig(base_dir=Path('/new_base_dir'))
+    assert config.journal_file == Path('/new_base_dir/history/calculator_history.journal').resolve()
+
+def test_invalid_save_flush_every():
+    with pytest.raises(ConfigurationError, match="save_flush_every must be positive"):
+        CalculatorConfig(save_flush_every=-1).validate()
+
+def test_invalid_save_flush_interval_ms():
+    with pytest.raises(ConfigurationError, match="save_flush_interval_ms must be positive"):
+        CalculatorConfig(save_flush_interval_ms=-1).validate()
+
+def test_invalid_history_format():
+    with pytest.raises(ConfigurationError, match="history_format must be"):
+        CalculatorConfig(history_format='xml').validate()
+
+def test_history_file_format():
+    clear_env_vars('CALCULATOR_HISTORY_FILE')
+    config = CalculatorConfig(base_dir=Path('/new_base_dir'))
+    assert config.history_file_format == 'csv'
+    config = CalculatorConfig(base_dir=Path('/new_base_dir'), history_format='binary')
+    assert config.history_file == Path('/new_base_dir/history/calculator_history.bin').resolve()
+    assert config.history_file_format == 'binary'
+    os.environ['CALCULATOR_HISTORY_FILE'] = '/new_base_dir/history/archive.bin'
+    try:
+        assert CalculatorConfig(base_dir=Path('/new_base_dir')).history_file_format == 'binary'
+    finally:
+        clear_env_vars('CALCULATOR_HISTORY_FILE')
+
+def test_invalid_history_backend():
+    with pytest.raises(ConfigurationError, match="history_backend must be"):
+        CalculatorConfig(history_backend='postgres').validate()
+
+def test_history_db_file():
+    clear_env_vars('CALCULATOR_HISTORY_DB_FILE')
+    config = CalculatorConfig(base_dir=Path('/new_base_dir'), history_backend='sqlite')
+    assert config.history_backend == 'sqlite'
+    assert config.history_db_file == Path('/new_base_dir/history/calculator_history.db').resolve()
+    os.environ['CALCULATOR_HISTORY_DB_FILE'] = '/new_base_dir/history/archive.db'
+    try:
+        assert config.history_db_file == Path('/new_base_dir/history/archive.db').resolve()
+    finally:
+        clear_env_vars('CALCULATOR_HISTORY_DB_FILE')
+
+def test_operation_cache_settings():
+    clear_env_vars('CALCULATOR_OPERATION_CACHE_FILE')
+    config = CalculatorConfig(base_dir=Path('/new_base_dir'), operation_cache_size=0, operation_cache_persist=True)
+    assert config.operation_cache_size == 0
+    assert config.operation_cache_persist
+    assert config.operation_cache_file == Path('/new_base_dir/history/operation_cache').resolve()
+    with pytest.raises(ConfigurationError, match="operation_cache_size must not be negative"):
+        CalculatorConfig(operation_cache_size=-1).validate()
+
+def test_decimal_context_settings():
+    clear_env_vars('CALCULATOR_ROUNDING', 'CALCULATOR_GUARD_DIGITS')
+    config = CalculatorConfig(precision=10)
+    assert config.rounding == 'ROUND_HALF_EVEN'
+    assert config.guard_digits == 18
+    assert config.decimal_context.prec == 28
+    config = CalculatorConfig(precision=5, guard_digits=0, rounding='round_up')
+    assert config.decimal_context.prec == 5
+    assert config.decimal_context.rounding == 'ROUND_UP'
+    with pytest.raises(ConfigurationError, match="guard_digits must not be negative"):
+        CalculatorConfig(guard_digits=-1).validate()
+    with pytest.raises(ConfigurationError, match="rounding must be one of"):
+        CalculatorConfig(rounding='round_randomly').validate()
+
+def test_parallel_settings():
+    clear_env_vars('CALCULATOR_PARALLEL_WORKERS', 'CALCULATOR_PARALLEL_CHUNK_SIZE')
+    config = CalculatorConfig()
+    assert config.parallel_workers == 0
+    assert config.parallel_chunk_size == 5000
+    os.environ['CALCULATOR_PARALLEL_WORKERS'] = '3'
+    assert CalculatorConfig().parallel_workers == 3
+    clear_env_vars('CALCULATOR_PARALLEL_WORKERS')
+    with pytest.raises(ConfigurationError, match="parallel_workers must not be negative"):
+        CalculatorConfig(parallel_workers=-1).validate()
+    with pytest.raises(ConfigurationError, match="parallel_chunk_size must be positive"):
+        CalculatorConfig(parallel_chunk_size=-5).validate()
+
+def test_session_settings():
+    clear_env_vars('CALCULATOR_SESSION_MAX_RESIDENT', 'CALCULATOR_SESSION_MAX_MEMORY_MB', 'CALCULATOR_SESSIONS_DIR')
+    config = CalculatorConfig(base_dir=Path('/new_base_dir'))
+    assert config.session_max_resident == 100
+    assert config.session_max_memory_mb == 256
+    assert config.sessions_dir == Path('/new_base_dir/sessions').resolve()
+    with pytest.raises(ConfigurationError, match="session_max_resident must be positive"):
+        CalculatorConfig(session_max_resident=-1).validate()
+    with pytest.raises(ConfigurationError, match="session_max_memory_mb must be positive"):
+        CalculatorConfig(session_max_memory_mb=-1).validate()
+
+def test_concurrent_setting():
+    clear_env_vars('CALCULATOR_CONCURRENT')
+    assert CalculatorConfig().concurrent is False
+    os.environ['CALCULATOR_CONCURRENT'] = 'true'
+    assert CalculatorConfig().concurrent is True
+    clear_env_vars('CALCULATOR_CONCURRENT')
+    assert CalculatorConfig(concurrent=True).concurrent is True
+
+def test_formulas_file_property():
+    clear_env_vars('CALCULATOR_FORMULAS_FILE')
+    config = CalculatorConfig(base_dir=Path('/new_base_dir'))
+    assert config.formulas_file == Path('/new_base_dir/formulas.txt').resolve()
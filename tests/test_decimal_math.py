@@ -0,0 +1,87 @@
+import pytest
+from decimal import Decimal, DivisionByZero, InvalidOperation, Overflow, ROUND_DOWN, localcontext
+from fractions import Fraction
+from app.decimal_math import EXACT_DIGITS, exact_power, exact_root, integer_nthroot, quantizer, rational_power
+
+
+# Test Integer Roots
+
+@pytest.mark.parametrize("value, n, expected", [
+    (0, 3, 0), (1, 5, 1), (26, 3, 2), (27, 3, 3), (28, 3, 3), (10 ** 400, 4, 10 ** 100), (10 ** 400 - 1, 4, 10 ** 100 - 1),
+])
+def test_integer_nthroot(value, n, expected):
+    assert integer_nthroot(value, n) == expected
+
+
+# Test Exact Powers And Roots
+
+def test_exact_power_is_exact():
+    assert exact_power(Decimal(2), 100) == Decimal(2 ** 100)
+    assert str(exact_power(Decimal('2.5'), 3)) == '15.625'
+    assert str(exact_power(Decimal('-1E+1'), 3)) == '-1000'
+    assert str(exact_power(Decimal('1E+400'), 2)) == '1E+800'
+    assert exact_power(Decimal(0), 7) == 0
+    assert exact_power(Decimal(7), 0) == 1
+
+def test_exact_power_gives_up_on_huge_results():
+    assert exact_power(Decimal(2), EXACT_DIGITS + 1) is None
+    assert exact_power(Decimal(123), EXACT_DIGITS // 2) is None
+    assert exact_power(Decimal('1E+999'), 1002) is None
+    assert exact_power(Decimal(99), 600) is None
+    assert exact_power(Decimal('1E+999999'), 2) is None
+
+def test_exact_root():
+    assert str(exact_root(Decimal('2.25'), 2)) == '1.5'
+    assert str(exact_root(Decimal('1E+2'), 2)) == '10'
+    assert str(exact_root(Decimal('1E-3'), 3)) == '0.1'
+    assert str(exact_root(Decimal(-27), 3)) == '-3'
+    assert exact_root(Decimal(2), 2) is None
+    assert exact_root(Decimal(-4), 2) is None
+    assert exact_root(Decimal(4), EXACT_DIGITS + 1) is None
+
+
+# Test Rational Powers
+
+def test_rational_power_exact_cases():
+    assert str(rational_power(Decimal(4), Fraction(1, 2))) == '2'
+    assert str(rational_power(Decimal('2.25'), Fraction(3, 2))) == '3.375'
+    assert str(rational_power(Decimal(8), Fraction(-1, 3))) == '0.5'
+    assert str(rational_power(Decimal(-8), Fraction(2, 3))) == '4'
+    assert rational_power(Decimal(0), Fraction(0)) == 1
+
+def test_rational_power_rounds_to_context():
+    assert rational_power(Decimal(2), Fraction(1, 2)) == Decimal(2).sqrt()
+    with localcontext() as context:
+        context.prec = 50
+        assert str(rational_power(Decimal(2), Fraction(1, 3))) == '1.2599210498948731647672106072782283505702514647015'
+        # Beyond the exact limit the power is rounded once, at the context precision
+        assert rational_power(Decimal(3), Fraction(5000)) == Decimal(3 ** 5000).normalize(context)
+    assert str(rational_power(Decimal(-2), Fraction(1, 3))) == '-1.259921049894873164767210607'
+    assert str(rational_power(Decimal(-2), Fraction(2, 3))) == '1.587401051968199474751705639'
+
+def test_rational_power_rounds_exact_results_to_context():
+    with localcontext() as context:
+        context.prec = 5
+        assert str(rational_power(Decimal(10), Fraction(999))) == '1.0000E+999'
+        assert str(rational_power(Decimal('1.5'), Fraction(10))) == '57.665'
+        assert str(rational_power(Decimal(2), Fraction(10))) == '1024'
+        context.rounding = ROUND_DOWN
+        assert str(rational_power(Decimal(7), Fraction(6))) == '1.1764E+5'
+
+def test_rational_power_large_exponents_are_fast():
+    assert rational_power(Decimal('1.0000001'), Fraction(123456789)) == Decimal('229964.0526159301784424247111')
+    assert rational_power(Decimal(1), Fraction(10 ** 999)) == 1
+    assert rational_power(Decimal(2), Fraction(1, 10 ** 999)) == 1
+
+def test_rational_power_errors():
+    with pytest.raises(InvalidOperation):
+        rational_power(Decimal(-8), Fraction(1, 2))
+    with pytest.raises(DivisionByZero):
+        rational_power(Decimal(0), Fraction(-1, 2))
+    with pytest.raises(Overflow):
+        rational_power(Decimal(10), Fraction(10 ** 6))
+
+def test_quantizer_is_built_once():
+    assert quantizer(3) == Decimal('0.001')
+    assert quantizer(3).as_tuple().exponent == -3
+    assert quantizer(3) is quantizer(3)
@@ -0,0 +1,106 @@
+import pytest
+from decimal import Decimal
+import numpy as np
+from app.exceptions import OperationError, ValidationError
+from app.expression import Apply, Number, Variable, compile_expression, parse, tokenize
+from app.operations import Addition, Power, Subtraction
+
+
+# Test Tokenizer
+
+def test_tokenize():
+    assert tokenize("2.5^x // .5e1") == [
+        ('number', '2.5', 0), ('symbol', '^', 3), ('name', 'x', 4),
+        ('symbol', '//', 6), ('number', '.5e1', 9), ('end', '', 13)
+    ]
+
+def test_tokenize_invalid_character():
+    with pytest.raises(ValidationError, match="unexpected '\\$' at position 4"):
+        tokenize("2 + $")
+
+
+# Test Parser
+
+def test_parse_builds_operation_nodes():
+    tree = parse("x + 2 ^ 3")
+    assert isinstance(tree, Apply) and isinstance(tree.operation, Addition)
+    assert tree.left == Variable('x')
+    assert isinstance(tree.right.operation, Power)
+    assert tree.right.left == Number(Decimal('2'))
+
+def test_negation_is_subtraction_from_zero():
+    tree = parse("-x")
+    assert isinstance(tree.operation, Subtraction)
+    assert tree.left == Number(Decimal('0'))
+
+@pytest.mark.parametrize("source, expected", [
+    ("(2.5 ^ 3 + root(56.25, 2)) % 7", "2.125"),
+    ("1 + 2 * 3", "7"),
+    ("(1 + 2) * 3", "9"),
+    ("10 - 4 - 3", "3"),
+    ("2 ^ 3 ^ 2", "512"),
+    ("-2 ^ 2", "-4"),
+    ("+3 - -2", "5"),
+    ("17 // 5 * 2", "6"),
+    ("percent(45, 900) + abs_diff(3.2, 5.7)", "7.5"),
+    ("1e3 / 8", "125"),
+])
+def test_evaluate(source, expected):
+    assert compile_expression(source).evaluate() == Decimal(expected)
+
+@pytest.mark.parametrize("source, message", [
+    ("2 +", "expected a number, name or '\\(', found end of expression"),
+    ("", "found end of expression"),
+    ("(1", "expected '\\)', found end of expression"),
+    ("1 2", "expected end of expression, found '2' at position 2"),
+    ("root(1)", "expected ',', found '\\)' at position 6"),
+    ("foo(1, 2)", "unknown operation 'foo' at position 0"),
+])
+def test_parse_errors(source, message):
+    with pytest.raises(ValidationError, match=message):
+        compile_expression(source)
+
+
+# Test Compiled Expressions
+
+def test_variables_rebind_without_parsing():
+    compiled = compile_expression("rate * x + x")
+    assert compiled.variables == ('rate', 'x')
+    assert compiled.evaluate({'rate': Decimal('2'), 'x': Decimal('3')}) == Decimal('9')
+    assert compiled.evaluate({'rate': Decimal('0.5'), 'x': Decimal('10')}) == Decimal('15')
+    assert compile_expression("rate * x + x") is compiled
+    assert repr(compiled) == "CompiledExpression('rate * x + x')"
+
+def test_missing_variable():
+    with pytest.raises(ValidationError, match="No value given for variable: y"):
+        compile_expression("x + y").evaluate({'x': Decimal('1')})
+
+def test_evaluate_operands():
+    compiled = compile_expression("(x + 1) * (x - 1)")
+    assert compiled.evaluate_operands({'x': Decimal('5')}) == (Decimal('6'), Decimal('4'), Decimal('24'))
+    with pytest.raises(ValidationError, match="Expression has no operation: 42"):
+        compile_expression("42").evaluate_operands()
+
+def test_operation_errors():
+    with pytest.raises(ValidationError, match="Division by zero is not allowed"):
+        compile_expression("1 / (2 - 2)").evaluate()
+    with pytest.raises(OperationError, match="Evaluation failed"):
+        compile_expression("10 ^ 1000000").evaluate()
+    with pytest.raises(OperationError, match="Evaluation failed"):
+        compile_expression("x * 10 ^ 1000000").evaluate_operands({'x': Decimal(1)})
+
+def test_failed_parse_is_not_cached():
+    before = compile_expression.cache_info().currsize
+    with pytest.raises(ValidationError):
+        compile_expression("1 +* 2")
+    assert compile_expression.cache_info().currsize == before
+
+def test_evaluate_array():
+    compiled = compile_expression("x / y + 1")
+    result, errors = compiled.evaluate_array({'x': np.array([1.0, 2.0]), 'y': np.array([4.0, 0.0])})
+    assert result[0] == 1.25
+    assert errors.tolist() == [False, True]
+    result, errors = compile_expression("2 ^ 3").evaluate_array({})
+    assert result.tolist() == [8.0] and not errors.any()
+    with pytest.raises(ValidationError, match="No value given for variable: y"):
+        compiled.evaluate_array({'x': np.array([1.0])})
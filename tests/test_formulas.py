@@ -0,0 +1,139 @@
+import pytest
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import numpy as np
+from app.calculation import Calculation
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.exceptions import OperationError, ValidationError
+from app.expression import compile_expression
+from app.formulas import Formula, define_formula, load_formulas
+from app.operations import OperationFactory
+
+
+# Test Formula Definitions
+
+def test_define_formula_registers_operation():
+    formula = define_formula("margin(x, y) = (x - y) / x * 100")
+    assert formula.definition == "margin(x, y) = (x - y) / x * 100"
+    assert OperationFactory.create_operation('margin') is formula
+    assert OperationFactory.get_operation('margin') is formula
+    assert 'margin' in OperationFactory.operation_names()
+    assert str(formula) == 'margin'
+    assert formula.execute(Decimal('50'), Decimal('40')) == Decimal('20')
+
+def test_formula_recomputes_from_history():
+    define_formula("hypot2(a, b) = a ^ 2 + b ^ 2")
+    calc = Calculation.from_dict({
+        'operation': 'hypot2', 'operand1': '3', 'operand2': '4',
+        'result': '25', 'timestamp': '2024-01-01T12:00:00'
+    })
+    assert calc.verify()
+
+def test_formula_vector_kernel_matches_scalar():
+    formula = define_formula("blend(p, q) = root(p * q, 2) + p % 3 - q // 2")
+    a = np.array([4.0, 9.0, 2.5, 12.0])
+    b = np.array([1.0, 4.0, 10.0, 3.0])
+    result, errors = formula.execute_array(a, b)
+    assert not errors.any()
+    expected = [float(formula.execute(Decimal(repr(x)), Decimal(repr(y)))) for x, y in zip(a.tolist(), b.tolist())]
+    np.testing.assert_allclose(result, expected)
+
+def test_formula_vector_kernel_flags_failed_rows():
+    formula = define_formula("ratio(x, y) = x / (y - 1) + root(x, 2)")
+    result, errors = formula.execute_array(np.array([4.0, 4.0, -4.0]), np.array([3.0, 1.0, 3.0]))
+    assert errors.tolist() == [False, True, True]
+    assert result[0] == 4.0
+
+def test_formula_errors_propagate():
+    formula = define_formula("inverse(x, y) = y / x")
+    with pytest.raises(ValidationError, match="Division by zero"):
+        formula.execute(Decimal('0'), Decimal('1'))
+    formula = define_formula("huge(x, y) = x ^ y")
+    with pytest.raises(OperationError, match="Evaluation failed"):
+        formula.execute(Decimal('10'), Decimal('1000000'))
+
+def test_redefining_formula_recompiles_expressions():
+    define_formula("twice(x, y) = x * 2")
+    assert compile_expression("twice(5, 0)").evaluate() == Decimal('10')
+    define_formula("twice(x, y) = x + x + y")
+    assert compile_expression("twice(5, 1)").evaluate() == Decimal('11')
+
+def test_redefining_formula_recompiles_callers():
+    define_formula("base(x, y) = x + y")
+    define_formula("outer(x, y) = base(x, y) + 0")
+    define_formula("outermost(x, y) = outer(x, y) * 10")
+    assert OperationFactory.create_operation('outermost').execute(Decimal('5'), Decimal('2')) == Decimal('70')
+    define_formula("base(x, y) = x - y")
+    assert OperationFactory.create_operation('outer').execute(Decimal('5'), Decimal('2')) == Decimal('3')
+    assert OperationFactory.create_operation('outermost').execute(Decimal('5'), Decimal('2')) == Decimal('30')
+
+def test_redefined_formula_is_not_answered_from_cache():
+    with TemporaryDirectory() as temp_dir:
+        calc = Calculator(CalculatorConfig(base_dir=Path(temp_dir), auto_save=False, operation_cache_size=100))
+        calc.define_formula("f(x, y) = x + y")
+        calc.define_formula("g(x, y) = f(x, y) + 0")
+        assert calc.perform_many([('f', 1, 2), ('g', 5, 2)]) == [Decimal('3'), Decimal('7')]
+        calc.define_formula("f(x, y) = x * y")
+        assert calc.perform_many([('f', 1, 2), ('g', 5, 2)]) == [Decimal('2'), Decimal('10')]
+        assert OperationFactory.create_operation('g').cache_key == "g(x, y) = f(x, y) + 0; f(x, y) = x * y"
+
+@pytest.mark.parametrize("definition, message", [
+    ("margin = x - y", "Invalid formula definition"),
+    ("f(x) = x", "Invalid formula definition"),
+    ("add(x, y) = x - y", "Cannot redefine operation: add"),
+    ("Addition(x, y) = x - y", "Cannot redefine operation: Addition"),
+    ("bad(x, x) = x", "Formula parameters must differ: x"),
+    ("bad(x, y) = x + z", "Unknown variable in formula bad: z"),
+    ("bad(x, y) = x +", "Invalid expression"),
+    ("history(x, y) = x", "Formula name is a reserved command: history"),
+    ("Eval(x, y) = x", "Formula name is a reserved command: Eval"),
+])
+def test_invalid_definitions(definition, message):
+    with pytest.raises(ValidationError, match=message):
+        define_formula(definition)
+
+
+# Test Formulas File
+
+def test_load_formulas():
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "formulas.txt"
+        assert load_formulas(path) == []
+        path.write_text(
+            "# Business formulas\n\nmarkup(cost, price) = (price - cost) / cost * 100\nbroken(x) = x\n",
+            encoding='utf-8'
+        )
+        with patch('app.formulas.logging.warning') as logging_warning_mock:
+            formulas = load_formulas(path)
+        assert [formula.name for formula in formulas] == ['markup']
+        assert isinstance(OperationFactory.create_operation('markup'), Formula)
+        logging_warning_mock.assert_called_once()
+        assert "line 4" in logging_warning_mock.call_args.args[0]
+
+def test_defined_formulas_are_saved_to_formulas_file():
+    with TemporaryDirectory() as temp_dir:
+        config = CalculatorConfig(base_dir=Path(temp_dir), auto_save=False)
+        config.formulas_file.write_text("# Saved formulas\nkept(x, y) = x", encoding='utf-8')
+        calc = Calculator(config)
+        calc.define_formula("persisted(x, y) = x * y + 1")
+        calc.define_formula("persisted(x, y) = x * y + 2")
+        assert config.formulas_file.read_text(encoding='utf-8').splitlines() == [
+            "# Saved formulas", "kept(x, y) = x",
+            "persisted(x, y) = x * y + 1", "persisted(x, y) = x * y + 2",
+        ]
+        # A restarted calculator defines the latest definition again
+        define_formula("persisted(x, y) = x")
+        assert [formula.definition for formula in load_formulas(config.formulas_file)][-1] == "persisted(x, y) = x * y + 2"
+        assert OperationFactory.create_operation('persisted').execute(Decimal('2'), Decimal('3')) == Decimal('8')
+
+def test_formula_is_defined_when_formulas_file_cannot_be_written():
+    with TemporaryDirectory() as temp_dir:
+        calc = Calculator(CalculatorConfig(base_dir=Path(temp_dir), auto_save=False))
+        with patch('app.calculator.open', side_effect=OSError("read-only")), \
+             patch('app.calculator.logging.warning') as logging_warning_mock:
+            calc.define_formula("unsaved(x, y) = x - y")
+        assert "read-only" in logging_warning_mock.call_args.args[0]
+        assert OperationFactory.create_operation('unsaved').execute(Decimal('5'), Decimal('3')) == Decimal('2')
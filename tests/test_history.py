@@ -1,7 +1,9 @@
 import pytest
+from decimal import Decimal
 from unittest.mock import Mock, patch
-from app.calculation import Calculation
-from app.history import LoggingObserver, AutoSaveObserver
+import numpy as np
+from app.calculation import BatchCalculation, Calculation
+from app.history import LoggingObserver, AutoSaveObserver, StatsObserver
 from app.calculator import Calculator
 from app.calculator_config import CalculatorConfig
 
@@ -71,3 +73,94 @@ def test_autosave_observer_no_calculation():
     
     with pytest.raises(AttributeError):
         observer.update(None)  # Passing None should raise an exception
+
+# Test cases for batch notifications
+
+def test_observer_update_batch_forwards_each():
+    observer = LoggingObserver()
+    with patch.object(observer, 'update') as mock_update:
+        observer.update_batch([calculation_mock, calculation_mock])
+        assert mock_update.call_count == 2
+
+def test_autosave_observer_saves_once_per_batch():
+    calculator_mock = Mock(spec=Calculator)
+    calculator_mock.config = Mock(spec=CalculatorConfig)
+    calculator_mock.config.auto_save = True
+    observer = AutoSaveObserver(calculator_mock)
+
+    observer.update_batch([calculation_mock, calculation_mock, calculation_mock])
+    calculator_mock.save_history.assert_called_once()
+
+def test_autosave_observer_queues_background_save():
+    calculator_mock = Mock(spec=Calculator)
+    calculator_mock.config = Mock(spec=CalculatorConfig)
+    calculator_mock.config.auto_save = True
+    calculator_mock.writer = Mock()
+    observer = AutoSaveObserver(calculator_mock)
+
+    observer.update(calculation_mock)
+    observer.update_batch([calculation_mock, calculation_mock])
+    assert calculator_mock.writer.notify.call_args_list == [((1,),), ((2,),)]
+    calculator_mock.save_history.assert_not_called()
+
+def test_autosave_observer_commits_incremental_storage():
+    calculator_mock = Mock(spec=Calculator)
+    calculator_mock.config = Mock(spec=CalculatorConfig)
+    calculator_mock.config.auto_save = True
+    calculator_mock.storage = Mock(incremental=True)
+    observer = AutoSaveObserver(calculator_mock)
+
+    observer.update(calculation_mock)
+    calculator_mock.storage.commit.assert_called_once()
+    calculator_mock.save_history.assert_not_called()
+
+# Test StatsObserver
+
+def test_stats_observer_follows_history_changes():
+    observer = StatsObserver()
+    entries = [Calculation("Addition", Decimal(n), Decimal(1)) for n in range(4)]
+    observer.update(entries[0])
+    observer.history_changed('append', entries)
+    observer.history_changed('evict', entries[:2])
+    assert observer.statistics()["Addition"]['count'] == 4
+    observer.history_changed('truncate', entries[2:])
+    summary = observer.statistics("Addition")["Addition"]
+    assert (summary['count'], summary['sum'], summary['min'], summary['max']) == (2, 3.0, 1.0, 2.0)
+    observer.history_changed('prepend', entries[:2])
+    observer.history_changed('truncate', entries[:2])
+    assert observer.statistics() == {}
+    observer.history_changed('truncate', entries[:1])
+    observer.history_changed('reset', entries[:1])
+    assert observer.statistics()["Addition"]['count'] == 1
+    observer.history_changed('clear')
+    assert observer.statistics() == {}
+    with pytest.raises(AttributeError):
+        observer.update(None)
+
+def test_stats_observer_memory_is_bounded_by_history():
+    observer = StatsObserver()
+    entries = [Calculation("Addition", Decimal(n), Decimal(1)) for n in range(100)]
+    for n, entry in enumerate(entries):
+        observer.history_changed('append', [entry])
+        if n >= 5:
+            observer.history_changed('evict', [entries[n - 5]])
+    assert len(observer._stats["Addition"]._extremes) == 5
+    assert observer.statistics()["Addition"]['max'] == 100.0
+
+def test_stats_observer_counts_batch_rows():
+    observer = StatsObserver()
+    batch = BatchCalculation(
+        operation="Division",
+        operand1=np.array([1.0, 2.0, 3.0]),
+        operand2=np.array([2.0, 0.0, 1.0]),
+        result=np.array([0.5, np.nan, 3.0]),
+        errors=np.array([False, True, False])
+    )
+    observer.history_changed('append', [batch, Calculation("Multiplication", Decimal("1E+500"), Decimal("1E+500"))])
+    summary = observer.statistics()["Division"]
+    assert (summary['count'], summary['mean']) == (2, 1.75)
+    # Results too large for a float are left out
+    assert observer.statistics("Multiplication")["Multiplication"]['count'] == 0
+
+def test_default_observer_ignores_history_changes():
+    LoggingObserver().history_changed('clear')
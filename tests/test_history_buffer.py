@@ -0,0 +1,102 @@
+import datetime
+import pytest
+from types import SimpleNamespace
+from app.history_buffer import HistoryBuffer
+
+
+def entry(seconds_ago=0):
+    return SimpleNamespace(timestamp=datetime.datetime.now() - datetime.timedelta(seconds=seconds_ago))
+
+
+# Test Construction
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError, match="capacity must be positive"):
+        HistoryBuffer(0)
+
+def test_initial_entries_keep_newest():
+    buffer = HistoryBuffer(3, entries=range(5))
+    assert buffer == [2, 3, 4]
+    assert len(buffer) == 3
+
+# Test Append and Eviction
+
+def test_append_evicts_oldest():
+    buffer = HistoryBuffer(2)
+    assert buffer.append(1) == []
+    assert buffer.append(2) == []
+    assert buffer.append(3) == [1]
+    assert buffer == [2, 3]
+    assert buffer.extend([4, 5, 6]) == [2, 3, 4]
+    assert list(buffer) == [5, 6]
+
+def test_popleft_empty():
+    with pytest.raises(IndexError):
+        HistoryBuffer(2).popleft()
+
+# Test Indexing
+
+def test_indexing_and_slicing():
+    buffer = HistoryBuffer(3, entries=range(5))
+    assert buffer[0] == 2
+    assert buffer[-1] == 4
+    assert buffer[1:] == [3, 4]
+    assert buffer[::-1] == [4, 3, 2]
+    with pytest.raises(IndexError):
+        buffer[3]
+    with pytest.raises(IndexError):
+        buffer[-4]
+
+def test_equality():
+    buffer = HistoryBuffer(3, entries=[1, 2])
+    assert buffer == (1, 2)
+    assert buffer == HistoryBuffer(5, entries=[1, 2])
+    assert buffer != [1]
+    assert buffer != "12"
+    assert repr(buffer) == "HistoryBuffer([1, 2], capacity=3, max_age=None)"
+
+# Test Age Retention
+
+def test_age_retention():
+    old = entry(seconds_ago=120)
+    buffer = HistoryBuffer(10, max_age=60, entries=[old])
+    new = entry()
+    assert buffer.append(new) == [old]
+    assert buffer == [new]
+
+def test_expire_without_max_age():
+    buffer = HistoryBuffer(10, entries=[entry(seconds_ago=1000)])
+    assert buffer.expire() == []
+    assert len(buffer) == 1
+
+# Test Resize and Clear
+
+def test_resize():
+    buffer = HistoryBuffer(4, entries=range(4))
+    assert buffer.resize(2) == [0, 1]
+    assert buffer == [2, 3]
+    assert buffer.resize(5) == []
+    buffer.append(4)
+    assert buffer == [2, 3, 4]
+    with pytest.raises(ValueError):
+        buffer.resize(0)
+
+def test_clear_and_copy():
+    buffer = HistoryBuffer(3, entries=range(3))
+    copy = buffer.copy()
+    buffer.clear()
+    assert buffer == []
+    assert copy == [0, 1, 2]
+
+# Test Front and Back Operations
+
+def test_appendleft_and_pop():
+    buffer = HistoryBuffer(3, entries=[2, 3])
+    assert buffer.appendleft(1)
+    assert not buffer.appendleft(0)
+    assert buffer == [1, 2, 3]
+    assert buffer.pop() == 3
+    assert buffer == [1, 2]
+    buffer.clear()
+    with pytest.raises(IndexError):
+        buffer.pop()
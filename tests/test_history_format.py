@@ -0,0 +1,181 @@
+import datetime
+import gc
+import io
+import pytest
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import numpy as np
+from app.calculation import BatchCalculation, Calculation
+from app.exceptions import OperationError
+from app.history_format import (
+    is_binary_path, parse_timestamps, read_binary_history, read_binary_layout, read_csv_history,
+    write_binary_history
+)
+
+
+def write(entries):
+    buffer = io.BytesIO()
+    write_binary_history(buffer, entries)
+    return buffer.getvalue()
+
+
+# Test Round Trip
+
+def test_round_trip_preserves_entries():
+    timestamp = datetime.datetime(2024, 5, 1, 12, 30, 15, 123456)
+    entries = [
+        Calculation("Addition", Decimal("1.10"), Decimal("2"), timestamp=timestamp),
+        Calculation("Division", Decimal("1"), Decimal("3")),
+        Calculation("Addition", Decimal("-1E+5"), Decimal("0.000001")),
+    ]
+    loaded = read_binary_history(write(entries))
+    assert loaded == entries
+    assert [entry.timestamp for entry in loaded] == [entry.timestamp for entry in entries]
+    # Decimal strings are stored exactly, trailing zeros and exponents included
+    assert str(loaded[0].operand1) == "1.10"
+    assert str(loaded[2].operand1) == "-1E+5"
+
+def test_round_trip_batch_entry():
+    batch = BatchCalculation(
+        operation="Division",
+        operand1=np.array([1.0, 2.0]),
+        operand2=np.array([2.0, 0.0]),
+        result=np.array([0.5, np.nan]),
+        errors=np.array([False, True])
+    )
+    loaded = read_binary_history(write([batch]))
+    assert loaded == [batch]
+    assert loaded[0].errors.tolist() == [False, True]
+
+def test_empty_history():
+    assert read_binary_history(write([])) == []
+
+
+# Test Layout
+
+def test_layout_is_columnar():
+    entries = [Calculation("Addition", Decimal(i), Decimal("1")) for i in range(3)]
+    entries.append(Calculation("Subtraction", Decimal("5"), Decimal("1")))
+    layout = read_binary_layout(write(entries))
+    assert layout.names == ["Addition", "Subtraction"]
+    assert layout.codes.tolist() == [0, 0, 0, 1]
+    assert layout.timestamps.dtype == np.int64
+    offsets, data = layout.strings[2]
+    assert bytes(data) == b"1234"
+    assert offsets.tolist() == [0, 1, 2, 3, 4]
+    assert layout.numbers[2].tolist() == [1.0, 2.0, 3.0, 4.0]
+
+def test_is_binary_path():
+    assert is_binary_path("history/calculator_history.BIN")
+    assert not is_binary_path("history/calculator_history.csv")
+
+
+# Test Invalid Files
+
+def test_invalid_header():
+    with pytest.raises(OperationError, match="truncated header"):
+        read_binary_history(b"CALC")
+    with pytest.raises(OperationError, match="unknown header"):
+        read_binary_history(b"operation,operand1,operand2,result,timestamp\n")
+
+def test_truncated_columns():
+    data = write([Calculation("Addition", Decimal("1"), Decimal("2"))])
+    with pytest.raises(OperationError, match="Invalid binary history file"):
+        read_binary_history(data[:-16])
+    with pytest.raises(OperationError, match="string column past end of file"):
+        read_binary_history(data[:-32])
+
+def test_invalid_decimal():
+    data = write([Calculation("Addition", Decimal("1"), Decimal("2"))]).replace(b"3", b"x")
+    with pytest.raises(OperationError, match="Invalid calculation data"):
+        read_binary_history(data)
+
+def test_verify_rate_recomputes_results():
+    calc = Calculation("Addition", Decimal("1"), Decimal("2"))
+    data = write([calc])
+    assert read_binary_history(data, verify_rate=1.0) == [calc]
+
+def test_binary_limit_reads_newest_entries():
+    entries = [Calculation("Addition", Decimal(i), Decimal("1")) for i in range(5)]
+    assert read_binary_history(write(entries), limit=2) == entries[3:]
+    assert read_binary_history(write(entries), limit=10) == entries
+
+
+# Test CSV Reader
+
+HEADER = "operation,operand1,operand2,result,timestamp\n"
+
+
+@pytest.fixture
+def csv_path():
+    with TemporaryDirectory() as temp_dir:
+        yield Path(temp_dir) / "calculator_history.csv"
+
+
+def rows(count):
+    return "".join(f"Addition,{i},1,{i + 1},2024-01-01T00:00:{i:02d}.5\n" for i in range(count))
+
+
+def test_csv_reads_all_rows(csv_path):
+    csv_path.write_text(HEADER + rows(3))
+    entries = read_csv_history(csv_path)
+    assert [entry.result for entry in entries] == [Decimal(1), Decimal(2), Decimal(3)]
+    assert entries[0].timestamp == datetime.datetime(2024, 1, 1, 0, 0, 0, 500000)
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_csv_tail_reads_only_kept_rows(csv_path, chunk_size):
+    # Older rows are never parsed, so their invalid values do not matter
+    csv_path.write_text(HEADER + "Addition,bad,1,bad,never\n" * 5 + rows(4))
+    with patch('app.history_format.TAIL_CHUNK_SIZE', chunk_size):
+        entries = read_csv_history(csv_path, limit=3)
+    assert [entry.operand1 for entry in entries] == [Decimal(1), Decimal(2), Decimal(3)]
+
+def test_csv_tail_limit_beyond_rows(csv_path):
+    csv_path.write_text(HEADER + rows(2).rstrip("\n"))
+    with patch('app.history_format.TAIL_CHUNK_SIZE', 5):
+        assert len(read_csv_history(csv_path, limit=10)) == 2
+
+def test_csv_quoted_batch_row(csv_path):
+    batch = BatchCalculation(
+        operation="Addition",
+        operand1=np.array([1.0, 2.0]),
+        operand2=np.array([3.0, 4.0]),
+        result=np.array([4.0, 6.0]),
+        errors=np.array([False, False])
+    )
+    data = batch.to_dict()
+    csv_path.write_text(
+        "timestamp,operation,operand1,operand2,result\n"
+        f'{data["timestamp"]},Addition,"{data["operand1"]}","{data["operand2"]}","{data["result"]}"\n'
+    )
+    assert read_csv_history(csv_path, limit=1) == [batch]
+
+def test_csv_empty_file(csv_path):
+    csv_path.write_text("")
+    assert read_csv_history(csv_path) == []
+    csv_path.write_text(HEADER)
+    assert read_csv_history(csv_path, limit=5) == []
+
+def test_csv_invalid_files(csv_path):
+    csv_path.write_text("operation,operand1,result,timestamp\n")
+    with pytest.raises(OperationError, match="Invalid calculation data"):
+        read_csv_history(csv_path)
+    csv_path.write_text(HEADER + "Addition,1,2\n")
+    with pytest.raises(OperationError, match="missing fields"):
+        read_csv_history(csv_path)
+    csv_path.write_text(HEADER + "Addition,1,2,3,yesterday\n")
+    with pytest.raises(OperationError, match="Invalid calculation data"):
+        read_csv_history(csv_path)
+
+def test_csv_gc_restored(csv_path):
+    csv_path.write_text(HEADER + "Addition,x,2,3,2024-01-01T00:00:00\n")
+    assert gc.isenabled()
+    with pytest.raises(OperationError):
+        read_csv_history(csv_path)
+    assert gc.isenabled()
+
+def test_parse_timestamps_falls_back_to_fromisoformat():
+    parsed = parse_timestamps(["2024-01-01T00:00:00+01:00"])
+    assert parsed == [datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=1)))]
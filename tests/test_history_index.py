@@ -0,0 +1,107 @@
+import datetime
+import pytest
+from decimal import Decimal
+import numpy as np
+from app.calculation import BatchCalculation, Calculation
+from app.history_index import HistoryIndex
+
+START = datetime.datetime(2024, 1, 1, 12, 0, 0)
+
+
+def calc(n, operation="Addition"):
+    return Calculation(operation, Decimal(n), Decimal("0.5"), timestamp=START + datetime.timedelta(seconds=n))
+
+
+@pytest.fixture
+def entries():
+    return [calc(n, "Addition" if n % 2 else "Subtraction") for n in range(10)]
+
+
+@pytest.fixture
+def index(entries):
+    return HistoryIndex(entries)
+
+
+# Test Queries
+
+def test_query_without_conditions(index, entries):
+    assert len(index) == 10
+    assert index.query() == entries
+    assert index.query(limit=3) == entries[-3:]
+
+def test_query_by_operation(index, entries):
+    assert index.query(operation="Addition") == entries[1::2]
+    assert index.query(operation="Addition", limit=2) == entries[7::2]
+    assert index.query(operation="Power") == []
+
+def test_query_by_time(index, entries):
+    since = START + datetime.timedelta(seconds=3)
+    until = START + datetime.timedelta(seconds=6)
+    assert index.query(since=since, until=until) == entries[3:6]
+    assert index.query(since=since) == entries[3:]
+    assert index.query(until=since) == entries[:3]
+    assert index.query(since=until, until=since) == []
+
+def test_query_by_result(index, entries):
+    # Addition results are n + 0.5, subtraction results n - 0.5
+    matches = index.query(result_range=(Decimal("2.5"), Decimal("4.5")))
+    assert matches == entries[3:5]
+    assert index.query(result_range=(None, Decimal("0"))) == [entries[0]]
+    assert index.query(result_range=(Decimal("9"), None)) == [entries[9]]
+
+def test_query_combines_conditions(index, entries):
+    since = START + datetime.timedelta(seconds=2)
+    matches = index.query(operation="Subtraction", since=since, result_range=(None, Decimal("6")))
+    assert matches == [entries[2], entries[4], entries[6]]
+    # Conditions not used to pick the candidates are checked on each candidate
+    assert index.query(operation="Addition", since=START + datetime.timedelta(seconds=8)) == [entries[9]]
+    assert index.query(until=START + datetime.timedelta(seconds=2), result_range=(Decimal("9"), None)) == []
+
+
+# Test Incremental Updates
+
+def test_append_and_evict(index, entries):
+    new = calc(10, "Multiplication")
+    index.apply('append', [new])
+    index.apply('evict', entries[:2])
+    assert index.query() == entries[2:] + [new]
+    assert index.query(operation="Multiplication") == [new]
+    assert index.query(result_range=(None, Decimal("1"))) == []
+
+def test_truncate_and_prepend(index, entries):
+    index.apply('truncate', entries[8:])
+    index.apply('prepend', [calc(-2), calc(-1)])
+    assert index.query() == [calc(-2), calc(-1)] + entries[:8]
+    assert index.query(operation="Addition") == [calc(-2), calc(-1)] + entries[1:8:2]
+    index.apply('evict', [calc(-2)])
+    index.apply('truncate', entries[7:8])
+    assert index.query(operation="Addition") == [calc(-1)] + entries[1:6:2]
+
+def test_clear_and_reset(index, entries):
+    index.apply('clear')
+    assert len(index) == 0
+    assert index.query(operation="Addition") == []
+    index.apply('reset', entries[:3])
+    assert index.query() == entries[:3]
+
+def test_equal_timestamps_and_results():
+    same = [Calculation("Addition", Decimal(1), Decimal(1), timestamp=START) for _ in range(3)]
+    index = HistoryIndex(same)
+    index.apply('evict', same[:1])
+    assert len(index.query(since=START, result_range=(2, 2))) == 2
+    index.apply('truncate', same[2:])
+    assert index.query() == same[1:2]
+
+def test_batch_entries_have_no_single_result():
+    batch = BatchCalculation(
+        operation="Division",
+        operand1=np.array([1.0, 2.0]),
+        operand2=np.array([2.0, 0.0]),
+        result=np.array([0.5, np.nan]),
+        errors=np.array([False, True])
+    )
+    index = HistoryIndex([batch, calc(1)])
+    assert index.query(operation="Division") == [batch]
+    assert index.query(result_range=(None, None)) == [calc(1)]
+    index.apply('evict', [batch])
+    assert index.query(operation="Division") == []
@@ -0,0 +1,117 @@
+import datetime
+import pytest
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from app.calculation import Calculation
+from app.exceptions import ConfigurationError
+from app.history_journal import HistoryJournal
+
+
+def calc(n):
+    return Calculation(operation="Addition", operand1=Decimal(n), operand2=Decimal("1"))
+
+
+@pytest.fixture
+def journal_path():
+    with TemporaryDirectory() as temp_dir:
+        yield Path(temp_dir) / "history" / "calculator_history.journal"
+
+
+# Test Recording and Replay
+
+def test_replay_applies_records(journal_path):
+    journal = HistoryJournal(journal_path)
+    a, b, c, d = calc(1), calc(2), calc(3), calc(4)
+    journal.record('append', [b, c])
+    journal.record('evict', [a])
+    journal.record('truncate', [c])
+    journal.record('prepend', [a])
+    journal.record('append', [d])
+    journal.commit()
+    journal.close()
+    assert journal.records == 5
+    assert HistoryJournal(journal_path).replay([a]) == [a, b, d]
+
+def test_replay_clear_and_reset(journal_path):
+    journal = HistoryJournal(journal_path, durability='none')
+    journal.record('clear')
+    journal.record('append', [calc(5)])
+    journal.commit()
+    assert journal.replay([calc(1)]) == [calc(5)]
+    journal.record('reset', [calc(7), calc(8)])
+    journal.commit()
+    assert journal.replay([]) == [calc(7), calc(8)]
+
+def test_replay_without_journal(journal_path):
+    assert HistoryJournal(journal_path).replay([calc(1)]) == [calc(1)]
+
+def test_replay_ignores_torn_record(journal_path, caplog):
+    journal = HistoryJournal(journal_path, durability='op')
+    journal.record('append', [calc(1)])
+    journal.close()
+    with open(journal_path, 'a', encoding='utf-8') as file:
+        file.write('{"op": "append", "entr')
+    assert HistoryJournal(journal_path).replay([]) == [calc(1)]
+    assert "Ignoring incomplete journal record" in caplog.text
+
+def test_unknown_durability(journal_path):
+    with pytest.raises(ConfigurationError, match="Unknown journal durability"):
+        HistoryJournal(journal_path, durability='always')
+
+# Test Durability
+
+def test_durability_levels_fsync(journal_path):
+    with patch('app.history_journal.os.fsync') as mock_fsync:
+        journal = HistoryJournal(journal_path, durability='op')
+        journal.record('append', [calc(1)])
+        journal.record('append', [calc(2)])
+        assert mock_fsync.call_count == 2
+        journal.close()
+
+    with patch('app.history_journal.os.fsync') as mock_fsync:
+        journal = HistoryJournal(journal_path, durability='batch')
+        journal.record('append', [calc(1)])
+        journal.record('append', [calc(2)])
+        journal.commit()
+        assert mock_fsync.call_count == 1
+        journal.close()
+
+    with patch('app.history_journal.os.fsync') as mock_fsync:
+        journal = HistoryJournal(journal_path, durability='none')
+        journal.commit()
+        journal.record('append', [calc(1)])
+        journal.commit()
+        mock_fsync.assert_not_called()
+        journal.close()
+
+# Test Rotation for Compaction
+
+def test_rotation_skips_compacted_records(journal_path):
+    journal = HistoryJournal(journal_path)
+    snapshot = [calc(1), calc(2)]
+    journal.record('append', snapshot)
+    rotated = journal.rotate(snapshot)
+    assert rotated.exists() and not journal_path.exists()
+    assert journal.records == 0
+    journal.record('append', [calc(3)])
+    journal.commit()
+
+    # Crash before the snapshot was written: the rotated records are replayed
+    assert journal.replay([]) == [calc(1), calc(2), calc(3)]
+    # Crash after the snapshot was written: the rotated records are skipped
+    assert journal.replay(snapshot) == [calc(1), calc(2), calc(3)]
+
+    journal.discard_rotated()
+    assert not rotated.exists()
+
+def test_truncate(journal_path):
+    journal = HistoryJournal(journal_path)
+    journal.record('append', [calc(1)])
+    journal.rotate([calc(1)])
+    journal.record('append', [calc(2)])
+    journal.truncate()
+    assert not journal_path.exists()
+    assert not journal.rotated_path.exists()
+    assert journal.replay([]) == []
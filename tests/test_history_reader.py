@@ -0,0 +1,156 @@
+import datetime
+import pytest
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import numpy as np
+from app.calculation import BatchCalculation, Calculation
+from app.exceptions import OperationError
+from app.history_format import write_binary_history
+from app.history_reader import HistoryReader
+
+START = datetime.datetime(2024, 1, 1, 12, 0, 0)
+
+
+def calc(n):
+    return Calculation("Addition", Decimal(n), Decimal("0.5"), timestamp=START + datetime.timedelta(seconds=n))
+
+
+@pytest.fixture
+def entries():
+    return [calc(n) for n in range(10)]
+
+
+@pytest.fixture
+def history_path(entries):
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "archive.bin"
+        with open(path, 'wb') as file:
+            write_binary_history(file, entries)
+        yield path
+
+
+# Test Random Access
+
+def test_index_and_iterate(history_path, entries):
+    with HistoryReader(history_path) as reader:
+        assert len(reader) == 10
+        assert reader[3] == entries[3]
+        assert reader[-1] == entries[-1]
+        assert reader[3].timestamp == entries[3].timestamp
+        assert list(reader) == entries
+        assert reader.entries() == entries
+        with pytest.raises(IndexError):
+            reader[10]
+
+def test_slices_are_windows(history_path, entries):
+    with HistoryReader(history_path) as reader:
+        window = reader[2:8]
+        assert isinstance(window, HistoryReader)
+        assert len(window) == 6
+        assert window[0] == entries[2]
+        inner = window[1:-1]
+        assert inner.entries() == entries[3:7]
+        assert len(reader[8:2]) == 0
+        assert reader[8:2].entries() == []
+        with pytest.raises(ValueError, match="steps"):
+            reader[::2]
+
+def test_iteration_in_chunks(history_path, entries):
+    with HistoryReader(history_path) as reader:
+        reader.CHUNK_SIZE = 3
+        assert list(reader[1:9]) == entries[1:9]
+
+
+# Test Columns
+
+def test_zero_copy_columns(history_path):
+    with HistoryReader(history_path) as reader:
+        window = reader[5:]
+        assert window.timestamps[0] == np.datetime64(START + datetime.timedelta(seconds=5), 'us')
+        assert window.column('operand1').tolist() == [5.0, 6.0, 7.0, 8.0, 9.0]
+        assert window.column('result').sum() == pytest.approx(37.5)
+        assert not window.column('operand2').flags.writeable
+        assert reader.operation_names == ["Addition"]
+        assert window.operation_codes.tolist() == [0] * 5
+        with pytest.raises(OperationError, match="Unknown history column"):
+            window.column('timestamp')
+
+def test_batch_entry(history_path):
+    batch = BatchCalculation(
+        operation="Multiplication",
+        operand1=np.array([1.0, 2.0]),
+        operand2=np.array([3.0, 4.0]),
+        result=np.array([3.0, 8.0]),
+        errors=np.array([False, False])
+    )
+    with open(history_path, 'wb') as file:
+        write_binary_history(file, [calc(1), batch])
+    with HistoryReader(history_path) as reader:
+        assert reader[1] == batch
+        assert np.isnan(reader.column('result')[1])
+        assert reader.operation_names == ["Addition", "Multiplication"]
+
+
+# Test Time Search
+
+def test_search_and_between(history_path, entries):
+    with HistoryReader(history_path) as reader:
+        assert reader.search(START + datetime.timedelta(seconds=4)) == 4
+        assert reader.search(START + datetime.timedelta(seconds=4), side='right') == 5
+        assert reader.search(START + datetime.timedelta(seconds=3.5)) == 4
+        assert reader.search(START - datetime.timedelta(days=1)) == 0
+        window = reader.between(START + datetime.timedelta(seconds=2), START + datetime.timedelta(seconds=5))
+        assert window.entries() == entries[2:5]
+        assert reader.between(start=START + datetime.timedelta(seconds=8)).entries() == entries[8:]
+        assert reader.between(end=START + datetime.timedelta(seconds=1)).entries() == entries[:1]
+        # Searching a window is relative to the window
+        assert reader[5:].search(START + datetime.timedelta(seconds=7)) == 2
+
+
+# Test DataFrame
+
+def test_to_dataframe(history_path, entries):
+    with HistoryReader(history_path) as reader:
+        df = reader[1:3].to_dataframe()
+    assert df['operation'].tolist() == ["Addition", "Addition"]
+    assert df['operand1'].tolist() == ["1", "2"]
+    assert df['result'].tolist() == ["1.5", "2.5"]
+    assert df['timestamp'].tolist() == [entries[1].timestamp, entries[2].timestamp]
+
+
+# Test Opening and Closing
+
+def test_invalid_files():
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "history.bin"
+        with pytest.raises(OperationError, match="Cannot open history file"):
+            HistoryReader(path)
+        path.write_bytes(b"")
+        with pytest.raises(OperationError, match="Cannot open history file"):
+            HistoryReader(path)
+        path.write_bytes(b"operation,operand1,operand2,result,timestamp\n")
+        with pytest.raises(OperationError, match="unknown header"):
+            HistoryReader(path)
+
+def test_close_with_views_in_use(history_path):
+    reader = HistoryReader(history_path)
+    timestamps = reader.timestamps
+    reader.close()
+    reader.close()
+    # The mapping stays valid while views of it are alive
+    assert len(timestamps) == 10
+
+def test_windows_share_the_mapping(history_path, entries):
+    reader = HistoryReader(history_path)
+    window = reader[2:6]
+    inner = window[1:]
+    window.close()
+    # Closing one window leaves the reader and the other windows readable
+    assert reader[0] == entries[0]
+    assert inner.entries() == entries[3:6]
+    reader.close()
+    assert inner[0] == entries[3]
+    mapping = inner._mmap
+    inner.close()
+    assert mapping.closed
@@ -0,0 +1,104 @@
+import pytest
+import numpy as np
+from app.history_stats import OperationStats, QuantileSketch
+
+
+# Test Quantile Sketch
+
+def test_sketch_quantiles_within_relative_accuracy():
+    values = np.random.default_rng(0).lognormal(0, 2, 10000)
+    sketch = QuantileSketch(0.01)
+    sketch.add(values)
+    for q in (0.0, 0.1, 0.5, 0.9, 0.99, 1.0):
+        exact = np.quantile(values, q, method='lower')
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+
+def test_sketch_handles_signs_and_zero():
+    sketch = QuantileSketch()
+    sketch.add(np.array([-100.0, -1.0, 0.0, 0.0, 1.0, 100.0]))
+    assert sketch.quantile(0) == pytest.approx(-100, rel=0.01)
+    assert sketch.quantile(0.25) == pytest.approx(-1, rel=0.01)
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1) == pytest.approx(100, rel=0.01)
+
+def test_sketch_remove_and_merge():
+    first, second = QuantileSketch(), QuantileSketch()
+    first.add(np.array([1.0, 2.0, 3.0]))
+    second.add(np.array([10.0, 20.0]))
+    first.merge(second)
+    assert first.count == 5
+    assert first.quantile(1) == pytest.approx(20, rel=0.01)
+    first.add(np.array([10.0, 20.0]), weight=-1)
+    assert first.count == 3
+    assert first.quantile(1) == pytest.approx(3, rel=0.01)
+    first.add(np.array([1.0, 2.0, 3.0]), weight=-1)
+    assert first.quantile(0.5) is None
+
+def test_sketch_validation():
+    with pytest.raises(ValueError, match="relative_accuracy"):
+        QuantileSketch(0)
+    with pytest.raises(ValueError, match="different relative accuracies"):
+        QuantileSketch(0.01).merge(QuantileSketch(0.05))
+    with pytest.raises(ValueError, match="Quantile must be between 0 and 1"):
+        QuantileSketch().quantile(1.5)
+
+
+# Test Operation Stats
+
+def test_stats_match_batch_computation():
+    values = np.random.default_rng(1).normal(5, 3, 1000)
+    stats = OperationStats()
+    stats.add(values[:1])
+    stats.add(values[1:400])
+    for value in values[400:]:
+        stats.add(np.array([value]))
+    assert stats.count == 1000
+    assert stats.sum == pytest.approx(values.sum())
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var())
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+def test_stats_remove_newest_values():
+    stats = OperationStats()
+    stats.add(np.array([5.0, 6.0]))
+    stats.add(np.array([1.0, 9.0, 7.0]))
+    stats.add(np.array([8.0]))
+    stats.remove(np.array([8.0]))
+    stats.remove(np.array([1.0, 9.0, 7.0]))
+    assert stats.count == 2
+    assert stats.mean == pytest.approx(5.5)
+    assert stats.variance == pytest.approx(0.25)
+    assert (stats.min, stats.max) == (5.0, 6.0)
+    stats.remove(np.array([5.0, 6.0]))
+    assert stats.summary() == {
+        'count': 0, 'sum': 0.0, 'min': None, 'max': None, 'mean': None,
+        'variance': 0.0, 'p50': None, 'p90': None, 'p99': None
+    }
+
+def test_stats_drop_extremes_of_evicted_values():
+    stats = OperationStats()
+    for value in range(1000):
+        stats.add(np.array([float(value)]))
+        # A history of 10 values evicts the oldest once full
+        if value >= 10:
+            stats.evict(1)
+    assert len(stats._extremes) == 10
+    stats.remove(np.array([999.0, 998.0]))
+    assert (stats.min, stats.max) == (0.0, 997.0)
+    assert stats.count == 998
+
+def test_stats_estimate_extremes_past_evicted_values():
+    stats = OperationStats()
+    stats.add(np.array([1.0, 50.0, 100.0]))
+    stats.evict(2)
+    stats.restore(2)
+    stats.remove(np.array([100.0, 50.0]))
+    assert stats.min == stats.max == pytest.approx(1.0, rel=0.01)
+    stats.remove(np.array([1.0]))
+    assert (stats.min, stats.max) == (None, None)
+
+def test_stats_ignore_empty_groups():
+    stats = OperationStats()
+    stats.add(np.array([]))
+    stats.remove(np.array([]))
+    assert stats.count == 0
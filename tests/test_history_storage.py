@@ -0,0 +1,158 @@
+import datetime
+import sqlite3
+import pytest
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock
+import numpy as np
+from app.calculation import BatchCalculation, Calculation
+from app.exceptions import OperationError
+from app.history_storage import FileHistoryStorage, SQLiteHistoryStorage
+
+START = datetime.datetime(2024, 1, 1, 12, 0, 0)
+
+
+def calc(n, operation="Addition"):
+    return Calculation(operation, Decimal(n), Decimal("0.5"), timestamp=START + datetime.timedelta(seconds=n))
+
+
+@pytest.fixture
+def storage():
+    with TemporaryDirectory() as temp_dir:
+        storage = SQLiteHistoryStorage(Path(temp_dir) / "history/calculator_history.db")
+        yield storage
+        storage.close()
+
+
+# Test SQLite Storage
+
+def test_database_uses_wal(storage):
+    assert storage.location.exists()
+    assert storage._connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert not storage.exists()
+    assert storage.load() == []
+
+def test_save_and_load(storage):
+    entries = [calc(n) for n in range(5)]
+    storage.save(entries)
+    assert storage.exists()
+    assert storage.load() == entries
+    assert storage.load(limit=2) == entries[-2:]
+
+def test_values_are_exact(storage):
+    entry = Calculation("Multiplication", Decimal("1.10"), Decimal("-1E+5"), timestamp=START)
+    storage.save([entry])
+    loaded = storage.load()[0]
+    assert str(loaded.operand1) == "1.10"
+    assert str(loaded.operand2) == "-1E+5"
+    assert loaded.timestamp == START
+
+def test_batch_entry_round_trip(storage):
+    batch = BatchCalculation(
+        operation="Division",
+        operand1=np.array([1.0, 2.0]),
+        operand2=np.array([2.0, 0.0]),
+        result=np.array([0.5, np.nan]),
+        errors=np.array([False, True])
+    )
+    storage.save([batch])
+    assert storage.load() == [batch]
+
+def test_record_changes(storage):
+    entries = [calc(n) for n in range(6)]
+    storage.record('append', entries[2:5])
+    storage.record('prepend', entries[:2])
+    assert storage.load() == entries[:5]
+    storage.record('evict', entries[:1])
+    storage.record('truncate', entries[4:5])
+    assert storage.load() == entries[1:4]
+    storage.record('reset', entries[3:])
+    assert storage.load() == entries[3:]
+    storage.record('clear')
+    assert storage.load() == []
+
+def test_prepend_to_empty_database(storage):
+    storage.record('prepend', [calc(1)])
+    storage.record('append', [calc(2)])
+    assert storage.load() == [calc(1), calc(2)]
+
+def test_commit_and_discard(storage):
+    storage.save([calc(0)])
+    storage.record('append', [calc(1)])
+    storage.discard()
+    assert storage.load() == [calc(0)]
+    storage.record('append', [calc(2)])
+    storage.commit()
+    storage.discard()
+    assert storage.load() == [calc(0), calc(2)]
+
+def test_trim_keeps_newest(storage):
+    entries = [calc(n) for n in range(5)]
+    storage.save(entries)
+    storage.trim(2)
+    assert storage.load() == entries[-2:]
+
+def test_committed_changes_survive_reopen(storage):
+    storage.record('append', [calc(1)])
+    storage.commit()
+    storage.record('append', [calc(2)])
+    storage.discard()
+    storage.record('append', [calc(3)])
+    # Closing commits the changes recorded since the last commit
+    storage.close()
+    reopened = SQLiteHistoryStorage(storage.location)
+    try:
+        assert reopened.load() == [calc(1), calc(3)]
+    finally:
+        reopened.close()
+
+def test_query_filters(storage):
+    entries = [calc(n, "Addition" if n % 2 else "Subtraction") for n in range(10)]
+    storage.save(entries)
+    assert storage.query(operation="Addition") == entries[1::2]
+    assert storage.query(operation="Addition", limit=2) == entries[7::2]
+    window = storage.query(
+        start=START + datetime.timedelta(seconds=3),
+        end=START + datetime.timedelta(seconds=6)
+    )
+    assert window == entries[3:6]
+    assert storage.query(operation="Power") == []
+
+def test_query_uses_indexes(storage):
+    plan = storage._connection.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM history WHERE operation = ?", ("Addition",)
+    ).fetchall()
+    assert any("INDEX" in str(row) for row in plan)
+
+def test_open_failure():
+    with TemporaryDirectory() as temp_dir:
+        with pytest.raises(OperationError, match="Cannot open history database"):
+            SQLiteHistoryStorage(Path(temp_dir))
+
+
+# Test File Storage
+
+def test_file_storage_follows_config():
+    with TemporaryDirectory() as temp_dir:
+        config = Mock(verify_rate=0.0, history_file_format='binary')
+        config.history_file = Path(temp_dir) / "history/calculator_history.bin"
+        storage = FileHistoryStorage(config)
+        assert not storage.incremental
+        assert storage.location == config.history_file
+        assert not storage.exists()
+        entries = [calc(n) for n in range(3)]
+        storage.save(entries)
+        assert storage.exists()
+        assert storage.load(limit=2) == entries[1:]
+        config.history_file_format = 'csv'
+        config.history_file = Path(temp_dir) / "history/calculator_history.csv"
+        storage.save(entries)
+        assert storage.load() == entries
+        # The base class hooks for incremental backends do nothing
+        storage.record('append', entries)
+        storage.commit()
+        storage.discard()
+        storage.trim(1)
+        storage.close()
+        assert storage.load() == entries
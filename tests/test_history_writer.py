@@ -0,0 +1,191 @@
+import gc
+import threading
+import time
+import weakref
+import pytest
+from unittest.mock import patch
+from app.history_writer import BackgroundHistoryWriter, _close_live_writers, _live_writers
+
+
+class SlowSave:
+    """Save callback that records calls and can be held to simulate slow I/O."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def __call__(self):
+        self.release.wait()
+        if self.fail:
+            raise OSError("disk full")
+        self.calls += 1
+
+
+@pytest.fixture
+def save():
+    return SlowSave()
+
+
+# Test Coalescing
+
+def test_burst_is_coalesced_into_one_save(save):
+    writer = BackgroundHistoryWriter(save, flush_every=1000, flush_interval=60)
+    for _ in range(50):
+        writer.notify()
+    assert writer.pending == 50
+    assert writer.staleness > 0
+    assert save.calls == 0
+    assert writer.flush(timeout=5)
+    assert save.calls == 1
+    assert writer.pending == 0
+    assert writer.staleness == 0.0
+    writer.close()
+
+def test_flush_every_triggers_save(save):
+    writer = BackgroundHistoryWriter(save, flush_every=3, flush_interval=60)
+    writer.notify(3)
+    deadline = time.monotonic() + 5
+    while writer.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.pending == 0
+    assert save.calls == 1
+    writer.close()
+
+def test_flush_interval_triggers_save(save):
+    writer = BackgroundHistoryWriter(save, flush_every=1000, flush_interval=0.05)
+    writer.notify()
+    deadline = time.monotonic() + 5
+    while writer.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.pending == 0
+    assert save.calls == 1
+    writer.close()
+
+def test_changes_during_save_stay_pending(save):
+    writer = BackgroundHistoryWriter(save, flush_every=1, flush_interval=60)
+    save.release.clear()
+    writer.notify()
+    time.sleep(0.05)
+    writer.notify(2)
+    assert writer.pending == 3
+    save.release.set()
+    assert writer.flush(timeout=5)
+    assert save.calls == 2
+    writer.close()
+
+
+# Test Adaptive Policy
+
+def test_save_cost_delays_next_save(save):
+    writer = BackgroundHistoryWriter(save, flush_every=1, flush_interval=60, cost_factor=1000)
+    save.release.clear()
+    writer.notify()
+    time.sleep(0.02)
+    save.release.set()
+    deadline = time.monotonic() + 5
+    while writer.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.last_save_cost >= 0.01
+    # The next save would be due immediately, but the measured cost holds it back
+    writer.notify()
+    time.sleep(0.05)
+    assert writer.pending == 1
+    # flush overrides the back-off
+    assert writer.flush(timeout=5)
+    assert save.calls == 2
+    writer.close()
+
+
+# Test External Saves and Shutdown
+
+def test_mark_saved_clears_pending(save):
+    writer = BackgroundHistoryWriter(save, flush_every=1000, flush_interval=60)
+    writer.notify(2)
+    generation = writer.generation
+    writer.notify()
+    writer.mark_saved(generation)
+    assert writer.pending == 1
+    writer.mark_saved(writer.generation)
+    assert writer.pending == 0
+    assert writer.staleness == 0.0
+    assert writer.flush(timeout=5)
+    assert save.calls == 0
+    writer.close()
+
+def test_partial_save_restarts_staleness_from_first_unsaved_change(save):
+    writer = BackgroundHistoryWriter(save, flush_every=1000, flush_interval=0.2)
+    writer.notify(2)
+    generation = writer.generation
+    time.sleep(0.15)
+    writer.notify()
+    writer.mark_saved(generation)
+    # Only the last change is pending, and it has just been made
+    assert writer.pending == 1
+    assert writer.staleness < 0.1
+    assert not writer._due(time.monotonic())
+    assert writer.flush(timeout=5)
+    assert writer.staleness == 0.0
+    writer.close()
+
+def test_close_flushes_pending_changes(save):
+    writer = BackgroundHistoryWriter(save, flush_every=1000, flush_interval=60)
+    writer.notify(5)
+    writer.close()
+    writer.close()
+    assert save.calls == 1
+    assert writer.pending == 0
+
+def test_open_writers_are_closed_at_exit(save):
+    writer = BackgroundHistoryWriter(save, flush_every=1000, flush_interval=60)
+    writer.notify(3)
+    assert writer in _live_writers
+    _close_live_writers()
+    assert save.calls == 1
+    assert writer not in _live_writers
+
+def test_unclosed_writer_can_be_collected(save):
+    writer = BackgroundHistoryWriter(save, flush_every=1000, flush_interval=60)
+    writer.notify()
+    thread = writer._thread
+    reference = weakref.ref(writer)
+    del writer
+    gc.collect()
+    assert reference() is None
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert save.calls == 0
+
+def test_thread_stops_when_writer_is_collected_before_waiting(save):
+    writer = BackgroundHistoryWriter(save, flush_every=1000, flush_interval=60)
+    lookups = iter([writer, None])
+    BackgroundHistoryWriter._run(lambda: next(lookups))
+    writer.close()
+
+
+# Test Errors
+
+@patch('app.history_writer.logging.error')
+def test_failed_save_is_raised_by_flush(logging_error_mock, save):
+    writer = BackgroundHistoryWriter(save, flush_every=1000, flush_interval=60)
+    save.fail = True
+    writer.notify()
+    with pytest.raises(OSError, match="disk full"):
+        writer.flush(timeout=5)
+    logging_error_mock.assert_called_once_with("Background history save failed: disk full")
+    assert writer.pending == 1
+    save.fail = False
+    assert writer.flush(timeout=5)
+    writer.close()
+
+@patch('app.history_writer.logging.error')
+def test_failed_save_on_close_stops_writer(logging_error_mock, save):
+    writer = BackgroundHistoryWriter(save, flush_every=1000, flush_interval=60)
+    save.fail = True
+    writer.notify()
+    writer.close()
+    assert writer.pending == 1
+    with pytest.raises(OSError):
+        writer.flush(timeout=5)
+    assert not writer.flush(timeout=5)
@@ -1,8 +1,12 @@
 # Test memento to_dict and from_dict methods
 
+from decimal import Decimal
+
+from app.calculation import Calculation
 from app.calculator import Calculator
 from app.calculator_config import CalculatorConfig
-from app.calculator_memento import CalculatorMemento
+from app.calculator_memento import CalculatorMemento, HistoryDelta
+from app.history_buffer import HistoryBuffer
 from app.operations import OperationFactory
 
 
@@ -27,4 +31,24 @@ def test_memento_to_from_dic():
     # Convert back and forth then compare the history before and after.
     data = mem.to_dict()
     back = CalculatorMemento.from_dict(data)
-    assert back.history == calc.history
\ No newline at end of file
+    assert back.history == calc.history
+
+def test_history_delta_to_from_dict():
+    calc = Calculation(operation="Addition", operand1=Decimal("2"), operand2=Decimal("3"))
+    old = Calculation(operation="Subtraction", operand1=Decimal("5"), operand2=Decimal("3"))
+    delta = HistoryDelta()
+    delta.record(appended=[calc], evicted=[old])
+    back = HistoryDelta.from_dict(delta.to_dict())
+    assert list(back.appended) == [calc]
+    assert back.evicted == [old]
+
+
+def test_history_delta_undo_redo():
+    buffer = HistoryBuffer(2, entries=[1, 2])
+    delta = HistoryDelta()
+    delta.record(appended=[3], evicted=buffer.append(3))
+    assert buffer == [2, 3]
+    delta.undo(buffer)
+    assert buffer == [1, 2]
+    delta.redo(buffer)
+    assert buffer == [2, 3]
@@ -0,0 +1,91 @@
+import pytest
+from decimal import Decimal, localcontext
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from app.exceptions import ValidationError
+from app.operation_cache import OperationCache
+from app.operations import OperationFactory
+
+add = OperationFactory.create_operation('add')
+divide = OperationFactory.create_operation('divide')
+
+
+# Test Lookups
+
+def test_repeated_operands_hit_the_cache():
+    cache = OperationCache(capacity=10)
+    with patch.object(type(add), 'execute', wraps=add.execute) as mock_execute:
+        assert cache.execute(add, Decimal('2'), Decimal('3')) == Decimal('5')
+        assert cache.execute(add, Decimal('2'), Decimal('3')) == Decimal('5')
+        assert mock_execute.call_count == 1
+    assert cache.execute(add, Decimal('3'), Decimal('2')) == Decimal('5')
+    assert cache.statistics() == {
+        'size': 2, 'capacity': 10, 'hits': 1, 'misses': 2, 'evictions': 0, 'hit_rate': pytest.approx(1 / 3)
+    }
+
+def test_key_includes_operation_and_context():
+    cache = OperationCache()
+    assert cache.execute(divide, Decimal('1'), Decimal('3')) == Decimal('0.3333333333333333333333333333')
+    assert cache.execute(OperationFactory.create_operation('multiply'), Decimal('1'), Decimal('3')) == Decimal('3')
+    with localcontext() as context:
+        context.prec = 5
+        assert cache.execute(divide, Decimal('1'), Decimal('3')) == Decimal('0.33333')
+    # Operands equal in value but not in form give results of the same form as execute
+    assert str(cache.execute(add, Decimal('1.0'), Decimal('1'))) == '2.0'
+    assert str(cache.execute(add, Decimal('1'), Decimal('1'))) == '2'
+    assert cache.hits == 0
+
+def test_failures_are_not_cached():
+    cache = OperationCache()
+    for _ in range(2):
+        with pytest.raises(ValidationError):
+            cache.execute(divide, Decimal('1'), Decimal('0'))
+    assert len(cache) == 0
+    assert cache.misses == 2
+
+def test_least_recently_used_result_is_evicted():
+    cache = OperationCache(capacity=2)
+    cache.execute(add, Decimal('1'), Decimal('1'))
+    cache.execute(add, Decimal('2'), Decimal('2'))
+    cache.execute(add, Decimal('1'), Decimal('1'))
+    cache.execute(add, Decimal('3'), Decimal('3'))
+    assert cache.evictions == 1
+    cache.execute(add, Decimal('1'), Decimal('1'))
+    cache.execute(add, Decimal('2'), Decimal('2'))
+    assert (cache.hits, cache.misses) == (2, 4)
+    cache.clear()
+    assert cache.statistics()['size'] == 0
+    assert cache.hit_rate == 0.0
+
+
+# Test Persistence
+
+def test_persisted_cache_starts_warm():
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "cache/operation_cache"
+        cache = OperationCache(path=path)
+        cache.execute(add, Decimal('2'), Decimal('3'))
+        cache.execute(divide, Decimal('1'), Decimal('3'))
+        cache.save()
+        restarted = OperationCache(capacity=1, path=path)
+        assert len(restarted) == 1
+        assert restarted.evictions == 0
+        restarted = OperationCache(path=path)
+        assert restarted.execute(add, Decimal('2'), Decimal('3')) == Decimal('5')
+        assert restarted.hits == 1
+
+def test_save_without_file_does_nothing():
+    cache = OperationCache()
+    cache.execute(add, Decimal('2'), Decimal('3'))
+    cache.save()
+
+@patch('app.operation_cache.logging.warning')
+def test_unreadable_cache_file_is_skipped(logging_warning_mock):
+    with TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "operation_cache"
+        cache = OperationCache(path=path)
+        cache._entries[('Addition', '2', '3')] = Decimal('5')
+        cache.save()
+        assert len(OperationCache(path=path)) == 0
+        logging_warning_mock.assert_called_once()
@@ -1,5 +1,6 @@
 import pytest
 from decimal import Decimal
+import numpy as np
 from typing import Any, Dict, Type
 
 from app.exceptions import ValidationError
@@ -149,13 +150,18 @@ class TestPower(BaseOperationTest):
         "one_exponent": {"a": "5", "b": "1", "expected": "5"},
         "decimal_base": {"a": "2.5", "b": "2", "expected": "6.25"},
         "zero_base": {"a": "0", "b": "5", "expected": "0"},
+        "exact_large_integer": {"a": "2", "b": "90", "expected": "1237940039285380274899124224"},
+        "large_integer_rounds_to_context": {"a": "2", "b": "100", "expected": "1.267650600228229401496703205E+30"},
+        "beyond_float_range": {"a": "10", "b": "400", "expected": "1E+400"},
+        "fractional_exponent": {"a": "2.25", "b": "1.5", "expected": "3.375"},
+        "inexact_fractional_exponent": {"a": "2", "b": "0.5", "expected": "1.414213562373095048801688724"},
     }
     invalid_test_cases = {
         "negative_exponent": {
             "a": "2",
             "b": "-3",
             "error": ValidationError,
-            "message": "Negative exponents not supported"
+            "message": "Negative exponents are not supported"
         },
     }
 
@@ -169,6 +175,10 @@ class TestRoot(BaseOperationTest):
         "cube_root": {"a": "27", "b": "3", "expected": "3"},
         "fourth_root": {"a": "16", "b": "4", "expected": "2"},
         "decimal_root": {"a": "2.25", "b": "2", "expected": "1.5"},
+        "large_perfect_power": {"a": "1E+600", "b": "3", "expected": "1E+200"},
+        "irrational_root": {"a": "2", "b": "3", "expected": "1.259921049894873164767210607"},
+        "negative_degree": {"a": "16", "b": "-4", "expected": "0.5"},
+        "fractional_degree": {"a": "8", "b": "1.5", "expected": "4"},
     }
     invalid_test_cases = {
         "negative_base": {
@@ -316,4 +326,64 @@ class TestOperationFactory:
             pass
 
         with pytest.raises(TypeError, match="Operation class must inherit"):
-            OperationFactory.register_operation("invalid", InvalidOperation)
\ No newline at end of file
+            OperationFactory.register_operation("invalid", InvalidOperation)
+
+class TestExecuteArray:
+    """Test vectorized execution of operations."""
+
+    def test_vector_kernels_match_scalar(self):
+        """Test every factory operation's NumPy kernel against its scalar execute."""
+        a = np.array([5.0, -6.0, 2.25, 9.0])
+        b = np.array([2.0, 4.0, 2.0, 3.0])
+        for op_name in ['add', 'subtract', 'multiply', 'divide', 'power', 'modulus',
+                        'int_divide', 'percent', 'abs_diff']:
+            operation = OperationFactory.create_operation(op_name)
+            result, errors = operation.execute_array(a, b)
+            assert not errors.any(), op_name
+            for i in range(len(a)):
+                expected = operation.execute(Decimal(str(a[i])), Decimal(str(b[i])))
+                assert result[i] == pytest.approx(float(expected)), op_name
+
+    def test_vector_kernel_error_mask(self):
+        """Test that invalid rows are flagged and hold NaN."""
+        result, errors = Division().execute_array(np.array([1.0, 4.0]), np.array([0.0, 2.0]))
+        assert errors.tolist() == [True, False]
+        assert np.isnan(result[0]) and result[1] == 2.0
+
+        result, errors = Root().execute_array(np.array([-9.0, 9.0, 9.0]), np.array([2.0, 0.0, 2.0]))
+        assert errors.tolist() == [True, True, False]
+        assert result[2] == 3.0
+
+    def test_scalar_fallback(self):
+        """Test that operations without a kernel fall back to the scalar execute."""
+        class Halve(Operation):
+            def execute(self, a: Decimal, b: Decimal) -> Decimal:
+                if b == 0:
+                    raise ValidationError("Division by zero is not allowed")
+                return a / 2
+
+        result, errors = Halve().execute_array(np.array([4.0, 3.0]), np.array([1.0, 0.0]))
+        assert result[0] == 2.0
+        assert errors.tolist() == [False, True]
+
+
+class TestOperationRegistry:
+    """Test the shared operation registry."""
+
+    def test_create_returns_shared_instance(self):
+        """Test that stateless operations are instantiated once."""
+        assert OperationFactory.create_operation('add') is OperationFactory.create_operation('ADD')
+
+    def test_lookup_by_display_name(self):
+        """Test looking operations and kernels up by display name."""
+        operation = OperationFactory.get_operation("Division")
+        assert isinstance(operation, Division)
+        assert OperationFactory.get_kernel("Division")(Decimal("6"), Decimal("3")) == Decimal("2")
+        assert OperationFactory.get_operation("Unknown") is None
+        assert OperationFactory.get_kernel("Unknown") is None
+
+    def test_operation_names(self):
+        """Test listing registered operation identifiers."""
+        names = OperationFactory.operation_names()
+        assert names[:10] == ['add', 'subtract', 'multiply', 'divide', 'power', 'root',
+                              'modulus', 'int_divide', 'percent', 'abs_diff']
@@ -0,0 +1,75 @@
+import pickle
+import pytest
+from decimal import Context, Decimal
+from app.calculator_config import CalculatorConfig
+from app.exceptions import OperationError, ValidationError
+from app.operations import OperationFactory
+from app.parallel import (
+    decode_outcomes, decode_rows, encode_rows, evaluate_chunk, init_worker, is_encodable, resolve_operation
+)
+
+
+@pytest.fixture
+def config():
+    return CalculatorConfig(max_input_value=Decimal('1e6'))
+
+
+# Test Encoding
+
+def test_encode_rows_round_trip():
+    rows = [('add', 1, '2.5'), ('divide', Decimal('7'), 3), ('add', '-4', 0)]
+    names, codes, operands = chunk = encode_rows(rows)
+    assert names == ('add', 'divide')
+    assert len(codes) == 6
+    assert list(decode_rows(chunk)) == [('add', '1', '2.5'), ('divide', '7', '3'), ('add', '-4', '0')]
+
+def test_encode_rows_is_compact():
+    rows = [('add', Decimal(n), Decimal('0.5')) for n in range(1000)]
+    assert len(pickle.dumps(encode_rows(rows))) < len(pickle.dumps(rows)) / 2
+
+def test_rows_with_separators_are_not_encoded():
+    assert is_encodable(('add', 1, '2'))
+    assert not is_encodable(('add', '1\x1f2', '3'))
+    assert not is_encodable(('a\x1edd', '1', '3'))
+    with pytest.raises(ValueError, match="Row cannot be encoded"):
+        encode_rows([('add', '1\x1f2', '3')])
+
+
+# Test Evaluation
+
+def test_evaluate_chunk(config):
+    chunk = encode_rows([('add', '2', '3'), ('divide', 1, 0), ('bogus', 1, 1), ('multiply', 'x', 2), ('Power', 2, 10)])
+    outcomes = list(decode_outcomes(evaluate_chunk(chunk, config, Context(prec=28))))
+    assert outcomes[0] == (Decimal('2'), Decimal('3'), Decimal('5'))
+    assert isinstance(outcomes[1], ValidationError)
+    assert str(outcomes[1]) == "Division by zero is not allowed"
+    assert isinstance(outcomes[2], OperationError)
+    assert str(outcomes[2]) == "Unknown operation: bogus"
+    assert isinstance(outcomes[3], ValidationError)
+    assert outcomes[4] == (Decimal('2'), Decimal('10'), Decimal('1024'))
+
+def test_evaluate_chunk_uses_context(config):
+    chunk = encode_rows([('divide', 1, 3)])
+    [(_, _, result)] = decode_outcomes(evaluate_chunk(chunk, config, Context(prec=5)))
+    assert result == Decimal('0.33333')
+
+def test_evaluate_chunk_wraps_arithmetic_errors(config):
+    chunk = encode_rows([('power', '1e5', '1e5')])
+    [outcome] = decode_outcomes(evaluate_chunk(chunk, config, Context(prec=28, Emax=10)))
+    assert isinstance(outcome, OperationError)
+    assert str(outcome).startswith("Operation failed")
+
+def test_decode_outcomes_empty():
+    assert list(decode_outcomes('')) == []
+
+def test_resolve_operation():
+    assert resolve_operation('add') is OperationFactory.create_operation('add')
+    assert resolve_operation('Addition') is OperationFactory.create_operation('add')
+    assert resolve_operation('bogus') is None
+
+
+# Test Worker Setup
+
+def test_init_worker_defines_formulas():
+    init_worker(["spread(x, y) = x - y * 2"])
+    assert OperationFactory.create_operation('spread').execute(Decimal('10'), Decimal('3')) == Decimal('4')
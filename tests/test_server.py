@@ -0,0 +1,225 @@
+import asyncio
+import json
+import os
+import pytest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import AsyncMock, Mock, patch
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.server import CalculatorServer, main
+
+
+@pytest.fixture
+def calculator():
+    with TemporaryDirectory() as temp_dir:
+        calc = Calculator(CalculatorConfig(base_dir=Path(temp_dir), auto_save=False))
+        calc.clear_history()
+        yield calc
+
+
+@pytest.fixture
+def server(calculator):
+    server = CalculatorServer(calculator)
+    yield server
+    server.close()
+
+
+async def exchange(server, lines, count=None, path=None):
+    """Send all request lines at once, then read the response lines."""
+    listener = await server.start(port=0, path=path)
+    async with listener:
+        if path is None:
+            reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+        else:
+            reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(''.join(line + '\n' for line in lines).encode())
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(len(lines) if count is None else count)]
+        writer.close()
+        await writer.wait_closed()
+    return responses
+
+
+def request(**fields):
+    return json.dumps(fields)
+
+
+# Test Requests
+
+def test_pipelined_operations_and_commands(server, calculator):
+    responses = asyncio.run(exchange(server, [
+        request(id=1, operation='add', a=2, b=3),
+        '',
+        request(id=2, operation='power', a='2', b=0.5),
+        request(id=3, operation='divide', a=1, b=0),
+        request(id=4, operation='bogus', a=1, b=2),
+        request(id=5, operation='add', a=1),
+        request(id=6, command='history'),
+        request(id=7, command='undo'),
+        request(id=8, command='version'),
+        request(id=9, command='operations'),
+        request(id=10, command='explode'),
+        'not json',
+        '5',
+    ], count=12))
+    assert responses[0] == {'id': 1, 'result': '5'}
+    assert responses[1]['result'].startswith('1.41421356')
+    assert responses[2] == {'id': 3, 'error': "Division by zero is not allowed"}
+    assert responses[3] == {'id': 4, 'error': "Unknown operation: bogus"}
+    assert responses[4] == {'id': 5, 'error': "Missing field: b"}
+    assert [entry['result'] for entry in responses[5]['result']] == ['5', responses[1]['result']]
+    assert responses[6] == {'id': 7, 'result': True}
+    assert responses[7]['result'] == calculator.version
+    assert 'add' in responses[8]['result']
+    assert responses[9] == {'id': 10, 'error': "Unknown command: explode"}
+    assert responses[10]['id'] is None and responses[10]['error'].startswith("Invalid JSON")
+    assert responses[11] == {'id': None, 'error': "Request must be a JSON object or array"}
+    assert len(calculator.history) == 1
+
+def test_batch_request(server, calculator):
+    batch = json.dumps([
+        {'id': 'a', 'operation': 'multiply', 'a': '1.5', 'b': 4},
+        {'id': 'b', 'command': 'undo'},
+        {'id': 'c', 'operation': 'subtract', 'a': 10, 'b': 'x'},
+        7,
+        {'id': 'd', 'operation': 'modulus', 'a': 10, 'b': 4},
+    ])
+    [responses] = asyncio.run(exchange(server, [batch]))
+    assert responses == [
+        {'id': 'a', 'result': '6.0'},
+        {'id': 'b', 'error': "Commands cannot be batched"},
+        {'id': 'c', 'error': "Invalid number format: x"},
+        {'id': None, 'error': "Batch entries must be JSON objects"},
+        {'id': 'd', 'result': '2'},
+    ]
+    assert len(calculator.history) == 2
+    assert len(calculator.undo_stack) == 1
+
+def test_unix_socket(server):
+    with TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'calculator.sock')
+        responses = asyncio.run(exchange(server, [request(id=1, operation='subtract', a=5, b=8)], path=path))
+    assert responses == [{'id': 1, 'result': '-3'}]
+
+
+def test_malformed_command_does_not_stall_connection(server, calculator):
+    responses = asyncio.run(exchange(server, [
+        request(id=1, command=[1]),
+        request(id=2, operation='add', a=1, b=2),
+    ]))
+    assert responses == [
+        {'id': 1, 'error': "Unknown command: [1]"},
+        {'id': 2, 'result': '3'},
+    ]
+
+def test_unexpected_errors_are_answered(server, calculator):
+    with patch.object(calculator, 'perform_many', side_effect=RuntimeError("boom")):
+        responses = asyncio.run(exchange(server, [
+            request(id=1, operation='add', a=1, b=2),
+            request(id=2, command='version'),
+        ]))
+    assert responses == [
+        {'id': 1, 'error': "Request failed: boom"},
+        {'id': 2, 'result': calculator.version},
+    ]
+    with patch.object(server, 'handle_line', side_effect=RuntimeError("boom")):
+        responses = asyncio.run(exchange(server, [request(id=3, command='version')]))
+    assert responses == [{'id': None, 'error': "Request failed: boom"}]
+
+
+# Test Flow Control
+
+def test_deep_pipeline_keeps_order(calculator):
+    server = CalculatorServer(calculator, pipeline_depth=2)
+    try:
+        lines = [request(id=n, operation='add', a=n, b=1) for n in range(300)]
+        responses = asyncio.run(exchange(server, lines))
+    finally:
+        server.close()
+    assert [response['id'] for response in responses] == list(range(300))
+    assert responses[-1]['result'] == '300'
+
+def test_calculations_do_not_stall_event_loop(server, calculator):
+    def slow_perform_many(rows, record=True):
+        time.sleep(0.3)
+        return [Decimal(1)]
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await server.handle_line(request(id=1, operation='power', a=2, b=3).encode())
+        task.cancel()
+        return ticks
+
+    with patch.object(calculator, 'perform_many', side_effect=slow_perform_many):
+        assert asyncio.run(scenario()) >= 5
+
+def test_request_line_too_long(server):
+    with patch('app.server.MAX_LINE_SIZE', 64):
+        responses = asyncio.run(exchange(server, ['x' * 200, request(id=1, operation='add', a=1, b=1)], count=1))
+    assert responses == [{'id': None, 'error': "Request line too long"}]
+
+
+# Test Connection Errors
+
+def test_respond_stops_writing_after_disconnect(server):
+    async def scenario():
+        writer = Mock()
+        writer.drain = AsyncMock(side_effect=ConnectionResetError)
+        queue = asyncio.Queue()
+        for line in (request(operation='add', a=1, b=1).encode(), request(operation='add', a=2, b=2).encode(), None):
+            queue.put_nowait(line)
+        await server._respond(queue, writer)
+        return writer
+
+    assert asyncio.run(scenario()).write.call_count == 1
+
+def test_reset_while_reading(server):
+    async def scenario():
+        reader = Mock()
+        reader.readline = AsyncMock(side_effect=ConnectionResetError)
+        writer = Mock()
+        await server.handle_connection(reader, writer)
+        return writer
+
+    assert asyncio.run(scenario()).close.called
+    assert server.connections == 0
+
+
+# Test Server Lifecycle
+
+def test_serve_until_cancelled(server):
+    async def scenario():
+        task = asyncio.create_task(server.serve(port=0))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+def test_close_keeps_shared_executor(calculator):
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        CalculatorServer(calculator, executor=executor).close()
+        assert executor.submit(lambda: 42).result() == 42
+
+def test_main_runs_until_interrupted(calculator):
+    def interrupt(coroutine):
+        coroutine.close()
+        raise KeyboardInterrupt
+
+    with patch('app.server.Calculator', return_value=calculator), \
+         patch('app.server.asyncio.run', side_effect=interrupt) as run:
+        assert main(['--port', '0']) == 0
+    run.assert_called_once()
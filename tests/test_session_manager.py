@@ -0,0 +1,157 @@
+import json
+import pytest
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import numpy as np
+from app.calculator_config import CalculatorConfig
+from app.exceptions import ValidationError
+from app.operations import OperationFactory
+from app.session_manager import ENTRY_BYTES, SessionManager, SessionStats, dump_session, estimate_size
+
+
+@pytest.fixture
+def base_dir():
+    with TemporaryDirectory() as temp_dir:
+        yield Path(temp_dir)
+
+
+def make_manager(base_dir, **settings):
+    return SessionManager(CalculatorConfig(base_dir=base_dir, **settings))
+
+
+def calculate(calc, op, a, b):
+    calc.set_operation(OperationFactory.create_operation(op))
+    return calc.perform_operation(a, b)
+
+
+# Test Session Lifecycle
+
+def test_sessions_are_created_on_demand(base_dir):
+    manager = make_manager(base_dir)
+    alice = manager.get('alice')
+    assert len(alice.history) == 0
+    assert not alice.config.auto_save
+    calculate(alice, 'add', 2, 3)
+    assert manager.get('alice') is alice
+    assert len(manager.get('bob').history) == 0
+    assert len(manager) == 2 and 'alice' in manager
+    assert (manager.stats.hits, manager.stats.created, manager.stats.misses) == (1, 2, 2)
+
+def test_least_recently_used_session_is_offloaded(base_dir):
+    manager = make_manager(base_dir, session_max_resident=2)
+    alice = manager.get('alice')
+    calculate(alice, 'add', 2, 3)
+    calculate(alice, 'multiply', 4, 5)
+    calculate(alice, 'subtract', 9, 1)
+    alice.undo()
+    manager.get('bob')
+    manager.get('alice')
+    manager.get('carol')
+    assert 'bob' not in manager and 'alice' in manager
+    manager.get('dave')
+    assert 'alice' not in manager
+    assert manager.session_file('alice').exists()
+    assert manager.stats.evictions == 2
+
+    restored = manager.get('alice')
+    assert restored is not alice
+    assert not manager.session_file('alice').exists()
+    assert [calc.result for calc in restored.history] == [Decimal('5'), Decimal('20')]
+    assert restored.redo()
+    assert restored.history[-1].result == Decimal('8')
+    assert restored.undo(3)
+    assert len(restored.history) == 0
+    assert manager.stats.rehydrated == 1
+    assert manager.stats.mean_rehydration_ms > 0
+
+def test_sessions_are_offloaded_by_memory(base_dir):
+    manager = make_manager(base_dir, session_max_memory_mb=0.005)
+    alice = manager.get('alice')
+    for n in range(10):
+        calculate(alice, 'add', n, 1)
+    assert manager.memory_usage() == estimate_size(alice) > 0
+    manager.get('bob')
+    assert 'alice' not in manager
+    assert len(manager.get('alice').history) == 10
+
+def test_memory_is_estimated_from_content(base_dir):
+    manager = make_manager(base_dir)
+    alice = manager.get('alice')
+    empty = estimate_size(alice)
+    alice.perform_batch('add', np.zeros(100_000), np.ones(100_000))
+    # Three float64 arrays and a boolean mask of 100k rows
+    assert estimate_size(alice) - empty > 100_000 * 25
+    small = estimate_size(alice)
+    alice.perform_many([('add', n, 1) for n in range(1000)])
+    assert estimate_size(alice) - small >= 1000 * ENTRY_BYTES
+    alice.undo()
+    # Undone entries are held by the redo step, and counted once
+    assert estimate_size(alice) - small >= 1000 * ENTRY_BYTES
+
+def test_memory_is_estimated_only_for_changed_sessions(base_dir):
+    manager = make_manager(base_dir)
+    for name in ('alice', 'bob', 'carol'):
+        calculate(manager.get(name), 'add', 1, 1)
+    total = manager.memory_usage()
+    with patch('app.session_manager.estimate_size', wraps=estimate_size) as estimate:
+        calculate(manager.get('bob'), 'multiply', 2, 3)
+        manager.get('alice')
+        usage = manager.memory_usage()
+    # Only bob changed since the sizes were last estimated
+    assert estimate.call_count == 1
+    assert usage == total + estimate_size(manager.get('bob')) // 2
+    manager.discard('bob')
+    assert manager.memory_usage() == total * 2 // 3
+
+def test_sessions_share_cache_and_logging(base_dir):
+    with patch('app.session_manager.Calculator.setup_logging') as setup_logging:
+        manager = make_manager(base_dir, operation_cache_size=16)
+        alice, bob = manager.get('alice'), manager.get('bob')
+    setup_logging.assert_called_once_with(manager.template)
+    assert alice.operation_cache is bob.operation_cache is manager.operation_cache
+    calculate(alice, 'power', 2, 10)
+    calculate(bob, 'power', 2, 10)
+    assert manager.operation_cache.hits == 1
+    assert make_manager(base_dir, operation_cache_size=0).operation_cache is None
+
+def test_restored_entries_are_shared(base_dir):
+    manager = make_manager(base_dir)
+    calculate(manager.get('alice'), 'power', 2, 8)
+    data = dump_session(manager.get('alice'))
+    assert len(data['entries']) == 1
+    manager.evict('alice')
+    restored = manager.get('alice')
+    assert restored.history[-1] is restored.undo_stack[-1].appended[-1]
+
+def test_discard_and_close(base_dir):
+    manager = make_manager(base_dir)
+    calculate(manager.get('alice'), 'add', 1, 1)
+    manager.get('bob')
+    manager.evict('bob')
+    assert not manager.evict('bob')
+    manager.discard('bob')
+    assert not manager.session_file('bob').exists()
+    manager.discard('alice')
+    assert len(manager) == 0
+    calculate(manager.get('carol'), 'add', 1, 1)
+    manager.close()
+    assert len(manager) == 0
+    assert json.loads(manager.session_file('carol').read_text())['history'] == [0]
+
+def test_invalid_session_id(base_dir):
+    manager = make_manager(base_dir)
+    with pytest.raises(ValidationError, match="Invalid session id"):
+        manager.get('../escape')
+
+
+# Test Session Statistics
+
+def test_session_stats():
+    stats = SessionStats()
+    assert stats.hit_rate == 0.0
+    assert stats.mean_rehydration_ms == 0.0
+    stats = SessionStats(hits=3, created=1, rehydrated=2, evictions=2, rehydration_seconds=0.01)
+    assert stats.hit_rate == 0.5
+    assert str(stats) == "3 hits, 3 misses (50.0% hit rate), 2 evictions, 5.00 ms mean rehydration"